@@ -8,7 +8,11 @@ from .config import Config
 
 db = SQLAlchemy()
 
-def create_app(config_class=Config):
+def create_app(config_class=Config, start_sync_workers: bool = True):
+    """
+    :param start_sync_workers: Whether to start the SYNC_WORKERS threads of the sync queue. Command line tools
+        pass False, since a short-lived process must not claim shared sync jobs it may exit in the middle of.
+    """
     app = Flask(__name__, template_folder='./templates', static_folder='./static')
     app.config.from_object(config_class)
 
@@ -32,8 +36,28 @@ def create_app(config_class=Config):
     db.init_app(app)
 
     with app.app_context():
-        from app.models import issue_model  # pylint: disable=unused-import
+        from app.models import (  # pylint: disable=unused-import
+            issue_model, sync_state_model, sync_job_model, index_version_model, duplicate_report_model
+        )
+        from app.models.schema_migrations import add_missing_columns, normalize_embeddings
         db.create_all()
+        add_missing_columns(db.engine, db.metadata)
+        normalize_embeddings(db.engine)
+
+    from .services.sync_queue import sync_queue
+    sync_queue.init_app(app, start_workers=start_sync_workers)
+
+    from .services.issue_service import init_query_batching
+    init_query_batching(app)
+
+    from .utils.compression import init_compression
+    init_compression(app)
+
+    from .utils.stage_timing import init_stage_timing
+    init_stage_timing(app)
+
+    from .utils.profiling import init_profiling
+    init_profiling(app)
 
     from .routes import main_routes
     app.register_blueprint(main_routes)
@@ -10,7 +10,54 @@ class Config:
     LOG_LEVEL = os.getenv('LOG_LEVEL') or logging.INFO
 
     SECRET_KEY = os.getenv('SECRET_KEY') or 'dummy'
+    GITHUB_API_URL = os.getenv('GITHUB_API_URL') or 'https://api.github.com'
     GITHUB_ACCESS_TOKEN = os.getenv('GITHUB_ACCESS_TOKEN') or ''
+    GITHUB_WEBHOOK_SECRET = os.getenv('GITHUB_WEBHOOK_SECRET') or ''
+    WEBHOOK_SYNC_TTL = float(os.getenv('WEBHOOK_SYNC_TTL') or 604800)
 
     SQLALCHEMY_DATABASE_URI = 'sqlite:///issues.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    SEARCH_MODE = os.getenv('SEARCH_MODE') or 'sync'
+    SEARCH_STALE_TTL = int(os.getenv('SEARCH_STALE_TTL') or 600)
+    SEARCH_SYNC_WAIT = float(os.getenv('SEARCH_SYNC_WAIT') or 30)
+    SEARCH_SNIPPET_LENGTH = int(os.getenv('SEARCH_SNIPPET_LENGTH') or 0)
+    SEARCH_CACHE_SIZE = int(os.getenv('SEARCH_CACHE_SIZE') or 256)
+    SEARCH_CACHE_TTL = float(os.getenv('SEARCH_CACHE_TTL') or 300)
+    CORPUS_CACHE_SIZE = int(os.getenv('CORPUS_CACHE_SIZE') or 16)
+    SEARCH_RANKING = os.getenv('SEARCH_RANKING') or 'semantic'
+    LEXICAL_WEIGHT = float(os.getenv('LEXICAL_WEIGHT') or 0.3)
+    LEXICAL_PREFILTER_K = int(os.getenv('LEXICAL_PREFILTER_K') or 0)
+    LEXICAL_PREFILTER_MIN_ISSUES = int(os.getenv('LEXICAL_PREFILTER_MIN_ISSUES') or 5000)
+    SEARCH_BATCH_MAX_QUERIES = int(os.getenv('SEARCH_BATCH_MAX_QUERIES') or 100)
+    QUERY_BATCH_SIZE = int(os.getenv('QUERY_BATCH_SIZE') or 32)
+    QUERY_BATCH_WAIT = float(os.getenv('QUERY_BATCH_WAIT') or 0.005)
+
+    MULTI_SEARCH_MAX_REPOSITORIES = int(os.getenv('MULTI_SEARCH_MAX_REPOSITORIES') or 50)
+    MULTI_SEARCH_CONCURRENCY = int(os.getenv('MULTI_SEARCH_CONCURRENCY') or 4)
+    MULTI_SEARCH_MAX_REQUESTS = int(os.getenv('MULTI_SEARCH_MAX_REQUESTS') or 10)
+    MULTI_SEARCH_TOP_K = int(os.getenv('MULTI_SEARCH_TOP_K') or 100)
+
+    EMBEDDING_STORE_DIR = os.getenv('EMBEDDING_STORE_DIR', './embeddings')
+    SYNC_LOCK_DIR = os.getenv('SYNC_LOCK_DIR', './locks')
+
+    SYNC_WORKERS = int(os.getenv('SYNC_WORKERS') or 2)
+    SYNC_QUEUE_BACKEND = os.getenv('SYNC_QUEUE_BACKEND') or 'memory'
+    SYNC_QUEUE_POLL_INTERVAL = float(os.getenv('SYNC_QUEUE_POLL_INTERVAL') or 1.0)
+    SYNC_JOB_LEASE = float(os.getenv('SYNC_JOB_LEASE') or 60)
+
+    INDEX_BATCH_SIZE = int(os.getenv('INDEX_BATCH_SIZE') or 256)
+    INDEX_CONCURRENCY = int(os.getenv('INDEX_CONCURRENCY') or 10)
+
+    STREAM_POLL_INTERVAL = float(os.getenv('STREAM_POLL_INTERVAL') or 0.25)
+
+    DUPLICATE_THRESHOLD = float(os.getenv('DUPLICATE_THRESHOLD') or 0.9)
+    DUPLICATE_BLOCK_SIZE = int(os.getenv('DUPLICATE_BLOCK_SIZE') or 2048)
+
+    COMPRESSION_ENABLED = (os.getenv('COMPRESSION_ENABLED') or 'true').lower() == 'true'
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE') or 500)
+
+    SERVER_TIMING_ENABLED = (os.getenv('SERVER_TIMING_ENABLED') or 'true').lower() == 'true'
+    METRICS_ENABLED = (os.getenv('METRICS_ENABLED') or 'true').lower() == 'true'
+    PROFILING_ENABLED = (os.getenv('PROFILING_ENABLED') or 'false').lower() == 'true'
+    PROFILE_DIR = os.getenv('PROFILE_DIR') or './profiles'
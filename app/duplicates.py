@@ -0,0 +1,54 @@
+"""
+Build the duplicate report of a repository from the command line, e.g. from cron:
+
+    python -m app.duplicates owner/repository --threshold 0.9 --output report.json
+"""
+# pylint: disable=C0415
+
+import argparse
+import asyncio
+import json
+import sys
+from dataclasses import asdict
+from typing import List, Optional
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='python -m app.duplicates', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('repository', help="Repository in the format 'owner/repository'")
+    parser.add_argument('--threshold', type=float, help='Minimum similarity that links two issues')
+    parser.add_argument('--block-size', type=int, help='Rows per tile of the similarity matrix')
+    parser.add_argument('--sync', action='store_true', help='Sync the repository before clustering')
+    parser.add_argument('--output', help='Write the report as JSON to this file')
+    args = parser.parse_args(argv)
+    if args.repository.count('/') != 1 or not all(args.repository.split('/')):
+        parser.error("repository must be in the format 'owner/repository'")
+    if args.threshold is not None and not 0 < args.threshold <= 1:
+        parser.error('threshold must be in (0, 1]')
+    return args
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+
+    from app import create_app
+    from app.services.duplicate_service import build_duplicate_report
+
+    app = create_app(start_sync_workers=False)
+    with app.app_context():
+        if args.sync:
+            from app.services.issue_service import get_issues
+            asyncio.run(get_issues(*args.repository.split('/')))
+        report = build_duplicate_report(args.repository, args.threshold, args.block_size)
+
+    print(f'{report.name}: {len(report.clusters)} clusters among {report.total_issues} issues '
+          f'(threshold {report.threshold})')
+    for cluster in report.clusters:
+        numbers = ', '.join(f'#{issue.number}' for issue in cluster.issues)
+        print(f'  [{cluster.similarity:.3f}] {numbers}: {cluster.issues[0].title}')
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(asdict(report), f, ensure_ascii=False, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+Sync and embed repositories outside the web server, e.g. to build their indexes off-peak:
+
+    python -m app.index owner/repository [owner/repository ...] --batch-size 256 --concurrency 10
+
+Every batch of embedded issues is stored as it completes. An interrupted run resumes where it
+stopped when it is started again, since issues that are stored and up to date are skipped.
+"""
+# pylint: disable=C0415
+
+import argparse
+import asyncio
+import sys
+import time
+from typing import List, Optional, TextIO
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='python -m app.index', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('repositories', nargs='+', help="Repositories in the format 'owner/repository'")
+    parser.add_argument('--batch-size', type=int, help='Issues embedded and stored per batch')
+    parser.add_argument('--concurrency', type=int, help='GitHub comment requests in flight')
+    parser.add_argument('--quiet', action='store_true', help='Do not display the progress')
+    args = parser.parse_args(argv)
+    for repository in args.repositories:
+        if repository.count('/') != 1 or not all(repository.split('/')):
+            parser.error(f"repository must be in the format 'owner/repository': {repository}")
+    for option in ('batch_size', 'concurrency'):
+        if getattr(args, option) is not None and getattr(args, option) < 1:
+            parser.error(f"{option.replace('_', '-')} must be positive")
+    return args
+
+class ProgressDisplay:
+    """
+    Redraw a single status line with the counters and throughput of an indexing run.
+    """
+    REFRESH_INTERVAL = 0.5
+
+    def __init__(self, stream: TextIO = sys.stderr, enabled: bool = True):
+        self.stream = stream
+        self.enabled = enabled
+        self.started_at = time.monotonic()
+        self._drawn_at = 0.0
+
+    def throughput(self, embedded: int) -> float:
+        return embedded / max(time.monotonic() - self.started_at, 1e-9)
+
+    def __call__(self, progress):
+        now = time.monotonic()
+        if not self.enabled or now - self._drawn_at < self.REFRESH_INTERVAL:
+            return
+        self._drawn_at = now
+        rate = self.throughput(progress.embedded)
+        remaining = (progress.total - progress.embedded) / rate if rate else None
+        eta = f', ETA {remaining:.0f}s' if remaining is not None else ''
+        self.stream.write(
+            f'\r{progress.name}: listed {progress.fetched}, embedded {progress.embedded}/{progress.total}, '
+            f'stored {progress.persisted} ({rate:.1f} issues/s{eta})\033[K'
+        )
+        self.stream.flush()
+
+    def finish(self):
+        if self.enabled and self._drawn_at:
+            self.stream.write('\n')
+            self.stream.flush()
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+
+    from app import create_app
+    from app.services.bulk_indexer import index_repository
+    from app.services.sync_progress import SyncProgress
+
+    app = create_app(start_sync_workers=False)
+    exit_code = 0
+    with app.app_context():
+        for name in args.repositories:
+            display = ProgressDisplay(enabled=not args.quiet)
+            progress = SyncProgress(name, on_change=display)
+            try:
+                asyncio.run(index_repository(
+                    *name.split('/'), batch_size=args.batch_size, concurrency=args.concurrency, progress=progress
+                ))
+            except Exception as e:
+                display.finish()
+                print(f'{name}: failed after storing {progress.persisted} issues: {e}', file=sys.stderr)
+                exit_code = 1
+                continue
+            display.finish()
+            elapsed = time.monotonic() - display.started_at
+            print(
+                f'{name}: {progress.persisted} issues embedded in {elapsed:.1f}s '
+                f'({display.throughput(progress.embedded):.1f} issues/s), '
+                f'{progress.fetched - progress.total} already up to date'
+            )
+    return exit_code
+
+if __name__ == '__main__':
+    sys.exit(main())
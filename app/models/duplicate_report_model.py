@@ -0,0 +1,11 @@
+from app import db
+
+class DuplicateReport(db.Model):
+    __tablename__ = 'duplicate_reports'
+
+    name = db.Column(db.String, primary_key=True)
+    threshold = db.Column(db.Float, nullable=False)
+    total_issues = db.Column(db.Integer, nullable=False)
+    index_version = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.Float, nullable=False)
+    clusters = db.Column(db.PickleType, nullable=False)
@@ -0,0 +1,7 @@
+from app import db
+
+class IndexVersion(db.Model):
+    __tablename__ = 'index_versions'
+
+    name = db.Column(db.String, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
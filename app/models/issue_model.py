@@ -5,10 +5,16 @@ class Issue(db.Model):
 
     name = db.Column(db.String, primary_key=True)
     number = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String)
+    url = db.Column(db.String)
+    state = db.Column(db.String)
     comments = db.Column(db.PickleType)
+    terms = db.Column(db.PickleType)
     embedding = db.Column(db.LargeBinary, nullable=False)
     shape = db.Column(db.String, nullable=False)
     updated = db.Column(db.String, nullable=False)
+    # Rows stored before embeddings were scaled to unit length have NULL here until normalize_embeddings runs
+    normalized = db.Column(db.Boolean, default=True)
 
     __table_args__ = (
         db.PrimaryKeyConstraint('name', 'number'),
@@ -0,0 +1,69 @@
+import logging
+import numpy as np
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import MetaData
+
+logger = logging.getLogger(__name__)
+
+def add_missing_columns(engine: Engine, metadata: MetaData):
+    """
+    Add columns declared on the models that are missing from existing tables.
+
+    db.create_all only creates missing tables, so databases created by an older version
+    would otherwise fail on the first query touching a new column. Only nullable columns
+    can be added this way, which is what every column added after the initial schema is.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    with engine.begin() as connection:
+        for table in metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                logger.info('Adding column %s.%s (%s)', table.name, column.name, column_type)
+                connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+
+def normalize_embeddings(engine: Engine, batch_size: int = 1000) -> int:
+    """
+    Scale the embeddings of issues stored before embeddings were normalized to unit length.
+
+    Searches score stored embeddings with a plain dot product, which equals the cosine similarity
+    only for unit length vectors. Rows are marked through the normalized column, so each row is
+    rewritten once, in batches, however often this runs.
+
+    :return: The number of rewritten rows.
+    """
+    if 'issues' not in inspect(engine).get_table_names():
+        return 0
+
+    count = 0
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(text(
+                'SELECT name, number, embedding FROM issues WHERE normalized IS NULL LIMIT :limit'
+            ), {'limit': batch_size}).fetchall()
+            if not rows:
+                break
+            connection.execute(text(
+                'UPDATE issues SET embedding = :embedding, normalized = :normalized '
+                'WHERE name = :name AND number = :number'
+            ), [
+                {
+                    'name': row.name, 'number': row.number, 'embedding': to_unit_length(row.embedding),
+                    'normalized': True
+                } for row in rows
+            ])
+        count += len(rows)
+    if count:
+        logger.info('Normalized the embeddings of %d issues', count)
+    return count
+
+def to_unit_length(embedding: bytes) -> bytes:
+    vector = np.frombuffer(embedding, dtype=np.float32)
+    return (vector / max(float(np.linalg.norm(vector)), 1e-12)).astype(np.float32).tobytes()
@@ -0,0 +1,20 @@
+from app import db
+
+class SyncJob(db.Model):
+    __tablename__ = 'sync_jobs'
+
+    id = db.Column(db.String, primary_key=True)
+    name = db.Column(db.String, nullable=False, index=True)
+    owner = db.Column(db.String, nullable=False)
+    repository = db.Column(db.String, nullable=False)
+    status = db.Column(db.String, nullable=False, index=True)
+    fetched = db.Column(db.Integer, nullable=False, default=0)
+    embedded = db.Column(db.Integer, nullable=False, default=0)
+    persisted = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.String)
+    cancel_requested = db.Column(db.Boolean, nullable=False, default=False)
+    created_at = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.Float, nullable=False)
+    lease_expires_at = db.Column(db.Float)
+    lease_owner = db.Column(db.String)
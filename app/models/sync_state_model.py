@@ -0,0 +1,8 @@
+from app import db
+
+class SyncState(db.Model):
+    __tablename__ = 'sync_states'
+
+    name = db.Column(db.String, primary_key=True)
+    synced_at = db.Column(db.Float, nullable=False)
+    webhook_at = db.Column(db.Float)
@@ -0,0 +1,42 @@
+import logging
+from dataclasses import asdict
+from typing import Optional
+from app import db
+from app.models.duplicate_report_model import DuplicateReport
+from app.schemas.duplicate_report_schema import DuplicateReportSchema, DuplicateClusterSchema, DuplicateIssueSchema
+
+logger = logging.getLogger(__name__)
+
+class DuplicateReportRepository:
+    @staticmethod
+    def select_by_name(name: str) -> Optional[DuplicateReportSchema]:
+        report = db.session.get(DuplicateReport, name)
+        if report is None:
+            return None
+        return DuplicateReportSchema(
+            name=report.name,
+            threshold=report.threshold,
+            total_issues=report.total_issues,
+            index_version=report.index_version,
+            created_at=report.created_at,
+            clusters=[
+                DuplicateClusterSchema(
+                    issues=[DuplicateIssueSchema(**issue) for issue in cluster['issues']],
+                    similarity=cluster['similarity']
+                ) for cluster in report.clusters
+            ]
+        )
+
+    @staticmethod
+    def upsert(report: DuplicateReportSchema):
+        logger.info('Saving the duplicate report of %s with %d clusters', report.name, len(report.clusters))
+        # Clusters are stored as plain data so that the rows do not depend on the schema classes
+        db.session.merge(DuplicateReport(
+            name=report.name,
+            threshold=report.threshold,
+            total_issues=report.total_issues,
+            index_version=report.index_version,
+            created_at=report.created_at,
+            clusters=[asdict(cluster) for cluster in report.clusters]
+        ))
+        db.session.commit()
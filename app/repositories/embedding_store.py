@@ -0,0 +1,348 @@
+import json
+import logging
+import os
+import re
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+from filelock import FileLock
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class EmbeddingView:
+    """
+    Read-only view of one repository's embeddings.
+
+    ``matrix`` is a memory map over the raw float32 file, so every process that opens
+    the same store shares the operating system page cache instead of holding its own copy.
+    ``rows`` maps an issue number to the row holding its latest embedding and ``norms``
+    holds the L2 norm of every row, so scoring never recomputes them. ``normalized`` is set
+    when every row has unit length, in which case scores are plain dot products.
+    """
+    name: str
+    matrix: np.ndarray
+    numbers: np.ndarray
+    rows: Dict[int, int]
+    generation: int
+    norms: np.ndarray
+    normalized: bool = False
+
+    def __len__(self):
+        return len(self.rows)
+
+    def has_all(self, numbers: Sequence[int]) -> bool:
+        return all(number in self.rows for number in numbers)
+
+    def row_indices(self, numbers: Sequence[int]) -> np.ndarray:
+        return np.fromiter((self.rows[number] for number in numbers), dtype=np.int64, count=len(numbers))
+
+    def cosine_scores(self, rows: np.ndarray, query: np.ndarray, chunk_size: int = 8192) -> np.ndarray:
+        """
+        Calculate the cosine similarity of the given rows to a unit-length query.
+
+        Only the requested rows are read, chunk by chunk, so superseded rows are skipped and the
+        memory used does not grow with the size of the repository.
+        """
+        scores = np.empty(len(rows), dtype=np.float32)
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            scores[start:start + chunk_size] = np.asarray(self.matrix[chunk]) @ query
+        if self.normalized:
+            return scores
+        return scores / np.maximum(self.norms[rows], 1e-12)
+
+    def unit_rows(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Read the given rows scaled to unit length.
+        """
+        matrix = np.asarray(self.matrix[rows])
+        if self.normalized:
+            return matrix
+        return matrix / np.maximum(self.norms[rows], 1e-12)[:, None]
+
+class EmbeddingStore:
+    """
+    Append-friendly on-disk embedding store with one set of files per repository.
+
+    - ``<key>@<generation>.f32``: raw float32 rows, one embedding per row
+    - ``<key>@<generation>.ids``: raw int64 issue numbers, one per row (the sidecar id map)
+    - ``<key>@<generation>.norm``: raw float32 L2 norms, one per row
+    - ``<key>.json``: metadata (dimension, row count, generation and whether every row has unit length)
+
+    Updated issues are appended as new rows and the id map resolves to the latest one.
+    Once stale rows outnumber live ones the files are rewritten compactly. Writes hold a
+    file lock per repository, since worker processes share the store.
+
+    Readers take no lock. Every rewrite goes to the files of a new generation, which is published
+    by replacing the metadata atomically, so a reader maps either the old or the new generation,
+    never a mix of both. Appends only grow the files of the current generation before the row count
+    in the metadata, so readers see a consistent prefix.
+    """
+    LOAD_ATTEMPTS = 3
+    DTYPE = np.float32
+    ID_DTYPE = np.int64
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.RLock()
+        self._views: Dict[str, EmbeddingView] = {}
+        self._lock_depths: Dict[str, int] = {}
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def to_key(name: str) -> str:
+        return re.sub(r'[^A-Za-z0-9_.-]', '__', name)
+
+    def _path(self, name: str, suffix: str) -> str:
+        return os.path.join(self.directory, f'{self.to_key(name)}.{suffix}')
+
+    def _data_path(self, name: str, meta: dict, suffix: str) -> str:
+        """
+        Path of a data file of the generation described by meta. Stores written before generations
+        had files of their own keep using unversioned files until they are rewritten.
+        """
+        if not meta.get('versioned'):
+            return self._path(name, suffix)
+        # '@' never occurs in a key, so the files of one repository never match those of another
+        return os.path.join(self.directory, f'{self.to_key(name)}@{meta["generation"]}.{suffix}')
+
+    def _remove_data_files(self, name: str, keep: Optional[str] = None):
+        """
+        Remove the data files of every generation of a repository except the one with the given path prefix.
+        Processes that still map a removed generation keep reading it until they load the new one.
+        """
+        key = self.to_key(name)
+        pattern = re.compile(rf'{re.escape(key)}(@\d+)?\.(f32|ids|norm)')
+        for file_name in os.listdir(self.directory):
+            path = os.path.join(self.directory, file_name)
+            if pattern.fullmatch(file_name) and (keep is None or not path.startswith(f'{keep}.')):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    @contextmanager
+    def _locked(self, name: str) -> Iterator[None]:
+        """
+        Hold the lock of a repository against other threads and, through a lock file, other processes.
+        Reentrant within a thread, so a locked append can fall back to a write.
+        """
+        with self._lock:
+            depth = self._lock_depths.get(name, 0)
+            self._lock_depths[name] = depth + 1
+            try:
+                if depth:
+                    yield
+                else:
+                    with FileLock(self._path(name, 'lock')):
+                        yield
+            finally:
+                self._lock_depths[name] = depth
+
+    def exists(self, name: str) -> bool:
+        return os.path.exists(self._path(name, 'json'))
+
+    def read_meta(self, name: str) -> Optional[dict]:
+        try:
+            with open(self._path(name, 'json'), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_meta(self, name: str, meta: dict):
+        tmp_path = self._path(name, 'json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._path(name, 'json'))
+
+    def write(self, name: str, numbers: Sequence[int], matrix: np.ndarray):
+        """
+        Replace the stored embeddings of a repository.
+
+        :param name: Repository name in the format 'owner/repository'.
+        :param numbers: Issue numbers, one per row of the matrix.
+        :param matrix: A 2-D array of embeddings.
+        """
+        matrix = np.ascontiguousarray(matrix, dtype=self.DTYPE)
+        ids = np.asarray(numbers, dtype=self.ID_DTYPE)
+        norms = to_norms(matrix)
+        with self._locked(name):
+            previous = self.read_meta(name) or {}
+            meta = {
+                'dim': int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+                'rows': len(ids),
+                'generation': previous.get('generation', 0) + 1,
+                'normalized': is_unit_length(norms),
+                'versioned': True
+            }
+            for suffix, data in (('f32', matrix), ('ids', ids), ('norm', norms)):
+                data.tofile(self._data_path(name, meta, suffix))
+            # Publishing the metadata switches readers to the new generation in one step
+            self._write_meta(name, meta)
+            self._remove_data_files(name, keep=self._data_path(name, meta, '')[:-1])
+            self._views.pop(name, None)
+        logger.info('Wrote %d embeddings for %s', len(ids), name)
+
+    def append(self, name: str, numbers: Sequence[int], matrix: np.ndarray):
+        """
+        Append embeddings to a repository, superseding earlier rows with the same issue number.
+        Data is appended before the metadata is updated, so concurrent readers always see a
+        consistent prefix of the files.
+        """
+        matrix = np.ascontiguousarray(matrix, dtype=self.DTYPE)
+        ids = np.asarray(numbers, dtype=self.ID_DTYPE)
+        with self._locked(name):
+            meta = self.read_meta(name)
+            if meta is None:
+                self.write(name, numbers, matrix)
+                return
+            if matrix.ndim != 2 or matrix.shape[1] != meta['dim']:
+                raise ValueError(f'Embedding dimension mismatch for {name}: {matrix.shape} vs {meta["dim"]}')
+            if not os.path.exists(self._data_path(name, meta, 'norm')):
+                # Stores written before norms were recorded
+                stored = np.memmap(
+                    self._data_path(name, meta, 'f32'), dtype=self.DTYPE, mode='r', shape=(meta['rows'], meta['dim'])
+                )
+                to_norms(stored).tofile(self._data_path(name, meta, 'norm'))
+
+            norms = to_norms(matrix)
+            for suffix, data, width in (('f32', matrix, meta['dim']), ('ids', ids, 1), ('norm', norms, 1)):
+                with open(self._data_path(name, meta, suffix), 'ab+') as f:
+                    # Drop any bytes beyond the committed rows left by an interrupted append
+                    f.truncate(meta['rows'] * data.itemsize * width)
+                    f.seek(0, os.SEEK_END)
+                    data.tofile(f)
+            meta['rows'] += len(ids)
+            meta['normalized'] = meta.get('normalized', False) and is_unit_length(norms)
+            self._write_meta(name, meta)
+        logger.info('Appended %d embeddings for %s', len(ids), name)
+
+        view = self.load(name)
+        if view is not None and meta['rows'] > 2 * len(view):
+            self.compact(name)
+
+    def compact(self, name: str):
+        with self._locked(name):
+            view = self.load(name)
+            if view is None:
+                return
+            numbers = sorted(view.rows)
+            self.write(name, numbers, np.asarray(view.matrix[view.row_indices(numbers)]))
+        logger.info('Compacted embeddings for %s', name)
+
+    def remove(self, name: str, numbers: Sequence[int]):
+        """
+        Rewrite the embeddings of a repository without the given issues.
+        """
+        with self._locked(name):
+            view = self.load(name)
+            if view is None:
+                return
+            removed = set(numbers)
+            kept = sorted(number for number in view.rows if number not in removed)
+            if len(kept) == len(view):
+                return
+            if not kept:
+                self.delete(name)
+                return
+            self.write(name, kept, np.asarray(view.matrix[view.row_indices(kept)]))
+        logger.info('Removed %d embeddings from %s', len(view) - len(kept), name)
+
+    def load(self, name: str) -> Optional[EmbeddingView]:
+        """
+        Memory-map the embeddings of a repository.
+
+        :param name: Repository name in the format 'owner/repository'.
+        :return: An EmbeddingView, or None if nothing is stored for the repository.
+        """
+        for attempt in range(self.LOAD_ATTEMPTS):
+            meta = self.read_meta(name)
+            if meta is None or not meta['rows']:
+                return None
+
+            cached = self._views.get(name)
+            if cached is not None and cached.generation == meta['generation'] and len(cached.numbers) == meta['rows']:
+                return cached
+
+            try:
+                view = self._map(name, meta)
+            except (FileNotFoundError, ValueError) as e:
+                # Another process published a new generation and removed this one while it was being mapped
+                if attempt == self.LOAD_ATTEMPTS - 1:
+                    raise
+                logger.debug('Loading the embeddings of %s again: %s', name, e)
+                continue
+            self._views[name] = view
+            return view
+        return None
+
+    def _map(self, name: str, meta: dict) -> EmbeddingView:
+        rows = meta['rows']
+        paths = {suffix: self._data_path(name, meta, suffix) for suffix in ('f32', 'ids')}
+        for suffix, size in (('f32', rows * meta['dim'] * np.dtype(self.DTYPE).itemsize),
+                             ('ids', rows * np.dtype(self.ID_DTYPE).itemsize)):
+            if os.path.getsize(paths[suffix]) < size:
+                raise ValueError(f'{paths[suffix]} holds fewer than the {rows} rows of generation {meta["generation"]}')
+        matrix = np.memmap(paths['f32'], dtype=self.DTYPE, mode='r', shape=(rows, meta['dim']))
+        numbers = np.memmap(paths['ids'], dtype=self.ID_DTYPE, mode='r', shape=(rows,))
+        # Later rows supersede earlier ones for the same issue number
+        row_map = {int(number): row for row, number in enumerate(numbers.tolist())}
+        return EmbeddingView(
+            name=name, matrix=matrix, numbers=numbers, rows=row_map, generation=meta['generation'],
+            norms=self._load_norms(name, meta, matrix), normalized=meta.get('normalized', False)
+        )
+
+    def _load_norms(self, name: str, meta: dict, matrix: np.ndarray) -> np.ndarray:
+        path = self._data_path(name, meta, 'norm')
+        if os.path.exists(path) and os.path.getsize(path) >= len(matrix) * np.dtype(self.DTYPE).itemsize:
+            return np.memmap(path, dtype=self.DTYPE, mode='r', shape=(len(matrix),))
+        # Stores written before norms were recorded
+        return to_norms(matrix)
+
+    def delete(self, name: str):
+        with self._locked(name):
+            try:
+                os.remove(self._path(name, 'json'))
+            except FileNotFoundError:
+                pass
+            self._remove_data_files(name)
+            self._views.pop(name, None)
+
+_embedding_stores: Dict[str, EmbeddingStore] = {}
+
+def get_embedding_store() -> Optional[EmbeddingStore]:
+    """
+    Return the embedding store configured by EMBEDDING_STORE_DIR, or None when it is disabled.
+    """
+    directory = current_app.config.get('EMBEDDING_STORE_DIR')
+    if not directory:
+        return None
+    store = _embedding_stores.get(directory)
+    if store is None:
+        store = _embedding_stores.setdefault(directory, EmbeddingStore(directory))
+    return store
+
+def to_norms(matrix: np.ndarray) -> np.ndarray:
+    if matrix.ndim != 2 or matrix.shape[0] == 0:
+        return np.empty(0, dtype=EmbeddingStore.DTYPE)
+    return np.linalg.norm(matrix, axis=1).astype(EmbeddingStore.DTYPE)
+
+def is_unit_length(norms: np.ndarray) -> bool:
+    """
+    Whether every row with these norms has unit length. Zero rows score 0 either way, so they count as unit length.
+    """
+    return bool(np.all((np.abs(norms - 1) < 1e-3) | (norms == 0)))
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+def to_embedding_matrix(embeddings: List[bytes]) -> np.ndarray:
+    """
+    Stack serialized float32 embeddings into a 2-D matrix.
+    """
+    return np.stack([np.frombuffer(embedding, dtype=EmbeddingStore.DTYPE) for embedding in embeddings])
@@ -0,0 +1,36 @@
+import logging
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.index_version_model import IndexVersion
+
+logger = logging.getLogger(__name__)
+
+class IndexVersionRepository:
+    @staticmethod
+    def select_version(name: str) -> int:
+        index_version = db.session.get(IndexVersion, name)
+        return index_version.version if index_version else 0
+
+    @staticmethod
+    def increment(name: str) -> int:
+        """
+        Bump the index version of a repository and return the new version.
+        The increment is done in SQL so that concurrent processes never lose an update.
+        """
+        updated = IndexVersion.query.filter(IndexVersion.name == name).update(
+            {'version': IndexVersion.version + 1}, synchronize_session=False
+        )
+        if not updated:
+            db.session.add(IndexVersion(name=name, version=1))
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # Another process created the row first
+                db.session.rollback()
+                return IndexVersionRepository.increment(name)
+        else:
+            db.session.commit()
+        db.session.expire_all()
+        version = IndexVersionRepository.select_version(name)
+        logger.info('Incremented the index version of %s to %d', name, version)
+        return version
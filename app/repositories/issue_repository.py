@@ -1,7 +1,8 @@
 import logging
-from typing import List
+from typing import Dict, Iterable, Iterator, List, Optional
 from app import db
 from app.models.issue_model import Issue
+from app.utils.metrics import db_rows_written
 
 logger = logging.getLogger(__name__)
 
@@ -17,13 +18,93 @@ class IssueRepository:
         logger.info('Selected %d issues for name: %s', len(issues), name)
         return issues
 
+    @staticmethod
+    def select_metadata_by_name(name: str) -> List:
+        """
+        Select every issue of a repository without its embedding, for searches that read the
+        embeddings from the embedding store.
+        """
+        return Issue.query.with_entities(
+            Issue.number, Issue.title, Issue.url, Issue.state, Issue.comments, Issue.shape, Issue.updated
+        ).filter(Issue.name == name).all()
+
+    @staticmethod
+    def select_by_primary_key(name: str, number: int) -> Optional[Issue]:
+        return db.session.get(Issue, (name, number))
+
+    @staticmethod
+    def select_by_numbers(name: str, numbers: List[int]) -> List[Issue]:
+        return Issue.query.filter(Issue.name == name, Issue.number.in_(numbers)).all()
+
+    @staticmethod
+    def select_updated_by_name(name: str) -> Dict[int, str]:
+        """
+        Return the last update of every stored issue of a repository by number, without loading the issues.
+        """
+        return dict(Issue.query.with_entities(Issue.number, Issue.updated).filter(Issue.name == name).all())
+
+    @staticmethod
+    def count_by_name(name: str) -> int:
+        return Issue.query.filter(Issue.name == name).count()
+
+    @staticmethod
+    def iter_embeddings_by_name(name: str, batch_size: int = 1000) -> Iterator:
+        """
+        Stream the number, display columns and embedding of every issue of a repository
+        without loading the comments or holding every row at once.
+        """
+        return Issue.query.with_entities(
+            Issue.number, Issue.title, Issue.url, Issue.state, Issue.embedding
+        ).filter(Issue.name == name).order_by(Issue.number).yield_per(batch_size)
+
+    @staticmethod
+    def iter_by_name(name: str, batch_size: int = 1000) -> Iterator[Issue]:
+        """
+        Stream every issue of a repository in the order of their numbers.
+        """
+        return Issue.query.filter(Issue.name == name).order_by(Issue.number).yield_per(batch_size)
+
+    @staticmethod
+    def iter_terms_by_name(name: str, batch_size: int = 1000) -> Iterator:
+        """
+        Stream the lexical terms of every issue of a repository.
+        The title and comments are included for issues stored before terms were recorded.
+        """
+        return Issue.query.with_entities(
+            Issue.number, Issue.terms, Issue.title, Issue.comments
+        ).filter(Issue.name == name).yield_per(batch_size)
+
     @staticmethod
     def bulk_insert(issues: List[Issue]):
         logger.info('Inserting %d issues in bulk', len(issues))
         db.session.bulk_save_objects(issues)
         db.session.commit()
+        db_rows_written.inc(len(issues), table='issues')
         logger.info('Bulk insert completed')
 
+    @staticmethod
+    def replace_all_by_name(name: str, batches: Iterable[List[dict]]) -> int:
+        """
+        Replace every issue of a repository in a single transaction.
+
+        :param batches: Batches of column values, one dict per issue, inserted in bulk.
+        :return: The number of inserted issues.
+        """
+        logger.info('Replacing the issues of %s', name)
+        count = 0
+        try:
+            Issue.query.filter(Issue.name == name).delete(synchronize_session=False)
+            for batch in batches:
+                db.session.bulk_insert_mappings(Issue, batch)
+                count += len(batch)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        db_rows_written.inc(count, table='issues')
+        logger.info('Replaced the issues of %s with %d issues', name, count)
+        return count
+
     @staticmethod
     def delete_all_by_primary_key(issues: List[Issue]):
         issue_names = [issue.name for issue in issues]
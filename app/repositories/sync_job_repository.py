@@ -0,0 +1,139 @@
+import logging
+from dataclasses import asdict
+from typing import Optional
+from app import db
+from app.models.sync_job_model import SyncJob
+from app.schemas.sync_job_schema import SyncJobSchema, SyncCountersSchema, ACTIVE_STATUSES, QUEUED, RUNNING
+
+logger = logging.getLogger(__name__)
+
+def to_schema(job: SyncJob) -> SyncJobSchema:
+    return SyncJobSchema(
+        id=job.id,
+        name=job.name,
+        owner=job.owner,
+        repository=job.repository,
+        status=job.status,
+        counters=SyncCountersSchema(
+            fetched=job.fetched, total=job.total, embedded=job.embedded, persisted=job.persisted
+        ),
+        error=job.error,
+        cancel_requested=job.cancel_requested,
+        created_at=job.created_at,
+        updated_at=job.updated_at
+    )
+
+def to_columns(job: SyncJobSchema) -> dict:
+    columns = {key: value for key, value in vars(job).items() if key != 'counters'}
+    columns.update(asdict(job.counters))
+    return columns
+
+class SyncJobRepository:
+    @staticmethod
+    def insert(job: SyncJobSchema):
+        logger.info('Inserting sync job %s for %s', job.id, job.name)
+        db.session.add(SyncJob(**to_columns(job)))
+        db.session.commit()
+
+    @staticmethod
+    def select_by_id(job_id: str) -> Optional[SyncJobSchema]:
+        job = db.session.get(SyncJob, job_id)
+        return to_schema(job) if job else None
+
+    @staticmethod
+    def select_active_by_name(name: str) -> Optional[SyncJobSchema]:
+        job = SyncJob.query.filter(
+            SyncJob.name == name, SyncJob.status.in_(ACTIVE_STATUSES)
+        ).order_by(SyncJob.created_at).first()
+        return to_schema(job) if job else None
+
+    @staticmethod
+    def claim_next(
+            updated_at: float, lease_expires_at: float, lease_owner: Optional[str] = None
+        ) -> Optional[SyncJobSchema]:
+        """
+        Mark the oldest queued job as running and return it.
+        """
+        job = SyncJob.query.filter(SyncJob.status == QUEUED).order_by(SyncJob.created_at).first()
+        if job is None:
+            return None
+        return SyncJobRepository.claim(job.id, updated_at, lease_expires_at, lease_owner)
+
+    @staticmethod
+    def claim(
+            job_id: str, updated_at: float, lease_expires_at: float, lease_owner: Optional[str] = None
+        ) -> Optional[SyncJobSchema]:
+        """
+        Mark a queued job as running under a lease and return it.
+        The conditional update makes the claim atomic across worker processes.
+
+        :param lease_owner: Identifies this claim. Only its owner renews the lease and writes the running job.
+        """
+        claimed = SyncJob.query.filter(SyncJob.id == job_id, SyncJob.status == QUEUED).update(
+            {
+                'status': RUNNING, 'updated_at': updated_at, 'lease_expires_at': lease_expires_at,
+                'lease_owner': lease_owner
+            },
+            synchronize_session=False
+        )
+        db.session.commit()
+        if not claimed:
+            return None
+        db.session.expire_all()
+        return SyncJobRepository.select_by_id(job_id)
+
+    @staticmethod
+    def renew_lease(job_id: str, updated_at: float, lease_expires_at: float, lease_owner: Optional[str] = None):
+        SyncJob.query.filter(
+            SyncJob.id == job_id, SyncJob.status == RUNNING, SyncJob.lease_owner == lease_owner
+        ).update({'updated_at': updated_at, 'lease_expires_at': lease_expires_at}, synchronize_session=False)
+        db.session.commit()
+
+    @staticmethod
+    def requeue_expired(now: float, lease: float) -> int:
+        """
+        Queue running jobs again whose lease has expired, e.g. because their worker process died.
+        Jobs claimed before leases were recorded expire once they have not been updated for a lease.
+
+        :return: The number of jobs queued again.
+        """
+        requeued = SyncJob.query.filter(
+            SyncJob.status == RUNNING,
+            db.or_(
+                SyncJob.lease_expires_at < now,
+                db.and_(SyncJob.lease_expires_at.is_(None), SyncJob.updated_at < now - lease)
+            )
+        ).update(
+            {'status': QUEUED, 'lease_expires_at': None, 'lease_owner': None, 'updated_at': now},
+            synchronize_session=False
+        )
+        db.session.commit()
+        if requeued:
+            logger.warning('Queued %d sync jobs again after their lease expired', requeued)
+        return requeued
+
+    @staticmethod
+    def update(job: SyncJobSchema, lease_owner: Optional[str] = None) -> bool:
+        """
+        Write a job, unless it has changed hands since it was read.
+
+        With a lease owner, the job is only written while it is running under that owner's claim, so a worker
+        whose lease expired cannot overwrite the run of the worker that claimed the job again. Without one,
+        e.g. to cancel a job that has not started, it is only written while it is still queued.
+
+        :return: Whether the job was written.
+        """
+        values = {key: value for key, value in to_columns(job).items() if key not in ('id', 'cancel_requested')}
+        query = SyncJob.query.filter(SyncJob.id == job.id)
+        if lease_owner is not None:
+            query = query.filter(SyncJob.status == RUNNING, SyncJob.lease_owner == lease_owner)
+        else:
+            query = query.filter(SyncJob.status == QUEUED)
+        updated = query.update(values, synchronize_session=False)
+        db.session.commit()
+        return bool(updated)
+
+    @staticmethod
+    def request_cancel(job_id: str):
+        SyncJob.query.filter(SyncJob.id == job_id).update({'cancel_requested': True}, synchronize_session=False)
+        db.session.commit()
@@ -0,0 +1,27 @@
+import logging
+from typing import Optional
+from app import db
+from app.models.sync_state_model import SyncState
+
+logger = logging.getLogger(__name__)
+
+class SyncStateRepository:
+    @staticmethod
+    def select_by_name(name: str) -> Optional[SyncState]:
+        return db.session.get(SyncState, name)
+
+    @staticmethod
+    def upsert(name: str, synced_at: float):
+        logger.info('Recording sync of %s at %f', name, synced_at)
+        db.session.merge(SyncState(name=name, synced_at=synced_at))
+        db.session.commit()
+
+    @staticmethod
+    def record_webhook(name: str, received_at: float):
+        """
+        Record the delivery of a webhook event for a repository that has been synced.
+        """
+        SyncState.query.filter(SyncState.name == name).update(
+            {'webhook_at': received_at}, synchronize_session=False
+        )
+        db.session.commit()
@@ -1,11 +1,24 @@
 import logging
 import traceback
-from flask import Blueprint, render_template, jsonify, request, session
-from .services.issue_service import get_related_issues
+from flask import (
+    Blueprint, Response, current_app, render_template, jsonify, request, session, stream_with_context,
+    send_from_directory
+)
+from .services.issue_service import (
+    get_related_issues, get_related_issues_batch, stream_related_issues, get_issue_comments
+)
+from .services.multi_repo_service import get_related_issues_across_repositories
+from .services.webhook_service import verify_signature, handle_webhook_event
+from .services.duplicate_service import get_duplicate_report, schedule_duplicate_report, is_duplicate_report_running
+from .services.sync_queue import sync_queue
 from .utils.exceptions import (
     MissingFieldsError, RepositoryNotFoundError, RateLimitExceededError,
-    UnauthorizedError, IssueFetchFailedError
+    UnauthorizedError, IssueFetchFailedError, InvalidFieldError, SyncJobNotFoundError, IssueNotFoundError,
+    DuplicateReportNotFoundError, OrganizationNotFoundError, SyncCancelledError, SyncJobFailedError
 )
+from .utils.validators import validate_repository_data, parse_threshold
+from .utils.metrics import metrics
+from .utils.profiling import profile_request, get_profile_dir
 
 main_routes = Blueprint('main_routes', __name__)
 logger = logging.getLogger(__name__)
@@ -26,18 +39,195 @@ def index():
 async def search():
     logger.debug('Search is called')
     try:
-        issues, detail = await get_related_issues(request.get_json())
+        with profile_request('search'):
+            issues, detail = await get_related_issues(request.get_json())
         return jsonify({
             "issues": issues,
             "detail": detail
         })
     except (
         MissingFieldsError, RepositoryNotFoundError, RateLimitExceededError,
-        UnauthorizedError, IssueFetchFailedError
+        UnauthorizedError, IssueFetchFailedError, InvalidFieldError, SyncJobFailedError
+    ) as e:
+        logger.error('%s', e)
+        logger.error(traceback.format_exc())
+        return jsonify({"errorMessage": str(e)}), 400
+    except SyncCancelledError as e:
+        logger.warning('%s', e)
+        return jsonify({"errorMessage": str(e)}), 409
+    except Exception as e:
+        logger.error('An unexpected error occurred: %s', e)
+        logger.error(traceback.format_exc())
+        return jsonify({"errorMessage": 'An unexpected error occurred. Please try again.'}), 500
+
+@main_routes.route('/search/batch', methods=['POST'])
+async def search_batch():
+    logger.debug('Search batch is called')
+    try:
+        results = await get_related_issues_batch(request.get_json())
+        return jsonify({
+            "results": [{"issues": issues, "detail": detail} for issues, detail in results]
+        })
+    except (
+        MissingFieldsError, RepositoryNotFoundError, RateLimitExceededError,
+        UnauthorizedError, IssueFetchFailedError, InvalidFieldError, SyncJobFailedError
+    ) as e:
+        logger.error('%s', e)
+        logger.error(traceback.format_exc())
+        return jsonify({"errorMessage": str(e)}), 400
+    except SyncCancelledError as e:
+        logger.warning('%s', e)
+        return jsonify({"errorMessage": str(e)}), 409
+    except Exception as e:
+        logger.error('An unexpected error occurred: %s', e)
+        logger.error(traceback.format_exc())
+        return jsonify({"errorMessage": 'An unexpected error occurred. Please try again.'}), 500
+
+@main_routes.route('/search/repositories', methods=['POST'])
+async def search_repositories():
+    logger.debug('Search repositories is called')
+    try:
+        issues, detail, repositories = await get_related_issues_across_repositories(request.get_json())
+        return jsonify({
+            "issues": issues,
+            "detail": detail,
+            "repositories": repositories
+        })
+    except (
+        MissingFieldsError, OrganizationNotFoundError, RateLimitExceededError, UnauthorizedError, InvalidFieldError
     ) as e:
         logger.error('%s', e)
         logger.error(traceback.format_exc())
         return jsonify({"errorMessage": str(e)}), 400
+    except SyncCancelledError as e:
+        logger.warning('%s', e)
+        return jsonify({"errorMessage": str(e)}), 409
+    except Exception as e:
+        logger.error('An unexpected error occurred: %s', e)
+        logger.error(traceback.format_exc())
+        return jsonify({"errorMessage": 'An unexpected error occurred. Please try again.'}), 500
+
+@main_routes.route('/search/stream', methods=['POST'])
+def search_stream():
+    logger.debug('Search stream is called')
+    try:
+        search_events = stream_related_issues(request.get_json())
+    except (MissingFieldsError, InvalidFieldError) as e:
+        logger.error('%s', e)
+        return jsonify({"errorMessage": str(e)}), 400
+
+    def generate():
+        try:
+            for search_event in search_events:
+                yield current_app.json.dumps(search_event) + '\n'
+        except Exception as e:
+            logger.error('An unexpected error occurred: %s', e)
+            logger.error(traceback.format_exc())
+            yield current_app.json.dumps({
+                "type": "error",
+                "errorMessage": 'An unexpected error occurred. Please try again.'
+            }) + '\n'
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@main_routes.route('/issues/<owner>/<repository>/<int:number>/comments')
+def issue_comments(owner, repository, number):
+    logger.debug('Issue comments is called')
+    try:
+        return jsonify({"number": number, "comments": get_issue_comments(owner, repository, number)})
+    except IssueNotFoundError as e:
+        logger.error('%s', e)
+        return jsonify({"errorMessage": str(e)}), 404
+
+@main_routes.route('/sync', methods=['POST'])
+def enqueue_sync():
+    logger.debug('Enqueue sync is called')
+    try:
+        form_data = request.get_json()
+        validate_repository_data(form_data)
+        job = sync_queue.enqueue(form_data.get('owner'), form_data.get('repository'))
+        return jsonify({"job": job}), 202
+    except MissingFieldsError as e:
+        logger.error('%s', e)
+        return jsonify({"errorMessage": str(e)}), 400
+    except Exception as e:
+        logger.error('An unexpected error occurred: %s', e)
+        logger.error(traceback.format_exc())
+        return jsonify({"errorMessage": 'An unexpected error occurred. Please try again.'}), 500
+
+@main_routes.route('/sync/<job_id>', methods=['GET'])
+def get_sync(job_id):
+    logger.debug('Get sync is called')
+    try:
+        return jsonify({"job": sync_queue.get(job_id)})
+    except SyncJobNotFoundError as e:
+        logger.error('%s', e)
+        return jsonify({"errorMessage": str(e)}), 404
+
+@main_routes.route('/sync/<job_id>', methods=['DELETE'])
+def cancel_sync(job_id):
+    logger.debug('Cancel sync is called')
+    try:
+        return jsonify({"job": sync_queue.cancel(job_id)})
+    except SyncJobNotFoundError as e:
+        logger.error('%s', e)
+        return jsonify({"errorMessage": str(e)}), 404
+
+@main_routes.route('/duplicates', methods=['POST'])
+def build_duplicates():
+    logger.debug('Build duplicates is called')
+    try:
+        form_data = request.get_json()
+        validate_repository_data(form_data)
+        name = f"{form_data.get('owner')}/{form_data.get('repository')}"
+        scheduled = schedule_duplicate_report(name, parse_threshold(form_data))
+        return jsonify({"name": name, "running": True, "scheduled": scheduled}), 202
+    except (MissingFieldsError, InvalidFieldError) as e:
+        logger.error('%s', e)
+        return jsonify({"errorMessage": str(e)}), 400
+
+@main_routes.route('/duplicates/<owner>/<repository>', methods=['GET'])
+def duplicates(owner, repository):
+    logger.debug('Duplicates is called')
+    name = f'{owner}/{repository}'
+    try:
+        return jsonify({"report": get_duplicate_report(name), "running": is_duplicate_report_running(name)})
+    except DuplicateReportNotFoundError as e:
+        logger.error('%s', e)
+        return jsonify({"errorMessage": str(e), "running": is_duplicate_report_running(name)}), 404
+
+@main_routes.route('/metrics', methods=['GET'])
+def get_metrics():
+    if not current_app.config.get('METRICS_ENABLED'):
+        return jsonify({"errorMessage": 'Metrics are disabled. Set METRICS_ENABLED to enable them.'}), 404
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@main_routes.route('/profiles/<name>', methods=['GET'])
+def get_profile(name):
+    if not current_app.config.get('PROFILING_ENABLED'):
+        return jsonify({"errorMessage": 'Profiling is disabled. Set PROFILING_ENABLED to enable it.'}), 404
+    return send_from_directory(get_profile_dir(), name, mimetype='application/octet-stream', as_attachment=True)
+
+@main_routes.route('/webhooks/github', methods=['POST'])
+async def github_webhook():
+    logger.debug('GitHub webhook is called')
+    secret = current_app.config.get('GITHUB_WEBHOOK_SECRET')
+    if not secret:
+        return jsonify({"errorMessage": 'Webhooks are disabled. Set GITHUB_WEBHOOK_SECRET to enable them.'}), 403
+    if not verify_signature(secret, request.get_data(), request.headers.get('X-Hub-Signature-256')):
+        logger.error('Rejected a webhook delivery with an invalid signature')
+        return jsonify({"errorMessage": 'Invalid signature'}), 401
+
+    try:
+        result = await handle_webhook_event(request.headers.get('X-GitHub-Event', ''), request.get_json(silent=True))
+        return jsonify({"result": result})
+    except InvalidFieldError as e:
+        logger.error('%s', e)
+        return jsonify({"errorMessage": str(e)}), 400
     except Exception as e:
         logger.error('An unexpected error occurred: %s', e)
         logger.error(traceback.format_exc())
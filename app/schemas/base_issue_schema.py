@@ -1,7 +1,7 @@
 from dataclasses import dataclass
 from typing import List, Optional
 
-@dataclass
+@dataclass(slots=True)
 class BaseIssueSchema:
     name: str
     number: int
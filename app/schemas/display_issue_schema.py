@@ -1,11 +1,14 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
+from typing import Optional
 from app.schemas.base_issue_schema import BaseIssueSchema
 from app.schemas.issue_schema import IssueSchema
 
-@dataclass
+@dataclass(slots=True)
 class DisplayIssueSchema(BaseIssueSchema):
     @classmethod
-    def from_issue_schema(cls, issue_schema: IssueSchema) -> 'DisplayIssueSchema':
+    def from_issue_schema(
+        cls, issue_schema: IssueSchema, threshold: Optional[float] = None
+    ) -> 'DisplayIssueSchema':
         return cls(
             name=issue_schema.name,
             number=issue_schema.number,
@@ -13,8 +16,19 @@ class DisplayIssueSchema(BaseIssueSchema):
             url=issue_schema.url,
             state=issue_schema.state,
             comments=issue_schema.comments,
-            threshold=issue_schema.threshold
+            threshold=issue_schema.threshold if threshold is None else threshold
         )
 
+    def with_snippets(self, snippet_length: int) -> 'DisplayIssueSchema':
+        """
+        Return a copy whose comments are cut to at most snippet_length characters.
+        """
+        if not snippet_length or not self.comments:
+            return self
+        return replace(self, comments=[
+            comment[:snippet_length].rstrip() + '…' if comment and len(comment) > snippet_length else comment
+            for comment in self.comments
+        ])
+
     def __repr__(self):
         return f'<DisplayIssueSchema name={self.name} number={self.number} title={self.title}>'
@@ -0,0 +1,24 @@
+from dataclasses import dataclass, field
+from typing import List
+
+@dataclass
+class DuplicateIssueSchema:
+    number: int
+    title: str
+    url: str
+    state: str
+
+@dataclass
+class DuplicateClusterSchema:
+    issues: List[DuplicateIssueSchema]
+    similarity: float
+
+@dataclass
+class DuplicateReportSchema:
+    name: str
+    threshold: float
+    total_issues: int
+    index_version: int
+    created_at: float
+    clusters: List[DuplicateClusterSchema] = field(default_factory=list)
+    stale: bool = False
@@ -0,0 +1,10 @@
+from dataclasses import dataclass
+from typing import Optional
+
+@dataclass
+class FreshnessSchema:
+    synced_at: Optional[str]
+    age_seconds: Optional[float]
+    stale: bool
+    refreshing: bool
+    job_id: Optional[str] = None
@@ -0,0 +1,133 @@
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, List, Optional, Sequence, Union
+
+import numpy as np
+
+from app.schemas.issue_schema import IssueSchema
+from app.schemas.display_issue_schema import DisplayIssueSchema
+
+if TYPE_CHECKING:
+    from app.repositories.embedding_store import EmbeddingView
+
+@dataclass(eq=False, slots=True)
+class IssueCorpusSchema:
+    """
+    Columnar form of the issues of one repository, as scored by a search.
+
+    Each attribute holds one column with an entry per issue, instead of one object per issue,
+    and DisplayIssueSchema objects are only built for the hits. ``embeddings`` holds the serialized
+    embeddings, which are empty when the embedding store provides them.
+    """
+    name: str
+    numbers: np.ndarray
+    titles: List[str]
+    urls: List[str]
+    states: List[str]
+    comments: List[Optional[List[str]]]
+    embeddings: List[bytes]
+    _matrix: Optional[np.ndarray] = field(default=None, init=False, repr=False)
+    _view_rows: Optional[tuple] = field(default=None, init=False, repr=False)
+
+    def __len__(self):
+        return len(self.numbers)
+
+    @classmethod
+    def of(cls, issues: Union['IssueCorpusSchema', Sequence[IssueSchema]]) -> 'IssueCorpusSchema':
+        return issues if isinstance(issues, cls) else cls.from_issues(issues)
+
+    @classmethod
+    def from_issues(cls, issues: Sequence[IssueSchema]) -> 'IssueCorpusSchema':
+        return cls(
+            name=issues[0].name if issues else '',
+            numbers=np.fromiter((issue.number for issue in issues), dtype=np.int64, count=len(issues)),
+            titles=[issue.title for issue in issues],
+            urls=[issue.url for issue in issues],
+            states=[issue.state for issue in issues],
+            comments=[issue.comments for issue in issues],
+            embeddings=[issue.embedding for issue in issues]
+        )
+
+    @classmethod
+    def from_rows(cls, name: str, rows: Sequence[Any]) -> 'IssueCorpusSchema':
+        """
+        Build a corpus from stored issue rows, which may have been selected without their embeddings.
+        """
+        return cls(
+            name=name,
+            numbers=np.fromiter((row.number for row in rows), dtype=np.int64, count=len(rows)),
+            titles=[row.title or '' for row in rows],
+            urls=[row.url or f'https://github.com/{name}/issues/{row.number}' for row in rows],
+            states=[row.state or '' for row in rows],
+            comments=[row.comments for row in rows],
+            embeddings=[getattr(row, 'embedding', b'') for row in rows]
+        )
+
+    @classmethod
+    def from_listing(cls, name: str, listed_issues: Sequence[dict], rows: Sequence[Any]) -> 'IssueCorpusSchema':
+        """
+        Build a corpus from issues listed by GitHub and their up-to-date stored rows, one row per listed issue.
+        The listing provides the title, URL and state, and the rows the comments and embeddings.
+        """
+        return cls(
+            name=name,
+            numbers=np.fromiter((issue['number'] for issue in listed_issues), dtype=np.int64, count=len(listed_issues)),
+            titles=[issue['title'] for issue in listed_issues],
+            urls=[issue['html_url'] for issue in listed_issues],
+            states=[issue['state'] for issue in listed_issues],
+            comments=[row.comments for row in rows],
+            embeddings=[getattr(row, 'embedding', b'') for row in rows]
+        )
+
+    @classmethod
+    def concat(cls, name: str, corpora: Sequence['IssueCorpusSchema']) -> 'IssueCorpusSchema':
+        return cls(
+            name=name,
+            numbers=np.concatenate([corpus.numbers for corpus in corpora]) if corpora else np.empty(0, dtype=np.int64),
+            titles=[title for corpus in corpora for title in corpus.titles],
+            urls=[url for corpus in corpora for url in corpus.urls],
+            states=[state for corpus in corpora for state in corpus.states],
+            comments=[comments for corpus in corpora for comments in corpus.comments],
+            embeddings=[embedding for corpus in corpora for embedding in corpus.embeddings]
+        )
+
+    def take(self, indices: np.ndarray) -> 'IssueCorpusSchema':
+        return IssueCorpusSchema(
+            name=self.name,
+            numbers=self.numbers[indices],
+            titles=[self.titles[i] for i in indices],
+            urls=[self.urls[i] for i in indices],
+            states=[self.states[i] for i in indices],
+            comments=[self.comments[i] for i in indices],
+            embeddings=[self.embeddings[i] for i in indices]
+        )
+
+    def embedding_matrix(self) -> np.ndarray:
+        """
+        Stack the serialized embeddings into a 2-D float32 matrix, once per corpus.
+        """
+        if self._matrix is None:
+            self._matrix = np.stack([np.frombuffer(embedding, dtype=np.float32) for embedding in self.embeddings])
+        return self._matrix
+
+    def row_indices(self, view: 'EmbeddingView') -> np.ndarray:
+        """
+        Return the rows of the issues in an embedding view, looked up once per version of the view.
+        """
+        key = (view.name, view.generation, len(view.numbers))
+        if self._view_rows is None or self._view_rows[0] != key:
+            self._view_rows = (key, view.row_indices(self.numbers.tolist()))
+        return self._view_rows[1]
+
+    def to_display_issue(self, i: int, threshold: Optional[float] = None) -> DisplayIssueSchema:
+        return DisplayIssueSchema(
+            name=self.name,
+            number=int(self.numbers[i]),
+            title=self.titles[i],
+            url=self.urls[i],
+            state=self.states[i],
+            comments=self.comments[i],
+            threshold=threshold
+        )
+
+    def __repr__(self):
+        return f'<IssueCorpusSchema name={self.name} issues={len(self)}>'
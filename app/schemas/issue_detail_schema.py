@@ -1,6 +1,9 @@
 from dataclasses import dataclass
+from typing import Optional
+from app.schemas.freshness_schema import FreshnessSchema
 
 @dataclass
 class IssueDetaiSchema:
     total: int
     message: str
+    freshness: Optional[FreshnessSchema] = None
@@ -2,7 +2,7 @@ from dataclasses import dataclass, field
 from app.schemas.base_issue_schema import BaseIssueSchema
 from app.models.issue_model import Issue
 
-@dataclass
+@dataclass(slots=True)
 class IssueSchema(BaseIssueSchema):
     embedding: bytes = field(default_factory=bytes)
     shape: str = ''
@@ -12,6 +12,9 @@ class IssueSchema(BaseIssueSchema):
         return Issue(
             name=self.name,
             number=self.number,
+            title=self.title,
+            url=self.url,
+            state=self.state,
             comments=self.comments,
             embedding=self.embedding,
             shape=self.shape,
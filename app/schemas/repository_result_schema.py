@@ -0,0 +1,10 @@
+from dataclasses import dataclass
+from typing import Optional
+from app.schemas.freshness_schema import FreshnessSchema
+
+@dataclass
+class RepositoryResultSchema:
+    name: str
+    total: int
+    freshness: Optional[FreshnessSchema] = None
+    error: Optional[str] = None
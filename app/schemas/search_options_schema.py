@@ -0,0 +1,11 @@
+from dataclasses import dataclass
+from typing import List, Optional
+
+DISPLAY_FIELDS = ('name', 'number', 'title', 'url', 'state', 'comments', 'threshold')
+
+@dataclass
+class SearchOptionsSchema:
+    limit: Optional[int] = None
+    offset: int = 0
+    fields: Optional[List[str]] = None
+    snippet_length: int = 0
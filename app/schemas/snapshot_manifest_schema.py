@@ -0,0 +1,14 @@
+from dataclasses import dataclass
+from typing import Optional
+
+SNAPSHOT_FORMAT = 1
+
+@dataclass
+class SnapshotManifestSchema:
+    name: str
+    model: str
+    dimension: int
+    issues: int
+    created_at: float
+    synced_at: Optional[float] = None
+    format: int = SNAPSHOT_FORMAT
@@ -0,0 +1,34 @@
+from dataclasses import dataclass, field
+from typing import Optional
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+@dataclass
+class SyncCountersSchema:
+    fetched: int = 0
+    total: int = 0
+    embedded: int = 0
+    persisted: int = 0
+
+@dataclass
+class SyncJobSchema:
+    id: str
+    name: str
+    owner: str
+    repository: str
+    status: str = QUEUED
+    counters: SyncCountersSchema = field(default_factory=SyncCountersSchema)
+    error: Optional[str] = None
+    cancel_requested: bool = False
+    created_at: float = 0.0
+    updated_at: float = 0.0
+
+    @property
+    def is_active(self) -> bool:
+        return self.status in ACTIVE_STATUSES
@@ -0,0 +1,14 @@
+from dataclasses import dataclass
+from typing import Optional
+
+UPSERTED = 'upserted'
+REMOVED = 'removed'
+IGNORED = 'ignored'
+
+@dataclass
+class WebhookResultSchema:
+    event: str
+    action: Optional[str]
+    status: str
+    name: Optional[str] = None
+    number: Optional[int] = None
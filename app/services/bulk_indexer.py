@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from flask import current_app
+
+from app.repositories.embedding_store import get_embedding_store
+from app.repositories.issue_repository import IssueRepository
+from app.repositories.sync_state_repository import SyncStateRepository
+from app.schemas.issue_schema import IssueSchema
+from app.services.github_client import fetch_issues, fetch_comments_for_issue
+from app.services.issue_service import issue_searcher, generate_issue_name, persist_new_issues
+from app.services.multi_repo_service import load_repository_embeddings
+from app.services.sync_coordinator import inter_process_lock
+from app.services.sync_progress import SyncProgress
+from app.utils.exceptions import RateLimitExceededError, IssueFetchFailedError
+
+logger = logging.getLogger(__name__)
+
+async def index_repository(
+        owner: str, repository: str, batch_size: Optional[int] = None, concurrency: Optional[int] = None,
+        progress: Optional[SyncProgress] = None
+    ) -> SyncProgress:
+    """
+    Sync and embed a repository in batches, for indexing large repositories ahead of the first search.
+
+    The comments of a batch are fetched concurrently while the previous batch is embedded with a
+    single batched model call, and every batch is stored once embedded. Each stored batch is a
+    checkpoint: issues that are already stored and up to date are skipped, so an interrupted run
+    resumes where it stopped when it is started again.
+
+    :param batch_size: Issues per batch. Defaults to INDEX_BATCH_SIZE.
+    :param concurrency: Comment requests in flight. Defaults to INDEX_CONCURRENCY.
+    :param progress: Receives the fetched, embedded and persisted counters.
+    :return: The progress of the run.
+    """
+    batch_size = batch_size or current_app.config.get('INDEX_BATCH_SIZE')
+    semaphore = asyncio.Semaphore(concurrency or current_app.config.get('INDEX_CONCURRENCY'))
+    name = generate_issue_name(owner, repository)
+    progress = progress or SyncProgress(name)
+
+    async with inter_process_lock(current_app.config.get('SYNC_LOCK_DIR'), name):
+        stored_updates = IssueRepository.select_updated_by_name(name)
+        latest_issues = await fetch_issues(owner, repository)
+        pending = [issue for issue in latest_issues if stored_updates.get(issue['number']) != issue['updated_at']]
+        progress.set_fetched(len(latest_issues), len(pending))
+        logger.info('Indexing %d of %d issues of %s', len(pending), len(latest_issues), name)
+
+        batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        failed_issues = []
+        rate_limit_error = None
+        next_fetch = None
+        if batches:
+            next_fetch = asyncio.ensure_future(fetch_batch_comments(semaphore, owner, repository, batches[0]))
+        try:
+            for i, batch in enumerate(batches):
+                results = await next_fetch
+                next_fetch = None
+                progress.check_cancelled()
+
+                fetched, failed, batch_rate_limit_error = partition_batch_results(batch, results)
+                failed_issues.extend(failed)
+                rate_limit_error = rate_limit_error or batch_rate_limit_error
+
+                if rate_limit_error is None and i + 1 < len(batches):
+                    # The next batch is fetched while this one is embedded
+                    next_fetch = asyncio.ensure_future(
+                        fetch_batch_comments(semaphore, owner, repository, batches[i + 1])
+                    )
+
+                if fetched:
+                    await embed_and_persist_batch(name, fetched, stored_updates, progress)
+
+                if rate_limit_error is not None:
+                    break
+        finally:
+            if next_fetch is not None:
+                next_fetch.cancel()
+
+        if rate_limit_error is not None:
+            raise rate_limit_error
+        if failed_issues:
+            raise IssueFetchFailedError(failed_issues)
+
+        SyncStateRepository.upsert(name, time.time())
+        store = get_embedding_store()
+        if store is not None and not store.exists(name):
+            # Stored batches are only appended to an existing embedding store. A repository indexed for the
+            # first time has none, so it is built here from the stored rows instead of by the first search.
+            load_repository_embeddings(name)
+    return progress
+
+def partition_batch_results(
+        batch: List[dict], results: List[object]
+    ) -> Tuple[List[Tuple[dict, List[dict]]], List[int], Optional[RateLimitExceededError]]:
+    """
+    Split the comment requests of a batch into fetched issues and failures.
+
+    :return: The issues with their comments, the numbers of the issues that failed,
+        and the rate limit error if the rate limit was hit.
+    """
+    fetched = []
+    failed_issues = []
+    rate_limit_error = None
+    for latest_issue, result in zip(batch, results):
+        if isinstance(result, Exception):
+            if isinstance(result, RateLimitExceededError):
+                rate_limit_error = result
+            else:
+                logger.error('%s: - %s', type(result).__name__, result)
+            failed_issues.append(latest_issue['number'])
+        else:
+            fetched.append((latest_issue, result))
+    return fetched, failed_issues, rate_limit_error
+
+async def embed_and_persist_batch(
+        name: str, fetched: List[Tuple[dict, List[dict]]], stored_updates: Dict[int, str], progress: SyncProgress
+    ):
+    """
+    Embed a batch off the event loop and store it, so that the batch is a checkpoint of the run.
+    """
+    new_issues = await asyncio.to_thread(embed_issues, name, fetched)
+    for _ in new_issues:
+        progress.add_embedded()
+    persist_new_issues(
+        name, new_issues, [issue.to_issue() for issue in new_issues if issue.number in stored_updates]
+    )
+    progress.add_persisted(len(new_issues))
+
+async def fetch_batch_comments(
+        semaphore: asyncio.Semaphore, owner: str, repository: str, batch: List[dict]
+    ) -> List[object]:
+    return await asyncio.gather(*(
+        fetch_comments_for_issue(semaphore, owner, repository, latest_issue['number']) for latest_issue in batch
+    ), return_exceptions=True)
+
+def embed_issues(name: str, fetched: List[Tuple[dict, List[dict]]]) -> List[IssueSchema]:
+    """
+    Embed a batch of issues listed by GitHub together with their comments.
+    """
+    documents = [
+        (latest_issue['title'], [latest_issue['body']] + [comment['body'] for comment in issue_comments])
+        for latest_issue, issue_comments in fetched
+    ]
+    embeddings = issue_searcher.generate_serialized_embeddings(documents)
+    return [
+        IssueSchema(
+            name=name,
+            number=latest_issue['number'],
+            title=latest_issue['title'],
+            url=latest_issue['html_url'],
+            state=latest_issue['state'],
+            comments=comments,
+            embedding=embedding,
+            shape=shape,
+            updated=latest_issue['updated_at']
+        ) for (latest_issue, _), (_, comments), (embedding, shape) in zip(fetched, documents, embeddings)
+    ]
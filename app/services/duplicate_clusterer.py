@@ -0,0 +1,130 @@
+import logging
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+logger = logging.getLogger(__name__)
+
+def read_rows(matrix: np.ndarray, rows: Optional[np.ndarray], start: int, block_size: int) -> np.ndarray:
+    """
+    Read a block of rows as float32, either consecutive rows of the matrix or the given row indices.
+    """
+    block = matrix[start:start + block_size] if rows is None else matrix[rows[start:start + block_size]]
+    return np.asarray(block, dtype=np.float32)
+
+def iter_similar_pairs(
+        matrix: np.ndarray, threshold: float, block_size: int, rows: Optional[np.ndarray] = None
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Yield the pairs of rows whose cosine similarity is at least the threshold.
+
+    The similarity matrix is computed one block_size x block_size tile at a time and only
+    the upper triangle is visited, so memory stays bounded by the block size however many
+    rows the matrix has. The matrix may be a memory map; only two row blocks are read at once.
+
+    :param rows: Row indices of the matrix to compare, e.g. the live rows of an embedding store.
+        Every row is compared when omitted.
+    :return: An iterator of (rows, columns, scores) arrays with rows < columns, as positions in rows
+        if it is given.
+    """
+    count = len(matrix) if rows is None else len(rows)
+    # Norms are computed once so that each tile is a single matrix product
+    norms = np.empty(count, dtype=np.float32)
+    for start in range(0, count, block_size):
+        norms[start:start + block_size] = np.linalg.norm(read_rows(matrix, rows, start, block_size), axis=1)
+    norms = np.maximum(norms, 1e-12)
+
+    for row_start in range(0, count, block_size):
+        row_block = read_rows(matrix, rows, row_start, block_size) / norms[row_start:row_start + block_size, None]
+        for column_start in range(row_start, count, block_size):
+            column_block = read_rows(matrix, rows, column_start, block_size)
+            column_block = column_block / norms[column_start:column_start + block_size, None]
+            scores = row_block @ column_block.T
+            if column_start == row_start:
+                # Skip the diagonal and the lower triangle of tiles on the diagonal
+                scores = np.triu(scores, k=1)
+            row_indices, column_indices = np.nonzero(scores >= threshold)
+            if len(row_indices):
+                yield (
+                    row_indices + row_start,
+                    column_indices + column_start,
+                    scores[row_indices, column_indices]
+                )
+
+def cluster_embeddings(
+        matrix: np.ndarray, threshold: float, block_size: int = 2048, rows: Optional[np.ndarray] = None
+    ) -> List[Tuple[List[int], float]]:
+    """
+    Group rows into clusters of near duplicates.
+
+    Every pair of rows with a cosine similarity of at least the threshold is linked and each
+    connected component with more than one row is a cluster.
+
+    :param matrix: A 2-D array of embeddings, one row per issue.
+    :param threshold: The minimum similarity that links two rows.
+    :param block_size: Number of rows per tile of the similarity matrix.
+    :param rows: Row indices of the matrix to cluster. Every row is clustered when omitted.
+    :return: (row indices, highest similarity within the cluster) pairs, largest clusters first.
+        Row indices are positions in rows if it is given.
+    """
+    count = len(matrix) if rows is None else len(rows)
+    best_scores = np.full(count, -np.inf, dtype=np.float32)
+    # The pairs of each tile are merged into a union-find forest and dropped,
+    # so memory stays bounded by the row count however many pairs are linked
+    parents = np.arange(count)
+    linked_pairs = 0
+
+    for pair_row, pair_column, scores in iter_similar_pairs(matrix, threshold, block_size, rows):
+        np.maximum.at(best_scores, pair_row, scores)
+        np.maximum.at(best_scores, pair_column, scores)
+        union_pairs(parents, pair_row, pair_column)
+        linked_pairs += len(pair_row)
+
+    if not linked_pairs:
+        logger.info('Linked no pairs of %d rows', count)
+        return []
+
+    labels = find_roots(parents, np.arange(count))
+
+    linked = np.flatnonzero(np.isfinite(best_scores))
+    linked = linked[np.argsort(labels[linked], kind='stable')]
+    boundaries = np.flatnonzero(np.diff(labels[linked])) + 1
+    clusters = [
+        (members.tolist(), float(best_scores[members].max())) for members in np.split(linked, boundaries)
+    ]
+    clusters.sort(key=lambda cluster: (-len(cluster[0]), -cluster[1]))
+    logger.info('Linked %d pairs of %d rows into %d clusters', linked_pairs, count, len(clusters))
+    return clusters
+
+def find_roots(parents: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+    """
+    Return the root of every node in a union-find forest, following all parents at once.
+    """
+    roots = parents[nodes]
+    while True:
+        grandparents = parents[roots]
+        if np.array_equal(grandparents, roots):
+            return roots
+        roots = grandparents
+
+def union_pairs(parents: np.ndarray, pair_rows: np.ndarray, pair_columns: np.ndarray):
+    """
+    Link the pairs of one tile in a union-find forest, in place.
+
+    The trees the pairs touch are merged with connected_components over their roots alone, so the
+    graph of a tile is never larger than its pairs. Each merged tree hangs from its smallest root,
+    and the touched nodes point straight at it, which keeps the trees shallow.
+    """
+    nodes = np.concatenate([pair_rows, pair_columns])
+    roots, inverse = np.unique(find_roots(parents, nodes), return_inverse=True)
+    graph = coo_matrix(
+        (np.ones(len(pair_rows), dtype=np.int8), (inverse[:len(pair_rows)], inverse[len(pair_rows):])),
+        shape=(len(roots), len(roots))
+    )
+    component_count, components = connected_components(graph, directed=False)
+    representatives = np.full(component_count, len(parents), dtype=parents.dtype)
+    np.minimum.at(representatives, components, roots)
+    parents[roots] = representatives[components]
+    parents[nodes] = representatives[components[inverse]]
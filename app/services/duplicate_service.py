@@ -0,0 +1,152 @@
+import logging
+import threading
+import time
+from typing import List, Optional, Set, Tuple
+
+import numpy as np
+from flask import Flask, current_app
+
+from app.repositories.duplicate_report_repository import DuplicateReportRepository
+from app.repositories.index_version_repository import IndexVersionRepository
+from app.repositories.issue_repository import IssueRepository
+from app.repositories.embedding_store import get_embedding_store
+from app.schemas.duplicate_report_schema import DuplicateReportSchema, DuplicateClusterSchema, DuplicateIssueSchema
+from app.services.duplicate_clusterer import cluster_embeddings
+from app.utils.exceptions import DuplicateReportNotFoundError
+
+logger = logging.getLogger(__name__)
+
+class _DuplicateReportState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running: Set[str] = set()
+
+def build_duplicate_report(
+        name: str, threshold: Optional[float] = None, block_size: Optional[int] = None
+    ) -> DuplicateReportSchema:
+    """
+    Cluster the stored issues of a repository into groups of near duplicates and save the report.
+
+    :param name: Repository name in the format 'owner/repository'.
+    :param threshold: The minimum similarity that links two issues. Defaults to DUPLICATE_THRESHOLD.
+    :param block_size: Rows per tile of the similarity matrix. Defaults to DUPLICATE_BLOCK_SIZE.
+    """
+    threshold = threshold or current_app.config.get('DUPLICATE_THRESHOLD')
+    block_size = block_size or current_app.config.get('DUPLICATE_BLOCK_SIZE')
+    index_version = IndexVersionRepository.select_version(name)
+
+    started_at = time.monotonic()
+    issues, matrix, rows = load_duplicate_candidates(name)
+    clusters = cluster_embeddings(matrix, threshold, block_size, rows) if issues else []
+
+    report = DuplicateReportSchema(
+        name=name,
+        threshold=threshold,
+        total_issues=len(issues),
+        index_version=index_version,
+        created_at=time.time(),
+        clusters=[
+            DuplicateClusterSchema(issues=[issues[i] for i in sorted(members)], similarity=round(similarity, 4))
+            for members, similarity in clusters
+        ]
+    )
+    DuplicateReportRepository.upsert(report)
+    logger.info(
+        'Built the duplicate report of %s: %d issues, %d clusters in %.1fs',
+        name, len(issues), len(report.clusters), time.monotonic() - started_at
+    )
+    return report
+
+def load_duplicate_candidates(
+        name: str
+    ) -> Tuple[List[DuplicateIssueSchema], np.ndarray, Optional[np.ndarray]]:
+    """
+    Load the display columns of every stored issue of a repository and the embeddings to cluster.
+
+    When the embedding store holds every issue, its memory-mapped matrix is returned with the rows
+    of the issues, so tiles are read straight from the store. Otherwise rows are streamed from the
+    database into a single preallocated float32 matrix.
+
+    :return: The issues, the embedding matrix and the rows of the matrix holding the issues in order,
+        or None when the matrix rows are the issues.
+    """
+    store = get_embedding_store()
+    view = store.load(name) if store is not None else None
+    if view is not None:
+        stored_issues = IssueRepository.select_metadata_by_name(name)
+        numbers = [issue.number for issue in stored_issues]
+        if view.has_all(numbers):
+            issues = [to_duplicate_issue(name, issue) for issue in stored_issues]
+            return issues, view.matrix, view.row_indices(numbers)
+
+    count = IssueRepository.count_by_name(name)
+    issues: List[DuplicateIssueSchema] = []
+    matrix = np.empty((0, 0), dtype=np.float32)
+    for row in IssueRepository.iter_embeddings_by_name(name):
+        if len(issues) == count:
+            # Issues inserted after counting are left for the next report
+            break
+        embedding = np.frombuffer(row.embedding, dtype=np.float32)
+        if not issues:
+            matrix = np.empty((count, len(embedding)), dtype=np.float32)
+        matrix[len(issues)] = embedding
+        issues.append(to_duplicate_issue(name, row))
+    return issues, matrix[:len(issues)], None
+
+def to_duplicate_issue(name: str, issue) -> DuplicateIssueSchema:
+    return DuplicateIssueSchema(
+        number=issue.number,
+        title=issue.title or '',
+        url=issue.url or f'https://github.com/{name}/issues/{issue.number}',
+        state=issue.state or ''
+    )
+
+def get_duplicate_report(name: str) -> DuplicateReportSchema:
+    """
+    Return the latest duplicate report of a repository.
+    The report is marked stale when embeddings have been stored since it was built.
+    """
+    report = DuplicateReportRepository.select_by_name(name)
+    if report is None:
+        raise DuplicateReportNotFoundError(name)
+    report.stale = report.index_version != IndexVersionRepository.select_version(name)
+    return report
+
+def is_duplicate_report_running(name: str) -> bool:
+    state = _state()
+    with state.lock:
+        return name in state.running
+
+def schedule_duplicate_report(name: str, threshold: Optional[float] = None) -> bool:
+    """
+    Build the duplicate report of a repository on a background thread.
+
+    :return: False if a report of the repository is already being built.
+    """
+    state = _state()
+    with state.lock:
+        if name in state.running:
+            return False
+        state.running.add(name)
+
+    app = current_app._get_current_object()  # pylint: disable=protected-access
+    threading.Thread(
+        target=run_duplicate_report, args=(app, state, name, threshold), name=f'duplicates-{name}', daemon=True
+    ).start()
+    return True
+
+def run_duplicate_report(app: Flask, state: _DuplicateReportState, name: str, threshold: Optional[float]):
+    try:
+        with app.app_context():
+            build_duplicate_report(name, threshold)
+    except Exception as e:
+        logger.error('Building the duplicate report of %s failed: %s', name, e)
+    finally:
+        with state.lock:
+            state.running.discard(name)
+
+def _state() -> _DuplicateReportState:
+    state = current_app.extensions.get('duplicate_reports')
+    if state is None:
+        state = current_app.extensions.setdefault('duplicate_reports', _DuplicateReportState())
+    return state
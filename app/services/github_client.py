@@ -1,59 +1,102 @@
 import logging
 import asyncio
-from typing import Union, Dict, List
+from typing import Callable, Union, Dict, List
 
 import httpx
 from flask import current_app
 from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception_type
 
-from app.utils.exceptions import RepositoryNotFoundError, RateLimitExceededError, UnauthorizedError
+from app.utils.exceptions import (
+    RepositoryNotFoundError, RateLimitExceededError, UnauthorizedError, OrganizationNotFoundError
+)
+from app.utils.metrics import github_requests, github_rate_limit_remaining
 
 logger = logging.getLogger(__name__)
 
-async def fetch_issues(owner: str, repository: str):
-    issues_url = f'https://api.github.com/repos/{owner}/{repository}/issues'
+DEFAULT_API_URL = 'https://api.github.com'
 
-    logger.debug('Fetching issues from %s', issues_url)
+def api_url(path: str) -> str:
+    """
+    Resolve a REST API path against GITHUB_API_URL, e.g. a GitHub Enterprise server or a local stand-in.
+    """
+    return (current_app.config.get('GITHUB_API_URL') or DEFAULT_API_URL).rstrip('/') + path
 
+def get_headers() -> Dict[str, str]:
     github_token = current_app.config.get('GITHUB_ACCESS_TOKEN')
     if github_token:
-        headers = {'Authorization': f'token {github_token}'}
-    else:
-        headers = {}
-        logger.warning('GITHUB_ACCESS_TOKEN is not set. API rate limits may apply.')
+        return {'Authorization': f'token {github_token}'}
+    logger.warning('GITHUB_ACCESS_TOKEN is not set. API rate limits may apply.')
+    return {}
 
-    issues = []
+def record_response(res: httpx.Response):
+    github_requests.inc(status=str(res.status_code))
+    remaining = res.headers.get('X-RateLimit-Remaining')
+    if remaining is not None and remaining.isdigit():
+        github_rate_limit_remaining.set(int(remaining))
+
+def raise_for_rate_limit(res: httpx.Response):
+    if res.status_code in (403, 429) and res.headers.get('X-RateLimit-Remaining') == '0':
+        reset_timestamp = int(res.headers.get('X-RateLimit-Reset', 0))
+        raise RateLimitExceededError(reset_timestamp)
+
+async def fetch_all_pages(
+    url: str, params: Dict[str, Union[str, int]], not_found: Callable[[], Exception]
+) -> List[dict]:
+    """
+    Fetch every page of a paginated list endpoint.
+
+    :param params: Query parameters of every page, besides per_page and page.
+    :param not_found: Builds the error raised when the endpoint answers 404.
+    """
+    headers = get_headers()
+    items = []
     page = 1
     async with httpx.AsyncClient() as client:
         while True:
-            params = {'state': 'all', 'per_page': 100, 'page': page}
-            res = await client.get(issues_url, headers=headers, params=params, timeout=30)
+            res = await client.get(url, headers=headers, params={**params, 'per_page': 100, 'page': page}, timeout=30)
+            record_response(res)
 
             if res.status_code == 401:
                 raise UnauthorizedError()
 
-            if res.status_code in (403, 429) and res.headers.get('X-RateLimit-Remaining') == '0':
-                reset_timestamp = int(res.headers.get('X-RateLimit-Reset', 0))
-                raise RateLimitExceededError(reset_timestamp)
+            raise_for_rate_limit(res)
 
             if res.status_code == 404:
-                raise RepositoryNotFoundError(owner, repository)
+                raise not_found()
 
             if res.status_code != 200:
-                logger.error(
-                    'Failed to fetch issues from %s. Status code: %d, Response: %s', 
-                    issues_url, res.status_code, res.text
-                )
+                logger.error('Failed to fetch %s. Status code: %d, Response: %s', url, res.status_code, res.text)
                 res.raise_for_status()
 
             data = res.json()
             if not data:
                 break
-            issues.extend(data)
+            items.extend(data)
             page += 1
+    return items
+
+async def fetch_issues(owner: str, repository: str):
+    issues_url = api_url(f'/repos/{owner}/{repository}/issues')
+
+    logger.debug('Fetching issues from %s', issues_url)
+    issues = await fetch_all_pages(issues_url, {'state': 'all'}, lambda: RepositoryNotFoundError(owner, repository))
     logger.debug('Successfully fetched issues from %s', issues_url)
     return issues
 
+async def fetch_organization_repositories(organization: str) -> List[str]:
+    """
+    List the repositories of an organization that are not archived.
+
+    :return: Repository names in the format 'owner/repository'.
+    """
+    repositories_url = api_url(f'/orgs/{organization}/repos')
+
+    logger.debug('Fetching repositories from %s', repositories_url)
+    data = await fetch_all_pages(repositories_url, {'type': 'all'}, lambda: OrganizationNotFoundError(organization))
+    repositories = [repository['full_name'] for repository in data if not repository.get('archived')]
+    logger.debug('Successfully fetched %d repositories from %s', len(repositories), repositories_url)
+    return repositories
+
 @retry(
     retry=retry_if_exception_type((httpx.RequestError, httpx.TimeoutException)),
     wait=wait_exponential(multiplier=2, min=1, max=10),
@@ -69,10 +112,9 @@ async def fetch_page_comments(
 ) -> List[dict]:
     async with semaphore:
         res = await client.get(comments_url, headers=headers, params=params, timeout=30)
+    record_response(res)
 
-    if res.status_code in (403, 429) and res.headers.get('X-RateLimit-Remaining') == '0':
-        reset_timestamp = int(res.headers.get('X-RateLimit-Reset', 0))
-        raise RateLimitExceededError(reset_timestamp)
+    raise_for_rate_limit(res)
 
     if res.status_code != 200:
         logger.error('Failed to fetch comments. Status code: %d, Response: %s', res.status_code, res.text)
@@ -83,16 +125,10 @@ async def fetch_page_comments(
 async def fetch_comments_for_issue(
     semaphore: asyncio.Semaphore, owner: str, repository: str, issue_number: str
 ) -> List[dict]:
-    comments_url = f'https://api.github.com/repos/{owner}/{repository}/issues/{issue_number}/comments'
+    comments_url = api_url(f'/repos/{owner}/{repository}/issues/{issue_number}/comments')
 
     logger.debug('Fetching issue comments from %s', comments_url)
-
-    github_token = current_app.config.get('GITHUB_ACCESS_TOKEN')
-    if github_token:
-        headers = {'Authorization': f'token {github_token}'}
-    else:
-        headers = {}
-        logger.warning('GITHUB_ACCESS_TOKEN is not set. API rate limits may apply.')
+    headers = get_headers()
 
     comments = []
     page = 1
@@ -1,16 +1,27 @@
+# pylint: disable=C0415
+
 import logging
 import re
-from typing import List
+import threading
+import time
+from typing import List, Optional, Tuple, Union
 
 import numpy as np
-import torch
-from sentence_transformers import SentenceTransformer, util
 
+from app.repositories.embedding_store import EmbeddingView, normalize_rows
+from app.services.query_batcher import QueryBatcher
+from app.utils.ttl_cache import TtlLruCache
+from app.utils.metrics import record_cache, record_embedding
+from app.utils.offload import run_off_loop
 from app.schemas.issue_schema import IssueSchema
+from app.schemas.issue_corpus_schema import IssueCorpusSchema
 from app.schemas.display_issue_schema import DisplayIssueSchema
 
 logger = logging.getLogger(__name__)
 
+# Issues of one repository, either as schemas or already in columnar form
+Issues = Union[List[IssueSchema], IssueCorpusSchema]
+
 def preprocess_text(text: str):
     if not text:
         return ''
@@ -22,13 +33,56 @@ def preprocess_text(text: str):
     text = text.lower()
     return text
 
+def to_document(title: str, comments: Optional[List[str]]) -> str:
+    """
+    Build the preprocessed text that is embedded for an issue.
+    """
+    comment = '' if comments is None else ' '.join(
+        comment if comment is not None else '' for comment in comments
+    )
+    return preprocess_text(f'{title}: {comment}')
+
+def normalize_vector(vector: np.ndarray) -> np.ndarray:
+    return vector / max(np.linalg.norm(vector), 1e-12)
+
+def fuse_scores(semantic_scores: np.ndarray, lexical_scores: np.ndarray, lexical_weight: float) -> np.ndarray:
+    """
+    Blend cosine similarities with BM25 scores scaled to [0, 1] by the best lexical match.
+    """
+    best = float(lexical_scores.max()) if len(lexical_scores) else 0.0
+    if best <= 0:
+        return semantic_scores
+    return (1 - lexical_weight) * semantic_scores + lexical_weight * (lexical_scores / best)
+
 class IssueSearcher:
-    def __init__(self, model_name: str = 'paraphrase-mpnet-base-v2', threshold: float = 0.5):
+    def __init__(
+        self, model_name: str = 'paraphrase-mpnet-base-v2', threshold: float = 0.5, query_cache_size: int = 1024
+    ):
         """
-        Initialize the SBERT model and set the similarity threshold.
+        Set the SBERT model and the similarity threshold. The model is loaded on first use.
         """
-        self.model = SentenceTransformer(model_name)
+        self.model_name = model_name
+        self._model = None
+        self._model_lock = threading.Lock()
         self.threshold = threshold
+        self.query_embeddings = TtlLruCache(query_cache_size)
+        self.query_batcher = QueryBatcher(self.encode_query_batch)
+
+    @property
+    def model(self):
+        """
+        The SBERT model. Scoring runs on numpy alone, so torch is only imported once something is encoded.
+        """
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    @property
+    def embedding_dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
 
     def set_threshold(self, threshold: float):
         """
@@ -39,6 +93,7 @@ class IssueSearcher:
     async def generate_serialized_embedding(self, title: str, comments: List[str]) -> tuple[bytes, str]:
         """
         Asynchronously generate a serialized embedding for a given title and associated comments.
+        Embeddings are scaled to unit length, so that they are scored with a plain dot product.
 
         :param title: The title for which the embedding is generated.
         :param comments: A list of comment strings associated with the title.
@@ -47,53 +102,220 @@ class IssueSearcher:
         - A bytes object of the embedding in serialized format.
         - A string representing the shape of the embedding in the format 'dim1,dim2,...'.
         """
-        comment = '' if comments is None else ' '.join(
-            comment if comment is not None else '' for comment in comments
-        )
-        embeddings = self.model.encode(preprocess_text(f'{title}: {comment}'), convert_to_tensor=False)
-        embedding_np = embeddings.astype(np.float32)
+        started_at = time.perf_counter()
+        # Inference runs off the event loop, which keeps serving other requests meanwhile
+        embeddings = await run_off_loop(self.model.encode, to_document(title, comments), convert_to_tensor=False)
+        record_embedding(1, time.perf_counter() - started_at)
+        embedding_np = normalize_vector(embeddings.astype(np.float32)).astype(np.float32)
         return embedding_np.tobytes(), ','.join(map(str, embedding_np.shape))
 
-    def deserialize_embedding(self, byte_data: bytes, shape_str: str) -> torch.Tensor:
+    def generate_serialized_embeddings(self, documents: List[Tuple[str, List[str]]]) -> List[Tuple[bytes, str]]:
+        """
+        Generate the serialized embeddings of many issues in batched model calls.
+
+        :param documents: (title, comments) pairs.
+        :return: One (embedding bytes, shape) pair per document, as from generate_serialized_embedding.
+        """
+        if not documents:
+            return []
+        started_at = time.perf_counter()
+        embeddings = normalize_rows(np.asarray(self.model.encode(
+            [to_document(title, comments) for title, comments in documents], convert_to_tensor=False
+        ), dtype=np.float32).reshape(len(documents), -1)).astype(np.float32)
+        record_embedding(len(documents), time.perf_counter() - started_at)
+        shape = str(embeddings.shape[1])
+        return [(embedding.tobytes(), shape) for embedding in embeddings]
+
+    def deserialize_embedding(self, byte_data: bytes, shape_str: str) -> np.ndarray:
         """
-        Deserialize a serialized embedding into a tensor.
+        Deserialize a serialized embedding into an array.
 
         :param byte_data: The byte array containing the serialized embedding.
         :param shape_str: A string representing the shape of the embedding in the format 'dim1,dim2,...'.
 
-        :return: A torch.Tensor reconstructed from the byte data with the specified shape.
+        :return: A read-only float32 array over the byte data with the specified shape.
         """
         shape = tuple(map(int, shape_str.split(',')))
-        np_array = np.frombuffer(byte_data, dtype=np.float32).reshape(shape)
-        return torch.from_numpy(np_array.copy())
+        return np.frombuffer(byte_data, dtype=np.float32).reshape(shape)
+
+    def encode_query(self, query: str) -> np.ndarray:
+        """
+        Encode a preprocessed search query, reusing the embedding of an identical earlier query.
+
+        :param query: The preprocessed search query.
+        :return: A read-only float32 embedding.
+        """
+        embedding = self.get_cached_query_embedding(query)
+        if embedding is None:
+            embedding = self.query_batcher.encode(query)
+            self.query_embeddings.set(query, embedding)
+        return embedding
+
+    async def encode_query_async(self, query: str) -> np.ndarray:
+        """
+        Counterpart of encode_query that waits for its batch without blocking the event loop.
+        """
+        embedding = self.get_cached_query_embedding(query)
+        if embedding is None:
+            embedding = await self.query_batcher.encode_async(query)
+            self.query_embeddings.set(query, embedding)
+        return embedding
+
+    def get_cached_query_embedding(self, query: str) -> Optional[np.ndarray]:
+        embedding = self.query_embeddings.get(query)
+        record_cache('queries', hits=int(embedding is not None), misses=int(embedding is None))
+        return embedding
+
+    def encode_query_batch(self, queries: List[str]) -> np.ndarray:
+        """
+        Encode the queries collected by the query batcher in one model call.
+
+        :return: A read-only float32 array with one row per query.
+        """
+        embeddings = np.array(self.model.encode(queries, convert_to_tensor=False), dtype=np.float32)
+        embeddings = embeddings.reshape(len(queries), -1)
+        # The rows are cached and shared between searches
+        embeddings.setflags(write=False)
+        return embeddings
+
+    def encode_queries(self, queries: List[str]) -> np.ndarray:
+        """
+        Encode preprocessed search queries in a single model call.
+        Queries found in the query embedding cache are not encoded again.
+
+        :param queries: The preprocessed search queries.
+        :return: A 2-D float32 array with one row per query.
+        """
+        embeddings = [self.query_embeddings.get(query) for query in queries]
+        missing = list(dict.fromkeys(query for query, embedding in zip(queries, embeddings) if embedding is None))
+        record_cache('queries', hits=len(queries) - len(missing), misses=len(missing))
+        if missing:
+            encoded = self.encode_query_batch(missing)
+            for query, embedding in zip(missing, encoded):
+                self.query_embeddings.set(query, embedding)
+            encoded_by_query = dict(zip(missing, encoded))
+            embeddings = [
+                encoded_by_query[query] if embedding is None else embedding
+                for query, embedding in zip(queries, embeddings)
+            ]
+        return np.stack(embeddings)
+
+    def score_embedding_view(
+        self, embeddings: EmbeddingView, rows: np.ndarray, search_embedding: np.ndarray
+    ) -> np.ndarray:
+        """
+        Calculate cosine similarity scores against a memory-mapped embedding view.
+
+        :param embeddings: The embedding view of the repository.
+        :param rows: Rows of the view to score.
+        :param search_embedding: The embedding of the search query.
+        :return: A 1-D array of scores in the same order as rows.
+        """
+        search_embedding = normalize_vector(search_embedding)
+        # Only the rows of the scored issues are read; pages are shared between processes
+        return embeddings.cosine_scores(rows, search_embedding)
 
     async def find_related_issues(
-        self, issues: List[IssueSchema], title: str, description: str
+        self, issues: Issues, title: str, description: str,
+        embeddings: Optional[EmbeddingView] = None, lexical_scores: Optional[np.ndarray] = None,
+        lexical_weight: float = 0.0
     ) -> List[DisplayIssueSchema]:
         """
         Asynchronously find issue comments that are semantically similar to the search query using SBERT.
 
-        :param issues: List of issue to search within
+        :param issues: List of issue, or the corpus of a repository, to search within
         :param title: Search query
         :param description: Search query
+        :param embeddings: Optional memory-mapped embeddings covering every issue.
+            When given, the serialized embedding of each issue is not deserialized.
+        :param lexical_scores: Optional BM25 scores, one per issue, fused with the cosine similarity.
+        :param lexical_weight: The share of the fused score given to the lexical scores.
         :return: A list of issues that exceed a threshold
         """
-        # Deserializing issue comments
-        comments_embeddings = torch.stack([
-            self.deserialize_embedding(issue.embedding, issue.shape) for issue in issues
-        ])
+        if not issues:
+            return []
+        # The query may be encoded together with those of concurrent searches
+        search_embedding = await self.encode_query_async(preprocess_text(f'{title}: {description}'))
+        return await run_off_loop(
+            self.rank_issues, issues, title, description, embeddings, lexical_scores, lexical_weight, search_embedding
+        )
 
-        # Encode the search query
-        search_embedding = self.model.encode(preprocess_text(f'{title}: {description}'), convert_to_tensor=True)
+    def rank_issues(
+        self, issues: Issues, title: str, description: str,
+        embeddings: Optional[EmbeddingView] = None, lexical_scores: Optional[np.ndarray] = None,
+        lexical_weight: float = 0.0, search_embedding: Optional[np.ndarray] = None
+    ) -> List[DisplayIssueSchema]:
+        """
+        Synchronous counterpart of find_related_issues for callers without an event loop.
 
-        # Calculate cosine similarity scores
-        cosine_scores = util.pytorch_cos_sim(search_embedding, comments_embeddings)[0]
+        :param search_embedding: The embedding of the query, if it is already encoded.
+        """
+        if not issues:
+            return []
+
+        corpus = IssueCorpusSchema.of(issues)
+        if search_embedding is None:
+            search_embedding = self.encode_query(preprocess_text(f'{title}: {description}'))
+        if embeddings is not None:
+            scores = self.score_embedding_view(embeddings, corpus.row_indices(embeddings), search_embedding)
+        else:
+            # Stored embeddings have unit length, so the cosine similarity is a single matrix-vector product
+            scores = corpus.embedding_matrix() @ normalize_vector(search_embedding)
+
+        if lexical_scores is not None:
+            scores = fuse_scores(scores, lexical_scores, lexical_weight)
+
+        # Display issues are only built for the scores above the threshold
+        return [
+            corpus.to_display_issue(i, threshold=float(scores[i])) for i in np.flatnonzero(scores >= self.threshold)
+        ]
+
+    async def find_related_issues_batch(
+        self, issues: Issues, queries: List[Tuple[str, str]],
+        embeddings: Optional[EmbeddingView] = None, lexical_scores: Optional[List[np.ndarray]] = None,
+        lexical_weight: float = 0.0
+    ) -> List[List[DisplayIssueSchema]]:
+        """
+        Asynchronously find the related issues of several search queries at once.
+
+        :param issues: List of issue, or the corpus of a repository, to search within
+        :param queries: (title, description) pairs
+        :param embeddings: Optional memory-mapped embeddings covering every issue.
+        :param lexical_scores: Optional BM25 scores per query, one per issue, fused with the cosine similarity.
+        :param lexical_weight: The share of the fused score given to the lexical scores.
+        :return: One list of issues that exceed the threshold per query, in the order of queries
+        """
+        return await run_off_loop(self.rank_issues_batch, issues, queries, embeddings, lexical_scores, lexical_weight)
+
+    def rank_issues_batch(
+        self, issues: Issues, queries: List[Tuple[str, str]],
+        embeddings: Optional[EmbeddingView] = None, lexical_scores: Optional[List[np.ndarray]] = None,
+        lexical_weight: float = 0.0
+    ) -> List[List[DisplayIssueSchema]]:
+        """
+        Score every query against every issue with a single N x M matrix product.
+        """
+        if not issues or not queries:
+            return [[] for _ in queries]
+
+        corpus = IssueCorpusSchema.of(issues)
+        if embeddings is not None:
+            matrix = embeddings.unit_rows(corpus.row_indices(embeddings))
+        else:
+            matrix = corpus.embedding_matrix()
+        query_matrix = self.encode_queries([
+            preprocess_text(f'{title}: {description}') for title, description in queries
+        ])
 
-        # Extract comments with similarity scores above the threshold
-        related_issues = []
-        for i, score in enumerate(cosine_scores):
-            if score.item() >= self.threshold:
-                issue = issues[i]
-                issue.threshold = score.item()
-                related_issues.append(DisplayIssueSchema.from_issue_schema(issue))
-        return related_issues
+        scores = normalize_rows(query_matrix) @ matrix.T
+        if lexical_scores is not None:
+            scores = np.stack([
+                fuse_scores(row, query_lexical_scores, lexical_weight)
+                for row, query_lexical_scores in zip(scores, lexical_scores)
+            ])
+        return [
+            [
+                corpus.to_display_issue(i, threshold=float(row[i]))
+                for i in np.flatnonzero(row >= self.threshold)
+            ] for row in scores
+        ]
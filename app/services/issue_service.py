@@ -1,87 +1,561 @@
 import logging
-import json
 import asyncio
+import time
+from datetime import datetime, timezone
 
-from typing import List
+from dataclasses import replace
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+import numpy as np
+from flask import Flask, current_app
 from werkzeug.datastructures import ImmutableMultiDict
 
 from app.services.github_client import fetch_issues, fetch_comments_for_issue
-from app.services.issue_searcher import IssueSearcher
+from app.services.issue_searcher import IssueSearcher, Issues, preprocess_text
+from app.services.lexical_index import get_lexical_index, update_lexical_index, count_issue_terms, tokenize
+from app.services.sync_coordinator import SingleFlight, inter_process_lock
+from app.services.sync_progress import SyncProgress
+from app.services.sync_queue import sync_queue
 from app.schemas.issue_schema import IssueSchema
+from app.schemas.issue_corpus_schema import IssueCorpusSchema
 from app.schemas.issue_detail_schema import IssueDetaiSchema
+from app.schemas.freshness_schema import FreshnessSchema
+from app.schemas.sync_job_schema import SyncJobSchema, SUCCEEDED, FAILED, CANCELLED
+from app.schemas.display_issue_schema import DisplayIssueSchema
+from app.schemas.search_options_schema import SearchOptionsSchema
+from app.models.issue_model import Issue
+from app.models.sync_state_model import SyncState
 from app.repositories.issue_repository import IssueRepository
-from app.utils.exceptions import RateLimitExceededError, IssueFetchFailedError
-from app.utils.validators import validate_form_data
+from app.repositories.sync_state_repository import SyncStateRepository
+from app.repositories.index_version_repository import IndexVersionRepository
+from app.repositories.embedding_store import EmbeddingView, get_embedding_store, to_embedding_matrix
+from app.utils.exceptions import (
+    RateLimitExceededError, IssueFetchFailedError, IssueNotFoundError, SyncCancelledError, SyncJobFailedError
+)
+from app.utils.validators import validate_form_data, validate_batch_data, parse_search_options
+from app.utils.ttl_cache import TtlLruCache
+from app.utils.stage_timing import time_stage
+from app.utils.metrics import record_cache, search_seconds, to_repository_size
+from app.utils.offload import run_off_loop
 
 logger = logging.getLogger(__name__)
 issue_searcher = IssueSearcher()
+sync_flight = SingleFlight()
+
+def init_query_batching(app: Flask):
+    issue_searcher.query_batcher.configure(app.config.get('QUERY_BATCH_SIZE'), app.config.get('QUERY_BATCH_WAIT'))
 
 async def get_related_issues(form_data: ImmutableMultiDict[str, str]):
+    started_at = time.perf_counter()
     validate_form_data(form_data)
+    options = parse_search_options(form_data, current_app.config.get('SEARCH_SNIPPET_LENGTH'))
 
-    issues = await get_issues(form_data.get('owner'), form_data.get('repository'))
-    logger.debug('issues: %s', issues)
+    owner, repository = form_data.get('owner'), form_data.get('repository')
+    issues, freshness = await get_searchable_issues(owner, repository, form_data.get('mode'))
 
-    related_issues = await issue_searcher.find_related_issues(
-        issues, form_data.get('title'), form_data.get('description')
+    related_issues = await find_related_issues_cached(
+        generate_issue_name(owner, repository), issues, form_data.get('title'), form_data.get('description'),
+        form_data.get('ranking') or current_app.config.get('SEARCH_RANKING')
+    )
+    logger.debug('related_issues: %s', related_issues)
+    response = (
+        present_related_issues(related_issues, options), get_related_issues_detail(len(related_issues), freshness)
     )
+    search_seconds.observe(time.perf_counter() - started_at, repository_size=to_repository_size(len(issues)))
+    return response
+
+async def get_related_issues_batch(
+        form_data: ImmutableMultiDict[str, str]
+    ) -> List[Tuple[List[Union[DisplayIssueSchema, dict]], IssueDetaiSchema]]:
+    """
+    Search a repository for several queries at once.
+
+    The repository is synced once and every query that is not cached is scored in a single batch.
+    The response options of the request apply to each query.
+
+    :return: One (issues, detail) pair per query, in the order of the queries.
+    """
+    started_at = time.perf_counter()
+    validate_batch_data(form_data, current_app.config.get('SEARCH_BATCH_MAX_QUERIES'))
+    options = parse_search_options(form_data, current_app.config.get('SEARCH_SNIPPET_LENGTH'))
+
+    owner, repository = form_data.get('owner'), form_data.get('repository')
+    issues, freshness = await get_searchable_issues(owner, repository, form_data.get('mode'))
+
+    queries = [(query.get('title'), query.get('description')) for query in form_data.get('queries')]
+    related_issues_list = await find_related_issues_batch_cached(
+        generate_issue_name(owner, repository), issues, queries,
+        form_data.get('ranking') or current_app.config.get('SEARCH_RANKING')
+    )
+    response = [
+        (present_related_issues(related_issues, options), get_related_issues_detail(len(related_issues), freshness))
+        for related_issues in related_issues_list
+    ]
+    search_seconds.observe(time.perf_counter() - started_at, repository_size=to_repository_size(len(issues)))
+    return response
+
+async def get_searchable_issues(
+        owner: str, repository: str, mode: Optional[str] = None
+    ) -> Tuple[Issues, FreshnessSchema]:
+    name = generate_issue_name(owner, repository)
+    if (mode or current_app.config.get('SEARCH_MODE')) == 'stale':
+        issues, freshness = await get_cached_issues(owner, repository)
+    elif await run_off_loop(is_webhook_managed_by_name, name):
+        # Kept up to date by webhook events, so GitHub is not crawled again
+        issues, freshness = await run_off_loop(load_stored_corpus, name), await run_off_loop(get_freshness, name)
+    else:
+        issues = await sync_for_search(owner, repository)
+        freshness = await run_off_loop(get_freshness, name)
+    logger.debug('issues: %s', issues)
+    return issues, freshness
+
+async def sync_for_search(owner: str, repository: str) -> Issues:
+    """
+    Bring a repository up to date before it is searched in sync mode.
+
+    With sync workers running, the sync is queued as a job, or the job already queued or running for
+    the repository is joined, and the search waits up to SEARCH_SYNC_WAIT seconds for it. The stored
+    issues are searched once it has finished, or once the wait is over while the job keeps running,
+    so a large repository never holds the request longer than that. Without workers nothing else
+    would run the job, so the sync runs in the request.
+    """
+    if not sync_queue.has_workers:
+        return await get_issues(owner, repository)
+
+    name = generate_issue_name(owner, repository)
+    job = await run_off_loop(sync_queue.enqueue, owner, repository)
+    deadline = time.monotonic() + current_app.config.get('SEARCH_SYNC_WAIT')
+    while job.is_active and time.monotonic() < deadline:
+        await asyncio.sleep(min(current_app.config.get('STREAM_POLL_INTERVAL'), max(deadline - time.monotonic(), 0)))
+        job = await run_off_loop(sync_queue.get, job.id)
+
+    if job.status == FAILED:
+        raise SyncJobFailedError(name, job.error)
+    if job.status == CANCELLED:
+        raise SyncCancelledError(name)
+    if job.is_active:
+        logger.info('Sync job %s for %s is still running. Searching the stored issues.', job.id, name)
+    return await run_off_loop(load_stored_corpus, name)
+
+async def find_related_issues_cached(
+        name: str, issues: Issues, title: str, description: str, ranking: str = 'semantic'
+    ) -> List[DisplayIssueSchema]:
+    """
+    Return the sorted hits of a search, reusing the hits of an identical search.
+
+    Results are keyed by the index version of the repository, which is bumped whenever
+    new embeddings are persisted, so a cached result never outlives the issues it ranked.
+
+    :param ranking: 'semantic' ranks by cosine similarity, 'hybrid' fuses it with BM25 scores.
+    """
+    cache = get_search_cache()
+    key = to_search_cache_key(name, IndexVersionRepository.select_version(name), title, description, ranking)
+    cached = cache.get(key)
+    record_cache('results', hits=int(cached is not None), misses=int(cached is None))
+    if cached is not None:
+        logger.debug('Search cache hit for %s', name)
+        return list(cached)
+
+    # Issues are scored in columnar form, so display objects are only built for the hits
+    corpus = IssueCorpusSchema.of(issues)
+    # The view covers every issue, so the prefilter below only narrows the rows that are scored
+    with time_stage('db_read'):
+        embeddings = await run_off_loop(get_embedding_view, name, corpus)
+    corpus, lexical_options = await run_off_loop(apply_lexical_ranking, name, corpus, title, description, ranking)
+
+    with time_stage('score'):
+        related_issues = await issue_searcher.find_related_issues(
+            corpus, title, description, embeddings=embeddings, **lexical_options
+        )
+    sort_related_issues(related_issues)
+    cache.set(key, tuple(related_issues))
+    return related_issues
+
+def apply_lexical_ranking(
+        name: str, corpus: IssueCorpusSchema, title: str, description: str, ranking: str
+    ) -> Tuple[IssueCorpusSchema, dict]:
+    """
+    Narrow a large corpus to the lexical candidates of a query and compute the BM25 scores of hybrid ranking.
+
+    :return: The corpus to score, and the lexical keyword arguments of IssueSearcher.find_related_issues.
+    """
+    lexical_options = {}
+    prefilter = use_lexical_prefilter(corpus)
+    if ranking == 'hybrid' or prefilter:
+        lexical_index = get_lexical_index(name)
+        query_terms = tokenize(f'{title} {description or ""}')
+        if prefilter:
+            candidates = lexical_index.top_k(query_terms, current_app.config.get('LEXICAL_PREFILTER_K'))
+            corpus = prefilter_issues(candidates, corpus)
+        if ranking == 'hybrid':
+            lexical_options = {
+                'lexical_scores': lexical_index.score(query_terms, corpus.numbers.tolist()),
+                'lexical_weight': current_app.config.get('LEXICAL_WEIGHT')
+            }
+    return corpus, lexical_options
+
+def use_lexical_prefilter(issues: Issues) -> bool:
+    k = current_app.config.get('LEXICAL_PREFILTER_K')
+    return bool(k) and len(issues) > max(k, current_app.config.get('LEXICAL_PREFILTER_MIN_ISSUES'))
 
+def prefilter_issues(candidates: List[Tuple[int, float]], corpus: IssueCorpusSchema) -> IssueCorpusSchema:
+    """
+    Keep only the lexical candidates, so dense scoring runs on the top-K issues of a large repository.
+    All issues are kept when no issue shares a term with the query.
+    """
+    if not candidates:
+        return corpus
+    indices = np.flatnonzero(np.isin(corpus.numbers, [number for number, _ in candidates]))
+    logger.debug('Lexical prefilter kept %d of %d issues', len(indices), len(corpus))
+    return corpus.take(indices)
+
+async def find_related_issues_batch_cached(
+        name: str, issues: Issues, queries: List[Tuple[str, str]], ranking: str = 'semantic'
+    ) -> List[List[DisplayIssueSchema]]:
+    """
+    Batch counterpart of find_related_issues_cached. Only the queries missing from the cache are scored.
+    The lexical prefilter does not apply, since all queries are scored against the same issues.
+    """
+    cache = get_search_cache()
+    version = IndexVersionRepository.select_version(name)
+    keys = [to_search_cache_key(name, version, title, description, ranking) for title, description in queries]
+    results = [cache.get(key) for key in keys]
+
+    missing = [i for i, result in enumerate(results) if result is None]
+    logger.debug('Search cache hits for %s: %d of %d', name, len(queries) - len(missing), len(queries))
+    record_cache('results', hits=len(queries) - len(missing), misses=len(missing))
+    if missing:
+        corpus = IssueCorpusSchema.of(issues)
+        lexical_options = {}
+        if ranking == 'hybrid':
+            lexical_options = {
+                'lexical_scores': await run_off_loop(score_lexically, name, corpus, [queries[i] for i in missing]),
+                'lexical_weight': current_app.config.get('LEXICAL_WEIGHT')
+            }
+        with time_stage('db_read'):
+            embeddings = await run_off_loop(get_embedding_view, name, corpus)
+        with time_stage('score'):
+            related_issues_list = await issue_searcher.find_related_issues_batch(
+                corpus, [queries[i] for i in missing], embeddings=embeddings, **lexical_options
+            )
+        for i, related_issues in zip(missing, related_issues_list):
+            sort_related_issues(related_issues)
+            cache.set(keys[i], tuple(related_issues))
+            results[i] = related_issues
+    return [list(result) for result in results]
+
+def score_lexically(name: str, corpus: IssueCorpusSchema, queries: List[Tuple[str, str]]) -> List[np.ndarray]:
+    """
+    :return: The BM25 scores of every issue of the corpus, per (title, description) query.
+    """
+    lexical_index = get_lexical_index(name)
+    numbers = corpus.numbers.tolist()
+    return [lexical_index.score(tokenize(f'{title} {description or ""}'), numbers) for title, description in queries]
+
+def to_search_cache_key(name: str, version: int, title: str, description: str, ranking: str = 'semantic') -> tuple:
+    return name, version, preprocess_text(f'{title}: {description}'), issue_searcher.threshold, ranking
+
+def get_search_cache() -> TtlLruCache:
+    cache = current_app.extensions.get('search_cache')
+    if cache is None:
+        cache = current_app.extensions.setdefault('search_cache', TtlLruCache(
+            current_app.config.get('SEARCH_CACHE_SIZE'), current_app.config.get('SEARCH_CACHE_TTL')
+        ))
+    return cache
+
+def get_corpus_cache() -> TtlLruCache:
+    cache = current_app.extensions.get('corpus_cache')
+    if cache is None:
+        cache = current_app.extensions.setdefault(
+            'corpus_cache', TtlLruCache(current_app.config.get('CORPUS_CACHE_SIZE'))
+        )
+    return cache
+
+def sort_related_issues(related_issues: List[DisplayIssueSchema]) -> List[DisplayIssueSchema]:
     related_issues.sort(
         key=lambda x: x.threshold if x.threshold is not None else float('-inf'),
         reverse=True
     )
-    logger.debug('related_issues: %s', related_issues)
-    return related_issues, get_related_issues_detail(len(related_issues))
+    return related_issues
 
-async def get_issues(owner: str, repository: str) -> List[IssueSchema]:
-    semaphore = asyncio.Semaphore(5)
+def present_related_issues(
+        related_issues: List[DisplayIssueSchema], options: SearchOptionsSchema
+    ) -> List[Union[DisplayIssueSchema, dict]]:
+    """
+    Apply the pagination, snippet length and field projection of a search to its sorted hits.
+    """
+    end = None if options.limit is None else options.offset + options.limit
+    page = [issue.with_snippets(options.snippet_length) for issue in related_issues[options.offset:end]]
+    if options.fields is None:
+        return page
+    return [{field: getattr(issue, field) for field in options.fields} for issue in page]
 
+def get_issue_comments(owner: str, repository: str, number: int) -> List[str]:
+    """
+    Return the full comments of an indexed issue.
+    """
     name = generate_issue_name(owner, repository)
-    issue_dict = {issue.number: issue for issue in IssueRepository.select_by_name(name)}
-    has_rate_limit_exceeded_error = None
+    issue = IssueRepository.select_by_primary_key(name, number)
+    if issue is None:
+        raise IssueNotFoundError(name, number)
+    return issue.comments or []
 
-    issues = []
-    fetch_failed_issues = []
+def stream_related_issues(form_data: ImmutableMultiDict[str, str]) -> Iterator[dict]:
+    """
+    Validate a search and return a generator of search events.
 
-    # Collect tasks to be executed asynchronously
-    fetch_comments_tasks = []
-    latest_issues_to_fetch_comments_tasks = []
+    - results: hits among the issues that are already indexed
+    - progress: the sync job and its counters, whenever they change
+    - hits: hits among issues embedded since the previous event
+    - done: the complete, sorted hits once the sync has finished, or right away when no sync is needed
+    - error: the sync failed or was cancelled
+
+    Whether the repository is synced first is decided like for /search, see get_stream_sync_job.
+    """
+    validate_form_data(form_data)
+    options = parse_search_options(form_data, current_app.config.get('SEARCH_SNIPPET_LENGTH'))
+    return generate_search_events(
+        form_data.get('owner'), form_data.get('repository'), form_data.get('title'), form_data.get('description'),
+        # Hits arrive incrementally, so only the projection applies to a stream
+        replace(options, limit=None, offset=0), form_data.get('mode')
+    )
+
+def generate_search_events(
+        owner: str, repository: str, title: str, description: str, options: Optional[SearchOptionsSchema] = None,
+        mode: Optional[str] = None
+    ) -> Iterator[dict]:
+    name = generate_issue_name(owner, repository)
+    options = options or SearchOptionsSchema()
+
+    def rank_stored_issues():
+        corpus = load_stored_corpus(name)
+        return sort_related_issues(issue_searcher.rank_issues(
+            corpus, title, description, embeddings=get_embedding_view(name, corpus)
+        ))
+
+    related_issues = rank_stored_issues()
+    job = get_stream_sync_job(owner, repository, mode)
+    yield {
+        'type': 'results',
+        'issues': present_related_issues(related_issues, options),
+        'detail': get_related_issues_detail(len(related_issues), get_freshness(name))
+    }
+    if job is None:
+        yield {
+            'type': 'done',
+            'issues': present_related_issues(related_issues, options),
+            'detail': get_related_issues_detail(len(related_issues), get_freshness(name))
+        }
+        return
+
+    if not sync_queue.has_workers:
+        # Nothing else runs the job, so the stream syncs in the foreground and reports once it has finished
+        sync_queue.run_job(job.id)
+
+    sent_counters = None
+    embedded_cursor = 0
+    while True:
+        job = sync_queue.get(job.id)
+        progress = sync_queue.get_progress(job.id)
+        if progress is not None:
+            job.counters.fetched, job.counters.total = progress.fetched, progress.total
+            job.counters.embedded = progress.embedded
+            embedded_issues = progress.embedded_issues[embedded_cursor:]
+            embedded_cursor += len(embedded_issues)
+            hits = issue_searcher.rank_issues(embedded_issues, title, description)
+            if hits:
+                yield {'type': 'hits', 'issues': present_related_issues(sort_related_issues(hits), options)}
+
+        counters = (job.status, job.counters)
+        if counters != sent_counters:
+            sent_counters = counters
+            yield {'type': 'progress', 'job': job}
+
+        if not job.is_active:
+            break
+        time.sleep(current_app.config.get('STREAM_POLL_INTERVAL'))
+
+    if job.status == SUCCEEDED:
+        related_issues = rank_stored_issues()
+        yield {
+            'type': 'done',
+            'issues': present_related_issues(related_issues, options),
+            'detail': get_related_issues_detail(len(related_issues), get_freshness(name))
+        }
+    else:
+        yield {'type': 'error', 'errorMessage': job.error or f'The sync of {name} was {job.status}'}
+
+def get_stream_sync_job(owner: str, repository: str, mode: Optional[str] = None) -> Optional[SyncJobSchema]:
+    """
+    Return the sync job a search stream follows, or None when the stored issues are searched as they are.
+    As in get_searchable_issues, the stale mode only refreshes data older than SEARCH_STALE_TTL and
+    repositories kept up to date by webhook events are not synced.
+    """
+    name = generate_issue_name(owner, repository)
+    if (mode or current_app.config.get('SEARCH_MODE')) == 'stale':
+        freshness = refresh_if_stale(owner, repository)
+        return sync_queue.get(freshness.job_id) if freshness.job_id else None
+    if is_webhook_managed(SyncStateRepository.select_by_name(name)):
+        return None
+    return sync_queue.enqueue(owner, repository)
 
+async def get_cached_issues(owner: str, repository: str) -> Tuple[Issues, FreshnessSchema]:
+    """
+    Return the stored issues of a repository without waiting for GitHub.
+    A sync job is queued once the data is older than SEARCH_STALE_TTL. Repositories that
+    were never synced are queued as well when sync workers are running, and are synced
+    in the foreground otherwise.
+    """
+    name = generate_issue_name(owner, repository)
+    if await run_off_loop(SyncStateRepository.select_by_name, name) is None:
+        if sync_queue.has_workers:
+            logger.info('%s has not been synced yet. Queueing a sync job.', name)
+            schedule_refresh(owner, repository)
+            return [], get_freshness(name)
+        logger.info('%s has not been synced yet. Syncing before searching.', name)
+        issues = await get_issues(owner, repository)
+        return issues, await run_off_loop(get_freshness, name)
+
+    return await run_off_loop(load_stored_corpus, name), await run_off_loop(refresh_if_stale, owner, repository)
+
+def refresh_if_stale(owner: str, repository: str) -> FreshnessSchema:
+    """
+    Queue a background sync once the stored data of a repository is older than SEARCH_STALE_TTL.
+    """
+    name = generate_issue_name(owner, repository)
+    freshness = get_freshness(name)
+    if freshness.stale and not freshness.refreshing:
+        schedule_refresh(owner, repository)
+        freshness = get_freshness(name)
+    return freshness
+
+def select_stored_issues(name: str) -> List:
+    """
+    Select the stored issues of a repository. Their embeddings are left out when the embedding
+    store covers every issue, since searches then read the vectors from the store.
+    """
+    with time_stage('db_read'):
+        store = get_embedding_store()
+        view = store.load(name) if store is not None else None
+        if view is not None:
+            issues = IssueRepository.select_metadata_by_name(name)
+            if view.has_all([issue.number for issue in issues]):
+                return issues
+        return IssueRepository.select_by_name(name)
+
+def load_stored_corpus(name: str) -> IssueCorpusSchema:
+    """
+    Return the stored issues of a repository in columnar form, without an IssueSchema per issue.
+
+    The corpus is kept in memory per index version, which is bumped whenever stored issues change,
+    so unchanged repositories are neither read from the database nor rebuilt on every search.
+    """
+    cache = get_corpus_cache()
+    key = (name, IndexVersionRepository.select_version(name))
+    corpus = cache.get(key)
+    record_cache('corpus', hits=int(corpus is not None), misses=int(corpus is None))
+    if corpus is None:
+        corpus = IssueCorpusSchema.from_rows(name, select_stored_issues(name))
+        cache.set(key, corpus)
+    return corpus
+
+def get_freshness(name: str) -> FreshnessSchema:
+    sync_state = SyncStateRepository.select_by_name(name)
+    active_job = sync_queue.get_active(name)
+    job_id = active_job.id if active_job else None
+    if sync_state is None:
+        return FreshnessSchema(
+            synced_at=None, age_seconds=None, stale=True, refreshing=job_id is not None, job_id=job_id
+        )
+
+    age_seconds = max(time.time() - sync_state.synced_at, 0.0)
+    return FreshnessSchema(
+        synced_at=datetime.fromtimestamp(sync_state.synced_at, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+        age_seconds=round(age_seconds, 3),
+        stale=age_seconds > current_app.config.get('SEARCH_STALE_TTL') and not is_webhook_managed(sync_state),
+        refreshing=job_id is not None,
+        job_id=job_id
+    )
+
+def is_webhook_managed_by_name(name: str) -> bool:
+    return is_webhook_managed(SyncStateRepository.select_by_name(name))
+
+def is_webhook_managed(sync_state: Optional[SyncState]) -> bool:
+    """
+    Whether a synced repository is kept up to date by webhook events.
+    A repository that has not delivered an event for WEBHOOK_SYNC_TTL seconds is synced again as usual.
+    """
+    if sync_state is None or sync_state.webhook_at is None:
+        return False
+    ttl = current_app.config.get('WEBHOOK_SYNC_TTL')
+    return not ttl or time.time() - sync_state.webhook_at <= ttl
+
+def schedule_refresh(owner: str, repository: str) -> SyncJobSchema:
+    """
+    Queue a background sync of a repository. A job that is already queued or running is reused.
+    """
+    job = sync_queue.enqueue(owner, repository)
+    logger.info('Scheduled a background refresh of %s as job %s', job.name, job.id)
+    return job
+
+async def get_issues(
+    owner: str, repository: str, progress: Optional[SyncProgress] = None,
+    semaphore: Optional[asyncio.Semaphore] = None
+) -> IssueCorpusSchema:
+    """
+    Sync a repository with GitHub and return its issues.
+
+    Concurrent calls for the same repository share a single sync, and a file lock keeps
+    syncs of the same repository in other worker processes from racing on the database.
+    Progress is reported to the caller that starts the sync.
+
+    :param semaphore: Optional semaphore bounding the comment requests in flight,
+        shared with the syncs of other repositories.
+    """
+    name = generate_issue_name(owner, repository)
+
+    async def sync_exclusively():
+        async with inter_process_lock(current_app.config.get('SYNC_LOCK_DIR'), name):
+            return await sync_issues(owner, repository, progress, semaphore)
+
+    return await sync_flight.run(name, sync_exclusively)
+
+async def sync_issues(
+    owner: str, repository: str, progress: Optional[SyncProgress] = None,
+    semaphore: Optional[asyncio.Semaphore] = None
+) -> IssueCorpusSchema:
+    semaphore = semaphore or asyncio.Semaphore(5)
+
+    name = generate_issue_name(owner, repository)
+    progress = progress or SyncProgress(name)
+    issue_dict = {issue.number: issue for issue in await run_off_loop(select_stored_issues, name)}
+    has_rate_limit_exceeded_error = None
+
+    fetch_failed_issues = []
     new_issues = []
     existing_issues = []
 
-    latest_issues = await fetch_issues(owner, repository)
+    with time_stage('list'):
+        latest_issues = await fetch_issues(owner, repository)
     logger.info('The fetch operation retrieved %d issues.', len(latest_issues))
 
-    for latest_issue in latest_issues:
-        number = latest_issue['number']
-        updated = latest_issue['updated_at']
-
-        existing_issue = issue_dict.get(number)
-        if existing_issue and existing_issue.updated == updated:
-            comments_json_str = json.dumps(existing_issue.comments, ensure_ascii=False, indent=2)
-            issues.append(IssueSchema(
-                name=name,
-                number=number,
-                title=latest_issue['title'],
-                url=latest_issue['html_url'],
-                state=latest_issue['state'],
-                comments=json.loads(comments_json_str),
-                embedding=existing_issue.embedding,
-                shape=existing_issue.shape,
-                updated=updated
-            ))
-        else:
-            task = fetch_comments_for_issue(semaphore, owner, repository, number)
-            fetch_comments_tasks.append(task)
-            latest_issues_to_fetch_comments_tasks.append(latest_issue)
+    issues, latest_issues_to_fetch_comments_tasks = await run_off_loop(
+        split_latest_issues, name, latest_issues, issue_dict
+    )
 
-    if not fetch_comments_tasks:
+    progress.set_fetched(len(latest_issues), len(latest_issues_to_fetch_comments_tasks))
+    if not latest_issues_to_fetch_comments_tasks:
+        await run_off_loop(SyncStateRepository.upsert, name, time.time())
         return issues
 
-    logger.info('There are %d issues to retrieve the latest comments.', len(fetch_comments_tasks))
-    fetch_results = await asyncio.gather(*fetch_comments_tasks, return_exceptions=True)
+    progress.check_cancelled()
+    logger.info('There are %d issues to retrieve the latest comments.', len(latest_issues_to_fetch_comments_tasks))
+    with time_stage('comments'):
+        fetch_results = await asyncio.gather(*(
+            fetch_comments_for_issue(semaphore, owner, repository, latest_issue['number'])
+            for latest_issue in latest_issues_to_fetch_comments_tasks
+        ), return_exceptions=True)
     for result, latest_issue in zip(fetch_results, latest_issues_to_fetch_comments_tasks):
+        progress.check_cancelled()
         existing_issue = issue_dict.get(latest_issue['number'])
         updated = latest_issue['updated_at']
         if isinstance(result, Exception):
@@ -95,27 +569,29 @@ async def get_issues(owner: str, repository: str) -> List[IssueSchema]:
                 logger.error('Stack trace:', exc_info=True)
             fetch_failed_issues.append(latest_issue['number'])
         else:
-            new_issue = await generate_issue_schema(
-                owner=owner,
-                repository=repository,
-                number=latest_issue['number'],
-                title=latest_issue['title'],
-                url=latest_issue['html_url'],
-                state=latest_issue['state'],
-                description=latest_issue['body'],
-                updated=updated,
-                issue_comments=result
-            )
+            with time_stage('embed'):
+                new_issue = await generate_issue_schema(
+                    owner=owner,
+                    repository=repository,
+                    number=latest_issue['number'],
+                    title=latest_issue['title'],
+                    url=latest_issue['html_url'],
+                    state=latest_issue['state'],
+                    description=latest_issue['body'],
+                    updated=updated,
+                    issue_comments=result
+                )
             new_issues.append(new_issue)
+            progress.add_embedded(new_issue)
             if existing_issue:
                 existing_issues.append(new_issue.to_issue())
 
-    # Database updates are done in bulk
     if new_issues:
-        if existing_issues:
-            IssueRepository.delete_all_by_primary_key(existing_issues)
-        IssueRepository.bulk_insert([new_issue.to_issue() for new_issue in new_issues])
-        issues.extend(new_issues)
+        progress.check_cancelled()
+        with time_stage('db_write'):
+            await run_off_loop(persist_new_issues, name, new_issues, existing_issues)
+        progress.add_persisted(len(new_issues))
+        issues = IssueCorpusSchema.concat(name, [issues, IssueCorpusSchema.from_issues(new_issues)])
 
     if has_rate_limit_exceeded_error:
         raise has_rate_limit_exceeded_error
@@ -123,8 +599,100 @@ async def get_issues(owner: str, repository: str) -> List[IssueSchema]:
     if fetch_failed_issues:
         raise IssueFetchFailedError(fetch_failed_issues)
 
+    await run_off_loop(SyncStateRepository.upsert, name, time.time())
     return issues
 
+def split_latest_issues(
+    name: str, latest_issues: List[dict], issue_dict: Dict[int, Issue]
+) -> Tuple[IssueCorpusSchema, List[dict]]:
+    """
+    Split the issues listed by GitHub into stored issues that are up to date
+    and issues whose comments have to be fetched and embedded again.
+
+    Up-to-date issues are returned in columnar form, built straight from their stored rows.
+    """
+    up_to_date_issues, up_to_date_rows = [], []
+    # Collect issues whose comments are fetched asynchronously
+    latest_issues_to_fetch_comments_tasks = []
+
+    for latest_issue in latest_issues:
+        existing_issue = issue_dict.get(latest_issue['number'])
+        if existing_issue and existing_issue.updated == latest_issue['updated_at']:
+            up_to_date_issues.append(latest_issue)
+            up_to_date_rows.append(existing_issue)
+        else:
+            latest_issues_to_fetch_comments_tasks.append(latest_issue)
+    record_cache('issues', hits=len(up_to_date_issues), misses=len(latest_issues_to_fetch_comments_tasks))
+    return (
+        IssueCorpusSchema.from_listing(name, up_to_date_issues, up_to_date_rows),
+        latest_issues_to_fetch_comments_tasks
+    )
+
+def persist_new_issues(name: str, new_issues: List[IssueSchema], existing_issues: List[Issue]):
+    # Database updates are done in bulk
+    if existing_issues:
+        IssueRepository.delete_all_by_primary_key(existing_issues)
+    issues = [to_indexed_issue(new_issue) for new_issue in new_issues]
+    IssueRepository.bulk_insert(issues)
+    update_embedding_store(name, new_issues)
+    update_lexical_index(name, issues, IndexVersionRepository.increment(name))
+
+def remove_stored_issues(name: str, numbers: List[int]):
+    """
+    Remove issues from the database and every index of a repository.
+    """
+    issues = IssueRepository.select_by_numbers(name, numbers)
+    if not issues:
+        return
+    IssueRepository.delete_all_by_primary_key(issues)
+    store = get_embedding_store()
+    if store is not None:
+        store.remove(name, numbers)
+    update_lexical_index(name, [], IndexVersionRepository.increment(name), removed=numbers)
+
+def to_indexed_issue(issue_schema: IssueSchema) -> Issue:
+    issue = issue_schema.to_issue()
+    issue.terms = count_issue_terms(issue_schema.title, issue_schema.comments)
+    return issue
+
+def update_embedding_store(name: str, new_issues: List[IssueSchema]):
+    store = get_embedding_store()
+    if store is None or not store.exists(name):
+        # The store is built from the complete issue list on the next search
+        return
+    store.append(
+        name,
+        [issue.number for issue in new_issues],
+        to_embedding_matrix([issue.embedding for issue in new_issues])
+    )
+
+def get_embedding_view(name: str, issues: Issues) -> Optional[EmbeddingView]:
+    """
+    Return the embedding store view of a repository, rebuilding the store when it misses any issue.
+
+    :param issues: Every stored issue of the repository. The store is rewritten with exactly these
+        issues, so a subset, e.g. prefiltered candidates, must never be passed.
+    """
+    store = get_embedding_store()
+    if store is None or not issues:
+        return None
+
+    corpus = IssueCorpusSchema.of(issues)
+    numbers = corpus.numbers.tolist()
+    view = store.load(name)
+    covered = view is not None and view.has_all(numbers)
+    record_cache('embeddings', hits=int(covered), misses=int(not covered))
+    if not covered:
+        logger.info('Rebuilding the embedding store for %s', name)
+        embeddings = corpus.embeddings
+        if not all(embeddings):
+            # Issues loaded without embeddings while the store covered them
+            stored = {row.number: row.embedding for row in IssueRepository.iter_embeddings_by_name(name)}
+            embeddings = [embedding or stored[number] for number, embedding in zip(numbers, embeddings)]
+        store.write(name, numbers, to_embedding_matrix(embeddings))
+        view = store.load(name)
+    return view
+
 def generate_issue_name(owner: str, repository: str):
     return  f'{owner}/{repository}'
 
@@ -150,9 +718,10 @@ async def generate_issue_schema(
         updated=updated,
     )
 
-def get_related_issues_detail(related_issues_len):
+def get_related_issues_detail(related_issues_len, freshness: Optional[FreshnessSchema] = None):
     message = f'There are {related_issues_len} related issues.' if related_issues_len else 'No related issues found.'
     return IssueDetaiSchema(
         total=related_issues_len,
-        message=message
+        message=message,
+        freshness=freshness
     )
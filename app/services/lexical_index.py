@@ -0,0 +1,168 @@
+import heapq
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from flask import current_app
+
+from app.repositories.index_version_repository import IndexVersionRepository
+from app.repositories.issue_repository import IssueRepository
+
+logger = logging.getLogger(__name__)
+
+# Identifiers, dotted names and version numbers are kept whole, e.g. 'v1.2.3' or 'java.lang.NullPointerException'
+TOKEN_PATTERN = re.compile(r'[a-z0-9_]+(?:[.\-:/][a-z0-9_]+)*')
+TOKEN_SEPARATORS = re.compile(r'[.\-:/]')
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """
+    Split text into lexical terms.
+
+    Unlike preprocess_text, punctuation inside a token is kept, so error names, stack trace
+    identifiers and version numbers stay searchable. Compound tokens are also indexed by their parts.
+    """
+    if not text:
+        return []
+    terms = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        terms.append(token)
+        parts = TOKEN_SEPARATORS.split(token)
+        if len(parts) > 1:
+            terms.extend(part for part in parts if part)
+    return terms
+
+def count_issue_terms(title: Optional[str], comments: Optional[Sequence[Optional[str]]]) -> Dict[str, int]:
+    terms = tokenize(title)
+    for comment in comments or []:
+        terms.extend(tokenize(comment))
+    return dict(Counter(terms))
+
+class LexicalIndex:
+    """
+    In-memory BM25 inverted index over the issues of one repository.
+
+    :param version: The index version of the repository the index reflects.
+    """
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, version: int = 0):
+        self.version = version
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._documents: Dict[int, Dict[str, int]] = {}
+        self._lengths: Dict[int, int] = {}
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._documents)
+
+    def add(self, number: int, terms: Dict[str, int]):
+        """
+        Index an issue, replacing the terms it was indexed with before.
+        """
+        with self._lock:
+            self._remove(number)
+            self._documents[number] = terms
+            length = sum(terms.values())
+            self._lengths[number] = length
+            self._total_length += length
+            for term, frequency in terms.items():
+                self._postings.setdefault(term, {})[number] = frequency
+
+    def remove(self, number: int):
+        with self._lock:
+            self._remove(number)
+
+    def _remove(self, number: int):
+        terms = self._documents.pop(number, None)
+        if terms is None:
+            return
+        self._total_length -= self._lengths.pop(number)
+        for term in terms:
+            postings = self._postings[term]
+            del postings[number]
+            if not postings:
+                del self._postings[term]
+
+    def score_all(self, query_terms: Iterable[str]) -> Dict[int, float]:
+        """
+        Return the BM25 score of every issue that shares at least one term with the query.
+        """
+        scores: Dict[int, float] = {}
+        with self._lock:
+            count = len(self._documents)
+            if not count:
+                return scores
+            average_length = max(self._total_length / count, 1e-12)
+            for term in set(query_terms):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for number, frequency in postings.items():
+                    norm = self.K1 * (1 - self.B + self.B * self._lengths[number] / average_length)
+                    scores[number] = scores.get(number, 0.0) + idf * frequency * (self.K1 + 1) / (frequency + norm)
+        return scores
+
+    def score(self, query_terms: Iterable[str], numbers: Sequence[int]) -> np.ndarray:
+        """
+        Return the BM25 scores of the given issues, in the same order.
+        """
+        scores = self.score_all(query_terms)
+        return np.fromiter((scores.get(number, 0.0) for number in numbers), dtype=np.float32, count=len(numbers))
+
+    def top_k(self, query_terms: Iterable[str], k: int) -> List[Tuple[int, float]]:
+        return heapq.nlargest(k, self.score_all(query_terms).items(), key=lambda item: item[1])
+
+_indexes_lock = threading.Lock()
+
+def _indexes() -> Dict[str, LexicalIndex]:
+    indexes = current_app.extensions.get('lexical_indexes')
+    if indexes is None:
+        indexes = current_app.extensions.setdefault('lexical_indexes', {})
+    return indexes
+
+def get_lexical_index(name: str) -> LexicalIndex:
+    """
+    Return the lexical index of a repository, loading it again when another process
+    has stored issues since it was built.
+    """
+    version = IndexVersionRepository.select_version(name)
+    index = _indexes().get(name)
+    if index is not None and index.version == version:
+        return index
+
+    index = LexicalIndex(version)
+    for issue in IssueRepository.iter_terms_by_name(name):
+        terms = issue.terms
+        if terms is None:
+            # Issues stored before terms were recorded are tokenized on load
+            terms = count_issue_terms(issue.title, issue.comments)
+        index.add(issue.number, terms)
+    logger.info('Loaded the lexical index of %s with %d issues', name, len(index))
+    with _indexes_lock:
+        _indexes()[name] = index
+    return index
+
+def update_lexical_index(name: str, issues: Sequence, version: int, removed: Sequence[int] = ()):
+    """
+    Add newly stored issues to the loaded lexical index of a repository.
+
+    :param issues: Issue rows with their number and terms.
+    :param version: The index version after the issues were stored.
+    :param removed: Numbers of issues removed from the repository.
+    """
+    index = _indexes().get(name)
+    if index is None or index.version != version - 1:
+        # Not loaded, or another process stored issues in between; it is reloaded on the next search
+        return
+    for number in removed:
+        index.remove(number)
+    for issue in issues:
+        index.add(issue.number, issue.terms)
+    index.version = version
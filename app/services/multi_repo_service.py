@@ -0,0 +1,206 @@
+import asyncio
+import heapq
+import logging
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+from flask import current_app
+from werkzeug.datastructures import ImmutableMultiDict
+
+from app.repositories.embedding_store import get_embedding_store
+from app.repositories.issue_repository import IssueRepository
+from app.repositories.sync_state_repository import SyncStateRepository
+from app.schemas.display_issue_schema import DisplayIssueSchema
+from app.schemas.issue_detail_schema import IssueDetaiSchema
+from app.schemas.repository_result_schema import RepositoryResultSchema
+from app.services.github_client import fetch_organization_repositories
+from app.services.issue_searcher import fuse_scores, normalize_vector, preprocess_text
+from app.services.issue_service import (
+    issue_searcher, get_issues, get_freshness, refresh_if_stale, is_webhook_managed, present_related_issues,
+    get_related_issues_detail
+)
+from app.services.lexical_index import get_lexical_index, tokenize
+from app.services.sync_coordinator import SyncBudget
+from app.utils.offload import run_off_loop
+from app.utils.validators import validate_multi_repository_data, validate_repository_count, parse_search_options
+
+logger = logging.getLogger(__name__)
+
+# (score, repository name, issue number)
+Hit = Tuple[float, str, int]
+
+async def get_related_issues_across_repositories(
+        form_data: ImmutableMultiDict[str, str]
+    ) -> Tuple[List[Union[DisplayIssueSchema, dict]], IssueDetaiSchema, List[RepositoryResultSchema]]:
+    """
+    Search several repositories, or every repository of an organization, for one query.
+
+    The repositories are synced concurrently under a shared request budget. Each repository is
+    scored on its own as a shard, only the top hits of every shard are kept and merged, and the
+    full rows are loaded for the merged hits only.
+
+    :return: The hits, the search detail and one result per repository.
+    """
+    max_repositories = current_app.config.get('MULTI_SEARCH_MAX_REPOSITORIES')
+    validate_multi_repository_data(form_data, max_repositories)
+    options = parse_search_options(form_data, current_app.config.get('SEARCH_SNIPPET_LENGTH'))
+
+    names = form_data.get('repositories') or await fetch_organization_repositories(form_data.get('organization'))
+    names = list(dict.fromkeys(names))
+    validate_repository_count(len(names), max_repositories)
+
+    errors = await sync_repositories(names, form_data.get('mode'))
+
+    title, description = form_data.get('title'), form_data.get('description')
+    ranking = form_data.get('ranking') or current_app.config.get('SEARCH_RANKING')
+    top_k = current_app.config.get('MULTI_SEARCH_TOP_K') if options.limit is None else options.offset + options.limit
+
+    query_embedding = await issue_searcher.encode_query_async(preprocess_text(f'{title}: {description}'))
+    query_embedding = normalize_vector(query_embedding)
+    query_terms = tokenize(f'{title} {description or ""}') if ranking == 'hybrid' else None
+
+    shard_hits = []
+    repository_results = []
+    for name in names:
+        hits, total = await run_off_loop(score_repository, name, query_embedding, query_terms, top_k)
+        shard_hits.append(hits)
+        repository_results.append(RepositoryResultSchema(
+            name=name, total=total, freshness=await run_off_loop(get_freshness, name), error=errors.get(name)
+        ))
+
+    related_issues = await run_off_loop(load_hits, merge_hits(shard_hits, top_k))
+    total = sum(result.total for result in repository_results)
+    return present_related_issues(related_issues, options), get_related_issues_detail(total), repository_results
+
+async def sync_repositories(names: List[str], mode: Optional[str] = None) -> Dict[str, str]:
+    """
+    Bring every repository up to date before it is scored.
+
+    Repositories kept up to date by webhook events, and in stale mode every repository that has
+    been synced before, are searched as stored and refreshed in the background once stale.
+    A repository that fails to sync is searched with its stored issues.
+
+    :return: The error message of every repository that failed to sync, by name.
+    """
+    budget = SyncBudget(
+        current_app.config.get('MULTI_SEARCH_CONCURRENCY'), current_app.config.get('MULTI_SEARCH_MAX_REQUESTS')
+    )
+    errors = {}
+
+    async def sync_repository(name: str):
+        owner, repository = name.split('/', 1)
+        sync_state = await run_off_loop(SyncStateRepository.select_by_name, name)
+        stale_mode = (mode or current_app.config.get('SEARCH_MODE')) == 'stale'
+        if sync_state and (stale_mode or is_webhook_managed(sync_state)):
+            await run_off_loop(refresh_if_stale, owner, repository)
+            return
+        try:
+            # Only the sync matters here; the issues are scored from the stored embeddings
+            await budget.run(lambda: get_issues(owner, repository, semaphore=budget.requests))
+        except Exception as e:
+            logger.error('The sync of %s failed: %s', name, e)
+            errors[name] = str(e)
+
+    await asyncio.gather(*(sync_repository(name) for name in names))
+    return errors
+
+def score_repository(
+        name: str, query_embedding: np.ndarray, query_terms: Optional[List[str]], top_k: int
+    ) -> Tuple[List[Hit], int]:
+    """
+    Score the stored issues of one repository.
+
+    :param query_embedding: The unit length query embedding.
+    :param query_terms: Tokenized query for hybrid ranking, or None to rank semantically.
+    :param top_k: The number of hits to keep.
+    :return: The top hits sorted by descending score, and the number of issues above the threshold.
+    """
+    numbers, matrix = load_repository_embeddings(name)
+    if numbers.size == 0:
+        return [], 0
+
+    # The rows have unit length, so no norms are computed per query
+    scores = np.asarray(matrix @ query_embedding)
+    if query_terms is not None:
+        scores = fuse_scores(
+            scores, get_lexical_index(name).score(query_terms, numbers), current_app.config.get('LEXICAL_WEIGHT')
+        )
+
+    above = np.flatnonzero(scores >= issue_searcher.threshold)
+    top = above
+    if len(top) > top_k:
+        top = top[np.argpartition(-scores[top], top_k - 1)[:top_k]] if top_k else top[:0]
+    top = top[np.argsort(-scores[top], kind='stable')]
+    return [(float(scores[i]), name, int(numbers[i])) for i in top], len(above)
+
+def load_repository_embeddings(name: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return the issue numbers and the unit length embedding matrix of a repository.
+
+    The memory-mapped embedding store is used when it is enabled, and built from the database
+    the first time a repository is scored. Otherwise the embeddings are streamed from the database
+    without their comments.
+    """
+    store = get_embedding_store()
+    view = store.load(name) if store is not None else None
+    if view is not None:
+        if len(view.numbers) == len(view) and view.normalized:
+            return np.asarray(view.numbers), view.matrix
+        numbers = np.fromiter(view.rows, dtype=np.int64, count=len(view))
+        return numbers, view.unit_rows(view.row_indices(numbers))
+
+    count = IssueRepository.count_by_name(name)
+    numbers = np.empty(count, dtype=np.int64)
+    matrix = np.empty((0, 0), dtype=np.float32)
+    loaded = 0
+    for row in IssueRepository.iter_embeddings_by_name(name):
+        if loaded == count:
+            break
+        embedding = np.frombuffer(row.embedding, dtype=np.float32)
+        if not loaded:
+            matrix = np.empty((count, len(embedding)), dtype=np.float32)
+        numbers[loaded] = row.number
+        matrix[loaded] = embedding
+        loaded += 1
+    numbers, matrix = numbers[:loaded], matrix[:loaded]
+
+    if store is not None and loaded:
+        store.write(name, numbers, matrix)
+    return numbers, matrix
+
+def merge_hits(shard_hits: Iterable[List[Hit]], top_k: int) -> List[Hit]:
+    """
+    Merge the sorted hits of every shard into the overall top-k.
+    """
+    return list(islice(heapq.merge(*shard_hits, key=lambda hit: hit[0], reverse=True), top_k))
+
+def load_hits(hits: List[Hit]) -> List[DisplayIssueSchema]:
+    """
+    Load the rows of the merged hits, keeping the order of the hits.
+    """
+    numbers_by_name: Dict[str, List[int]] = {}
+    for _, name, number in hits:
+        numbers_by_name.setdefault(name, []).append(number)
+
+    issues = {
+        (issue.name, issue.number): issue
+        for name, numbers in numbers_by_name.items()
+        for issue in IssueRepository.select_by_numbers(name, numbers)
+    }
+    related_issues = []
+    for score, name, number in hits:
+        issue = issues.get((name, number))
+        if issue is None:
+            # Removed since it was scored
+            continue
+        related_issues.append(DisplayIssueSchema(
+            name=name,
+            number=number,
+            title=issue.title or '',
+            url=issue.url or f'https://github.com/{name}/issues/{number}',
+            state=issue.state or '',
+            comments=issue.comments,
+            threshold=score
+        ))
+    return related_issues
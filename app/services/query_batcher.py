@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.metrics import query_batch_size
+from app.utils.profiling import is_profiling
+
+logger = logging.getLogger(__name__)
+
+class QueryBatcher:
+    """
+    Encode the queries of concurrent searches in shared model calls.
+
+    A query waits up to max_wait seconds for more queries to arrive, or until max_batch queries are pending,
+    and the batch is then encoded in one call on a background thread. Each caller receives its own row.
+    A single query therefore pays at most max_wait extra, while concurrent queries share the cost of a call.
+
+    :param encode: Encodes a list of queries into a 2-D array with one row per query.
+    :param max_batch: Maximum number of queries per model call.
+    :param max_wait: Seconds the first query of a batch waits for more. 0 encodes every query on its caller's thread.
+    """
+    def __init__(self, encode: Callable[[List[str]], np.ndarray], max_batch: int = 32, max_wait: float = 0):
+        self.encode_batch = encode
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._pending: 'queue.Queue[Tuple[str, Future]]' = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_wait > 0 and self.max_batch > 1
+
+    def configure(self, max_batch: int, max_wait: float):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+
+    def submit(self, query: str) -> Future:
+        """
+        Queue a query for the next batch.
+
+        :return: A future of the float32 embedding of the query.
+        """
+        future = Future()
+        if not self.enabled or is_profiling():
+            # A profiled request encodes its query on its own thread, which is the one the profiler sees
+            self._run([(query, future)])
+            return future
+        self._ensure_thread()
+        self._pending.put((query, future))
+        return future
+
+    def encode(self, query: str) -> np.ndarray:
+        """
+        Encode a query in the next batch, blocking the calling thread until it is done.
+        """
+        return self.submit(query).result()
+
+    async def encode_async(self, query: str) -> np.ndarray:
+        """
+        Encode a query in the next batch without blocking the event loop.
+        """
+        return await asyncio.wrap_future(self.submit(query))
+
+    def _ensure_thread(self):
+        with self._lock:
+            # A forked worker inherits the thread object, but not the thread
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._work, name='query-batcher', daemon=True)
+                self._thread.start()
+
+    def _work(self):
+        while True:
+            batch = [self._pending.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._pending.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            self._run(batch)
+
+    def _run(self, batch: List[Tuple[str, Future]]):
+        query_batch_size.observe(len(batch))
+        try:
+            embeddings = self.encode_batch([query for query, _ in batch])
+        except Exception as e:
+            logger.error('Failed to encode a batch of %d queries: %s', len(batch), e)
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), embedding in zip(batch, embeddings):
+            future.set_result(embedding)
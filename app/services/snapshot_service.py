@@ -0,0 +1,216 @@
+import io
+import json
+import logging
+import time
+import zipfile
+from dataclasses import asdict, fields
+from typing import BinaryIO, Iterator, List, Optional, Union
+
+import numpy as np
+from flask import current_app
+
+from app.repositories.embedding_store import get_embedding_store, normalize_rows
+from app.repositories.index_version_repository import IndexVersionRepository
+from app.repositories.issue_repository import IssueRepository
+from app.repositories.sync_state_repository import SyncStateRepository
+from app.schemas.snapshot_manifest_schema import SnapshotManifestSchema, SNAPSHOT_FORMAT
+from app.services.issue_service import issue_searcher
+from app.services.lexical_index import count_issue_terms
+from app.services.sync_coordinator import blocking_inter_process_lock
+from app.utils.exceptions import SnapshotError
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_ENTRY = 'manifest.json'
+ISSUES_ENTRY = 'issues.jsonl'
+NUMBERS_ENTRY = 'numbers.i64'
+EMBEDDINGS_ENTRY = 'embeddings.f32'
+
+NUMBER_DTYPE = np.dtype('<i8')
+EMBEDDING_DTYPE = np.dtype('<f4')
+
+def export_snapshot(name: str, target: Union[str, BinaryIO]) -> SnapshotManifestSchema:
+    """
+    Write the stored index of a repository to a single zip file.
+
+    - manifest.json: repository, model id, embedding dimension and issue count
+    - issues.jsonl: one issue per line with its metadata, comments and lexical terms, deflate-compressed
+    - numbers.i64 and embeddings.f32: the issue numbers and raw little-endian float32 embeddings, row by row
+
+    Issues are streamed from the database, so the repository is never held in memory.
+
+    :param name: Repository name in the format 'owner/repository'.
+    :param target: A file path or a writable binary file.
+    """
+    numbers = []
+    dimension = None
+    with zipfile.ZipFile(target, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        with archive.open(ISSUES_ENTRY, 'w', force_zip64=True) as entry:
+            writer = io.TextIOWrapper(entry, encoding='utf-8')
+            for issue in IssueRepository.iter_by_name(name):
+                numbers.append(issue.number)
+                writer.write(json.dumps({
+                    'number': issue.number,
+                    'title': issue.title,
+                    'url': issue.url,
+                    'state': issue.state,
+                    'updated': issue.updated,
+                    'comments': issue.comments,
+                    'terms': issue.terms
+                }, ensure_ascii=False) + '\n')
+            writer.flush()
+            writer.detach()
+
+        exported = set(numbers)
+        # Embeddings barely compress, so they are stored as is
+        with archive.open(zipfile.ZipInfo(EMBEDDINGS_ENTRY), 'w', force_zip64=True) as entry:
+            count = 0
+            for row in IssueRepository.iter_embeddings_by_name(name):
+                if row.number not in exported:
+                    # Stored after the issues were exported
+                    continue
+                embedding = np.frombuffer(row.embedding, dtype=np.float32)
+                if dimension is None:
+                    dimension = len(embedding)
+                elif len(embedding) != dimension:
+                    raise SnapshotError(f'{name}#{row.number} has {len(embedding)} dimensions instead of {dimension}')
+                entry.write(embedding.astype(EMBEDDING_DTYPE, copy=False).tobytes())
+                count += 1
+            if count != len(numbers):
+                raise SnapshotError(f'the issues of {name} changed during the export')
+        archive.writestr(
+            NUMBERS_ENTRY, np.asarray(numbers, dtype=NUMBER_DTYPE).tobytes(), compress_type=zipfile.ZIP_STORED
+        )
+
+        sync_state = SyncStateRepository.select_by_name(name)
+        manifest = SnapshotManifestSchema(
+            name=name,
+            model=issue_searcher.model_name,
+            dimension=dimension or issue_searcher.embedding_dimension,
+            issues=len(numbers),
+            created_at=time.time(),
+            synced_at=sync_state.synced_at if sync_state else None
+        )
+        archive.writestr(MANIFEST_ENTRY, json.dumps(asdict(manifest), indent=2))
+    logger.info('Exported %d issues of %s', manifest.issues, name)
+    return manifest
+
+def import_snapshot(
+        source: Union[str, BinaryIO], name: Optional[str] = None, batch_size: int = 1000
+    ) -> SnapshotManifestSchema:
+    """
+    Replace the stored index of a repository with a snapshot, without embedding anything again.
+
+    The snapshot is refused unless it was built with the model and embedding dimension in use.
+    Issues are bulk inserted in a single transaction, the embedding store is rewritten and the
+    index version is bumped, so cached results and lexical indexes are rebuilt. All of it happens
+    under the sync lock of the repository.
+
+    :param source: A file path or a readable binary file written by export_snapshot.
+    :param name: Repository to import into. Defaults to the repository of the snapshot.
+    :return: The manifest of the snapshot.
+    """
+    try:
+        archive = zipfile.ZipFile(source)
+    except (zipfile.BadZipFile, OSError) as e:
+        raise SnapshotError(str(e)) from e
+
+    with archive:
+        manifest = read_manifest(archive)
+        if manifest.model != issue_searcher.model_name:
+            raise SnapshotError(f'built with the model {manifest.model}, not {issue_searcher.model_name}')
+        if manifest.dimension != issue_searcher.embedding_dimension:
+            raise SnapshotError(
+                f'{manifest.dimension} dimensions do not match the {issue_searcher.embedding_dimension} of the model'
+            )
+
+        if ISSUES_ENTRY not in archive.namelist():
+            raise SnapshotError(f'missing {ISSUES_ENTRY}')
+        numbers = np.frombuffer(read_entry(archive, NUMBERS_ENTRY), dtype=NUMBER_DTYPE)
+        matrix = np.frombuffer(read_entry(archive, EMBEDDINGS_ENTRY), dtype=EMBEDDING_DTYPE)
+        if len(numbers) != manifest.issues or len(matrix) != manifest.issues * manifest.dimension:
+            raise SnapshotError('the embeddings do not match the manifest')
+        matrix = matrix.reshape(manifest.issues, manifest.dimension).astype(np.float32, copy=False)
+        # Snapshots exported before embeddings were normalized hold raw model output
+        matrix = normalize_rows(matrix).astype(np.float32, copy=False)
+
+        name = name or manifest.name
+        # A sync of the repository in a worker process must not interleave with the replacement
+        with blocking_inter_process_lock(current_app.config.get('SYNC_LOCK_DIR'), name):
+            # Both the issue count and the checksum of the zip entry are verified before the replacement is
+            # committed, so a damaged snapshot leaves the stored issues as they were
+            try:
+                with archive.open(ISSUES_ENTRY) as entry:
+                    count = IssueRepository.replace_all_by_name(name, iter_issue_batches(
+                        name, io.TextIOWrapper(entry, encoding='utf-8'), numbers, matrix, batch_size
+                    ))
+            except (KeyError, ValueError, zipfile.BadZipFile) as e:
+                raise SnapshotError(f'unreadable issues: {e}') from e
+
+            store = get_embedding_store()
+            if store is not None:
+                if len(numbers):
+                    store.write(name, numbers, matrix)
+                else:
+                    store.delete(name)
+            SyncStateRepository.upsert(name, manifest.synced_at or manifest.created_at)
+            IndexVersionRepository.increment(name)
+    logger.info('Imported %d issues into %s', count, name)
+    return manifest
+
+def read_entry(archive: zipfile.ZipFile, entry: str) -> bytes:
+    try:
+        return archive.read(entry)
+    except KeyError as e:
+        raise SnapshotError(f'missing {entry}') from e
+    except zipfile.BadZipFile as e:
+        raise SnapshotError(f'unreadable {entry}: {e}') from e
+
+def read_manifest(archive: zipfile.ZipFile) -> SnapshotManifestSchema:
+    try:
+        values = json.loads(archive.read(MANIFEST_ENTRY))
+    except (KeyError, ValueError) as e:
+        raise SnapshotError('missing or unreadable manifest') from e
+    if values.get('format') != SNAPSHOT_FORMAT:
+        raise SnapshotError(f'unsupported format {values.get("format")}')
+    try:
+        return SnapshotManifestSchema(**{field.name: values[field.name] for field in fields(SnapshotManifestSchema)})
+    except KeyError as e:
+        raise SnapshotError(f'the manifest has no {e}') from e
+
+def iter_issue_batches(
+        name: str, lines: Iterator[str], numbers: np.ndarray, matrix: np.ndarray, batch_size: int
+    ) -> Iterator[List[dict]]:
+    """
+    Pair the issues of a snapshot with their embeddings as rows ready for a bulk insert.
+    The last batch is only yielded once every issue of the snapshot has been read.
+    """
+    shape = str(matrix.shape[1])
+    batch = []
+    count = 0
+    for row, line in enumerate(lines):
+        count += 1
+        issue = json.loads(line)
+        if row >= len(numbers) or issue['number'] != numbers[row]:
+            raise SnapshotError(f'issue #{issue["number"]} does not match its embedding')
+        terms = issue.get('terms')
+        batch.append({
+            'name': name,
+            'number': issue['number'],
+            'title': issue.get('title'),
+            'url': issue.get('url'),
+            'state': issue.get('state'),
+            'updated': issue.get('updated'),
+            'comments': issue.get('comments'),
+            'terms': terms if terms is not None else count_issue_terms(issue.get('title'), issue.get('comments')),
+            'embedding': matrix[row].tobytes(),
+            'shape': shape,
+            'normalized': True
+        })
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if count != len(numbers):
+        raise SnapshotError(f'{count} issues do not match the {len(numbers)} embeddings of the manifest')
+    if batch:
+        yield batch
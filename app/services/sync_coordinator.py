@@ -0,0 +1,111 @@
+import asyncio
+import concurrent.futures
+import logging
+import os
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+from filelock import FileLock
+
+from app.repositories.embedding_store import EmbeddingStore
+from app.utils.exceptions import RateLimitExceededError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into a single execution.
+
+    The first caller runs the function and every caller that arrives while it is in flight
+    awaits the same result. Under WSGI each request runs its own event loop, so the shared
+    result is a thread-safe concurrent.futures.Future rather than an asyncio one.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, concurrent.futures.Future] = {}
+
+    def in_flight(self, key: str) -> bool:
+        with self._lock:
+            return key in self._calls
+
+    async def run(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        with self._lock:
+            future = self._calls.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = concurrent.futures.Future()
+                self._calls[key] = future
+
+        if not is_leader:
+            logger.info('Waiting for the in-flight call of %s', key)
+            return await asyncio.wrap_future(future)
+
+        try:
+            result = await func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+        future.set_result(result)
+        return result
+
+@asynccontextmanager
+async def inter_process_lock(lock_dir: Optional[str], key: str):
+    """
+    Hold a file lock for the key so that only one worker process syncs a repository at a time.
+    Does nothing when lock_dir is empty.
+    """
+    if not lock_dir:
+        yield
+        return
+
+    lock = create_file_lock(lock_dir, key)
+    # Waiting for another process must not block the event loop
+    await asyncio.to_thread(lock.acquire)
+    try:
+        yield
+    finally:
+        lock.release()
+
+@contextmanager
+def blocking_inter_process_lock(lock_dir: Optional[str], key: str):
+    """
+    Hold the lock of inter_process_lock from synchronous code that runs no event loop, e.g. a command.
+    """
+    if not lock_dir:
+        yield
+        return
+
+    with create_file_lock(lock_dir, key):
+        yield
+
+def create_file_lock(lock_dir: str, key: str) -> FileLock:
+    os.makedirs(lock_dir, exist_ok=True)
+    return FileLock(os.path.join(lock_dir, f'{EmbeddingStore.to_key(key)}.lock'), thread_local=False)
+
+class SyncBudget:
+    """
+    GitHub request budget shared by the syncs of one multi-repository search.
+
+    ``syncs`` bounds the repositories synced at once and ``requests`` the comment requests in
+    flight across all of them. Once any sync hits the rate limit, no further sync is started.
+    """
+    def __init__(self, max_syncs: int, max_requests: int):
+        self.syncs = asyncio.Semaphore(max_syncs)
+        self.requests = asyncio.Semaphore(max_requests)
+        self.rate_limit_error: Optional[RateLimitExceededError] = None
+
+    async def run(self, func: Callable[[], Awaitable[T]]) -> T:
+        async with self.syncs:
+            if self.rate_limit_error is not None:
+                raise self.rate_limit_error
+            try:
+                return await func()
+            except RateLimitExceededError as e:
+                self.rate_limit_error = e
+                raise
@@ -0,0 +1,60 @@
+import threading
+from typing import Callable, List, Optional
+
+from app.schemas.issue_schema import IssueSchema
+from app.utils.exceptions import SyncCancelledError
+
+class SyncProgress:
+    """
+    Progress of a single repository sync: issues fetched from GitHub, embedded and persisted.
+
+    :param name: Repository name in the format 'owner/repository'.
+    :param on_change: Called with this object whenever a counter changes.
+    """
+    def __init__(self, name: str, on_change: Optional[Callable[['SyncProgress'], None]] = None):
+        self.name = name
+        self.fetched = 0
+        self.total = 0
+        self.embedded = 0
+        self.persisted = 0
+        self.embedded_issues: List[IssueSchema] = []
+        self._on_change = on_change
+        self._cancelled = threading.Event()
+
+    def set_fetched(self, fetched: int, total: int):
+        """
+        :param fetched: Number of issues listed by GitHub.
+        :param total: Number of those issues that have to be embedded.
+        """
+        self.fetched = fetched
+        self.total = total
+        self._notify()
+
+    def add_embedded(self, issue: Optional[IssueSchema] = None):
+        """
+        :param issue: The newly embedded issue. It is kept so that streaming searches
+            can score it before the sync completes.
+        """
+        self.embedded += 1
+        if issue is not None:
+            self.embedded_issues.append(issue)
+        self._notify()
+
+    def add_persisted(self, count: int):
+        self.persisted += count
+        self._notify()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def check_cancelled(self):
+        if self.cancelled:
+            raise SyncCancelledError(self.name)
+
+    def _notify(self):
+        if self._on_change is not None:
+            self._on_change(self)
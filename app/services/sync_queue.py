@@ -0,0 +1,352 @@
+# pylint: disable=C0415
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+import uuid
+from dataclasses import replace
+from typing import Dict, List, Optional
+
+from flask import Flask, current_app
+
+from app.repositories.sync_job_repository import SyncJobRepository
+from app.schemas.sync_job_schema import (
+    SyncJobSchema, SyncCountersSchema, QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED
+)
+from app.services.sync_progress import SyncProgress
+from app.utils.exceptions import SyncJobNotFoundError, SyncCancelledError
+
+logger = logging.getLogger(__name__)
+
+def copy_job(job: SyncJobSchema) -> SyncJobSchema:
+    return replace(job, counters=replace(job.counters))
+
+class InProcessJobBackend:
+    """
+    Keeps jobs in memory. Jobs are only visible to the process that created them.
+    """
+    RETENTION_SECONDS = 3600
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, SyncJobSchema] = {}
+        self._pending: queue.Queue = queue.Queue()
+
+    def insert(self, job: SyncJobSchema):
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = copy_job(job)
+        self._pending.put(job.id)
+
+    def select_by_id(self, job_id: str) -> Optional[SyncJobSchema]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return copy_job(job) if job else None
+
+    def select_active_by_name(self, name: str) -> Optional[SyncJobSchema]:
+        with self._lock:
+            for job in self._jobs.values():
+                if job.name == name and job.is_active:
+                    return copy_job(job)
+        return None
+
+    def claim_next(self, timeout: float, lease_owner: Optional[str] = None) -> Optional[SyncJobSchema]:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                job_id = self._pending.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                return None
+            job = self.claim(job_id, lease_owner)
+            if job is not None:
+                return job
+
+    def claim(self, job_id: str, lease_owner: Optional[str] = None) -> Optional[SyncJobSchema]:  # pylint: disable=W0613
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != QUEUED:
+                return None
+            job.status = RUNNING
+            job.updated_at = time.time()
+            return copy_job(job)
+
+    def update(self, job: SyncJobSchema, lease_owner: Optional[str] = None) -> bool:  # pylint: disable=W0613
+        with self._lock:
+            stored = self._jobs.get(job.id)
+            if stored is None:
+                return False
+            # The cancellation flag is owned by request_cancel
+            self._jobs[job.id] = replace(copy_job(job), cancel_requested=stored.cancel_requested)
+            return True
+
+    def renew_lease(self, job_id: str, lease_owner: Optional[str] = None):
+        """
+        Jobs do not outlive the process that runs them, so they need no lease.
+        """
+
+    def request_cancel(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.cancel_requested = True
+
+    def _prune(self):
+        threshold = time.time() - self.RETENTION_SECONDS
+        for job_id in [job.id for job in self._jobs.values() if not job.is_active and job.updated_at < threshold]:
+            del self._jobs[job_id]
+
+class SqliteJobBackend:
+    """
+    Keeps jobs in the sync_jobs table, so every worker process sharing the database
+    can claim queued jobs and report their progress.
+
+    A running job holds a lease that its worker renews. A job whose worker died is queued
+    again once its lease expires, instead of being reported as running forever.
+    """
+    def __init__(self, poll_interval: float, lease: float):
+        self.poll_interval = poll_interval
+        self.lease = lease
+
+    def insert(self, job: SyncJobSchema):
+        SyncJobRepository.insert(job)
+
+    def select_by_id(self, job_id: str) -> Optional[SyncJobSchema]:
+        return SyncJobRepository.select_by_id(job_id)
+
+    def select_active_by_name(self, name: str) -> Optional[SyncJobSchema]:
+        SyncJobRepository.requeue_expired(time.time(), self.lease)
+        return SyncJobRepository.select_active_by_name(name)
+
+    def claim_next(self, timeout: float, lease_owner: Optional[str] = None) -> Optional[SyncJobSchema]:
+        deadline = time.monotonic() + timeout
+        while True:
+            now = time.time()
+            SyncJobRepository.requeue_expired(now, self.lease)
+            job = SyncJobRepository.claim_next(now, now + self.lease, lease_owner)
+            if job is not None or time.monotonic() >= deadline:
+                return job
+            time.sleep(min(self.poll_interval, max(deadline - time.monotonic(), 0)))
+
+    def claim(self, job_id: str, lease_owner: Optional[str] = None) -> Optional[SyncJobSchema]:
+        now = time.time()
+        return SyncJobRepository.claim(job_id, now, now + self.lease, lease_owner)
+
+    def renew_lease(self, job_id: str, lease_owner: Optional[str] = None):
+        now = time.time()
+        SyncJobRepository.renew_lease(job_id, now, now + self.lease, lease_owner)
+
+    def update(self, job: SyncJobSchema, lease_owner: Optional[str] = None) -> bool:
+        return SyncJobRepository.update(job, lease_owner)
+
+    def request_cancel(self, job_id: str):
+        SyncJobRepository.request_cancel(job_id)
+
+class _QueueState:
+    def __init__(self, app: Flask):
+        if app.config.get('SYNC_QUEUE_BACKEND') == 'sqlite':
+            self.backend = SqliteJobBackend(
+                app.config.get('SYNC_QUEUE_POLL_INTERVAL'), app.config.get('SYNC_JOB_LEASE')
+            )
+        else:
+            self.backend = InProcessJobBackend()
+        self.lease = app.config.get('SYNC_JOB_LEASE')
+        self.lock = threading.Lock()
+        self.progress: Dict[str, SyncProgress] = {}
+        self.workers: List[threading.Thread] = []
+        self.stopping = threading.Event()
+
+class SyncJobQueue:
+    """
+    Local job queue that syncs repositories on a pool of worker threads.
+
+    Each worker runs a job on its own event loop inside an application context, so indexing
+    a large repository never runs inside an HTTP request. No external broker is required:
+    jobs are kept in memory or, with SYNC_QUEUE_BACKEND=sqlite, in the application database.
+    """
+    PROGRESS_FLUSH_INTERVAL = 0.5
+
+    def __init__(self, app: Optional[Flask] = None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask, start_workers: bool = True):
+        state = _QueueState(app)
+        app.extensions['sync_queue'] = state
+        for i in range((app.config.get('SYNC_WORKERS') or 0) if start_workers else 0):
+            worker = threading.Thread(target=self._work, args=(app, state), name=f'sync-worker-{i}', daemon=True)
+            state.workers.append(worker)
+            worker.start()
+
+    @staticmethod
+    def _state() -> _QueueState:
+        return current_app.extensions['sync_queue']
+
+    @property
+    def has_workers(self) -> bool:
+        return bool(self._state().workers)
+
+    def enqueue(self, owner: str, repository: str) -> SyncJobSchema:
+        """
+        Queue a sync of the repository, or return the job that is already queued or running for it.
+        """
+        state = self._state()
+        name = f'{owner}/{repository}'
+        with state.lock:
+            active_job = state.backend.select_active_by_name(name)
+            if active_job is not None:
+                return active_job
+            now = time.time()
+            job = SyncJobSchema(
+                id=uuid.uuid4().hex, name=name, owner=owner, repository=repository,
+                created_at=now, updated_at=now
+            )
+            state.backend.insert(job)
+        logger.info('Queued sync job %s for %s', job.id, name)
+        return job
+
+    def get(self, job_id: str) -> SyncJobSchema:
+        job = self._state().backend.select_by_id(job_id)
+        if job is None:
+            raise SyncJobNotFoundError(job_id)
+        return job
+
+    def get_active(self, name: str) -> Optional[SyncJobSchema]:
+        return self._state().backend.select_active_by_name(name)
+
+    def get_progress(self, job_id: str) -> Optional[SyncProgress]:
+        """
+        Return the live progress of a job running in this process, or None.
+        """
+        return self._state().progress.get(job_id)
+
+    def cancel(self, job_id: str) -> SyncJobSchema:
+        """
+        Cancel a queued job immediately, or ask a running job to stop at its next checkpoint.
+        """
+        state = self._state()
+        job = self.get(job_id)
+        if job.status == QUEUED:
+            job.status = CANCELLED
+            job.updated_at = time.time()
+            state.backend.update(job)
+        elif job.status == RUNNING:
+            state.backend.request_cancel(job_id)
+            progress = state.progress.get(job_id)
+            if progress is not None:
+                progress.cancel()
+        logger.info('Cancellation of sync job %s requested', job_id)
+        return self.get(job_id)
+
+    def run_next(self, timeout: float = 0) -> Optional[SyncJobSchema]:
+        """
+        Claim the next queued job and run it on the calling thread.
+
+        :param timeout: Seconds to wait for a job to be queued.
+        :return: The finished job, or None if no job was queued.
+        """
+        state = self._state()
+        lease_owner = uuid.uuid4().hex
+        job = state.backend.claim_next(timeout, lease_owner)
+        if job is None:
+            return None
+        return self._run(state, job, lease_owner)
+
+    def run_job(self, job_id: str) -> Optional[SyncJobSchema]:
+        """
+        Run a specific queued job on the calling thread.
+
+        :return: The finished job, or None if the job was not queued anymore.
+        """
+        state = self._state()
+        lease_owner = uuid.uuid4().hex
+        job = state.backend.claim(job_id, lease_owner)
+        if job is None:
+            return None
+        return self._run(state, job, lease_owner)
+
+    def _run(self, state: _QueueState, job: SyncJobSchema, lease_owner: str) -> SyncJobSchema:
+        from app.services.issue_service import get_issues
+
+        logger.info('Running sync job %s for %s', job.id, job.name)
+        flushed_at = [0.0]
+
+        def report(progress: SyncProgress):
+            job.counters = SyncCountersSchema(
+                fetched=progress.fetched, total=progress.total, embedded=progress.embedded,
+                persisted=progress.persisted
+            )
+            if time.monotonic() - flushed_at[0] >= self.PROGRESS_FLUSH_INTERVAL:
+                flushed_at[0] = time.monotonic()
+                job.updated_at = time.time()
+                if not state.backend.update(job, lease_owner):
+                    # The lease expired and the job was queued again, so its new run owns it now
+                    logger.warning('Sync job %s for %s lost its lease. Stopping.', job.id, job.name)
+                    progress.cancel()
+                    return
+                # Cancellation may have been requested from another process
+                stored = state.backend.select_by_id(job.id)
+                if stored is not None and stored.cancel_requested:
+                    progress.cancel()
+
+        progress = SyncProgress(job.name, on_change=report)
+        state.progress[job.id] = progress
+        # Embedding runs the model on the event loop without yielding, so the lease is renewed from a thread
+        app = current_app._get_current_object()  # pylint: disable=protected-access
+        stop_heartbeat = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._renew_lease, args=(app, state, job.id, lease_owner, stop_heartbeat),
+            name=f'sync-lease-{job.id}', daemon=True
+        )
+        heartbeat.start()
+
+        try:
+            asyncio.run(get_issues(job.owner, job.repository, progress=progress))
+            job.status = SUCCEEDED
+        except SyncCancelledError:
+            job.status = CANCELLED
+        except Exception as e:
+            logger.error('Sync job %s for %s failed: %s', job.id, job.name, e)
+            job.status = FAILED
+            job.error = str(e)
+        finally:
+            stop_heartbeat.set()
+            heartbeat.join()
+            state.progress.pop(job.id, None)
+
+        job.updated_at = time.time()
+        if not state.backend.update(job, lease_owner):
+            logger.warning('Sync job %s for %s lost its lease before it finished', job.id, job.name)
+        logger.info('Sync job %s for %s finished with status %s', job.id, job.name, job.status)
+        return job
+
+    @staticmethod
+    def _renew_lease(app: Flask, state: _QueueState, job_id: str, lease_owner: str, stop: threading.Event):
+        """
+        Renew the lease of a running job until stop is set, even while its sync waits on GitHub
+        or embeds issues without making progress.
+        """
+        while not stop.wait(state.lease / 3):
+            try:
+                with app.app_context():
+                    state.backend.renew_lease(job_id, lease_owner)
+            except Exception as e:
+                logger.error('Failed to renew the lease of sync job %s: %s', job_id, e)
+
+    def shutdown(self, app: Flask):
+        state: _QueueState = app.extensions['sync_queue']
+        state.stopping.set()
+        for worker in state.workers:
+            worker.join()
+
+    def _work(self, app: Flask, state: _QueueState):
+        while not state.stopping.is_set():
+            try:
+                with app.app_context():
+                    self.run_next(timeout=1)
+            except Exception as e:
+                logger.error('Sync worker error: %s', e)
+                time.sleep(1)
+
+sync_queue = SyncJobQueue()
@@ -0,0 +1,135 @@
+import asyncio
+import hashlib
+import hmac
+import logging
+import time
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from flask import current_app
+
+from app.repositories.issue_repository import IssueRepository
+from app.repositories.sync_state_repository import SyncStateRepository
+from app.schemas.webhook_result_schema import WebhookResultSchema, UPSERTED, REMOVED, IGNORED
+from app.services.github_client import fetch_comments_for_issue
+from app.services.issue_service import generate_issue_schema, persist_new_issues, remove_stored_issues
+from app.services.sync_coordinator import inter_process_lock
+from app.utils.exceptions import InvalidFieldError
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_EVENTS = ('issues', 'issue_comment')
+# Actions after which the issue no longer belongs to the repository
+REMOVAL_ACTIONS = ('deleted', 'transferred')
+
+def verify_signature(secret: str, body: bytes, signature: Optional[str]) -> bool:
+    """
+    Check the X-Hub-Signature-256 header of a webhook delivery.
+
+    :param secret: The secret configured on the GitHub webhook.
+    :param body: The raw request body.
+    :param signature: The header value in the format 'sha256=<hex digest>'.
+    """
+    if not secret or not signature or not signature.startswith('sha256='):
+        return False
+    expected = hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature[len('sha256='):])
+
+async def handle_webhook_event(event: str, payload: dict) -> WebhookResultSchema:
+    """
+    Apply an issues or issue_comment event to the index of its repository.
+
+    Only the affected issue is embedded again and stored, which also updates the embedding store,
+    the lexical index and the index version. Events of repositories that have never been synced are
+    ignored, since their first search syncs them in full.
+    """
+    action = payload.get('action') if isinstance(payload, dict) else None
+    if event not in WEBHOOK_EVENTS:
+        return WebhookResultSchema(event=event, action=action, status=IGNORED)
+
+    if not isinstance(payload, dict):
+        raise InvalidFieldError('payload', None)
+    name = (payload.get('repository') or {}).get('full_name')
+    issue = payload.get('issue') or {}
+    if not name:
+        raise InvalidFieldError('repository', None)
+    if issue.get('number') is None:
+        raise InvalidFieldError('issue', None)
+
+    result = WebhookResultSchema(event=event, action=action, status=IGNORED, name=name, number=issue['number'])
+    if SyncStateRepository.select_by_name(name) is None:
+        logger.info('Ignoring %s event of %s, which has not been synced yet', event, name)
+        return result
+
+    async with inter_process_lock(current_app.config.get('SYNC_LOCK_DIR'), name):
+        if event == 'issues' and action in REMOVAL_ACTIONS:
+            remove_stored_issues(name, [issue['number']])
+            result.status = REMOVED
+        elif await upsert_issue(name, issue, payload.get('comment') if event == 'issue_comment' else None, action):
+            result.status = UPSERTED
+    SyncStateRepository.record_webhook(name, time.time())
+    logger.info('Applied %s.%s of %s#%d: %s', event, action, name, issue['number'], result.status)
+    return result
+
+async def upsert_issue(name: str, issue: dict, comment: Optional[dict], action: Optional[str]) -> bool:
+    """
+    Embed the issue of an event again and store it.
+
+    The stored comments are reused when the event carries every change: an edit of the issue itself
+    or a new comment. Other comment events fetch the comments of this one issue from GitHub.
+
+    :return: False when the stored issue is already up to date.
+    """
+    owner, repository = name.split('/', 1)
+    stored_issue = IssueRepository.select_by_primary_key(name, issue['number'])
+    if stored_issue is not None and not is_newer(issue.get('updated_at'), stored_issue.updated):
+        # A redelivery, an event delivered out of order, or one already covered by a sync
+        return False
+
+    stored_comments = stored_issue.comments if stored_issue is not None and stored_issue.comments else None
+    if stored_comments is not None and comment is None:
+        comment_bodies = stored_comments[1:]
+    elif stored_comments is not None and action == 'created':
+        comment_bodies = stored_comments[1:] + [comment.get('body')]
+    else:
+        comment_bodies = await fetch_comment_bodies(owner, repository, issue['number'])
+
+    new_issue = await generate_issue_schema(
+        owner=owner,
+        repository=repository,
+        number=issue['number'],
+        title=issue.get('title') or '',
+        url=issue.get('html_url') or f'https://github.com/{name}/issues/{issue["number"]}',
+        state=issue.get('state') or '',
+        description=issue.get('body'),
+        updated=issue.get('updated_at'),
+        issue_comments=[{'body': body} for body in comment_bodies]
+    )
+    persist_new_issues(name, [new_issue], [new_issue.to_issue()] if stored_issue is not None else [])
+    return True
+
+def is_newer(updated_at: Optional[str], stored_updated_at: Optional[str]) -> bool:
+    """
+    Whether the update time of an event is later than the one of the stored issue.
+    Timestamps that cannot be parsed are only compared for equality.
+    """
+    incoming, stored = parse_timestamp(updated_at), parse_timestamp(stored_updated_at)
+    if incoming is None or stored is None:
+        return updated_at != stored_updated_at
+    return incoming > stored
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """
+    Parse an ISO 8601 timestamp of GitHub, e.g. 2024-05-01T09:00:00Z. Timestamps without a zone are UTC.
+    """
+    if not value:
+        return None
+    try:
+        timestamp = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return timestamp if timestamp.tzinfo is not None else timestamp.replace(tzinfo=timezone.utc)
+
+async def fetch_comment_bodies(owner: str, repository: str, number: int) -> List[str]:
+    comments = await fetch_comments_for_issue(asyncio.Semaphore(1), owner, repository, number)
+    return [comment['body'] for comment in comments]
@@ -0,0 +1,52 @@
+"""
+Export the stored index of a repository to a single file, or import it on another instance:
+
+    python -m app.snapshot export owner/repository snapshot.zip
+    python -m app.snapshot import snapshot.zip [--name owner/repository]
+
+Snapshots hold the issues, their comments and embeddings, so importing one does not embed anything
+again. A snapshot is refused unless it was built with the model and embedding dimension in use.
+"""
+# pylint: disable=C0415
+
+import argparse
+import sys
+from typing import List, Optional
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='python -m app.snapshot', description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    export_parser = commands.add_parser('export', help='Write the stored index of a repository to a file')
+    export_parser.add_argument('repository', help="Repository in the format 'owner/repository'")
+    export_parser.add_argument('path', help='Snapshot file to write')
+    import_parser = commands.add_parser('import', help='Replace the stored index of a repository with a snapshot')
+    import_parser.add_argument('path', help='Snapshot file to read')
+    import_parser.add_argument('--name', help="Repository to import into. Defaults to the one of the snapshot")
+    args = parser.parse_args(argv)
+    repository = args.repository if args.command == 'export' else args.name
+    if repository is not None and (repository.count('/') != 1 or not all(repository.split('/'))):
+        parser.error(f"repository must be in the format 'owner/repository': {repository}")
+    return args
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+
+    from app import create_app
+    from app.services.snapshot_service import export_snapshot, import_snapshot
+
+    app = create_app(start_sync_workers=False)
+    with app.app_context():
+        try:
+            if args.command == 'export':
+                manifest = export_snapshot(args.repository, args.path)
+                print(f'{manifest.name}: exported {manifest.issues} issues to {args.path}')
+            else:
+                manifest = import_snapshot(args.path, args.name)
+                print(f'{args.name or manifest.name}: imported {manifest.issues} issues from {args.path}')
+        except Exception as e:
+            print(f'{args.path}: {e}', file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,10 +1,12 @@
+const SNIPPET_LENGTH = 2000;
+
 document.querySelector('#search-form').addEventListener('submit', async (event) => {
     event.preventDefault();
 
     const formData = new FormData(event.target);
-    const data = Object.fromEntries(formData.entries());
+    const data = { ...Object.fromEntries(formData.entries()), snippet_length: SNIPPET_LENGTH };
 
-    const response = await fetch('/search', {
+    const response = await fetch('/search/stream', {
         method: 'POST',
         headers: {
             "Content-Type": "application/json",
@@ -13,9 +15,8 @@ document.querySelector('#search-form').addEventListener('submit', async (event)
     });
 
     if (response.ok) {
-        const result = await response.json();
         updateErrorMessage();
-        updateRelatedIssues(result);
+        await readSearchEvents(response, handleSearchEvent);
     } else {
         const errorData = await response.json();
         console.error(`Error: ${errorData.errorMessage || "Unable to fetch data."}`);
@@ -24,6 +25,59 @@ document.querySelector('#search-form').addEventListener('submit', async (event)
     }
 });
 
+const readSearchEvents = async (response, onEvent) => {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        for (const line of lines) {
+            if (line.trim()) onEvent(JSON.parse(line));
+        }
+    }
+    if (buffer.trim()) onEvent(JSON.parse(buffer));
+}
+
+let streamedIssues = new Map();
+
+const handleSearchEvent = (searchEvent) => {
+    switch (searchEvent.type) {
+        case 'results':
+        case 'done':
+            streamedIssues = new Map(searchEvent.issues.map((issue) => [issue.number, issue]));
+            updateRelatedIssues(searchEvent);
+            updateProgressContent(searchEvent.type == 'done' ? null : undefined);
+            break;
+        case 'hits':
+            for (const issue of searchEvent.issues) streamedIssues.set(issue.number, issue);
+            updateIssuesContent(
+                [...streamedIssues.values()].sort((a, b) => (b.threshold ?? -Infinity) - (a.threshold ?? -Infinity))
+            );
+            break;
+        case 'progress':
+            updateProgressContent(searchEvent.job);
+            break;
+        case 'error':
+            updateProgressContent(null);
+            updateErrorMessage(searchEvent.errorMessage);
+            break;
+    }
+}
+
+const updateProgressContent = (job) => {
+    if (job === undefined) return;
+    const progressContent = document.querySelector('#progress-content');
+    progressContent.classList.toggle('hidden', !job);
+    if (!job) return;
+    const { fetched, total, embedded } = job.counters;
+    const of = total ? ` of ${total}` : '';
+    progressContent.innerText = `Syncing ${job.name}: fetched ${fetched}, embedded ${embedded}${of}.`;
+}
+
 const updateRelatedIssues = (data) => {
     const { detail, issues } = data;
 
@@ -34,7 +88,7 @@ const updateRelatedIssues = (data) => {
 }
 
 const updateDetailContent = (detail) => {
-    const { total, message } = detail;
+    const { total, message, freshness } = detail;
 
     const color = (total == 0) ? 'green' : 'yellow';
     const icon = (total == 0)
@@ -48,20 +102,32 @@ const updateDetailContent = (detail) => {
             <svg class="w-6 h-6 mr-2 text-${color}-500" xmlns="http://www.w3.org/2000/svg" 
                 fill="none" viewBox="0 0 24 24" stroke="currentColor">${icon}</svg>
             <p>${message}</p>
+            ${createFreshnessContent(freshness)}
         </div>
     `;
 }
 
+const createFreshnessContent = (freshness) => {
+    if (!freshness) return '';
+    if (!freshness.synced_at) {
+        return freshness.refreshing
+            ? '<p class="ml-auto text-sm">This repository is being indexed in the background. Try again shortly.</p>'
+            : '';
+    }
+    const refreshing = freshness.refreshing ? ' Refreshing in the background.' : '';
+    return `<p class="ml-auto text-sm">Data as of ${freshness.synced_at} (UTC).${refreshing}</p>`;
+}
+
 const updateIssuesContent = (issues) => {
     const issuesContent = document.querySelector('#issues-content');
     issuesContent.innerHTML = '';
     for (const issue of issues) {
-        const { number, title, url, state, comments, threshold } = issue;
+        const { name, number, title, url, state, comments, threshold } = issue;
         const issueContent = document.createElement('li');
         issueContent.classList.add('border', 'border-gray-300', 'rounded', 'p-4');
         issueContent.appendChild(createIssueHeader(number, title, url, state));
         issueContent.appendChild(createThresholdContent(threshold));
-        issueContent.appendChild(createCommentContent(comments));
+        issueContent.appendChild(createCommentContent(comments, name, number));
 
         issuesContent.appendChild(issueContent);
     }
@@ -130,8 +196,9 @@ const createThresholdContent = (threshold) => {
     return template.content.firstElementChild;
 }
 
-const createCommentContent = (comments) => {
+const createCommentContent = (comments, name, number) => {
     const comment = comments ? convertMarkdownToHtml(comments[0]) : 'No description available.';
+    const truncated = Boolean(comments && comments[0] && comments[0].endsWith('…'));
     const template = document.createElement('template');
     template.innerHTML = `
         <div class="pt-4">
@@ -139,10 +206,21 @@ const createCommentContent = (comments) => {
             <div class="markdown-body mt-2 pl-2 max-h-60 overflow-y-auto border-l-4 border-gray-300" 
                 ${comment}
             </div>
+            ${truncated ? '<button type="button" class="mt-2 text-sm text-blue-600 hover:underline">Show full description</button>' : ''}
         </div>
     `;
 
-    return template.content.firstElementChild;
+    const commentContent = template.content.firstElementChild;
+    if (truncated) {
+        commentContent.querySelector('button').addEventListener('click', async (event) => {
+            const response = await fetch(`/issues/${name}/${number}/comments`);
+            if (!response.ok) return;
+            const { comments: fullComments } = await response.json();
+            commentContent.querySelector('.markdown-body').innerHTML = convertMarkdownToHtml(fullComments[0]);
+            event.target.remove();
+        });
+    }
+    return commentContent;
 }
 
 const updateErrorMessage = (message) => {
@@ -0,0 +1,58 @@
+import gzip
+import logging
+
+from flask import Flask, Response, current_app, request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_MIMETYPES = (
+    'application/json', 'application/javascript', 'text/css', 'text/html', 'text/javascript', 'text/plain'
+)
+
+def init_compression(app: Flask):
+    """
+    Compress responses with brotli or gzip, depending on what the client accepts.
+    Brotli is only offered when the optional brotli package is installed.
+    """
+    app.after_request(compress_response)
+
+def available_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+def is_compressible(response: Response) -> bool:
+    """
+    Whether a response may be compressed, regardless of what the client accepts.
+    """
+    if not current_app.config.get('COMPRESSION_ENABLED'):
+        return False
+    if not 200 <= response.status_code < 300:
+        return False
+    if response.direct_passthrough or response.is_streamed:
+        return False
+    if 'Content-Encoding' in response.headers:
+        return False
+    return response.mimetype in COMPRESSIBLE_MIMETYPES
+
+def compress_response(response: Response) -> Response:
+    if not is_compressible(response):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(available_encodings())
+    if encoding is None:
+        return response
+
+    data = response.get_data()
+    if len(data) < current_app.config.get('COMPRESSION_MIN_SIZE'):
+        return response
+
+    compressed = brotli.compress(data) if encoding == 'br' else gzip.compress(data, compresslevel=6)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    logger.debug('Compressed the response with %s: %d -> %d bytes', encoding, len(data), len(compressed))
+    return response
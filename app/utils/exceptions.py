@@ -31,3 +31,51 @@ class IssueFetchFailedError(Exception):
         self.failed_issue_ids = failed_issues
         message = f"The fetch operation failed for the following issues: {', '.join(map(str, failed_issues))}"
         super().__init__(message)
+
+class InvalidFieldError(Exception):
+    """Exception thrown when a field has an unsupported value"""
+    def __init__(self, field, value):
+        self.field = field
+        message = f'Invalid value for {field}: {value}'
+        super().__init__(message)
+
+class SyncJobNotFoundError(Exception):
+    """Exception thrown when the specified sync job does not exist"""
+    def __init__(self, job_id):
+        message = f'Sync job not found: {job_id}'
+        super().__init__(message)
+
+class SyncJobFailedError(Exception):
+    """Exception thrown when the sync job a search waits for fails"""
+    def __init__(self, name, error=None):
+        message = f'The sync of {name} failed: {error}' if error else f'The sync of {name} failed'
+        super().__init__(message)
+
+class SyncCancelledError(Exception):
+    """Exception thrown when a sync is cancelled before completion"""
+    def __init__(self, name):
+        message = f'The sync of {name} was cancelled'
+        super().__init__(message)
+
+class IssueNotFoundError(Exception):
+    """Exception thrown when an issue has not been indexed"""
+    def __init__(self, name, number):
+        message = f'Issue not found: {name}#{number}'
+        super().__init__(message)
+
+class DuplicateReportNotFoundError(Exception):
+    """Exception thrown when no duplicate report has been built for a repository"""
+    def __init__(self, name):
+        message = f'No duplicate report for {name}'
+        super().__init__(message)
+
+class OrganizationNotFoundError(Exception):
+    """Exception thrown when the specified organization cannot be found"""
+    def __init__(self, organization):
+        message = f'Organization not found: https://github.com/{organization}'
+        super().__init__(message)
+
+class SnapshotError(Exception):
+    """Exception thrown when an index snapshot cannot be imported"""
+    def __init__(self, message):
+        super().__init__(f'Invalid index snapshot: {message}')
@@ -0,0 +1,222 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+Labels = Tuple[str, ...]
+
+def format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{escaped}"')
+    return '{' + ','.join(pairs) + '}'
+
+def to_label_values(metric, labels: Dict[str, str]) -> Labels:
+    if set(labels) != set(metric.labelnames):
+        raise ValueError(f'{metric.name} takes the labels {metric.labelnames}, not {tuple(labels)}')
+    return tuple(str(labels[name]) for name in metric.labelnames)
+
+class Counter:
+    """
+    A value per label set that only goes up.
+    """
+    type = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = to_label_values(self, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(to_label_values(self, labels), 0.0)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        if not values and not self.labelnames:
+            values[()] = 0.0
+        return [
+            f'{self.name}{format_labels(self.labelnames, key)} {format_value(value)}'
+            for key, value in sorted(values.items())
+        ]
+
+class Gauge(Counter):
+    """
+    A value per label set that is set to the latest measurement.
+    """
+    type = 'gauge'
+
+    def set(self, value: float, **labels: str):
+        key = to_label_values(self, labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+class Histogram:
+    """
+    Observations per label set, counted in cumulative buckets.
+    """
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        # Per label set: the count of every bucket, the sum and the count of the observations
+        self._values: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = to_label_values(self, labels)
+        with self._lock:
+            counts, totals = self._values.setdefault(key, ([0] * len(self.buckets), [0.0, 0.0]))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            totals[0] += value
+            totals[1] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at, **labels)
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            values = self._values.get(to_label_values(self, labels))
+            return int(values[1][1]) if values else 0
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = {key: (list(counts), list(totals)) for key, (counts, totals) in self._values.items()}
+        lines = []
+        for key, (counts, (total, count)) in sorted(values.items()):
+            for bound, bucket_count in zip(self.buckets, counts):
+                labels = format_labels(self.labelnames + ('le',), key + (format_value(bound),))
+                lines.append(f'{self.name}_bucket{labels} {format_value(bucket_count)}')
+            labels = format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {format_value(count)}')
+        return lines
+
+class MetricsRegistry:
+    """
+    In-process metrics rendered in the Prometheus text exposition format.
+    Each worker process keeps its own values, so every process has to be scraped.
+    """
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, buckets: Sequence[float], labelnames: Sequence[str] = ()
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, buckets, labelnames))
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def reset(self):
+        for metric in self._metrics:
+            metric.reset()
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+metrics = MetricsRegistry()
+
+github_requests = metrics.counter(
+    'github_requests_total', 'GitHub API responses by status code.', ('status',)
+)
+github_rate_limit_remaining = metrics.gauge(
+    'github_rate_limit_remaining', 'Requests left in the current GitHub rate-limit window, as of the latest response.'
+)
+issues_embedded = metrics.counter('issues_embedded_total', 'Issues embedded by the model.')
+embedding_seconds = metrics.counter('embedding_seconds_total', 'Seconds spent embedding issues.')
+issues_embedded_per_second = metrics.gauge(
+    'issues_embedded_per_second', 'Issues embedded per second by the latest model call.'
+)
+embedding_batch_size = metrics.histogram(
+    'embedding_batch_size', 'Issues embedded per model call.', (1, 8, 32, 64, 128, 256, 512, 1024)
+)
+query_batch_size = metrics.histogram(
+    'query_batch_size', 'Search queries encoded per model call.', (1, 2, 4, 8, 16, 32, 64)
+)
+cache_requests = metrics.counter(
+    'cache_requests_total', 'Cache lookups by cache and result (hit or miss).', ('cache', 'result')
+)
+cache_hit_ratio = metrics.gauge('cache_hit_ratio', 'Share of cache lookups that were hits.', ('cache',))
+db_rows_written = metrics.counter('db_rows_written_total', 'Rows written to the database by table.', ('table',))
+search_seconds = metrics.histogram(
+    'search_seconds',
+    'Seconds spent handling a search, from the sync of the repository to the response, by its number of issues.',
+    (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0), ('repository_size',)
+)
+
+REPOSITORY_SIZE_BUCKETS = ((1000, '<1k'), (10000, '1k-10k'), (100000, '10k-100k'))
+
+def to_repository_size(size: int) -> str:
+    for bound, label in REPOSITORY_SIZE_BUCKETS:
+        if size < bound:
+            return label
+    return '>=100k'
+
+def record_cache(cache: str, hits: int = 0, misses: int = 0):
+    """
+    Count cache lookups and update the hit ratio of the cache.
+
+    :param cache: issues, corpus, embeddings, queries or results.
+    """
+    if hits:
+        cache_requests.inc(hits, cache=cache, result='hit')
+    if misses:
+        cache_requests.inc(misses, cache=cache, result='miss')
+    total_hits = cache_requests.value(cache=cache, result='hit')
+    total = total_hits + cache_requests.value(cache=cache, result='miss')
+    if total:
+        cache_hit_ratio.set(total_hits / total, cache=cache)
+
+def record_embedding(count: int, seconds: float):
+    issues_embedded.inc(count)
+    embedding_seconds.inc(seconds)
+    embedding_batch_size.observe(count)
+    if seconds > 0:
+        issues_embedded_per_second.set(count / seconds)
@@ -0,0 +1,34 @@
+import asyncio
+from typing import Callable, TypeVar
+
+from flask import current_app, g, has_app_context
+
+from app.utils.profiling import is_profiling
+from app.utils.stage_timing import get_stage_timings
+
+T = TypeVar('T')
+
+async def run_off_loop(func: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Run blocking work, e.g. model inference, database queries or ranking, in a thread of the default executor,
+    so that the event loop keeps serving the coroutines of other requests in the meantime.
+
+    The work runs in an app context of its own, and so with a database session of its own, since a session
+    must not be used by two threads at once. The stage timings of the current request are carried over.
+    Profiled requests run the work inline, so that the profile includes it.
+    """
+    if is_profiling():
+        return func(*args, **kwargs)
+    if not has_app_context():
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+    app = current_app._get_current_object()  # pylint: disable=protected-access
+    timings = get_stage_timings()
+
+    def run_in_app_context() -> T:
+        with app.app_context():
+            if timings is not None:
+                g.stage_timings = timings
+            return func(*args, **kwargs)
+
+    return await asyncio.to_thread(run_in_app_context)
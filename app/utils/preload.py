@@ -0,0 +1,41 @@
+# pylint: disable=C0415
+
+import gc
+import logging
+import os
+from typing import Optional
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+def preload_model():
+    """
+    Load the embedding model in the parent process, before the server forks its workers.
+
+    Forked workers inherit the imported issue_service module and with it the model, whose weights
+    stay in memory pages shared with the parent until a worker writes to them, which inference never does.
+    The objects that exist at this point are frozen out of the garbage collector, whose passes would
+    otherwise write to their headers and copy the pages they live on into every worker.
+
+    :return: The shared IssueSearcher.
+    """
+    from app.services.issue_service import issue_searcher
+    # The model is otherwise loaded by the first search of each worker
+    issue_searcher.model.eval()
+    gc.collect()
+    gc.freeze()
+    logger.info('Preloaded %s before forking workers', issue_searcher.model_name)
+    return issue_searcher
+
+def configure_worker_threads(workers: int, threads: Optional[int] = None) -> int:
+    """
+    Limit the threads torch uses for inference in a worker, so that workers do not oversubscribe the CPU.
+
+    :param workers: The number of worker processes.
+    :param threads: Threads per worker. By default, the CPU cores are divided between the workers.
+    :return: The threads per worker.
+    """
+    threads = threads or max((os.cpu_count() or 1) // max(workers, 1), 1)
+    torch.set_num_threads(threads)
+    return threads
@@ -0,0 +1,71 @@
+import cProfile
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from flask import Flask, Response, current_app, g, request
+
+logger = logging.getLogger(__name__)
+_profiling: ContextVar[bool] = ContextVar('profiling', default=False)
+
+def init_profiling(app: Flask):
+    app.after_request(add_profile_header)
+
+def get_profile_dir() -> str:
+    return os.path.abspath(current_app.config.get('PROFILE_DIR'))
+
+def wants_profile() -> bool:
+    """
+    Whether the request asks to be profiled with an X-Profile: true header or ?profile=true.
+    Requests are never profiled unless PROFILING_ENABLED is set.
+    """
+    if not current_app.config.get('PROFILING_ENABLED'):
+        return False
+    return 'true' in (request.headers.get('X-Profile', '').lower(), request.args.get('profile', '').lower())
+
+def is_profiling() -> bool:
+    """
+    Whether the running block is being profiled by profile_request.
+    Work otherwise handed to a background thread, e.g. encoding a query in the query batcher,
+    is then done on the profiled thread, so that the profile includes it.
+    """
+    return _profiling.get()
+
+@contextmanager
+def profile_request(name: str) -> Iterator[None]:
+    """
+    Profile a block with cProfile when the request asks for it, and store the pstats dump in PROFILE_DIR.
+
+    The profiler only sees the thread that enables it, so the block must run in the thread
+    of the event loop that serves the request, i.e. inside the async view.
+
+    :param name: Prefix of the dump file.
+    """
+    if not wants_profile():
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    token = _profiling.set(True)
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        _profiling.reset(token)
+        profile_dir = get_profile_dir()
+        os.makedirs(profile_dir, exist_ok=True)
+        file_name = f"{name}-{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}.prof"
+        profiler.dump_stats(os.path.join(profile_dir, file_name))
+        g.profile_file = file_name
+        logger.info('Stored the profile of %s %s as %s', request.method, request.path, file_name)
+
+def add_profile_header(response: Response) -> Response:
+    file_name = g.get('profile_file')
+    if file_name:
+        response.headers['X-Profile'] = file_name
+    return response
@@ -0,0 +1,75 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from flask import Flask, Response, current_app, g, has_app_context, request
+
+logger = logging.getLogger(__name__)
+
+def init_stage_timing(app: Flask):
+    """
+    Time the stages of every request and report them in a Server-Timing header and a log line.
+    Must be registered after init_compression, so that the timings are added before the response is compressed.
+    """
+    app.before_request(start_stage_timing)
+    app.after_request(report_stage_timing)
+
+def start_stage_timing():
+    if current_app.config.get('SERVER_TIMING_ENABLED'):
+        g.stage_timings = {}
+        g.request_started_at = time.perf_counter()
+
+def get_stage_timings() -> Optional[Dict[str, float]]:
+    """
+    :return: Seconds spent per stage by the current request, or None outside of a timed request.
+    """
+    return g.get('stage_timings') if has_app_context() else None
+
+@contextmanager
+def time_stage(stage: str) -> Iterator[None]:
+    """
+    Add the wall time of a block to a stage of the current request. The blocks of a stage are summed.
+    Nothing is recorded outside of a timed request, e.g. in a sync worker.
+    """
+    timings = get_stage_timings()
+    if timings is None:
+        yield
+        return
+
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - started_at
+
+def wants_timings() -> bool:
+    """
+    Whether the request asks for a timings block in the response, with ?timings=true or "timings": true.
+    """
+    if request.args.get('timings', '').lower() == 'true':
+        return True
+    form_data = request.get_json(silent=True) if request.is_json else None
+    return isinstance(form_data, dict) and form_data.get('timings') is True
+
+def report_stage_timing(response: Response) -> Response:
+    timings = get_stage_timings()
+    if timings is None:
+        return response
+
+    milliseconds = {stage: round(seconds * 1000, 3) for stage, seconds in timings.items()}
+    milliseconds['total'] = round((time.perf_counter() - g.request_started_at) * 1000, 3)
+    response.headers['Server-Timing'] = ', '.join(f'{stage};dur={duration}' for stage, duration in milliseconds.items())
+
+    if timings:
+        logger.info(
+            'timings method=%s path=%s status=%d %s', request.method, request.path, response.status_code,
+            ' '.join(f'{stage}_ms={duration}' for stage, duration in milliseconds.items())
+        )
+
+    if response.is_json and not response.is_streamed and wants_timings():
+        data = response.get_json()
+        if isinstance(data, dict):
+            data['timings'] = milliseconds
+            response.set_data(current_app.json.dumps(data))
+    return response
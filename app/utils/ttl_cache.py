@@ -0,0 +1,46 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+class TtlLruCache:
+    """
+    Thread-safe least-recently-used cache whose entries also expire after a time to live.
+
+    :param max_size: Maximum number of entries. 0 disables the cache.
+    :param ttl: Seconds an entry stays valid. 0 keeps entries until they are evicted.
+    """
+    def __init__(self, max_size: int, ttl: float = 0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[Hashable, tuple[float, Any]]' = OrderedDict()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at and expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl if self.ttl else 0, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
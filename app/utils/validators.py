@@ -1,9 +1,120 @@
+import re
+from typing import List, Optional
 from werkzeug.datastructures import ImmutableMultiDict
-from app.utils.exceptions import MissingFieldsError
+from app.schemas.search_options_schema import SearchOptionsSchema, DISPLAY_FIELDS
+from app.utils.exceptions import MissingFieldsError, InvalidFieldError
+
+REPOSITORY_NAME_PATTERN = re.compile(r'[\w.-]+/[\w.-]+')
+SEARCH_MODES = ('sync', 'stale')
+SEARCH_RANKINGS = ('semantic', 'hybrid')
 
 def validate_form_data(form_data: ImmutableMultiDict[str, str]):
+    validate_required_fields(form_data, ['owner', 'repository', 'title'])
+    validate_mode(form_data)
+
+def validate_batch_data(form_data: ImmutableMultiDict[str, str], max_queries: int):
+    validate_required_fields(form_data, ['owner', 'repository', 'queries'])
+    validate_mode(form_data)
+
+    queries = form_data.get('queries')
+    if not isinstance(queries, list):
+        raise InvalidFieldError('queries', 'a list of queries is required')
+    if len(queries) > max_queries:
+        raise InvalidFieldError('queries', f'{len(queries)} queries exceed the limit of {max_queries}')
+
+    missing_fields = [
+        f'queries[{i}].title' for i, query in enumerate(queries)
+        if not isinstance(query, dict) or not query.get('title')
+    ]
+    if missing_fields:
+        raise MissingFieldsError(missing_fields)
+
+def validate_multi_repository_data(form_data: ImmutableMultiDict[str, str], max_repositories: int):
+    validate_required_fields(form_data, ['title'])
+    validate_mode(form_data)
+
+    repositories = form_data.get('repositories')
+    if not repositories and not form_data.get('organization'):
+        raise MissingFieldsError(['repositories or organization'])
+    if repositories:
+        if not isinstance(repositories, list):
+            raise InvalidFieldError('repositories', 'a list of repositories is required')
+        for repository in repositories:
+            if not isinstance(repository, str) or not REPOSITORY_NAME_PATTERN.fullmatch(repository):
+                raise InvalidFieldError('repositories', repository)
+        validate_repository_count(len(set(repositories)), max_repositories)
+
+def validate_repository_count(count: int, max_repositories: int):
+    if count > max_repositories:
+        raise InvalidFieldError('repositories', f'{count} repositories exceed the limit of {max_repositories}')
+
+def validate_mode(form_data: ImmutableMultiDict[str, str]):
+    mode = form_data.get('mode')
+    if mode and mode not in SEARCH_MODES:
+        raise InvalidFieldError('mode', mode)
+
+    ranking = form_data.get('ranking')
+    if ranking and ranking not in SEARCH_RANKINGS:
+        raise InvalidFieldError('ranking', ranking)
+
+def parse_search_options(form_data: ImmutableMultiDict[str, str], snippet_length: int = 0) -> SearchOptionsSchema:
+    """
+    Read the optional response shaping fields of a search.
+
+    :param form_data: The search request.
+    :param snippet_length: The snippet length used when the request does not set one.
+    """
+    fields = form_data.get('fields')
+    if isinstance(fields, str):
+        fields = [field.strip() for field in fields.split(',') if field.strip()]
+    if fields is not None:
+        if not isinstance(fields, list) or not fields:
+            raise InvalidFieldError('fields', fields)
+        for field in fields:
+            if field not in DISPLAY_FIELDS:
+                raise InvalidFieldError('fields', field)
+
+    requested_snippet_length = parse_non_negative_int(form_data, 'snippet_length')
+    return SearchOptionsSchema(
+        limit=parse_non_negative_int(form_data, 'limit'),
+        offset=parse_non_negative_int(form_data, 'offset') or 0,
+        fields=fields,
+        snippet_length=snippet_length if requested_snippet_length is None else requested_snippet_length
+    )
+
+def parse_non_negative_int(form_data: ImmutableMultiDict[str, str], field: str) -> Optional[int]:
+    value = form_data.get(field)
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool):
+        raise InvalidFieldError(field, value)
+    try:
+        number = int(value)
+    except (TypeError, ValueError) as e:
+        raise InvalidFieldError(field, value) from e
+    if number < 0:
+        raise InvalidFieldError(field, value)
+    return number
+
+def parse_threshold(form_data: ImmutableMultiDict[str, str]) -> Optional[float]:
+    value = form_data.get('threshold')
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool):
+        raise InvalidFieldError('threshold', value)
+    try:
+        threshold = float(value)
+    except (TypeError, ValueError) as e:
+        raise InvalidFieldError('threshold', value) from e
+    if not 0 < threshold <= 1:
+        raise InvalidFieldError('threshold', value)
+    return threshold
+
+def validate_repository_data(form_data: ImmutableMultiDict[str, str]):
+    validate_required_fields(form_data, ['owner', 'repository'])
+
+def validate_required_fields(form_data: ImmutableMultiDict[str, str], required_fields: List[str]):
     missing_fields = []
-    required_fields = ['owner', 'repository', 'title']
 
     for field in required_fields:
         value = form_data.get(field)
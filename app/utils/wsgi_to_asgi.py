@@ -0,0 +1,51 @@
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+class ThreadPoolWsgiToAsgiInstance(WsgiToAsgiInstance):
+    # asgiref runs every request in one shared thread by default, which would serve a single request at a time.
+    # Here each request gets a thread of the default executor, while the async views of every request still run
+    # on the event loop of the ASGI server, since asgiref's async_to_sync schedules them onto that loop.
+    @sync_to_async(thread_sensitive=False)
+    def run_wsgi_app(self, body):
+        environ = self.build_environ(self.scope, body)
+        bytes_sent = 0
+        for output in self.wsgi_application(environ, self.start_response):
+            # The response headers are sent with the first chunk of the body
+            if not self.response_started:
+                self.response_started = True
+                self.sync_send(self.response_start)
+            # No more bytes are sent than a Content-Length header allows
+            if self.response_content_length is not None:
+                output = output[:self.response_content_length - bytes_sent]
+            self.sync_send({'type': 'http.response.body', 'body': output, 'more_body': True})
+            bytes_sent += len(output)
+            if bytes_sent == self.response_content_length:
+                break
+        if not self.response_started:
+            self.response_started = True
+            self.sync_send(self.response_start)
+        self.sync_send({'type': 'http.response.body'})
+
+class ThreadPoolWsgiToAsgi(WsgiToAsgi):
+    """
+    Serve a Flask app from an ASGI server such as uvicorn or hypercorn.
+
+    The server's event loop lives as long as the worker process, so the coroutines of every request share it
+    instead of each request starting an event loop of its own. The rest of the request, including sync views,
+    runs in a thread pool.
+    """
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.handle_lifespan(receive, send)
+            return
+        await ThreadPoolWsgiToAsgiInstance(self.wsgi_application)(scope, receive, send)
+
+    async def handle_lifespan(self, receive, send):
+        # The app is created before the server starts, so there is nothing to set up or tear down
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
@@ -0,0 +1,5 @@
+from app import create_app
+from app.utils.wsgi_to_asgi import ThreadPoolWsgiToAsgi
+
+app = create_app()
+application = ThreadPoolWsgiToAsgi(app)
@@ -0,0 +1,29 @@
+# pylint: disable=C0103,W0613
+
+"""
+Gunicorn settings that load the embedding model once in the master process and then fork the workers,
+which share the model's memory instead of loading a copy each. Gunicorn reads this file from the working directory:
+
+    gunicorn
+"""
+
+import os
+
+from app.utils.preload import preload_model, configure_worker_threads
+
+wsgi_app = 'asgi:application'
+worker_class = 'uvicorn.workers.UvicornWorker'
+bind = f"{os.getenv('HOST') or '127.0.0.1'}:{os.getenv('PORT') or 8000}"
+workers = int(os.getenv('WEB_CONCURRENCY') or 4)
+torch_threads = int(os.getenv('TORCH_THREADS') or 0)
+
+# The app itself is created in each worker, so that its sync workers, database connections and
+# event loop belong to that worker. Only the model is loaded before forking.
+preload_app = False
+
+def on_starting(server):
+    preload_model()
+
+def post_fork(server, worker):
+    threads = configure_worker_threads(workers, torch_threads)
+    server.log.info('Worker %s uses %s torch threads', worker.pid, threads)
@@ -0,0 +1,319 @@
+"""
+Benchmark the sync, embedding, storage and search stages on synthetic repositories:
+
+    python -m tests.benchmark --sizes 1000 10000 100000 --output benchmark.json
+    python -m tests.benchmark --sizes 1000 --baseline benchmark.json
+
+Every size runs against its own temporary SQLite database and embedding store:
+
+- fetch: fetch_issues and the comment fan-out of fetch_comments_for_issue against the mock GitHub server
+- embed: generate_serialized_embedding one issue at a time, and generate_serialized_embeddings in batches
+- repository: IssueRepository bulk inserts, full and metadata-only loads, and the embedding stream
+- search: find_related_issues latency percentiles over the embedding store
+
+The results are written as JSON, so runs on different commits can be compared with --baseline.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import random
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from flask import Flask
+
+from app import create_app, db
+from app.config import Config
+from app.models.issue_model import Issue
+from app.repositories.issue_repository import IssueRepository
+from app.services.github_client import fetch_issues, fetch_comments_for_issue
+from app.services.issue_service import issue_searcher, load_stored_corpus, get_embedding_view
+
+from tests.mock_github_server import MockGitHubConfig, WORDS, run_mock_github_server
+
+NAME = 'benchmark_owner/benchmark_repo'
+INSERT_BATCH_SIZE = 1000
+
+@dataclass
+class BenchmarkOptions:
+    """
+    :param sizes: Issues of every synthetic repository.
+    :param comments: Comments of every issue served by the mock server.
+    :param comment_sample: Issues whose comments are fetched. Every issue is fetched when 0.
+    :param embed_sample: Issues embedded by the model.
+    :param queries: Searches timed per repository.
+    :param concurrency: Comment requests in flight.
+    :param seed: Seed of the generated text and embeddings.
+    """
+    sizes: List[int] = field(default_factory=lambda: [1000, 10000, 100000])
+    comments: int = 3
+    comment_sample: int = 1000
+    embed_sample: int = 256
+    queries: int = 50
+    concurrency: int = 10
+    seed: int = 0
+
+def create_benchmark_app(directory: str, api_url: str) -> Flask:
+    class BenchmarkConfig(Config):
+        # Keeps the runs out of log/app.log
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{directory}/benchmark.db'
+        EMBEDDING_STORE_DIR = f'{directory}/embeddings'
+        SYNC_LOCK_DIR = ''
+        SYNC_WORKERS = 0
+        GITHUB_API_URL = api_url
+        # Any token is accepted by the mock server and keeps the client from warning on every request
+        GITHUB_ACCESS_TOKEN = 'benchmark'
+        LOG_LEVEL = logging.WARNING
+
+    return create_app(BenchmarkConfig)
+
+@contextmanager
+def timer() -> Iterator[Callable[[], float]]:
+    """
+    Measure the wall time of a block. The yielded function returns the seconds elapsed so far,
+    or the duration of the block once it has exited.
+    """
+    started_at = time.perf_counter()
+    ended_at = None
+    yield lambda: (ended_at or time.perf_counter()) - started_at
+    ended_at = time.perf_counter()
+
+def per_second(count: int, seconds: float) -> float:
+    return round(count / max(seconds, 1e-9), 1)
+
+def percentiles(seconds: List[float]) -> Dict[str, float]:
+    milliseconds = np.asarray(seconds) * 1000
+    return {
+        'p50_ms': round(float(np.percentile(milliseconds, 50)), 3),
+        'p99_ms': round(float(np.percentile(milliseconds, 99)), 3),
+        'mean_ms': round(float(milliseconds.mean()), 3),
+        'max_ms': round(float(milliseconds.max()), 3)
+    }
+
+def generate_sentence(rng: random.Random) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(4, 12)))
+
+def generate_documents(count: int, seed: int) -> List[Tuple[str, List[str]]]:
+    rng = random.Random(seed)
+    return [(generate_sentence(rng), [generate_sentence(rng) for _ in range(3)]) for _ in range(count)]
+
+def generate_issue_rows(size: int, dimension: int, seed: int) -> Iterator[List[Issue]]:
+    """
+    Generate the stored rows of a synthetic repository batch by batch, so that large sizes are never held in memory.
+    """
+    rng = random.Random(seed)
+    vectors = np.random.default_rng(seed)
+    for start in range(1, size + 1, INSERT_BATCH_SIZE):
+        numbers = range(start, min(start + INSERT_BATCH_SIZE, size + 1))
+        embeddings = vectors.standard_normal((len(numbers), dimension), dtype=np.float32)
+        yield [
+            Issue(
+                name=NAME,
+                number=number,
+                title=generate_sentence(rng),
+                url=f'https://github.com/{NAME}/issues/{number}',
+                state='open',
+                comments=[generate_sentence(rng) for _ in range(3)],
+                terms={},
+                embedding=embedding.tobytes(),
+                shape=str(dimension),
+                updated='2024-01-01T00:00:00Z'
+            ) for number, embedding in zip(numbers, embeddings)
+        ]
+
+async def benchmark_fetch(options: BenchmarkOptions) -> dict:
+    owner, repository = NAME.split('/')
+    with timer() as list_seconds:
+        latest_issues = await fetch_issues(owner, repository)
+
+    sample = latest_issues[:options.comment_sample] if options.comment_sample else latest_issues
+    semaphore = asyncio.Semaphore(options.concurrency)
+    with timer() as comment_seconds:
+        await asyncio.gather(*(
+            fetch_comments_for_issue(semaphore, owner, repository, issue['number']) for issue in sample
+        ))
+    return {
+        'issues': len(latest_issues),
+        'list_seconds': round(list_seconds(), 4),
+        'listed_per_second': per_second(len(latest_issues), list_seconds()),
+        'comment_issues': len(sample),
+        'comment_seconds': round(comment_seconds(), 4),
+        'comment_issues_per_second': per_second(len(sample), comment_seconds())
+    }
+
+async def benchmark_embed(options: BenchmarkOptions) -> dict:
+    documents = generate_documents(options.embed_sample, options.seed)
+    with timer() as single_seconds:
+        for title, comments in documents:
+            await issue_searcher.generate_serialized_embedding(title, comments)
+    with timer() as batch_seconds:
+        issue_searcher.generate_serialized_embeddings(documents)
+    return {
+        'issues': len(documents),
+        'single_seconds': round(single_seconds(), 4),
+        'single_issues_per_second': per_second(len(documents), single_seconds()),
+        'batch_seconds': round(batch_seconds(), 4),
+        'batch_issues_per_second': per_second(len(documents), batch_seconds())
+    }
+
+def benchmark_repository(size: int, seed: int) -> dict:
+    dimension = issue_searcher.embedding_dimension
+    insert_seconds = 0.0
+    for rows in generate_issue_rows(size, dimension, seed):
+        with timer() as batch_seconds:
+            IssueRepository.bulk_insert(rows)
+        insert_seconds += batch_seconds()
+
+    with timer() as select_seconds:
+        IssueRepository.select_by_name(NAME)
+    db.session.expire_all()
+    with timer() as metadata_seconds:
+        IssueRepository.select_metadata_by_name(NAME)
+    with timer() as embedding_seconds:
+        streamed = sum(1 for _ in IssueRepository.iter_embeddings_by_name(NAME))
+    return {
+        'issues': streamed,
+        'insert_seconds': round(insert_seconds, 4),
+        'inserted_per_second': per_second(size, insert_seconds),
+        'select_seconds': round(select_seconds(), 4),
+        'select_metadata_seconds': round(metadata_seconds(), 4),
+        'stream_embeddings_seconds': round(embedding_seconds(), 4)
+    }
+
+async def benchmark_search(options: BenchmarkOptions) -> dict:
+    with timer() as load_seconds:
+        issues = load_stored_corpus(NAME)
+    with timer() as store_seconds:
+        embeddings = get_embedding_view(NAME, issues)
+
+    latencies = []
+    for title, comments in generate_documents(options.queries, options.seed + 1):
+        with timer() as search_seconds:
+            await issue_searcher.find_related_issues(issues, title, comments[0], embeddings=embeddings)
+        latencies.append(search_seconds())
+    return {
+        'queries': len(latencies),
+        'load_issues_seconds': round(load_seconds(), 4),
+        'build_store_seconds': round(store_seconds(), 4),
+        **percentiles(latencies)
+    }
+
+def benchmark_size(size: int, options: BenchmarkOptions) -> dict:
+    mock_config = MockGitHubConfig(issues=size, comments=options.comments, repositories=1, seed=options.seed)
+    with tempfile.TemporaryDirectory() as directory, run_mock_github_server(mock_config) as server:
+        app = create_benchmark_app(directory, server.config['MOCK_GITHUB_URL'])
+        with app.app_context():
+            try:
+                result = {'fetch': asyncio.run(benchmark_fetch(options))}
+                result['repository'] = benchmark_repository(size, options.seed)
+                result['search'] = asyncio.run(benchmark_search(options))
+            finally:
+                db.session.remove()
+                db.engine.dispose()
+        result['fetch']['requests'] = server.config['MOCK_GITHUB_STATS'].requests
+    return result
+
+def run_benchmark(options: BenchmarkOptions, report: Optional[Callable[[str], None]] = None) -> dict:
+    """
+    Run every stage for every size.
+
+    :param report: Receives a line after every finished size.
+    """
+    report = report or (lambda line: None)
+    results = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'model': issue_searcher.model_name,
+        'options': asdict(options)
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        with create_benchmark_app(directory, '').app_context():
+            results['embed'] = asyncio.run(benchmark_embed(options))
+            db.engine.dispose()
+    report(f"embed: {results['embed']['batch_issues_per_second']} issues/s batched")
+
+    results['sizes'] = {}
+    for size in options.sizes:
+        results['sizes'][str(size)] = result = benchmark_size(size, options)
+        report(
+            f"{size} issues: listed in {result['fetch']['list_seconds']}s, "
+            f"inserted in {result['repository']['insert_seconds']}s, "
+            f"search p50 {result['search']['p50_ms']}ms / p99 {result['search']['p99_ms']}ms"
+        )
+    return results
+
+def flatten(results: dict, prefix: str = '') -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f'{prefix}{key}.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f'{prefix}{key}'] = value
+    return flat
+
+def compare(results: dict, baseline: dict) -> List[str]:
+    """
+    Compare the durations and latencies of two runs.
+
+    :return: One line per measurement found in both runs, with the ratio of the new to the baseline value.
+    """
+    new = flatten({'embed': results.get('embed', {}), 'sizes': results.get('sizes', {})})
+    old = flatten({'embed': baseline.get('embed', {}), 'sizes': baseline.get('sizes', {})})
+    lines = []
+    for key in sorted(new.keys() & old.keys()):
+        if not key.endswith(('_seconds', '_ms')) or not old[key]:
+            continue
+        ratio = new[key] / old[key]
+        lines.append(f'{key}: {old[key]} -> {new[key]} ({ratio:.2f}x)')
+    return lines
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    defaults = BenchmarkOptions()
+    parser = argparse.ArgumentParser(prog='python -m tests.benchmark', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=defaults.sizes, help='Issues per repository')
+    parser.add_argument('--comments', type=int, default=defaults.comments, help='Comments of every issue')
+    parser.add_argument(
+        '--comment-sample', type=int, default=defaults.comment_sample,
+        help='Issues whose comments are fetched, 0 for all'
+    )
+    parser.add_argument('--embed-sample', type=int, default=defaults.embed_sample, help='Issues embedded by the model')
+    parser.add_argument('--queries', type=int, default=defaults.queries, help='Searches timed per repository')
+    parser.add_argument('--concurrency', type=int, default=defaults.concurrency, help='Comment requests in flight')
+    parser.add_argument('--seed', type=int, default=defaults.seed)
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    parser.add_argument('--baseline', help='Compare with the JSON results of an earlier run')
+    args = parser.parse_args(argv)
+    if any(size < 1 for size in args.sizes):
+        parser.error('sizes must be positive')
+    if args.embed_sample < 1 or args.queries < 1:
+        parser.error('embed-sample and queries must be positive')
+    return args
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = vars(parse_args(argv))
+    output, baseline = args.pop('output'), args.pop('baseline')
+    results = run_benchmark(BenchmarkOptions(**args), report=lambda line: print(line, file=sys.stderr))
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+    if baseline:
+        with open(baseline, encoding='utf-8') as f:
+            for line in compare(results, json.load(f)):
+                print(line, file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,79 @@
+# pylint: disable=W0621
+
+import json
+from unittest.mock import MagicMock, PropertyMock, patch
+
+import numpy as np
+import pytest
+
+from app.services.issue_searcher import IssueSearcher
+from tests.benchmark import BenchmarkOptions, compare, main, parse_args, percentiles, run_benchmark
+
+DIMENSION = 8
+
+@pytest.fixture
+def model():
+    def encode(sentences, **_kwargs):
+        rng = np.random.default_rng(len(sentences))
+        if isinstance(sentences, str):
+            return rng.random(DIMENSION, dtype=np.float32)
+        return rng.random((len(sentences), DIMENSION), dtype=np.float32)
+
+    # The benchmark measures the app around the model, so no model weights are loaded
+    mock_model = MagicMock()
+    mock_model.encode.side_effect = encode
+    mock_model.get_sentence_embedding_dimension.return_value = DIMENSION
+    with patch.object(IssueSearcher, 'model', new_callable=PropertyMock, return_value=mock_model):
+        yield mock_model
+
+@pytest.mark.usefixtures('model')
+class TestRunBenchmark:
+    def test_success(self):
+        results = run_benchmark(BenchmarkOptions(sizes=[20], comment_sample=5, embed_sample=4, queries=3))
+
+        assert {'created_at', 'python', 'numpy', 'model', 'options', 'embed', 'sizes'} <= set(results)
+        assert results['embed']['issues'] == 4
+        assert list(results['sizes']) == ['20']
+        result = results['sizes']['20']
+        assert result['fetch']['issues'] == 20
+        assert result['fetch']['comment_issues'] == 5
+        assert result['fetch']['requests'] == 2 + 5 * 2
+        assert result['repository']['issues'] == 20
+        assert result['search']['queries'] == 3
+        assert {'p50_ms', 'p99_ms'} <= set(result['search'])
+
+    def test_main_writes_json(self, tmp_path):
+        output = tmp_path / 'benchmark.json'
+
+        assert main([
+            '--sizes', '5', '--comment-sample', '1', '--embed-sample', '1', '--queries', '1', '--output', str(output)
+        ]) == 0
+
+        results = json.loads(output.read_text(encoding='utf-8'))
+        assert results['options']['sizes'] == [5]
+        assert list(results['sizes']) == ['5']
+
+class TestPercentiles:
+    def test_success(self):
+        result = percentiles([0.001] * 99 + [0.1])
+
+        assert result['p50_ms'] == pytest.approx(1.0)
+        assert result['max_ms'] == pytest.approx(100.0)
+
+class TestCompare:
+    def test_success(self):
+        baseline = {'sizes': {'10': {'search': {'p50_ms': 2.0, 'queries': 5}}}}
+        results = {'sizes': {'10': {'search': {'p50_ms': 1.0, 'queries': 5}}, '20': {'search': {'p50_ms': 3.0}}}}
+
+        assert compare(results, baseline) == ['sizes.10.search.p50_ms: 2.0 -> 1.0 (0.50x)']
+
+class TestParseArgs:
+    def test_defaults(self):
+        args = parse_args([])
+
+        assert args.sizes == [1000, 10000, 100000]
+        assert args.output is None
+
+    def test_invalid_size(self):
+        with pytest.raises(SystemExit):
+            parse_args(['--sizes', '0'])
@@ -0,0 +1,46 @@
+from unittest.mock import patch
+
+import pytest
+
+from app import create_app
+from app.duplicates import parse_args, main
+from app.schemas.duplicate_report_schema import DuplicateReportSchema, DuplicateClusterSchema, DuplicateIssueSchema
+
+from tests.testing_config import TestingConfig
+
+class TestParseArgs:
+    def test_success(self):
+        args = parse_args(['test_owner/test_repo', '--threshold', '0.8', '--block-size', '512', '--sync'])
+
+        assert args.repository == 'test_owner/test_repo'
+        assert args.threshold == 0.8
+        assert args.block_size == 512
+        assert args.sync
+
+    @pytest.mark.parametrize('argv', [['test_repo'], ['test_owner/test_repo', '--threshold', '1.5']])
+    def test_invalid(self, argv):
+        with pytest.raises(SystemExit):
+            parse_args(argv)
+
+class TestMain:
+    @patch('app.services.duplicate_service.build_duplicate_report')
+    @patch('app.create_app')
+    def test_writes_report(self, mock_create_app, mock_build_duplicate_report, tmp_path, capsys):
+        mock_create_app.side_effect = lambda **kwargs: create_app(TestingConfig, **kwargs)
+        mock_build_duplicate_report.return_value = DuplicateReportSchema(
+            name='test_owner/test_repo', threshold=0.9, total_issues=2, index_version=1, created_at=1.0,
+            clusters=[DuplicateClusterSchema(
+                issues=[
+                    DuplicateIssueSchema(number=1, title='Issue 1', url='url1', state='open'),
+                    DuplicateIssueSchema(number=2, title='Issue 2', url='url2', state='open')
+                ],
+                similarity=0.95
+            )]
+        )
+        output = tmp_path / 'report.json'
+
+        assert main(['test_owner/test_repo', '--output', str(output)]) == 0
+        mock_create_app.assert_called_once_with(start_sync_workers=False)
+
+        assert '[0.950] #1, #2: Issue 1' in capsys.readouterr().out
+        assert '"similarity": 0.95' in output.read_text(encoding='utf-8')
@@ -0,0 +1,72 @@
+import io
+from unittest.mock import patch
+
+import pytest
+
+from app import create_app
+from app.index import parse_args, main, ProgressDisplay
+from app.services.sync_progress import SyncProgress
+from app.utils.exceptions import RateLimitExceededError
+
+from tests.testing_config import TestingConfig
+
+class TestParseArgs:
+    def test_success(self):
+        args = parse_args(['test_owner/repo1', 'test_owner/repo2', '--batch-size', '128', '--concurrency', '4'])
+
+        assert args.repositories == ['test_owner/repo1', 'test_owner/repo2']
+        assert args.batch_size == 128
+        assert args.concurrency == 4
+        assert not args.quiet
+
+    @pytest.mark.parametrize('argv', [['test_repo'], ['test_owner/test_repo', '--batch-size', '0'], []])
+    def test_invalid(self, argv):
+        with pytest.raises(SystemExit):
+            parse_args(argv)
+
+class TestProgressDisplay:
+    def test_draws_status_line(self):
+        stream = io.StringIO()
+        display = ProgressDisplay(stream)
+        progress = SyncProgress('test_owner/test_repo', on_change=display)
+
+        progress.set_fetched(10, 4)
+        display.finish()
+
+        output = stream.getvalue()
+        assert output.startswith('\rtest_owner/test_repo: listed 10, embedded 0/4, stored 0')
+        assert output.endswith('\n')
+
+    def test_disabled(self):
+        stream = io.StringIO()
+        display = ProgressDisplay(stream, enabled=False)
+
+        display(SyncProgress('test_owner/test_repo'))
+        display.finish()
+
+        assert stream.getvalue() == ''
+
+class TestMain:
+    @patch('app.services.bulk_indexer.index_repository')
+    @patch('app.create_app')
+    def test_indexes_repositories(self, mock_create_app, mock_index_repository, capsys):
+        mock_create_app.side_effect = lambda **kwargs: create_app(TestingConfig, **kwargs)
+
+        async def index_repository_side_effect(_owner, repository, **kwargs):
+            progress = kwargs['progress']
+            if repository == 'repo2':
+                raise RateLimitExceededError(0)
+            progress.set_fetched(10, 4)
+            progress.add_persisted(4)
+            return progress
+
+        mock_index_repository.side_effect = index_repository_side_effect
+
+        assert main(['test_owner/repo1', 'test_owner/repo2', '--batch-size', '2', '--quiet']) == 1
+        mock_create_app.assert_called_once_with(start_sync_workers=False)
+
+        captured = capsys.readouterr()
+        assert 'test_owner/repo1: 4 issues embedded' in captured.out
+        assert '6 already up to date' in captured.out
+        assert 'test_owner/repo2: failed after storing 0 issues: Rate limit exceeded' in captured.err
+        assert mock_index_repository.call_args_list[0].kwargs['batch_size'] == 2
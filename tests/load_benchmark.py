@@ -0,0 +1,123 @@
+"""
+Measure the throughput and latency of /search under concurrent load, e.g. to compare run.py with the ASGI mode:
+
+    python -m tests.mock_github_server --issues 2000 --port 8001
+    GITHUB_API_URL=http://127.0.0.1:8001 python run.py
+    GITHUB_API_URL=http://127.0.0.1:8001 uvicorn asgi:application --port 8000
+    python -m tests.load_benchmark --url http://127.0.0.1:5000 --url http://127.0.0.1:8000 --output load.json
+
+Every server is warmed up with one search, which syncs the repository, and then receives --requests searches
+with distinct titles, --concurrency at a time, so that the result cache does not answer them.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from tests.mock_github_server import WORDS
+
+def generate_payloads(count: int, owner: str, repository: str, mode: Optional[str], seed: int = 0) -> List[dict]:
+    rng = random.Random(seed)
+    payloads = []
+    for _ in range(count):
+        payload = {
+            'owner': owner,
+            'repository': repository,
+            'title': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 8))),
+            'limit': 10
+        }
+        if mode:
+            payload['mode'] = mode
+        payloads.append(payload)
+    return payloads
+
+def summarize(statuses: Counter, latencies: List[float], seconds: float) -> Dict:
+    milliseconds = np.asarray(latencies) * 1000
+    return {
+        'requests': len(latencies),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'seconds': round(seconds, 3),
+        'requests_per_second': round(len(latencies) / max(seconds, 1e-9), 1),
+        'p50_ms': round(float(np.percentile(milliseconds, 50)), 1),
+        'p99_ms': round(float(np.percentile(milliseconds, 99)), 1),
+        'max_ms': round(float(milliseconds.max()), 1)
+    }
+
+async def run_load(
+    url: str, payloads: List[dict], concurrency: int, transport: Optional[httpx.AsyncBaseTransport] = None
+) -> Dict:
+    """
+    POST every payload to /search with at most concurrency requests in flight.
+    Failed connections are counted under the status 0.
+    """
+    queue = list(reversed(payloads))
+    statuses = Counter()
+    latencies = []
+
+    async def client_loop(client: httpx.AsyncClient):
+        while queue:
+            payload = queue.pop()
+            started_at = time.perf_counter()
+            try:
+                res = await client.post('/search', json=payload)
+                statuses[res.status_code] += 1
+            except httpx.HTTPError:
+                statuses[0] += 1
+            latencies.append(time.perf_counter() - started_at)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=300, limits=limits, transport=transport) as client:
+        started_at = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        seconds = time.perf_counter() - started_at
+    return summarize(statuses, latencies, seconds)
+
+async def benchmark_servers(args: argparse.Namespace) -> Dict:
+    results = {}
+    for url in args.url:
+        warmup = generate_payloads(1, args.owner, args.repository, args.mode, seed=-1)
+        await run_load(url, warmup, 1)
+        payloads = generate_payloads(args.requests, args.owner, args.repository, args.mode, args.seed)
+        results[url] = await run_load(url, payloads, args.concurrency)
+        print(
+            f"{url}: {results[url]['requests_per_second']} requests/s, "
+            f"p50 {results[url]['p50_ms']}ms, p99 {results[url]['p99_ms']}ms, statuses {results[url]['statuses']}",
+            file=sys.stderr
+        )
+    return results
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='python -m tests.load_benchmark', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', action='append', required=True, help='Base URL of a server, may be repeated')
+    parser.add_argument('--owner', default='test_owner')
+    parser.add_argument('--repository', default='test_repo')
+    parser.add_argument('--mode', choices=['sync', 'stale'], help='Search mode of the requests')
+    parser.add_argument('--requests', type=int, default=200, help='Searches per server')
+    parser.add_argument('--concurrency', type=int, default=16, help='Searches in flight')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    args = parser.parse_args(argv)
+    if args.requests < 1 or args.concurrency < 1:
+        parser.error('requests and concurrency must be positive')
+    return args
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    results = asyncio.run(benchmark_servers(args))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+    return 0 if all(set(result['statuses']) == {'200'} for result in results.values()) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,42 @@
+import httpx
+import pytest
+
+from tests.load_benchmark import generate_payloads, parse_args, run_load
+
+class TestRunLoad:
+    @pytest.mark.asyncio
+    async def test_success(self):
+        titles = []
+
+        def handler(request):
+            titles.append(request.read())
+            return httpx.Response(200 if len(titles) < 5 else 500, json={'issues': []})
+
+        result = await run_load(
+            'http://test', generate_payloads(6, 'test_owner', 'test_repo', 'stale'), 3,
+            transport=httpx.MockTransport(handler)
+        )
+
+        assert result['requests'] == 6
+        assert result['statuses'] == {'200': 4, '500': 2}
+        assert result['p50_ms'] <= result['p99_ms']
+        assert len(set(titles)) == 6
+
+class TestGeneratePayloads:
+    def test_success(self):
+        payloads = generate_payloads(3, 'test_owner', 'test_repo', None)
+
+        assert payloads == generate_payloads(3, 'test_owner', 'test_repo', None)
+        assert {payload['owner'] for payload in payloads} == {'test_owner'}
+        assert 'mode' not in payloads[0]
+
+class TestParseArgs:
+    def test_urls(self):
+        args = parse_args(['--url', 'http://127.0.0.1:5000', '--url', 'http://127.0.0.1:8000'])
+
+        assert args.url == ['http://127.0.0.1:5000', 'http://127.0.0.1:8000']
+        assert args.concurrency == 16
+
+    def test_url_is_required(self):
+        with pytest.raises(SystemExit):
+            parse_args([])
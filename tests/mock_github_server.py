@@ -0,0 +1,262 @@
+"""
+A local stand-in for the GitHub REST API, for measuring syncs deterministically and offline:
+
+    python -m tests.mock_github_server --issues 10000 --comments 5 --latency 0.05 --port 8001
+    GITHUB_API_URL=http://127.0.0.1:8001 python -m app.index test_owner/test_repo
+
+Every repository has the same generated issues and comments, built from the recorded payloads in
+tests/payloads. Responses are paginated like GitHub, carry rate-limit headers and ETags, answer
+conditional requests with 304 and can be slowed down or made to fail at a given rate.
+"""
+
+import argparse
+import copy
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterator, List, Optional
+
+from flask import Flask, Response, request
+from werkzeug.serving import make_server
+
+PAYLOAD_DIR = os.path.join(os.path.dirname(__file__), 'payloads')
+CREATED_AT = datetime(2024, 1, 1, tzinfo=timezone.utc)
+WORDS = (
+    'crash', 'startup', 'timeout', 'proxy', 'login', 'error', 'memory', 'leak', 'build', 'fails', 'windows',
+    'linux', 'macos', 'docker', 'upload', 'download', 'slow', 'search', 'cache', 'token', 'webhook', 'sync',
+    'database', 'migration', 'unicode', 'render', 'button', 'dark', 'mode', 'export', 'import', 'config'
+)
+
+@dataclass
+class MockGitHubConfig:
+    """
+    :param issues: Issues of every repository.
+    :param comments: Comments of every issue.
+    :param repositories: Repositories of every organization.
+    :param latency: Seconds every response is delayed by.
+    :param rate_limit: Requests allowed per rate-limit window. 0 never limits.
+    :param rate_limit_window: Seconds until the rate limit resets.
+    :param error_rate: Fraction of requests answered with error_status.
+    :param error_status: Status code of the injected errors.
+    :param token: Token required in the Authorization header. Empty accepts every request.
+    :param seed: Seed of the generated text and of the injected errors.
+    """
+    issues: int = 100
+    comments: int = 3
+    repositories: int = 3
+    latency: float = 0.0
+    rate_limit: int = 0
+    rate_limit_window: float = 3600.0
+    error_rate: float = 0.0
+    error_status: int = 502
+    token: str = ''
+    seed: int = 0
+
+@dataclass
+class MockGitHubStats:
+    requests: int = 0
+    not_modified: int = 0
+    rate_limited: int = 0
+    errors: int = 0
+    paths: List[str] = field(default_factory=list)
+
+def load_template(file_name: str, key: str) -> dict:
+    with open(os.path.join(PAYLOAD_DIR, file_name), encoding='utf-8') as f:
+        return json.load(f)[key]
+
+class MockGitHub:
+    """
+    Generated issues, comments and organization repositories, served page by page like GitHub.
+    """
+    def __init__(self, config: MockGitHubConfig):
+        self.config = config
+        self.stats = MockGitHubStats()
+        self.issue_template = load_template('issues_opened.json', 'issue')
+        self.comment_template = load_template('issue_comment_created.json', 'comment')
+        self.lock = threading.Lock()
+        self.errors = random.Random(config.seed)
+        self.remaining = config.rate_limit
+        self.reset_at = time.time() + config.rate_limit_window
+
+    def sentence(self, *keys: object) -> str:
+        words = random.Random(f'{self.config.seed}/' + '/'.join(map(str, keys)))
+        return ' '.join(words.choice(WORDS) for _ in range(words.randint(4, 12)))
+
+    def create_issue(self, owner: str, repository: str, number: int) -> dict:
+        issue = copy.deepcopy(self.issue_template)
+        updated_at = (CREATED_AT + timedelta(minutes=number)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        base_url = f'{request.host_url}repos/{owner}/{repository}/issues/{number}'
+        issue.update({
+            'url': base_url,
+            'repository_url': f'{request.host_url}repos/{owner}/{repository}',
+            'comments_url': f'{base_url}/comments',
+            'html_url': f'https://github.com/{owner}/{repository}/issues/{number}',
+            'id': number,
+            'number': number,
+            'title': f'Issue {number}: {self.sentence(owner, repository, number, "title")}',
+            'body': self.sentence(owner, repository, number, 'body'),
+            'comments': self.config.comments,
+            'created_at': updated_at,
+            'updated_at': updated_at
+        })
+        return issue
+
+    def create_comment(self, owner: str, repository: str, number: int, index: int) -> dict:
+        comment = copy.deepcopy(self.comment_template)
+        comment.update({
+            'id': number * 1000 + index,
+            'issue_url': f'{request.host_url}repos/{owner}/{repository}/issues/{number}',
+            'body': self.sentence(owner, repository, number, 'comment', index)
+        })
+        return comment
+
+    def rate_limit_headers(self) -> dict:
+        if not self.config.rate_limit:
+            return {}
+        return {
+            'X-RateLimit-Limit': str(self.config.rate_limit),
+            'X-RateLimit-Remaining': str(self.remaining),
+            'X-RateLimit-Reset': str(int(self.reset_at))
+        }
+
+    def before_request(self) -> Optional[Response]:
+        """
+        Delay the request, then answer it with an error when it is rate limited, unauthorized or injected to fail.
+        """
+        if self.config.latency:
+            time.sleep(self.config.latency)
+        with self.lock:
+            self.stats.requests += 1
+            self.stats.paths.append(request.full_path.rstrip('?'))
+            if self.config.rate_limit:
+                if time.time() >= self.reset_at:
+                    self.remaining = self.config.rate_limit
+                    self.reset_at = time.time() + self.config.rate_limit_window
+                if self.remaining == 0:
+                    self.stats.rate_limited += 1
+                    return error_response(403, 'API rate limit exceeded', self.rate_limit_headers())
+                self.remaining -= 1
+            if self.config.token and request.headers.get('Authorization') != f'token {self.config.token}':
+                return error_response(401, 'Bad credentials')
+            if self.config.error_rate and self.errors.random() < self.config.error_rate:
+                self.stats.errors += 1
+                return error_response(self.config.error_status, 'Injected error')
+        return None
+
+    def paginate(self, total: int, create_item: Callable[[int], dict]) -> Response:
+        """
+        Respond with the page of items requested by the per_page and page parameters.
+
+        :param create_item: Builds the item at a position between 0 and total.
+        """
+        per_page = min(max(request.args.get('per_page', 30, type=int), 1), 100)
+        page = max(request.args.get('page', 1, type=int), 1)
+        start = (page - 1) * per_page
+        data = json.dumps([create_item(i) for i in range(start, min(start + per_page, total))])
+
+        with self.lock:
+            headers = self.rate_limit_headers()
+        etag = hashlib.sha1(data.encode()).hexdigest()
+        headers['ETag'] = f'"{etag}"'
+        if page * per_page < total:
+            headers['Link'] = f'<{request.base_url}?per_page={per_page}&page={page + 1}>; rel="next"'
+        if request.if_none_match.contains(etag):
+            with self.lock:
+                self.stats.not_modified += 1
+            return Response(status=304, headers=headers)
+        return Response(data, mimetype='application/json', headers=headers)
+
+    def issues(self, owner: str, repository: str) -> Response:
+        # Newest first, like GitHub
+        return self.paginate(self.config.issues, lambda i: self.create_issue(owner, repository, self.config.issues - i))
+
+    def comments(self, owner: str, repository: str, number: int) -> Response:
+        if not 1 <= number <= self.config.issues:
+            return error_response(404, 'Not Found')
+        return self.paginate(self.config.comments, lambda i: self.create_comment(owner, repository, number, i))
+
+    def organization_repositories(self, organization: str) -> Response:
+        return self.paginate(self.config.repositories, lambda i: {
+            'name': f'repo{i + 1}', 'full_name': f'{organization}/repo{i + 1}', 'archived': False
+        })
+
+def create_mock_github_app(config: Optional[MockGitHubConfig] = None) -> Flask:
+    """
+    Build the mock server. Its configuration and request counters are in app.config['MOCK_GITHUB']
+    and app.config['MOCK_GITHUB_STATS'].
+    """
+    github = MockGitHub(config or MockGitHubConfig())
+    app = Flask(__name__)
+    app.config['MOCK_GITHUB'] = github.config
+    app.config['MOCK_GITHUB_STATS'] = github.stats
+    app.before_request(github.before_request)
+    app.add_url_rule('/repos/<owner>/<repository>/issues', view_func=github.issues)
+    app.add_url_rule('/repos/<owner>/<repository>/issues/<int:number>/comments', view_func=github.comments)
+    app.add_url_rule('/orgs/<organization>/repos', view_func=github.organization_repositories)
+    return app
+
+def error_response(status: int, message: str, headers: Optional[dict] = None) -> Response:
+    return Response(
+        json.dumps({'message': message, 'documentation_url': 'https://docs.github.com/rest'}),
+        status=status, mimetype='application/json', headers=headers
+    )
+
+@contextmanager
+def run_mock_github_server(config: Optional[MockGitHubConfig] = None, port: int = 0) -> Iterator[Flask]:
+    """
+    Serve the mock server from a background thread. The app's config['MOCK_GITHUB_URL'] is its base URL.
+    """
+    app = create_mock_github_app(config)
+    server = make_server('127.0.0.1', port, app, threaded=True)
+    app.config['MOCK_GITHUB_URL'] = f'http://127.0.0.1:{server.server_port}'
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield app
+    finally:
+        server.shutdown()
+        thread.join()
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    defaults = MockGitHubConfig()
+    parser = argparse.ArgumentParser(
+        prog='python -m tests.mock_github_server', description=__doc__.strip().splitlines()[0]
+    )
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--issues', type=int, default=defaults.issues, help='Issues of every repository')
+    parser.add_argument('--comments', type=int, default=defaults.comments, help='Comments of every issue')
+    parser.add_argument('--repositories', type=int, default=defaults.repositories, help='Repositories of every org')
+    parser.add_argument('--latency', type=float, default=defaults.latency, help='Seconds every response is delayed')
+    parser.add_argument('--rate-limit', type=int, default=defaults.rate_limit, help='Requests per window, 0 for none')
+    parser.add_argument('--rate-limit-window', type=float, default=defaults.rate_limit_window)
+    parser.add_argument('--error-rate', type=float, default=defaults.error_rate, help='Fraction of failed requests')
+    parser.add_argument('--error-status', type=int, default=defaults.error_status)
+    parser.add_argument('--token', default=defaults.token, help='Required token, empty accepts every request')
+    parser.add_argument('--seed', type=int, default=defaults.seed)
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = vars(parse_args(argv))
+    port = args.pop('port')
+    with run_mock_github_server(MockGitHubConfig(**args), port) as app:
+        print(f'Serving a mock GitHub API on {app.config["MOCK_GITHUB_URL"]}', file=sys.stderr)
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+        stats = app.config['MOCK_GITHUB_STATS']
+        print(
+            f'{stats.requests} requests, {stats.not_modified} not modified, '
+            f'{stats.rate_limited} rate limited, {stats.errors} injected errors', file=sys.stderr
+        )
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
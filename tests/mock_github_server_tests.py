@@ -0,0 +1,83 @@
+# pylint: disable=W0621
+
+import pytest
+
+from tests.mock_github_server import MockGitHubConfig, create_mock_github_app, parse_args
+
+def create_client(**kwargs):
+    return create_mock_github_app(MockGitHubConfig(**kwargs)).test_client()
+
+class TestMockGitHubServer:
+    def test_issues_are_paginated_newest_first(self):
+        client = create_client(issues=250)
+
+        res = client.get('/repos/test_owner/test_repo/issues?state=all&per_page=100&page=3')
+
+        assert res.status_code == 200
+        assert [issue['number'] for issue in res.json] == list(range(50, 0, -1))
+        assert 'Link' not in res.headers
+        assert client.get('/repos/test_owner/test_repo/issues?per_page=100&page=4').json == []
+        assert 'rel="next"' in client.get('/repos/test_owner/test_repo/issues?per_page=100').headers['Link']
+
+    def test_issues_are_deterministic(self):
+        first = create_client(issues=5).get('/repos/test_owner/test_repo/issues').json
+        second = create_client(issues=5).get('/repos/test_owner/test_repo/issues').json
+        other_seed = create_client(issues=5, seed=1).get('/repos/test_owner/test_repo/issues').json
+
+        assert first == second
+        assert first[0]['title'] != other_seed[0]['title']
+        assert first[0]['html_url'] == 'https://github.com/test_owner/test_repo/issues/5'
+        assert first[0]['user']['login'] == 'octocat'
+
+    def test_comments(self):
+        client = create_client(issues=5, comments=3)
+
+        assert len(client.get('/repos/test_owner/test_repo/issues/2/comments?per_page=2').json) == 2
+        assert len(client.get('/repos/test_owner/test_repo/issues/2/comments?per_page=2&page=2').json) == 1
+        assert client.get('/repos/test_owner/test_repo/issues/9/comments').status_code == 404
+
+    def test_not_modified(self):
+        client = create_client()
+        res = client.get('/repos/test_owner/test_repo/issues')
+
+        res = client.get('/repos/test_owner/test_repo/issues', headers={'If-None-Match': res.headers['ETag']})
+
+        assert res.status_code == 304
+        assert client.application.config['MOCK_GITHUB_STATS'].not_modified == 1
+
+    def test_rate_limit(self):
+        client = create_client(rate_limit=2)
+
+        assert client.get('/orgs/test_owner/repos').headers['X-RateLimit-Remaining'] == '1'
+        assert client.get('/orgs/test_owner/repos').status_code == 200
+        res = client.get('/orgs/test_owner/repos')
+
+        assert res.status_code == 403
+        assert res.headers['X-RateLimit-Remaining'] == '0'
+        assert int(res.headers['X-RateLimit-Reset']) > 0
+
+    def test_rate_limit_resets(self):
+        client = create_client(rate_limit=1, rate_limit_window=0)
+
+        assert client.get('/orgs/test_owner/repos').status_code == 200
+        assert client.get('/orgs/test_owner/repos').status_code == 200
+
+    def test_token(self):
+        client = create_client(token='test_token')
+
+        assert client.get('/orgs/test_owner/repos').status_code == 401
+        assert client.get('/orgs/test_owner/repos', headers={'Authorization': 'token test_token'}).status_code == 200
+
+    @pytest.mark.parametrize('error_rate, errors', [(0.0, 0), (1.0, 10)])
+    def test_error_injection(self, error_rate, errors):
+        client = create_client(error_rate=error_rate, error_status=500)
+
+        statuses = [client.get('/repos/test_owner/test_repo/issues').status_code for _ in range(10)]
+
+        assert statuses.count(500) == errors
+        assert client.application.config['MOCK_GITHUB_STATS'].errors == errors
+
+    def test_parse_args(self):
+        args = parse_args(['--issues', '1000', '--latency', '0.05', '--error-rate', '0.1'])
+
+        assert (args.issues, args.latency, args.error_rate, args.port) == (1000, 0.05, 0.1, 8001)
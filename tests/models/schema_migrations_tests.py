@@ -0,0 +1,57 @@
+import numpy as np
+from sqlalchemy import create_engine, inspect, text
+
+from app import db
+from app.models import issue_model  # pylint: disable=unused-import
+from app.models.schema_migrations import add_missing_columns, normalize_embeddings
+
+class TestAddMissingColumns:
+    def test_adds_columns_to_existing_table(self):
+        engine = create_engine('sqlite://')
+        with engine.begin() as connection:
+            connection.execute(text(
+                'CREATE TABLE issues (name VARCHAR, number INTEGER, comments BLOB, embedding BLOB NOT NULL, '
+                'shape VARCHAR NOT NULL, updated VARCHAR NOT NULL, PRIMARY KEY (name, number))'
+            ))
+
+        add_missing_columns(engine, db.metadata)
+
+        columns = {column['name'] for column in inspect(engine).get_columns('issues')}
+        assert {'title', 'url', 'state'} <= columns
+
+    def test_ignores_missing_tables(self):
+        engine = create_engine('sqlite://')
+
+        add_missing_columns(engine, db.metadata)
+
+        assert not inspect(engine).get_table_names()
+
+class TestNormalizeEmbeddings:
+    def test_normalizes_rows_stored_without_flag(self):
+        engine = create_engine('sqlite://')
+        db.metadata.create_all(engine, tables=[issue_model.Issue.__table__])
+        with engine.begin() as connection:
+            connection.execute(text(
+                'INSERT INTO issues (name, number, embedding, shape, updated, normalized) '
+                'VALUES (:name, :number, :embedding, :shape, :updated, :normalized)'
+            ), [
+                {
+                    'name': 'test_owner/test_repo', 'number': 1, 'shape': '2', 'updated': '2024-01-01',
+                    'embedding': np.array([3.0, 4.0], dtype=np.float32).tobytes(), 'normalized': None
+                },
+                {
+                    'name': 'test_owner/test_repo', 'number': 2, 'shape': '2', 'updated': '2024-01-01',
+                    'embedding': np.array([2.0, 0.0], dtype=np.float32).tobytes(), 'normalized': True
+                }
+            ])
+
+        assert normalize_embeddings(engine, batch_size=1) == 1
+        assert normalize_embeddings(engine) == 0
+
+        with engine.connect() as connection:
+            rows = dict(connection.execute(text('SELECT number, embedding FROM issues')).fetchall())
+        assert np.allclose(np.frombuffer(rows[1], dtype=np.float32), [0.6, 0.8])
+        assert np.array_equal(np.frombuffer(rows[2], dtype=np.float32), [2.0, 0.0])
+
+    def test_ignores_missing_tables(self):
+        assert normalize_embeddings(create_engine('sqlite://')) == 0
@@ -0,0 +1,41 @@
+# pylint: disable=W0621
+
+import pytest
+from app import create_app, db
+from app.repositories.duplicate_report_repository import DuplicateReportRepository
+from app.schemas.duplicate_report_schema import DuplicateReportSchema, DuplicateClusterSchema, DuplicateIssueSchema
+
+from tests.testing_config import TestingConfig
+
+@pytest.fixture(scope='function')
+def test_app():
+    app = create_app(TestingConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+def create_report(created_at, clusters):
+    return DuplicateReportSchema(
+        name='test_owner/test_repo', threshold=0.9, total_issues=3, index_version=1,
+        created_at=created_at, clusters=clusters
+    )
+
+@pytest.mark.usefixtures('test_app')
+class TestDuplicateReportRepository:
+    def test_select_missing(self):
+        assert DuplicateReportRepository.select_by_name('test_owner/test_repo') is None
+
+    def test_upsert(self):
+        cluster = DuplicateClusterSchema(
+            issues=[
+                DuplicateIssueSchema(number=1, title='Issue 1', url='url1', state='open'),
+                DuplicateIssueSchema(number=2, title='Issue 2', url='url2', state='closed')
+            ],
+            similarity=0.95
+        )
+        DuplicateReportRepository.upsert(create_report(1.0, []))
+        DuplicateReportRepository.upsert(create_report(2.0, [cluster]))
+
+        assert DuplicateReportRepository.select_by_name('test_owner/test_repo') == create_report(2.0, [cluster])
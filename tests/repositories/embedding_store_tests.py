@@ -0,0 +1,198 @@
+# pylint: disable=W0621
+
+import threading
+import time
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from app.repositories.embedding_store import EmbeddingStore, to_embedding_matrix
+
+@pytest.fixture
+def store(tmp_path):
+    return EmbeddingStore(str(tmp_path))
+
+class TestEmbeddingStore:
+    def test_to_key(self):
+        assert EmbeddingStore.to_key('test_owner/test_repo') == 'test_owner__test_repo'
+
+    def test_load_missing(self, store):
+        assert not store.exists('test_owner/test_repo')
+        assert store.load('test_owner/test_repo') is None
+
+    def test_write_and_load(self, store):
+        matrix = np.array([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32)
+        store.write('test_owner/test_repo', [10, 20], matrix)
+
+        view = store.load('test_owner/test_repo')
+
+        assert isinstance(view.matrix, np.memmap)
+        assert view.rows == {10: 0, 20: 1}
+        assert view.has_all([10, 20])
+        assert not view.has_all([30])
+        assert np.array_equal(view.matrix, matrix)
+        assert store.read_meta('test_owner/test_repo') == {
+            'dim': 2, 'rows': 2, 'generation': 1, 'normalized': True, 'versioned': True
+        }
+
+    def test_append_supersedes_existing_rows(self, store):
+        store.write('test_owner/test_repo', [1, 2], np.array([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32))
+        store.append('test_owner/test_repo', [2, 3], np.array([[0.5, 0.5], [1.0, 1.0]], dtype=np.float32))
+
+        view = store.load('test_owner/test_repo')
+
+        assert len(view) == 3
+        assert len(view.numbers) == 4
+        assert np.array_equal(view.matrix[view.row_indices([1, 2, 3])], [[1.0, 0.0], [0.5, 0.5], [1.0, 1.0]])
+
+    def test_append_creates_store(self, store):
+        store.append('test_owner/test_repo', [1], np.array([[1.0, 0.0]], dtype=np.float32))
+
+        assert store.load('test_owner/test_repo').rows == {1: 0}
+
+    def test_append_dimension_mismatch(self, store):
+        store.write('test_owner/test_repo', [1], np.array([[1.0, 0.0]], dtype=np.float32))
+
+        with pytest.raises(ValueError):
+            store.append('test_owner/test_repo', [2], np.array([[1.0, 0.0, 0.0]], dtype=np.float32))
+
+    def test_append_compacts_stale_rows(self, store):
+        store.write('test_owner/test_repo', [1], np.array([[1.0, 0.0]], dtype=np.float32))
+        store.append('test_owner/test_repo', [1], np.array([[0.0, 1.0]], dtype=np.float32))
+        store.append('test_owner/test_repo', [1], np.array([[0.5, 0.5]], dtype=np.float32))
+
+        view = store.load('test_owner/test_repo')
+
+        assert len(view.numbers) == 1
+        assert np.array_equal(view.matrix[view.rows[1]], [0.5, 0.5])
+        assert store.read_meta('test_owner/test_repo')['generation'] == 2
+
+    def test_norms(self, store):
+        store.write('test_owner/test_repo', [1], np.array([[3.0, 4.0]], dtype=np.float32))
+        store.append('test_owner/test_repo', [2], np.array([[0.0, 2.0]], dtype=np.float32))
+
+        view = store.load('test_owner/test_repo')
+
+        assert np.allclose(view.norms, [5.0, 2.0])
+
+    def test_norms_of_store_without_norm_file(self, store, tmp_path):
+        store.write('test_owner/test_repo', [1], np.array([[3.0, 4.0]], dtype=np.float32))
+        (tmp_path / 'test_owner__test_repo@1.norm').unlink()
+        store.append('test_owner/test_repo', [2], np.array([[0.0, 2.0]], dtype=np.float32))
+
+        assert np.allclose(store.load('test_owner/test_repo').norms, [5.0, 2.0])
+
+    def test_cosine_scores_read_only_live_rows(self, store):
+        store.write('test_owner/test_repo', [1, 2], np.array([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32))
+        store.append('test_owner/test_repo', [1], np.array([[0.0, 3.0]], dtype=np.float32))
+        view = store.load('test_owner/test_repo')
+
+        scores = view.cosine_scores(view.row_indices([1, 2]), np.array([0.0, 1.0], dtype=np.float32), chunk_size=1)
+
+        assert np.allclose(scores, [1.0, 1.0])
+
+    def test_normalized(self, store):
+        store.write('test_owner/test_repo', [1], np.array([[0.6, 0.8]], dtype=np.float32))
+        assert store.load('test_owner/test_repo').normalized
+
+        store.append('test_owner/test_repo', [2], np.array([[0.0, 2.0]], dtype=np.float32))
+        view = store.load('test_owner/test_repo')
+
+        assert not view.normalized
+        assert np.allclose(view.unit_rows(view.row_indices([1, 2])), [[0.6, 0.8], [0.0, 1.0]])
+
+    def test_store_without_normalized_flag(self, store):
+        store.write('test_owner/test_repo', [1], np.array([[0.6, 0.8]], dtype=np.float32))
+        meta = store.read_meta('test_owner/test_repo')
+        del meta['normalized']
+        store._write_meta('test_owner/test_repo', meta)  # pylint: disable=protected-access
+
+        assert not store.load('test_owner/test_repo').normalized
+
+    def test_writes_hold_file_lock(self, store, tmp_path):
+        with patch('app.repositories.embedding_store.FileLock') as mock_file_lock:
+            store.append('test_owner/test_repo', [1], np.array([[1.0, 0.0]], dtype=np.float32))
+
+        # The append falls back to a write without locking the repository twice
+        mock_file_lock.assert_called_once_with(str(tmp_path / 'test_owner__test_repo.lock'))
+
+    def test_remove(self, store):
+        store.write('test_owner/test_repo', [1, 2], np.array([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32))
+        store.append('test_owner/test_repo', [2], np.array([[0.5, 0.5]], dtype=np.float32))
+
+        store.remove('test_owner/test_repo', [1])
+
+        view = store.load('test_owner/test_repo')
+        assert view.rows == {2: 0}
+        assert np.array_equal(view.matrix, [[0.5, 0.5]])
+
+        store.remove('test_owner/test_repo', [2])
+        assert not store.exists('test_owner/test_repo')
+
+    def test_delete(self, store, tmp_path):
+        store.write('test_owner/test_repo', [1], np.array([[1.0, 0.0]], dtype=np.float32))
+        store.delete('test_owner/test_repo')
+
+        assert store.load('test_owner/test_repo') is None
+        assert not [path for path in tmp_path.iterdir() if not path.name.endswith('.lock')]
+
+    def test_write_removes_previous_generation(self, store, tmp_path):
+        store.write('test_owner/test_repo', [1], np.array([[1.0, 0.0]], dtype=np.float32))
+        store.write('test_owner/test_repo.1', [1], np.array([[1.0, 0.0]], dtype=np.float32))
+        store.write('test_owner/test_repo', [2], np.array([[0.0, 1.0]], dtype=np.float32))
+
+        assert sorted(path.name for path in tmp_path.glob('*.f32')) == [
+            'test_owner__test_repo.1@1.f32', 'test_owner__test_repo@2.f32'
+        ]
+
+    def test_store_without_generation_files(self, store, tmp_path):
+        np.array([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32).tofile(tmp_path / 'test_owner__test_repo.f32')
+        np.array([1, 2], dtype=np.int64).tofile(tmp_path / 'test_owner__test_repo.ids')
+        store._write_meta('test_owner/test_repo', {'dim': 2, 'rows': 2, 'generation': 1})  # pylint: disable=protected-access
+
+        assert store.load('test_owner/test_repo').rows == {1: 0, 2: 1}
+
+        store.remove('test_owner/test_repo', [1])
+
+        assert store.load('test_owner/test_repo').rows == {2: 0}
+        assert not (tmp_path / 'test_owner__test_repo.f32').exists()
+
+    def test_load_while_another_store_rewrites(self, tmp_path):
+        writer, reader = EmbeddingStore(str(tmp_path)), EmbeddingStore(str(tmp_path))
+        stop = threading.Event()
+
+        def rewrite():
+            # Every embedding holds its issue number, so a row read from the wrong generation is detected
+            while not stop.is_set():
+                for size in (3, 40, 7):
+                    numbers = list(range(1, size + 1))
+                    matrix = np.repeat(np.array(numbers, dtype=np.float32), 4).reshape(-1, 4)
+                    writer.write('test_owner/test_repo', numbers, matrix)
+                writer.remove('test_owner/test_repo', [1])
+
+        thread = threading.Thread(target=rewrite)
+        thread.start()
+        try:
+            deadline = time.monotonic() + 1
+            loads = 0
+            while time.monotonic() < deadline:
+                view = reader.load('test_owner/test_repo')
+                if view is None:
+                    continue
+                numbers = np.array(list(view.rows), dtype=np.float32)
+                assert np.array_equal(view.matrix[view.row_indices(list(view.rows))][:, 0], numbers)
+                loads += 1
+        finally:
+            stop.set()
+            thread.join()
+
+        assert loads
+
+class TestToEmbeddingMatrix:
+    def test_success(self):
+        embeddings = [
+            np.array([1.0, 2.0], dtype=np.float32).tobytes(),
+            np.array([3.0, 4.0], dtype=np.float32).tobytes()
+        ]
+        assert np.array_equal(to_embedding_matrix(embeddings), [[1.0, 2.0], [3.0, 4.0]])
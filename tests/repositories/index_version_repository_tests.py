@@ -0,0 +1,29 @@
+# pylint: disable=W0621
+
+import pytest
+from app import create_app, db
+from app.repositories.index_version_repository import IndexVersionRepository
+
+from tests.testing_config import TestingConfig
+
+@pytest.fixture(scope='function')
+def test_app():
+    app = create_app(TestingConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.mark.usefixtures('test_app')
+class TestIndexVersionRepository:
+    def test_select_missing(self):
+        assert IndexVersionRepository.select_version('test_owner/test_repo') == 0
+
+    def test_increment(self):
+        assert IndexVersionRepository.increment('test_owner/test_repo') == 1
+        assert IndexVersionRepository.increment('test_owner/test_repo') == 2
+        assert IndexVersionRepository.increment('test_owner/other_repo') == 1
+
+        assert IndexVersionRepository.select_version('test_owner/test_repo') == 2
+        assert IndexVersionRepository.select_version('test_owner/other_repo') == 1
@@ -4,6 +4,7 @@ import pytest
 from app import create_app, db
 from app.models.issue_model import Issue
 from app.repositories.issue_repository import IssueRepository
+from app.utils.metrics import db_rows_written
 
 from tests.testing_config import TestingConfig
 
@@ -57,12 +58,29 @@ class TestIssueRepository:
         assert issues[0].number == 3
         assert issues[0].shape == '768'
 
+    def test_select_by_primary_key(self):
+        IssueRepository.bulk_insert([self.create_issue(name='Issue 1', number=1, comments=['comment'])])
+
+        assert IssueRepository.select_by_primary_key('Issue 1', 1).comments == ['comment']
+        assert IssueRepository.select_by_primary_key('Issue 1', 2) is None
+
+    def test_select_updated_by_name(self):
+        IssueRepository.bulk_insert([
+            self.create_issue(name='test_owner/test_repo', number=1, updated='2024-01-01'),
+            self.create_issue(name='test_owner/test_repo', number=2, updated='2024-01-02'),
+            self.create_issue(name='test_owner/other_repo', number=3, updated='2024-01-03')
+        ])
+
+        assert IssueRepository.select_updated_by_name('test_owner/test_repo') == {1: '2024-01-01', 2: '2024-01-02'}
+
     def test_bulk_insert(self):
         issues = [
             self.create_issue(name='Test Issue', number=1, comments=['Test comment1']),
             self.create_issue(name='Test Issue', number=2, comments=['Test comment2'])
         ]
+        rows_written = db_rows_written.value(table='issues')
         IssueRepository.bulk_insert(issues)
+        assert db_rows_written.value(table='issues') == rows_written + 2
         retrieved_issue = Issue.query.all()
         assert len(retrieved_issue) == 2
         assert retrieved_issue[0].name == 'Test Issue'
@@ -97,3 +115,33 @@ class TestIssueRepository:
         assert retrieved_issue[0].name == 'Test Issue'
         assert retrieved_issue[0].number == 1
         assert retrieved_issue[0].comments == ['Test comment1']
+
+    def test_replace_all_by_name(self):
+        IssueRepository.bulk_insert([
+            self.create_issue(name='Other Issue', number=1),
+            self.create_issue(name='Replace Issue', number=1),
+            self.create_issue(name='Replace Issue', number=5)
+        ])
+
+        count = IssueRepository.replace_all_by_name('Replace Issue', [
+            [{'name': 'Replace Issue', 'number': 2, 'comments': ['New'], 'embedding': b'\x00', 'shape': '1',
+              'updated': '2024-02-01'}],
+            [{'name': 'Replace Issue', 'number': 3, 'embedding': b'\x00', 'shape': '1', 'updated': '2024-02-01'}]
+        ])
+
+        assert count == 2
+        assert [issue.number for issue in IssueRepository.iter_by_name('Replace Issue')] == [2, 3]
+        assert IssueRepository.select_by_primary_key('Replace Issue', 2).comments == ['New']
+        assert IssueRepository.count_by_name('Other Issue') == 1
+
+    def test_replace_all_by_name_rolls_back(self):
+        IssueRepository.bulk_insert([self.create_issue(name='Replace Issue', number=1)])
+
+        def batches():
+            yield [{'name': 'Replace Issue', 'number': 2, 'embedding': b'\x00', 'shape': '1', 'updated': '2024-02-01'}]
+            raise ValueError('Invalid snapshot')
+
+        with pytest.raises(ValueError):
+            IssueRepository.replace_all_by_name('Replace Issue', batches())
+
+        assert [issue.number for issue in IssueRepository.iter_by_name('Replace Issue')] == [1]
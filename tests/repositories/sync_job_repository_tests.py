@@ -0,0 +1,115 @@
+# pylint: disable=W0621
+
+import pytest
+from app import create_app, db
+from app.repositories.sync_job_repository import SyncJobRepository
+from app.schemas.sync_job_schema import SyncJobSchema
+
+from tests.testing_config import TestingConfig
+
+@pytest.fixture(scope='function')
+def test_app():
+    app = create_app(TestingConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+def create_job(job_id, name='test_owner/test_repo', created_at=1.0):
+    owner, repository = name.split('/')
+    return SyncJobSchema(
+        id=job_id, name=name, owner=owner, repository=repository, created_at=created_at, updated_at=created_at
+    )
+
+@pytest.mark.usefixtures('test_app')
+class TestSyncJobRepository:
+    def test_insert_and_select(self):
+        job = create_job('job1')
+        SyncJobRepository.insert(job)
+
+        assert SyncJobRepository.select_by_id('job1') == job
+        assert SyncJobRepository.select_by_id('missing') is None
+
+    def test_select_active_by_name(self):
+        SyncJobRepository.insert(create_job('job1'))
+
+        assert SyncJobRepository.select_active_by_name('test_owner/test_repo').id == 'job1'
+        assert SyncJobRepository.select_active_by_name('test_owner/other_repo') is None
+
+    def test_claim_next_in_creation_order(self):
+        SyncJobRepository.insert(create_job('job2', name='test_owner/repo2', created_at=2.0))
+        SyncJobRepository.insert(create_job('job1', name='test_owner/repo1', created_at=1.0))
+
+        first = SyncJobRepository.claim_next(3.0, 13.0)
+        second = SyncJobRepository.claim_next(3.0, 13.0)
+
+        assert (first.id, first.status) == ('job1', 'running')
+        assert second.id == 'job2'
+        assert SyncJobRepository.claim_next(3.0, 13.0) is None
+
+    def test_claim(self):
+        SyncJobRepository.insert(create_job('job1'))
+
+        assert SyncJobRepository.claim('job1', 2.0, 12.0).status == 'running'
+        assert SyncJobRepository.claim('job1', 3.0, 13.0) is None
+        assert SyncJobRepository.claim('missing', 3.0, 13.0) is None
+
+    def test_update_keeps_cancel_request(self):
+        job = create_job('job1')
+        SyncJobRepository.insert(job)
+        SyncJobRepository.request_cancel('job1')
+
+        job.counters.embedded = 5
+        SyncJobRepository.update(job)
+
+        stored_job = SyncJobRepository.select_by_id('job1')
+        assert stored_job.counters.embedded == 5
+        assert stored_job.cancel_requested
+
+    def test_requeue_expired(self):
+        SyncJobRepository.insert(create_job('job1', name='test_owner/repo1'))
+        SyncJobRepository.insert(create_job('job2', name='test_owner/repo2'))
+        SyncJobRepository.claim('job1', 2.0, 12.0)
+        SyncJobRepository.claim('job2', 2.0, 32.0)
+
+        assert SyncJobRepository.requeue_expired(20.0, 10.0) == 1
+
+        assert SyncJobRepository.select_by_id('job1').status == 'queued'
+        assert SyncJobRepository.select_by_id('job2').status == 'running'
+        assert SyncJobRepository.claim_next(21.0, 31.0).id == 'job1'
+
+    def test_renew_lease(self):
+        SyncJobRepository.insert(create_job('job1'))
+        SyncJobRepository.claim('job1', 2.0, 12.0)
+
+        SyncJobRepository.renew_lease('job1', 10.0, 20.0)
+
+        assert SyncJobRepository.requeue_expired(15.0, 10.0) == 0
+        assert SyncJobRepository.select_by_id('job1').updated_at == 10.0
+
+    def test_update_by_lease_owner(self):
+        SyncJobRepository.insert(create_job('job1'))
+        job = SyncJobRepository.claim('job1', 2.0, 12.0, 'worker1')
+        SyncJobRepository.requeue_expired(20.0, 10.0)
+        SyncJobRepository.claim('job1', 21.0, 31.0, 'worker2')
+
+        # The first worker's lease expired, so it cannot overwrite the run of the second one
+        job.status = 'succeeded'
+        assert not SyncJobRepository.update(job, 'worker1')
+        SyncJobRepository.renew_lease('job1', 22.0, 40.0, 'worker1')
+
+        stored_job = SyncJobRepository.select_by_id('job1')
+        assert (stored_job.status, stored_job.updated_at) == ('running', 21.0)
+        assert SyncJobRepository.update(job, 'worker2')
+        assert SyncJobRepository.select_by_id('job1').status == 'succeeded'
+
+    def test_update_without_lease_owner_only_writes_queued_jobs(self):
+        job = create_job('job1')
+        SyncJobRepository.insert(job)
+        SyncJobRepository.claim('job1', 2.0, 12.0, 'worker1')
+
+        job.status = 'cancelled'
+
+        assert not SyncJobRepository.update(job)
+        assert SyncJobRepository.select_by_id('job1').status == 'running'
@@ -0,0 +1,39 @@
+# pylint: disable=W0621
+
+import pytest
+from app import create_app, db
+from app.repositories.sync_state_repository import SyncStateRepository
+
+from tests.testing_config import TestingConfig
+
+@pytest.fixture(scope='function')
+def test_app():
+    app = create_app(TestingConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.mark.usefixtures('test_app')
+class TestSyncStateRepository:
+    def test_select_missing(self):
+        assert SyncStateRepository.select_by_name('test_owner/test_repo') is None
+
+    def test_upsert(self):
+        SyncStateRepository.upsert('test_owner/test_repo', 100.0)
+        SyncStateRepository.upsert('test_owner/test_repo', 200.0)
+
+        sync_state = SyncStateRepository.select_by_name('test_owner/test_repo')
+        assert sync_state.synced_at == 200.0
+
+    def test_record_webhook(self):
+        SyncStateRepository.record_webhook('test_owner/test_repo', 50.0)
+        assert SyncStateRepository.select_by_name('test_owner/test_repo') is None
+
+        SyncStateRepository.upsert('test_owner/test_repo', 100.0)
+        SyncStateRepository.record_webhook('test_owner/test_repo', 150.0)
+        SyncStateRepository.upsert('test_owner/test_repo', 200.0)
+
+        sync_state = SyncStateRepository.select_by_name('test_owner/test_repo')
+        assert (sync_state.synced_at, sync_state.webhook_at) == (200.0, 150.0)
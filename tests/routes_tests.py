@@ -1,12 +1,16 @@
 # pylint: disable=W0621
 
+import hashlib
+import hmac
+import json
 from unittest.mock import patch
 import pytest
 from flask import template_rendered
 from app import create_app
 from app.utils.exceptions import (
     MissingFieldsError, RepositoryNotFoundError,
-    RateLimitExceededError, UnauthorizedError
+    RateLimitExceededError, UnauthorizedError, InvalidFieldError, IssueNotFoundError,
+    DuplicateReportNotFoundError, OrganizationNotFoundError, SyncCancelledError
 )
 
 from tests.testing_config import TestingConfig
@@ -166,6 +170,32 @@ class TestSearch:
             'errorMessage': 'Unauthorized access. Please check your GITHUB_ACCESS_TOKEN'
         }
 
+    @patch('app.routes.get_related_issues')
+    def test_invalid_field_error(self, mock_get_related_issues, client):
+        form_data = {
+            'owner': 'test_owner',
+            'repository': 'test_repo',
+            'title': 'test_title',
+            'mode': 'unknown'
+        }
+        mock_get_related_issues.side_effect = InvalidFieldError('mode', 'unknown')
+
+        response = client.post('/search', json=form_data)
+
+        assert response.status_code == 400
+        assert response.json == {
+            'errorMessage': 'Invalid value for mode: unknown'
+        }
+
+    @patch('app.routes.get_related_issues')
+    def test_sync_cancelled(self, mock_get_related_issues, client):
+        mock_get_related_issues.side_effect = SyncCancelledError('test_owner/test_repository')
+
+        response = client.post('/search', json={'owner': 'test_owner', 'repository': 'test_repository'})
+
+        assert response.status_code == 409
+        assert response.json == {'errorMessage': 'The sync of test_owner/test_repository was cancelled'}
+
     @patch('app.routes.get_related_issues')
     def test_unexpected_exception(self, mock_get_related_issues, client):
         form_data = {
@@ -181,3 +211,274 @@ class TestSearch:
         assert response.json == {
             'errorMessage': 'An unexpected error occurred. Please try again.'
         }
+
+    @patch('app.routes.get_related_issues')
+    def test_profile(self, mock_get_related_issues, test_app, client, tmp_path):
+        test_app.config['PROFILING_ENABLED'] = True
+        test_app.config['PROFILE_DIR'] = str(tmp_path)
+        mock_get_related_issues.return_value = ([], {'total': 0})
+
+        response = client.post('/search', json={}, headers={'X-Profile': 'true'})
+
+        assert response.status_code == 200
+        assert response.headers['X-Profile'].startswith('search-')
+        assert (tmp_path / response.headers['X-Profile']).exists()
+
+class TestSearchBatch:
+    @patch('app.routes.get_related_issues_batch')
+    def test_success(self, mock_get_related_issues_batch, client):
+        mock_get_related_issues_batch.return_value = [
+            ([], {'total': 0, 'message': 'No related issues found.'}),
+            ([{'number': 1}], {'total': 1, 'message': 'There are 1 related issues.'})
+        ]
+        form_data = {
+            'owner': 'test_owner',
+            'repository': 'test_repository',
+            'queries': [{'title': 'title1'}, {'title': 'title2'}]
+        }
+
+        response = client.post('/search/batch', json=form_data)
+
+        assert response.status_code == 200
+        assert response.json == {'results': [
+            {'issues': [], 'detail': {'total': 0, 'message': 'No related issues found.'}},
+            {'issues': [{'number': 1}], 'detail': {'total': 1, 'message': 'There are 1 related issues.'}}
+        ]}
+        mock_get_related_issues_batch.assert_called_once_with(form_data)
+
+    @patch('app.routes.get_related_issues_batch')
+    def test_missing_fields_error(self, mock_get_related_issues_batch, client):
+        mock_get_related_issues_batch.side_effect = MissingFieldsError(['queries'])
+
+        response = client.post('/search/batch', json={'owner': 'test_owner', 'repository': 'test_repository'})
+
+        assert response.status_code == 400
+        assert response.json == {'errorMessage': 'Missing fields: queries'}
+
+class TestSearchRepositories:
+    @patch('app.routes.get_related_issues_across_repositories')
+    def test_success(self, mock_get_related_issues_across_repositories, client):
+        mock_get_related_issues_across_repositories.return_value = (
+            [{'name': 'test_owner/repo1', 'number': 1}],
+            {'total': 1, 'message': 'There are 1 related issues.'},
+            [{'name': 'test_owner/repo1', 'total': 1, 'error': None}]
+        )
+        form_data = {'repositories': ['test_owner/repo1'], 'title': 'test_title'}
+
+        response = client.post('/search/repositories', json=form_data)
+
+        assert response.status_code == 200
+        assert response.json == {
+            'issues': [{'name': 'test_owner/repo1', 'number': 1}],
+            'detail': {'total': 1, 'message': 'There are 1 related issues.'},
+            'repositories': [{'name': 'test_owner/repo1', 'total': 1, 'error': None}]
+        }
+        mock_get_related_issues_across_repositories.assert_called_once_with(form_data)
+
+    @patch('app.routes.get_related_issues_across_repositories')
+    def test_organization_not_found(self, mock_get_related_issues_across_repositories, client):
+        mock_get_related_issues_across_repositories.side_effect = OrganizationNotFoundError('test_owner')
+
+        response = client.post('/search/repositories', json={'organization': 'test_owner', 'title': 'test_title'})
+
+        assert response.status_code == 400
+        assert response.json == {'errorMessage': 'Organization not found: https://github.com/test_owner'}
+
+class TestSearchStream:
+    @patch('app.routes.stream_related_issues')
+    def test_success(self, mock_stream_related_issues, client):
+        mock_stream_related_issues.return_value = iter([
+            {'type': 'results', 'issues': [], 'detail': {'total': 0, 'message': 'No related issues found.'}},
+            {'type': 'done', 'issues': [], 'detail': {'total': 0, 'message': 'No related issues found.'}}
+        ])
+
+        response = client.post('/search/stream', json={
+            'owner': 'test_owner',
+            'repository': 'test_repository',
+            'title': 'test_title'
+        })
+
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        lines = response.get_data(as_text=True).splitlines()
+        assert [json.loads(line)['type'] for line in lines] == ['results', 'done']
+
+    def test_missing_fields_error(self, client):
+        response = client.post('/search/stream', json={'owner': 'test_owner'})
+
+        assert response.status_code == 400
+        assert response.json == {'errorMessage': 'Missing fields: repository, title'}
+
+    @patch('app.routes.stream_related_issues')
+    def test_unexpected_exception(self, mock_stream_related_issues, client):
+        def search_events():
+            yield {'type': 'results', 'issues': []}
+            raise RuntimeError()
+
+        mock_stream_related_issues.return_value = search_events()
+
+        response = client.post('/search/stream', json={
+            'owner': 'test_owner',
+            'repository': 'test_repository',
+            'title': 'test_title'
+        })
+
+        lines = response.get_data(as_text=True).splitlines()
+        assert json.loads(lines[-1]) == {
+            'type': 'error',
+            'errorMessage': 'An unexpected error occurred. Please try again.'
+        }
+
+class TestIssueComments:
+    @patch('app.routes.get_issue_comments', return_value=['description', 'comment'])
+    def test_success(self, mock_get_issue_comments, client):
+        response = client.get('/issues/test_owner/test_repository/1/comments')
+
+        assert response.status_code == 200
+        assert response.json == {'number': 1, 'comments': ['description', 'comment']}
+        mock_get_issue_comments.assert_called_once_with('test_owner', 'test_repository', 1)
+
+    @patch('app.routes.get_issue_comments', side_effect=IssueNotFoundError('test_owner/test_repository', 1))
+    def test_not_found(self, _mock_get_issue_comments, client):
+        response = client.get('/issues/test_owner/test_repository/1/comments')
+
+        assert response.status_code == 404
+        assert response.json == {'errorMessage': 'Issue not found: test_owner/test_repository#1'}
+
+class TestSync:
+    @patch('app.routes.sync_queue')
+    def test_enqueue(self, mock_sync_queue, client):
+        mock_sync_queue.enqueue.return_value = {'id': 'job1', 'status': 'queued'}
+
+        response = client.post('/sync', json={'owner': 'test_owner', 'repository': 'test_repo'})
+
+        assert response.status_code == 202
+        assert response.json == {'job': {'id': 'job1', 'status': 'queued'}}
+        mock_sync_queue.enqueue.assert_called_once_with('test_owner', 'test_repo')
+
+    def test_enqueue_missing_fields(self, client):
+        response = client.post('/sync', json={'owner': 'test_owner'})
+
+        assert response.status_code == 400
+        assert response.json == {'errorMessage': 'Missing fields: repository'}
+
+    def test_get(self, client):
+        job_id = client.post('/sync', json={'owner': 'test_owner', 'repository': 'test_repo'}).json['job']['id']
+
+        response = client.get(f'/sync/{job_id}')
+
+        assert response.status_code == 200
+        assert response.json['job']['name'] == 'test_owner/test_repo'
+        assert response.json['job']['status'] == 'queued'
+
+    def test_get_missing(self, client):
+        response = client.get('/sync/missing')
+
+        assert response.status_code == 404
+        assert response.json == {'errorMessage': 'Sync job not found: missing'}
+
+    def test_cancel(self, client):
+        job_id = client.post('/sync', json={'owner': 'test_owner', 'repository': 'test_repo'}).json['job']['id']
+
+        response = client.delete(f'/sync/{job_id}')
+
+        assert response.status_code == 200
+        assert response.json['job']['status'] == 'cancelled'
+
+    def test_cancel_missing(self, client):
+        response = client.delete('/sync/missing')
+
+        assert response.status_code == 404
+
+class TestDuplicates:
+    @patch('app.routes.schedule_duplicate_report', return_value=True)
+    def test_build(self, mock_schedule_duplicate_report, client):
+        response = client.post('/duplicates', json={
+            'owner': 'test_owner', 'repository': 'test_repository', 'threshold': 0.85
+        })
+
+        assert response.status_code == 202
+        assert response.json == {'name': 'test_owner/test_repository', 'running': True, 'scheduled': True}
+        mock_schedule_duplicate_report.assert_called_once_with('test_owner/test_repository', 0.85)
+
+    def test_build_invalid_threshold(self, client):
+        response = client.post('/duplicates', json={
+            'owner': 'test_owner', 'repository': 'test_repository', 'threshold': 2
+        })
+
+        assert response.status_code == 400
+        assert response.json == {'errorMessage': 'Invalid value for threshold: 2'}
+
+    @patch('app.routes.is_duplicate_report_running', return_value=False)
+    @patch('app.routes.get_duplicate_report')
+    def test_get(self, mock_get_duplicate_report, _mock_is_duplicate_report_running, client):
+        mock_get_duplicate_report.return_value = {'name': 'test_owner/test_repository', 'clusters': []}
+
+        response = client.get('/duplicates/test_owner/test_repository')
+
+        assert response.status_code == 200
+        assert response.json == {
+            'report': {'name': 'test_owner/test_repository', 'clusters': []},
+            'running': False
+        }
+
+    @patch('app.routes.is_duplicate_report_running', return_value=True)
+    @patch('app.routes.get_duplicate_report', side_effect=DuplicateReportNotFoundError('test_owner/test_repository'))
+    def test_get_missing(self, _mock_get_duplicate_report, _mock_is_duplicate_report_running, client):
+        response = client.get('/duplicates/test_owner/test_repository')
+
+        assert response.status_code == 404
+        assert response.json == {
+            'errorMessage': 'No duplicate report for test_owner/test_repository',
+            'running': True
+        }
+
+class TestGithubWebhook:
+    def post_event(self, client, payload, secret='test_secret', event='issues'):
+        body = json.dumps(payload).encode('utf-8')
+        signature = 'sha256=' + hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+        return client.post('/webhooks/github', data=body, content_type='application/json', headers={
+            'X-GitHub-Event': event, 'X-Hub-Signature-256': signature
+        })
+
+    @patch('app.routes.handle_webhook_event')
+    def test_success(self, mock_handle_webhook_event, test_app, client):
+        test_app.config['GITHUB_WEBHOOK_SECRET'] = 'test_secret'
+        mock_handle_webhook_event.return_value = {'event': 'issues', 'status': 'upserted'}
+        payload = {'action': 'opened', 'issue': {'number': 1}}
+
+        response = self.post_event(client, payload)
+
+        assert response.status_code == 200
+        assert response.json == {'result': {'event': 'issues', 'status': 'upserted'}}
+        mock_handle_webhook_event.assert_called_once_with('issues', payload)
+
+    @patch('app.routes.handle_webhook_event')
+    def test_invalid_signature(self, mock_handle_webhook_event, test_app, client):
+        test_app.config['GITHUB_WEBHOOK_SECRET'] = 'test_secret'
+
+        response = self.post_event(client, {'action': 'opened'}, secret='other_secret')
+
+        assert response.status_code == 401
+        mock_handle_webhook_event.assert_not_called()
+
+    @patch('app.routes.handle_webhook_event')
+    def test_disabled(self, mock_handle_webhook_event, client):
+        response = self.post_event(client, {'action': 'opened'})
+
+        assert response.status_code == 403
+        mock_handle_webhook_event.assert_not_called()
+
+class TestMetrics:
+    def test_success(self, client):
+        response = client.get('/metrics')
+
+        assert response.status_code == 200
+        assert response.content_type == 'text/plain; version=0.0.4; charset=utf-8'
+        assert '# TYPE github_requests_total counter' in response.text
+        assert '# TYPE search_seconds histogram' in response.text
+
+    def test_disabled(self, test_app, client):
+        test_app.config['METRICS_ENABLED'] = False
+
+        assert client.get('/metrics').status_code == 404
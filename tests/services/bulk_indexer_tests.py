@@ -0,0 +1,129 @@
+# pylint: disable=W0621,W0613
+
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from app import create_app, db
+from app.repositories.index_version_repository import IndexVersionRepository
+from app.repositories.issue_repository import IssueRepository
+from app.repositories.sync_state_repository import SyncStateRepository
+from app.services.bulk_indexer import index_repository
+from app.services.sync_progress import SyncProgress
+from app.utils.exceptions import RateLimitExceededError, IssueFetchFailedError, SyncCancelledError
+
+from tests.testing_config import TestingConfig
+
+@pytest.fixture
+def test_app():
+    app = create_app(TestingConfig)
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+def create_latest_issue(number, updated='2024-01-01T00:00:00Z'):
+    return {
+        'number': number,
+        'title': f'Issue {number}',
+        'html_url': f'https://github.com/test_owner/test_repo/issues/{number}',
+        'state': 'open',
+        'body': f'Description of issue {number}',
+        'updated_at': updated
+    }
+
+@pytest.fixture
+def mock_fetch_issues():
+    with patch('app.services.bulk_indexer.fetch_issues') as mock:
+        mock.return_value = [create_latest_issue(number) for number in range(1, 6)]
+        yield mock
+
+@pytest.fixture
+def mock_fetch_comments_for_issue():
+    with patch('app.services.bulk_indexer.fetch_comments_for_issue') as mock:
+        mock.side_effect = lambda _semaphore, _owner, _repository, number: [{'body': f'Comment on {number}'}]
+        yield mock
+
+@pytest.fixture
+def mock_generate_serialized_embeddings():
+    with patch('app.services.bulk_indexer.issue_searcher.generate_serialized_embeddings') as mock:
+        mock.side_effect = lambda documents: [(np.ones(2, dtype=np.float32).tobytes(), '2')] * len(documents)
+        yield mock
+
+@pytest.mark.usefixtures('test_app', 'mock_fetch_issues', 'mock_fetch_comments_for_issue')
+class TestIndexRepository:
+    @pytest.mark.asyncio
+    async def test_batches(self, mock_generate_serialized_embeddings):
+        progress = await index_repository('test_owner', 'test_repo', batch_size=2, concurrency=3)
+
+        assert (progress.fetched, progress.total, progress.embedded, progress.persisted) == (5, 5, 5, 5)
+        assert [len(call.args[0]) for call in mock_generate_serialized_embeddings.call_args_list] == [2, 2, 1]
+        issue = IssueRepository.select_by_primary_key('test_owner/test_repo', 3)
+        assert issue.comments == ['Description of issue 3', 'Comment on 3']
+        assert issue.terms['comment'] == 1
+        # Every batch is stored as a checkpoint
+        assert IndexVersionRepository.select_version('test_owner/test_repo') == 3
+        assert SyncStateRepository.select_by_name('test_owner/test_repo') is not None
+
+    @pytest.mark.asyncio
+    async def test_resumes_after_stored_issues(self, mock_fetch_issues, mock_generate_serialized_embeddings):
+        await index_repository('test_owner', 'test_repo', batch_size=2)
+        mock_generate_serialized_embeddings.reset_mock()
+        mock_fetch_issues.return_value[1] = create_latest_issue(2, updated='2024-02-01T00:00:00Z')
+
+        progress = await index_repository('test_owner', 'test_repo', batch_size=2)
+
+        assert (progress.fetched, progress.total, progress.persisted) == (5, 1, 1)
+        assert mock_generate_serialized_embeddings.call_args.args[0][0][0] == 'Issue 2'
+        assert IssueRepository.count_by_name('test_owner/test_repo') == 5
+        assert IssueRepository.select_by_primary_key('test_owner/test_repo', 2).updated == '2024-02-01T00:00:00Z'
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_keeps_completed_batches(
+            self, mock_fetch_comments_for_issue, mock_generate_serialized_embeddings
+        ):
+        def fetch_comments_side_effect(_semaphore, _owner, _repository, number):
+            if number == 4:
+                raise RateLimitExceededError(0)
+            return []
+
+        mock_fetch_comments_for_issue.side_effect = fetch_comments_side_effect
+
+        with pytest.raises(RateLimitExceededError):
+            await index_repository('test_owner', 'test_repo', batch_size=2)
+
+        assert sorted(IssueRepository.select_updated_by_name('test_owner/test_repo')) == [1, 2, 3]
+        assert SyncStateRepository.select_by_name('test_owner/test_repo') is None
+
+    @pytest.mark.asyncio
+    async def test_failed_issues(self, mock_fetch_comments_for_issue, mock_generate_serialized_embeddings):
+        def fetch_comments_side_effect(_semaphore, _owner, _repository, number):
+            if number == 2:
+                raise RuntimeError('boom')
+            return []
+
+        mock_fetch_comments_for_issue.side_effect = fetch_comments_side_effect
+
+        with pytest.raises(IssueFetchFailedError) as excinfo:
+            await index_repository('test_owner', 'test_repo', batch_size=2)
+
+        assert excinfo.value.failed_issue_ids == [2]
+        assert IssueRepository.count_by_name('test_owner/test_repo') == 4
+
+    @pytest.mark.asyncio
+    async def test_cancelled(self, mock_generate_serialized_embeddings):
+        progress = SyncProgress('test_owner/test_repo')
+        progress.cancel()
+
+        with pytest.raises(SyncCancelledError):
+            await index_repository('test_owner', 'test_repo', progress=progress)
+
+        mock_generate_serialized_embeddings.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_builds_embedding_store(self, test_app, tmp_path, mock_generate_serialized_embeddings):
+        test_app.config['EMBEDDING_STORE_DIR'] = str(tmp_path)
+
+        await index_repository('test_owner', 'test_repo')
+
+        assert (tmp_path / 'test_owner__test_repo.json').exists()
@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from app.services.duplicate_clusterer import iter_similar_pairs, cluster_embeddings, find_roots, union_pairs
+
+class TestIterSimilarPairs:
+    @pytest.mark.parametrize('block_size', [1, 3, 7, 100])
+    def test_matches_full_matrix(self, block_size):
+        rng = np.random.default_rng(0)
+        matrix = rng.standard_normal((20, 8)).astype(np.float32)
+        normalized = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+        full_scores = normalized @ normalized.T
+        expected = {
+            (i, j) for i in range(20) for j in range(i + 1, 20) if full_scores[i, j] >= 0.3
+        }
+
+        pairs = set()
+        for rows, columns, scores in iter_similar_pairs(matrix, 0.3, block_size):
+            assert np.all(rows < columns)
+            assert np.allclose(scores, full_scores[rows, columns], atol=1e-5)
+            pairs.update(zip(rows.tolist(), columns.tolist()))
+
+        assert pairs == expected
+
+    def test_memmap(self, tmp_path):
+        matrix = np.memmap(tmp_path / 'embeddings.f32', dtype=np.float32, mode='w+', shape=(3, 2))
+        matrix[:] = [[1.0, 0.0], [2.0, 0.0], [0.0, 1.0]]
+
+        pairs = [
+            (row, column) for rows, columns, _ in iter_similar_pairs(matrix, 0.9, 2)
+            for row, column in zip(rows.tolist(), columns.tolist())
+        ]
+
+        assert pairs == [(0, 1)]
+
+    def test_rows(self):
+        matrix = np.array([[1.0, 0.0], [0.0, 1.0], [2.0, 0.0], [0.0, 3.0]], dtype=np.float32)
+
+        pairs = [
+            (row, column) for rows, columns, _ in iter_similar_pairs(matrix, 0.9, 2, rows=np.array([3, 0, 2]))
+            for row, column in zip(rows.tolist(), columns.tolist())
+        ]
+
+        assert pairs == [(1, 2)]
+
+class TestClusterEmbeddings:
+    def test_connected_components(self):
+        first_axis, second_axis, third_axis = np.eye(3, dtype=np.float32)
+        matrix = np.stack([
+            first_axis,
+            third_axis,
+            first_axis + 0.1 * second_axis,
+            first_axis + 0.3 * second_axis,
+            second_axis,
+            second_axis + 0.05 * third_axis
+        ])
+
+        clusters = cluster_embeddings(matrix, 0.95, block_size=2)
+
+        assert [members for members, _ in clusters] == [[0, 2, 3], [4, 5]]
+        assert clusters[1][1] == pytest.approx(1 / np.sqrt(1.0025), abs=1e-5)
+
+    def test_chained_links(self):
+        angles = np.radians([0, 10, 20, 30, 90])
+        matrix = np.stack([np.cos(angles), np.sin(angles)], axis=1).astype(np.float32)
+
+        clusters = cluster_embeddings(matrix, np.cos(np.radians(12)), block_size=2)
+
+        assert [members for members, _ in clusters] == [[0, 1, 2, 3]]
+
+    def test_rows(self):
+        matrix = np.array([[1.0, 0.0], [0.0, 1.0], [2.0, 0.0], [0.0, 3.0]], dtype=np.float32)
+
+        clusters = cluster_embeddings(matrix, 0.9, rows=np.array([0, 1, 2]))
+
+        assert [members for members, _ in clusters] == [[0, 2]]
+
+    def test_no_duplicates(self):
+        assert not cluster_embeddings(np.eye(4, dtype=np.float32), 0.9)
+
+    @pytest.mark.parametrize('block_size', [1, 4, 16, 100])
+    def test_matches_components_of_full_graph(self, block_size):
+        rng = np.random.default_rng(1)
+        matrix = rng.standard_normal((60, 4)).astype(np.float32)
+        normalized = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+        rows, columns = np.nonzero(np.triu(normalized @ normalized.T, k=1) >= 0.9)
+        graph = coo_matrix((np.ones(len(rows)), (rows, columns)), shape=(60, 60))
+        _, labels = connected_components(graph, directed=False)
+        linked = set(rows.tolist()) | set(columns.tolist())
+        expected = {
+            frozenset(i for i in linked if labels[i] == label) for label in {labels[i] for i in linked}
+        }
+
+        clusters = cluster_embeddings(matrix, 0.9, block_size=block_size)
+
+        assert {frozenset(members) for members, _ in clusters} == expected
+
+class TestUnionPairs:
+    def test_success(self):
+        parents = np.arange(6)
+
+        union_pairs(parents, np.array([0, 4]), np.array([3, 5]))
+        union_pairs(parents, np.array([3]), np.array([5]))
+
+        assert find_roots(parents, np.arange(6)).tolist() == [0, 1, 2, 0, 0, 0]
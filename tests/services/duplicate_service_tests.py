@@ -0,0 +1,98 @@
+# pylint: disable=W0621,W0613
+
+import time
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from app import create_app, db
+from app.models.issue_model import Issue
+from app.repositories.index_version_repository import IndexVersionRepository
+from app.repositories.issue_repository import IssueRepository
+from app.repositories.embedding_store import get_embedding_store
+from app.services.duplicate_service import (
+    build_duplicate_report, get_duplicate_report, schedule_duplicate_report, is_duplicate_report_running
+)
+from app.utils.exceptions import DuplicateReportNotFoundError
+
+from tests.testing_config import TestingConfig
+
+@pytest.fixture
+def test_app():
+    app = create_app(TestingConfig)
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+def create_issue(number, embedding, name='test_owner/test_repo'):
+    return Issue(
+        name=name, number=number, title=f'Issue {number}', url=f'https://github.com/{name}/issues/{number}',
+        state='open', comments=['comment'], embedding=np.asarray(embedding, dtype=np.float32).tobytes(),
+        shape='3', updated='2024-01-01'
+    )
+
+@pytest.fixture
+def stored_issues(test_app):
+    IssueRepository.bulk_insert([
+        create_issue(1, [1.0, 0.0, 0.0]),
+        create_issue(2, [0.0, 1.0, 0.0]),
+        create_issue(3, [1.0, 0.01, 0.0]),
+        create_issue(4, [0.0, 0.0, 1.0]),
+        create_issue(5, [1.0, 0.0, 0.0], name='test_owner/other_repo')
+    ])
+
+@pytest.mark.usefixtures('stored_issues')
+class TestBuildDuplicateReport:
+    def test_success(self):
+        report = build_duplicate_report('test_owner/test_repo', threshold=0.9, block_size=2)
+
+        assert report.total_issues == 4
+        assert len(report.clusters) == 1
+        assert [issue.number for issue in report.clusters[0].issues] == [1, 3]
+        assert report.clusters[0].issues[0].title == 'Issue 1'
+        assert report.clusters[0].similarity == pytest.approx(1.0, abs=1e-3)
+        assert get_duplicate_report('test_owner/test_repo') == report
+
+    def test_reads_embedding_store(self, test_app, tmp_path):
+        test_app.config['EMBEDDING_STORE_DIR'] = str(tmp_path)
+        store = get_embedding_store()
+        store.write('test_owner/test_repo', [1, 2, 3, 4], np.eye(4, 3, dtype=np.float32))
+        # The later row of issue 2 supersedes its first one
+        store.append('test_owner/test_repo', [2], np.array([[1.0, 0.0, 0.0]], dtype=np.float32))
+
+        with patch.object(IssueRepository, 'iter_embeddings_by_name') as mock_iter_embeddings:
+            report = build_duplicate_report('test_owner/test_repo', threshold=0.9, block_size=2)
+
+        mock_iter_embeddings.assert_not_called()
+        assert report.total_issues == 4
+        assert [[issue.number for issue in cluster.issues] for cluster in report.clusters] == [[1, 2]]
+
+    def test_empty_repository(self):
+        report = build_duplicate_report('test_owner/empty_repo')
+
+        assert report.total_issues == 0
+        assert not report.clusters
+        assert report.threshold == 0.9
+
+    def test_stale_report(self):
+        build_duplicate_report('test_owner/test_repo')
+        IndexVersionRepository.increment('test_owner/test_repo')
+
+        assert get_duplicate_report('test_owner/test_repo').stale
+
+    def test_not_found(self):
+        with pytest.raises(DuplicateReportNotFoundError):
+            get_duplicate_report('test_owner/test_repo')
+
+@pytest.mark.usefixtures('stored_issues')
+class TestScheduleDuplicateReport:
+    def test_builds_in_background(self):
+        assert schedule_duplicate_report('test_owner/test_repo')
+        for _ in range(500):
+            if not is_duplicate_report_running('test_owner/test_repo'):
+                break
+            time.sleep(0.01)
+
+        assert not is_duplicate_report_running('test_owner/test_repo')
+        assert len(get_duplicate_report('test_owner/test_repo').clusters) == 1
@@ -1,5 +1,6 @@
 # pylint: disable=W0621
 
+from contextlib import contextmanager
 from unittest.mock import MagicMock, AsyncMock, patch
 from typing import Any
 
@@ -8,10 +9,13 @@ import pytest
 import httpx
 from flask import Flask
 
-from app.services.github_client import fetch_issues, fetch_comments_for_issue
+from app.services.github_client import fetch_issues, fetch_comments_for_issue, fetch_organization_repositories
 from app.utils.exceptions import (
-    RepositoryNotFoundError, RateLimitExceededError, UnauthorizedError
+    RepositoryNotFoundError, RateLimitExceededError, UnauthorizedError, OrganizationNotFoundError
 )
+from app.utils.metrics import metrics, github_requests, github_rate_limit_remaining
+
+from tests.mock_github_server import MockGitHubConfig, run_mock_github_server
 
 @pytest.fixture
 def app_context():
@@ -184,6 +188,49 @@ class TestFetchIssues:
             timeout=30,
         )
 
+@pytest.mark.usefixtures('app_context')
+class TestFetchOrganizationRepositories:
+    @pytest.mark.asyncio
+    @patch('app.services.github_client.httpx.AsyncClient')
+    async def test_success(self, mock_async_client_class):
+        mock_client = AsyncMock()
+        mock_async_client_class.return_value.__aenter__.return_value = mock_client
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.side_effect = [
+            [{'full_name': 'test_owner/repo1'}, {'full_name': 'test_owner/old', 'archived': True}],
+            [{'full_name': 'test_owner/repo2', 'archived': False}],
+            []
+        ]
+        mock_client.get.return_value = mock_response
+
+        repositories = await fetch_organization_repositories('test_owner')
+
+        assert repositories == ['test_owner/repo1', 'test_owner/repo2']
+        assert mock_client.get.call_count == 3
+        mock_client.get.assert_any_call(
+            'https://api.github.com/orgs/test_owner/repos',
+            headers={'Authorization': 'token fake_token'},
+            params={'type': 'all', 'per_page': 100, 'page': 1},
+            timeout=30,
+        )
+
+    @pytest.mark.asyncio
+    @patch('app.services.github_client.httpx.AsyncClient')
+    async def test_organization_not_found(self, mock_async_client_class):
+        mock_client = AsyncMock()
+        mock_async_client_class.return_value.__aenter__.return_value = mock_client
+
+        mock_response = MagicMock()
+        mock_response.status_code = 404
+        mock_client.get.return_value = mock_response
+
+        with pytest.raises(OrganizationNotFoundError) as exc_info:
+            await fetch_organization_repositories('test_owner')
+
+        assert str(exc_info.value) == 'Organization not found: https://github.com/test_owner'
+
 class TestFetchCommentsForIssue:
     app: Flask
     app_context: Any
@@ -368,3 +415,67 @@ class TestFetchCommentsForIssue:
 
         assert comments == []
         assert mock_fetch_page_comments.call_count == 1
+
+class TestMockGitHubServer:
+    app: Flask
+    app_context: Any
+    def setup_method(self):
+        self.app = Flask(__name__)
+        self.app.config['GITHUB_ACCESS_TOKEN'] = 'test_token'
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+    def teardown_method(self):
+        self.app_context.pop()
+
+    @contextmanager
+    def mock_server(self, **kwargs):
+        with run_mock_github_server(MockGitHubConfig(**kwargs)) as mock_app:
+            self.app.config['GITHUB_API_URL'] = mock_app.config['MOCK_GITHUB_URL']
+            yield mock_app
+
+    @pytest.mark.asyncio
+    async def test_fetch_issues(self):
+        with self.mock_server(issues=250, token='test_token') as mock_app:
+            issues = await fetch_issues('test_owner', 'test_repo')
+
+        assert sorted(issue['number'] for issue in issues) == list(range(1, 251))
+        # Three pages and the empty page that ends the listing
+        assert mock_app.config['MOCK_GITHUB_STATS'].requests == 4
+
+    @pytest.mark.asyncio
+    async def test_fetch_comments_for_issue(self):
+        with self.mock_server(issues=5, comments=120):
+            comments = await fetch_comments_for_issue(asyncio.Semaphore(2), 'test_owner', 'test_repo', 3)
+
+        assert len(comments) == 120
+
+    @pytest.mark.asyncio
+    async def test_fetch_organization_repositories(self):
+        with self.mock_server(repositories=3):
+            repositories = await fetch_organization_repositories('test_owner')
+
+        assert repositories == ['test_owner/repo1', 'test_owner/repo2', 'test_owner/repo3']
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_exceeded(self):
+        with self.mock_server(issues=250, rate_limit=2):
+            with pytest.raises(RateLimitExceededError):
+                await fetch_issues('test_owner', 'test_repo')
+
+    @pytest.mark.asyncio
+    async def test_records_metrics(self):
+        metrics.reset()
+        with self.mock_server(issues=250, rate_limit=2):
+            with pytest.raises(RateLimitExceededError):
+                await fetch_issues('test_owner', 'test_repo')
+
+        assert github_requests.value(status='200') == 2
+        assert github_requests.value(status='403') == 1
+        assert github_rate_limit_remaining.value() == 0
+
+    @pytest.mark.asyncio
+    async def test_injected_errors(self):
+        with self.mock_server(error_rate=1.0):
+            with pytest.raises(httpx.HTTPStatusError):
+                await fetch_comments_for_issue(asyncio.Semaphore(1), 'test_owner', 'test_repo', 1)
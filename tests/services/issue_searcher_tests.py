@@ -1,11 +1,14 @@
+import threading
 from unittest.mock import patch
 
 import pytest
 import numpy as np
-import torch
+from sentence_transformers import SentenceTransformer
 
-from app.services.issue_searcher import preprocess_text, IssueSearcher
+from app.repositories.embedding_store import EmbeddingStore
+from app.services.issue_searcher import preprocess_text, fuse_scores, IssueSearcher
 from app.schemas.issue_schema import IssueSchema
+from app.schemas.issue_corpus_schema import IssueCorpusSchema
 
 class TestPreprocessText:
     def test_not_text(self):
@@ -43,9 +46,20 @@ class TestPreprocessText:
         expected_output = 'this text is already clean and has no special elements'
         assert preprocess_text(input_text) == expected_output
 
+class TestFuseScores:
+    def test_success(self):
+        fused = fuse_scores(np.array([0.8, 0.6]), np.array([2.0, 4.0]), 0.5)
+
+        assert fused == pytest.approx([0.65, 0.8])
+
+    def test_without_lexical_matches(self):
+        semantic_scores = np.array([0.8, 0.6])
+
+        assert fuse_scores(semantic_scores, np.zeros(2), 0.5) is semantic_scores
+
 class TestIssueSearcher:
     @pytest.mark.asyncio
-    @patch('app.services.issue_searcher.SentenceTransformer.encode')
+    @patch.object(SentenceTransformer, 'encode')
     async def test_generate_serialized_embedding(self, mock_encode):
         searcher = IssueSearcher()
 
@@ -60,9 +74,38 @@ class TestIssueSearcher:
 
         mock_encode.assert_called_once_with(input_text, convert_to_tensor=False)
 
-        assert embedding_bytes == embedding_np.tobytes()
+        embedding = np.frombuffer(embedding_bytes, dtype=np.float32)
+        assert np.allclose(embedding, embedding_np / np.linalg.norm(embedding_np))
         assert shape_str == '768'
 
+    @pytest.mark.asyncio
+    @patch.object(SentenceTransformer, 'encode')
+    async def test_generate_serialized_embedding_off_the_event_loop(self, mock_encode):
+        threads = []
+
+        def encode(*args, **kwargs):
+            threads.append(threading.get_ident())
+            return np.ones(768, dtype=np.float32)
+
+        mock_encode.side_effect = encode
+
+        await IssueSearcher().generate_serialized_embedding('Issue Title', ['Comment one.'])
+
+        assert threads and threads[0] != threading.get_ident()
+
+    @patch.object(SentenceTransformer, 'encode')
+    def test_generate_serialized_embeddings(self, mock_encode):
+        searcher = IssueSearcher()
+        embeddings_np = np.random.rand(2, 768).astype(np.float32)
+        mock_encode.return_value = embeddings_np
+
+        embeddings = searcher.generate_serialized_embeddings([('Title 1', ['Body 1', None]), ('Title 2', None)])
+
+        mock_encode.assert_called_once_with(['title 1 body 1', 'title 2'], convert_to_tensor=False)
+        assert [shape for _, shape in embeddings] == ['768', '768']
+        for (embedding, _), embedding_np in zip(embeddings, embeddings_np):
+            assert np.allclose(np.frombuffer(embedding, dtype=np.float32), embedding_np / np.linalg.norm(embedding_np))
+
     def test_deserialize_embedding(self):
         searcher = IssueSearcher()
 
@@ -72,7 +115,7 @@ class TestIssueSearcher:
 
         deserialized_embedding = searcher.deserialize_embedding(embedding_bytes, shape_str)
 
-        assert torch.allclose(torch.from_numpy(embedding_np), deserialized_embedding)
+        assert np.array_equal(embedding_np, deserialized_embedding)
 
 
     @pytest.mark.asyncio
@@ -83,7 +126,8 @@ class TestIssueSearcher:
         # Manually set the embedding vector
         # fake_embedding_2 and fake_search_embedding are set to the same vector to increase the similarity
         fixed_vector = np.ones(768, dtype=np.float32)
-        fake_embedding_2 = fixed_vector
+        # Stored embeddings have unit length
+        fake_embedding_2 = fixed_vector / np.linalg.norm(fixed_vector)
         fake_search_embedding = fixed_vector
 
         # fake_embedding_1 is set to a different vector (low similarity)
@@ -128,3 +172,164 @@ class TestIssueSearcher:
 
         assert len(related_issues) == 1
         assert related_issues[0].number == 2
+        # The searched issues are left untouched
+        assert issues[1].threshold is None
+
+    @pytest.mark.asyncio
+    async def test_find_related_issues_with_embedding_view(self, tmp_path):
+        searcher = IssueSearcher()
+        searcher.set_threshold(0.5)
+
+        store = EmbeddingStore(str(tmp_path))
+        store.write('test_owner/test_repo', [2, 1], np.stack([
+            np.ones(768, dtype=np.float32),
+            np.zeros(768, dtype=np.float32)
+        ]))
+
+        issues = [
+            IssueSchema(
+                name='test_owner/test_repo',
+                number=number,
+                title=f'issue {number}',
+                url=f'https://github.com/test_owner/test_repo/issues/{number}',
+                state='open',
+                comments=[],
+                updated='2024-01-01'
+            ) for number in (1, 2)
+        ]
+
+        with patch.object(searcher.model, 'encode', return_value=np.ones(768, dtype=np.float32)):
+            related_issues = await searcher.find_related_issues(
+                issues, 'title', 'description', embeddings=store.load('test_owner/test_repo')
+            )
+
+        assert len(related_issues) == 1
+        assert related_issues[0].number == 2
+        assert related_issues[0].threshold == pytest.approx(1.0, abs=1e-4)
+
+    def test_rank_issue_corpus(self, tmp_path):
+        searcher = IssueSearcher()
+        searcher.set_threshold(0.5)
+
+        store = EmbeddingStore(str(tmp_path))
+        store.write('test_owner/test_repo', [3, 2, 1], np.eye(3, dtype=np.float32))
+        view = store.load('test_owner/test_repo')
+        corpus = IssueCorpusSchema(
+            name='test_owner/test_repo', numbers=np.array([1, 2, 3]), titles=['issue 1', 'issue 2', 'issue 3'],
+            urls=['url1', 'url2', 'url3'], states=['open', 'closed', 'open'], comments=[[], ['comment'], []],
+            embeddings=[b'', b'', b'']
+        )
+
+        with patch.object(searcher.model, 'encode', return_value=np.array([0.0, 1.0, 0.0], dtype=np.float32)):
+            related_issues = searcher.rank_issues(corpus, 'title', 'description', embeddings=view)
+
+        assert [(issue.number, issue.state, issue.comments) for issue in related_issues] == [(2, 'closed', ['comment'])]
+        # The rows of the issues are looked up once per version of the view
+        assert corpus.row_indices(view) is corpus.row_indices(view)
+
+    def test_model_is_loaded_on_first_use(self):
+        searcher = IssueSearcher()
+
+        with patch('sentence_transformers.SentenceTransformer') as mock_sentence_transformer:
+            assert searcher.model is searcher.model
+
+        mock_sentence_transformer.assert_called_once_with('paraphrase-mpnet-base-v2')
+
+    @pytest.mark.asyncio
+    async def test_find_related_issues_without_issues(self):
+        searcher = IssueSearcher()
+        assert await searcher.find_related_issues([], 'title', 'description') == []
+
+    def test_encode_query_is_cached(self):
+        searcher = IssueSearcher()
+
+        with patch.object(searcher.model, 'encode', return_value=np.ones(768, dtype=np.float32)) as mock_encode:
+            first = searcher.encode_query('same query')
+            second = searcher.encode_query('same query')
+            searcher.encode_query('other query')
+
+        assert first is second
+        assert not first.flags.writeable
+        assert mock_encode.call_count == 2
+
+    def test_encode_queries_in_one_batch(self):
+        searcher = IssueSearcher()
+        searcher.encode_query('cached query')
+
+        with patch.object(
+            searcher.model, 'encode', return_value=np.stack([np.zeros(768), np.ones(768)]).astype(np.float32)
+        ) as mock_encode:
+            embeddings = searcher.encode_queries(['query 1', 'cached query', 'query 2', 'query 1'])
+
+        mock_encode.assert_called_once_with(['query 1', 'query 2'], convert_to_tensor=False)
+        assert embeddings.shape == (4, 768)
+        assert np.array_equal(embeddings[0], embeddings[3])
+        assert np.array_equal(embeddings[2], np.ones(768))
+
+    @pytest.mark.asyncio
+    async def test_find_related_issues_batch(self):
+        searcher = IssueSearcher()
+        searcher.set_threshold(0.5)
+
+        first_axis, second_axis = np.eye(2, 768, dtype=np.float32)
+        issues = [
+            IssueSchema(
+                name='test_owner/test_repo',
+                number=number,
+                title=f'issue {number}',
+                url=f'https://github.com/test_owner/test_repo/issues/{number}',
+                state='open',
+                comments=[],
+                embedding=embedding.tobytes(),
+                shape='768',
+                updated='2024-01-01'
+            ) for number, embedding in (
+                (1, first_axis), (2, second_axis), (3, (first_axis + second_axis) / np.float32(np.sqrt(2)))
+            )
+        ]
+
+        with patch.object(searcher.model, 'encode', return_value=np.stack([first_axis, second_axis])):
+            related_issues_list = await searcher.find_related_issues_batch(
+                issues, [('first', 'query'), ('second', 'query')]
+            )
+
+        assert [[issue.number for issue in related_issues] for related_issues in related_issues_list] == [
+            [1, 3], [2, 3]
+        ]
+        assert related_issues_list[0][0].threshold == pytest.approx(1.0)
+        assert related_issues_list[0][1].threshold == pytest.approx(1 / np.sqrt(2))
+
+    @pytest.mark.asyncio
+    async def test_find_related_issues_batch_without_issues(self):
+        searcher = IssueSearcher()
+        assert await searcher.find_related_issues_batch([], [('title', 'description')]) == [[]]
+
+    def test_rank_issues_with_lexical_scores(self):
+        searcher = IssueSearcher()
+        searcher.set_threshold(0.6)
+
+        issues = [
+            IssueSchema(
+                name='test_owner/test_repo',
+                number=number,
+                title=f'issue {number}',
+                url=f'https://github.com/test_owner/test_repo/issues/{number}',
+                state='open',
+                comments=[],
+                embedding=embedding.tobytes(),
+                shape='2',
+                updated='2024-01-01'
+            ) for number, embedding in (
+                (1, np.array([1.0, 1.0], dtype=np.float32) / np.float32(np.sqrt(2))),
+                (2, np.array([1.0, 0.0], dtype=np.float32))
+            )
+        ]
+
+        with patch.object(searcher.model, 'encode', return_value=np.array([1.0, 0.0], dtype=np.float32)):
+            related_issues = searcher.rank_issues(
+                issues, 'title', 'description', lexical_scores=np.array([3.0, 0.0]), lexical_weight=0.5
+            )
+
+        # The semantically closest issue has no lexical match and falls below the threshold
+        assert [issue.number for issue in related_issues] == [1]
+        assert related_issues[0].threshold == pytest.approx(0.5 / np.sqrt(2) + 0.5)
@@ -1,19 +1,58 @@
-# pylint: disable=W0621
+# pylint: disable=W0621,C0302
 
-from unittest.mock import ANY, patch
+import asyncio
+import threading
+import time
+from unittest.mock import ANY, PropertyMock, patch
+import numpy as np
 import pytest
 
+from flask import g
 from werkzeug.datastructures import ImmutableMultiDict
 
+from app import create_app
+from app.services.sync_queue import sync_queue
 from app.services.issue_service import (
     get_related_issues, get_issues, generate_issue_name,
-    generate_issue_schema, get_related_issues_detail
+    generate_issue_schema, get_related_issues_detail,
+    get_embedding_view, update_embedding_store,
+    get_cached_issues, load_stored_corpus, get_freshness, schedule_refresh,
+    stream_related_issues, get_issue_comments, get_related_issues_batch, persist_new_issues, split_latest_issues,
+    get_searchable_issues
 )
 from app.schemas.display_issue_schema import DisplayIssueSchema
 from app.schemas.issue_detail_schema import IssueDetaiSchema
+from app.schemas.freshness_schema import FreshnessSchema
 from app.schemas.issue_schema import IssueSchema
+from app.schemas.issue_corpus_schema import IssueCorpusSchema
 from app.models.issue_model import Issue
-from app.utils.exceptions import RateLimitExceededError, IssueFetchFailedError
+from app.repositories.issue_repository import IssueRepository
+from app.repositories.sync_state_repository import SyncStateRepository
+from app.repositories.index_version_repository import IndexVersionRepository
+from app.repositories.embedding_store import get_embedding_store
+from app.services.sync_progress import SyncProgress
+from app.utils.metrics import metrics, cache_hit_ratio
+from app.utils.exceptions import (
+    RateLimitExceededError, IssueFetchFailedError, SyncCancelledError, MissingFieldsError, IssueNotFoundError,
+    SyncJobFailedError
+)
+
+from tests.testing_config import TestingConfig
+
+def to_columns(corpus: IssueCorpusSchema) -> tuple:
+    return (
+        corpus.name, corpus.numbers.tolist(), corpus.titles, corpus.urls, corpus.states, corpus.comments,
+        corpus.embeddings
+    )
+
+@pytest.fixture
+def test_app():
+    return create_app(TestingConfig)
+
+@pytest.fixture(autouse=True)
+def app_context(test_app):
+    with test_app.app_context():
+        yield
 
 class TestGetRelatedIssues:
     @patch('app.services.issue_service.get_issues')
@@ -75,8 +114,10 @@ class TestGetRelatedIssues:
         related_issues, related_issues_detail = await get_related_issues(form_data)
 
         mock_get_issues.assert_called_once_with('test_owner', 'test_repo')
-        mock_find_related_issues.assert_called_once_with(
-            mock_get_issues.return_value, 'test_title', 'test_description')
+        mock_find_related_issues.assert_called_once_with(ANY, 'test_title', 'test_description', embeddings=None)
+        corpus = mock_find_related_issues.call_args.args[0]
+        assert corpus.numbers.tolist() == [1, 2]
+        assert corpus.comments == [['comment1', 'comment2'], ['comment3']]
 
         # Validating sorting
         assert related_issues == [
@@ -101,9 +142,236 @@ class TestGetRelatedIssues:
         ]
         assert related_issues_detail == IssueDetaiSchema(
             total=2,
-            message='There are 2 related issues.'
+            message='There are 2 related issues.',
+            freshness=FreshnessSchema(synced_at=None, age_seconds=None, stale=True, refreshing=False)
         )
 
+    @patch('app.services.issue_service.get_issues', return_value=[])
+    @patch('app.services.issue_service.issue_searcher.find_related_issues')
+    @pytest.mark.asyncio
+    async def test_response_options(self, mock_find_related_issues, _mock_get_issues):
+        mock_find_related_issues.return_value = [
+            DisplayIssueSchema(
+                name='test_owner/test_repo',
+                number=number,
+                title=f'issue{number}',
+                url='url',
+                state='open',
+                comments=['a long first comment', 'short'],
+                threshold=number / 10
+            ) for number in range(1, 6)
+        ]
+
+        related_issues, related_issues_detail = await get_related_issues({
+            'owner': 'test_owner',
+            'repository': 'test_repo',
+            'title': 'test_title',
+            'limit': 2,
+            'offset': 1,
+            'fields': 'number,comments',
+            'snippet_length': 6
+        })
+
+        assert related_issues == [
+            {'number': 4, 'comments': ['a long…', 'short']},
+            {'number': 3, 'comments': ['a long…', 'short']}
+        ]
+        assert related_issues_detail.total == 5
+
+    @patch('app.services.issue_service.get_issues', return_value=[])
+    @patch('app.services.issue_service.issue_searcher.find_related_issues')
+    @pytest.mark.asyncio
+    async def test_result_cache(self, mock_find_related_issues, _mock_get_issues):
+        mock_find_related_issues.return_value = [
+            DisplayIssueSchema(
+                name='test_owner/test_repo', number=1, title='issue1', url='url', state='open',
+                comments=[], threshold=0.7
+            )
+        ]
+        form_data = {'owner': 'test_owner', 'repository': 'test_repo', 'title': 'Test title'}
+        metrics.reset()
+
+        first, _ = await get_related_issues(form_data)
+        # The cache key uses the normalized query
+        second, _ = await get_related_issues({**form_data, 'title': 'test TITLE!'})
+        assert first == second
+        assert mock_find_related_issues.await_count == 1
+        assert cache_hit_ratio.value(cache='results') == pytest.approx(0.5)
+
+        # Persisting new embeddings bumps the index version
+        IndexVersionRepository.increment('test_owner/test_repo')
+        await get_related_issues(form_data)
+        assert mock_find_related_issues.await_count == 2
+
+    @patch('app.services.issue_service.get_cached_issues')
+    @patch('app.services.issue_service.get_issues')
+    @patch('app.services.issue_service.issue_searcher.find_related_issues')
+    @pytest.mark.asyncio
+    async def test_stale_mode(self, mock_find_related_issues, mock_get_issues, mock_get_cached_issues):
+        form_data = ImmutableMultiDict({
+            'owner': 'test_owner',
+            'repository': 'test_repo',
+            'title': 'test_title',
+            'mode': 'stale'
+        })
+        freshness = FreshnessSchema(synced_at='2024-01-01 00:00:00', age_seconds=900.0, stale=True, refreshing=True)
+        mock_get_cached_issues.return_value = ([], freshness)
+        mock_find_related_issues.return_value = []
+
+        related_issues, related_issues_detail = await get_related_issues(form_data)
+
+        assert related_issues == []
+        assert related_issues_detail.freshness == freshness
+        mock_get_cached_issues.assert_awaited_once_with('test_owner', 'test_repo')
+        mock_get_issues.assert_not_called()
+
+    @patch('app.services.issue_service.get_issues')
+    @patch('app.services.issue_service.issue_searcher.find_related_issues', return_value=[])
+    @pytest.mark.asyncio
+    async def test_webhook_managed_repository(self, mock_find_related_issues, mock_get_issues):
+        SyncStateRepository.upsert('test_owner/test_repo', time.time() - 3600)
+        SyncStateRepository.record_webhook('test_owner/test_repo', time.time())
+
+        _, related_issues_detail = await get_related_issues({
+            'owner': 'test_owner', 'repository': 'test_repo', 'title': 'test_title'
+        })
+
+        mock_get_issues.assert_not_called()
+        mock_find_related_issues.assert_awaited_once()
+        assert not related_issues_detail.freshness.stale
+
+class TestLexicalSearch:
+    def create_issue_schema(self, number, title):
+        return IssueSchema(
+            name='test_owner/test_repo', number=number, title=title, url='url', state='open',
+            comments=['description'], embedding=np.ones(2, dtype=np.float32).tobytes(), shape='2',
+            updated='2024-01-01'
+        )
+
+    @pytest.fixture
+    def stored_issues(self):
+        issues = [
+            self.create_issue_schema(1, 'Crash with ERR_CONNECTION_RESET'),
+            self.create_issue_schema(2, 'Dark mode'),
+            self.create_issue_schema(3, 'Slow start')
+        ]
+        persist_new_issues('test_owner/test_repo', issues, [])
+        return issues
+
+    def test_persist_records_terms(self, stored_issues):
+        issue = IssueRepository.select_by_primary_key('test_owner/test_repo', stored_issues[1].number)
+
+        assert issue.terms == {'dark': 1, 'mode': 1, 'description': 1}
+        assert IndexVersionRepository.select_version('test_owner/test_repo') == 1
+
+    @patch('app.services.issue_service.get_issues')
+    @patch('app.services.issue_service.issue_searcher.find_related_issues', return_value=[])
+    @pytest.mark.asyncio
+    async def test_hybrid_ranking(self, mock_find_related_issues, mock_get_issues, stored_issues):
+        mock_get_issues.return_value = stored_issues
+
+        await get_related_issues({
+            'owner': 'test_owner', 'repository': 'test_repo', 'title': 'err_connection_reset', 'ranking': 'hybrid'
+        })
+
+        kwargs = mock_find_related_issues.await_args.kwargs
+        assert kwargs['lexical_weight'] == 0.3
+        assert kwargs['lexical_scores'][0] > 0
+        assert not kwargs['lexical_scores'][1:].any()
+
+    @patch('app.services.issue_service.get_issues')
+    @patch('app.services.issue_service.issue_searcher.find_related_issues', return_value=[])
+    @pytest.mark.asyncio
+    async def test_lexical_prefilter(self, mock_find_related_issues, mock_get_issues, stored_issues, test_app):
+        test_app.config['LEXICAL_PREFILTER_K'] = 1
+        test_app.config['LEXICAL_PREFILTER_MIN_ISSUES'] = 1
+        mock_get_issues.return_value = stored_issues
+
+        await get_related_issues({'owner': 'test_owner', 'repository': 'test_repo', 'title': 'dark theme'})
+        corpus = mock_find_related_issues.await_args.args[0]
+        assert corpus.numbers.tolist() == [2]
+        assert corpus.titles == ['Dark mode']
+
+        # Without any lexical match every issue is scored
+        await get_related_issues({'owner': 'test_owner', 'repository': 'test_repo', 'title': 'unrelated'})
+        assert mock_find_related_issues.await_args.args[0].numbers.tolist() == [1, 2, 3]
+
+    @patch('app.services.issue_service.get_issues')
+    @patch('app.services.issue_service.issue_searcher.find_related_issues', return_value=[])
+    @pytest.mark.asyncio
+    async def test_lexical_prefilter_keeps_full_embedding_store(
+            self, mock_find_related_issues, mock_get_issues, stored_issues, test_app, tmp_path
+        ):
+        test_app.config['LEXICAL_PREFILTER_K'] = 1
+        test_app.config['LEXICAL_PREFILTER_MIN_ISSUES'] = 1
+        test_app.config['EMBEDDING_STORE_DIR'] = str(tmp_path)
+        mock_get_issues.return_value = stored_issues
+
+        await get_related_issues({'owner': 'test_owner', 'repository': 'test_repo', 'title': 'dark theme'})
+
+        assert mock_find_related_issues.await_args.args[0].numbers.tolist() == [2]
+        view = mock_find_related_issues.await_args.kwargs['embeddings']
+        assert sorted(view.rows) == [1, 2, 3]
+        assert sorted(get_embedding_store().load('test_owner/test_repo').rows) == [1, 2, 3]
+
+class TestSearchSeconds:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('search', [get_related_issues, get_related_issues_batch])
+    @patch('app.services.issue_service.search_seconds')
+    @patch('app.services.issue_service.get_issues')
+    async def test_includes_the_sync(self, mock_get_issues, mock_search_seconds, search):
+        async def sync(_owner, _repository):
+            await asyncio.sleep(0.05)
+            return []
+
+        mock_get_issues.side_effect = sync
+
+        await search({
+            'owner': 'test_owner', 'repository': 'test_repo', 'title': 'title', 'queries': [{'title': 'title'}]
+        })
+
+        mock_search_seconds.observe.assert_called_once_with(ANY, repository_size='<1k')
+        assert mock_search_seconds.observe.call_args.args[0] >= 0.05
+
+class TestGetRelatedIssuesBatch:
+    def create_display_issue_schema(self, number, threshold):
+        return DisplayIssueSchema(
+            name='test_owner/test_repo', number=number, title=f'issue{number}', url='url', state='open',
+            comments=[], threshold=threshold
+        )
+
+    @patch('app.services.issue_service.get_issues', return_value=[])
+    @patch('app.services.issue_service.issue_searcher.find_related_issues_batch')
+    @pytest.mark.asyncio
+    async def test_success(self, mock_find_related_issues_batch, mock_get_issues):
+        mock_find_related_issues_batch.side_effect = [
+            [[self.create_display_issue_schema(1, 0.6), self.create_display_issue_schema(2, 0.9)], []],
+            [[self.create_display_issue_schema(3, 0.7)]]
+        ]
+        form_data = {
+            'owner': 'test_owner',
+            'repository': 'test_repo',
+            'queries': [{'title': 'title1', 'description': 'description1'}, {'title': 'title2'}]
+        }
+
+        results = await get_related_issues_batch(form_data)
+
+        mock_get_issues.assert_awaited_once_with('test_owner', 'test_repo')
+        mock_find_related_issues_batch.assert_awaited_once_with(
+            ANY, [('title1', 'description1'), ('title2', None)], embeddings=None
+        )
+        assert len(mock_find_related_issues_batch.await_args.args[0]) == 0
+        assert [[issue.number for issue in issues] for issues, _ in results] == [[2, 1], []]
+        assert [detail.total for _, detail in results] == [2, 0]
+
+        # Only the query that was not searched before is scored
+        results = await get_related_issues_batch({
+            **form_data, 'queries': [{'title': 'title3'}, {'title': 'title1', 'description': 'description1'}]
+        })
+
+        assert mock_find_related_issues_batch.await_args.args[1] == [('title3', None)]
+        assert [[issue.number for issue in issues] for issues, _ in results] == [[3], [2, 1]]
+
 class TestGetIssues:
     def create_issue(
             self, number, name='test_owner/test_repo', comments=None,
@@ -216,13 +484,14 @@ class TestGetIssues:
             )
         ]
 
-        assert issues == expected_issues
+        assert to_columns(issues) == to_columns(IssueCorpusSchema.from_issues(expected_issues))
         mock_select_by_name.assert_called_once_with(f'{owner}/{repository}')
         mock_fetch_issues.assert_called_once_with(owner, repository)
         mock_fetch_comments_for_issue.assert_awaited_once_with(ANY, owner, repository, 2)
         mock_generate_issue_schema.assert_awaited_once()
         mock_bulk_insert.assert_called_once()
         mock_delete_all_by_primary_key.assert_called_once()
+        assert IndexVersionRepository.select_version('test_owner/test_repo') == 1
 
     @pytest.mark.asyncio
     @patch('app.services.issue_service.IssueRepository.bulk_insert')
@@ -287,7 +556,8 @@ class TestGetIssues:
             )
         ]
 
-        assert issues == expected_issues
+        assert to_columns(issues) == to_columns(IssueCorpusSchema.from_issues(expected_issues))
+        assert SyncStateRepository.select_by_name(f'{owner}/{repository}') is not None
         mock_select_by_name.assert_called_once_with(f'{owner}/{repository}')
         mock_fetch_issues.assert_called_once_with(owner, repository)
         mock_fetch_comments_for_issue.assert_not_called()
@@ -359,6 +629,7 @@ class TestGetIssues:
         with pytest.raises(IssueFetchFailedError) as exc_info:
             await get_issues(owner, repository)
         assert exc_info.value.failed_issue_ids == [1]
+        assert SyncStateRepository.select_by_name(f'{owner}/{repository}') is None
 
         mock_fetch_comments_for_issue.assert_awaited_once_with(ANY, owner, repository, 1)
         mock_generate_issue_schema.assert_not_called()
@@ -419,6 +690,472 @@ class TestGetIssues:
         mock_generate_issue_schema.assert_awaited_once()
         mock_bulk_insert.assert_not_called()
 
+    @pytest.mark.asyncio
+    @patch('app.services.issue_service.generate_issue_schema')
+    @patch('app.services.issue_service.fetch_comments_for_issue', return_value=[])
+    @patch('app.services.issue_service.fetch_issues')
+    async def test_records_stage_timings(
+        self, mock_fetch_issues, _mock_fetch_comments_for_issue, mock_generate_issue_schema
+    ):
+        mock_fetch_issues.return_value = [{
+            'number': 1, 'title': 'Issue 1', 'html_url': 'url', 'state': 'open', 'body': 'body',
+            'updated_at': '2024-01-01T00:00:00Z'
+        }]
+        mock_generate_issue_schema.return_value = IssueSchema(
+            name='test_owner/test_repo', number=1, title='Issue 1', url='url', state='open', comments=['body'],
+            embedding=np.zeros(2, dtype=np.float32).tobytes(), shape='2', updated='2024-01-01T00:00:00Z'
+        )
+        g.stage_timings = {}
+
+        await get_issues('test_owner', 'test_repo')
+
+        assert set(g.stage_timings) == {'db_read', 'list', 'comments', 'embed', 'db_write'}
+
+    @patch('app.services.issue_service.IssueSchema')
+    def test_split_latest_issues_builds_columns_from_stored_rows(self, mock_issue_schema):
+        stored = {1: self.create_issue(1, comments=['description']), 2: self.create_issue(2)}
+        latest_issues = [
+            {'number': number, 'title': f'Issue {number}', 'state': 'open', 'updated_at': updated,
+             'html_url': f'https://github.com/test_owner/test_repo/issues/{number}'}
+            for number, updated in ((1, '2024-01-01T00:00:00Z'), (2, '2024-02-01T00:00:00Z'))
+        ]
+
+        corpus, to_fetch = split_latest_issues('test_owner/test_repo', latest_issues, stored)
+
+        assert to_columns(corpus) == (
+            'test_owner/test_repo', [1], ['Issue 1'], ['https://github.com/test_owner/test_repo/issues/1'],
+            ['open'], [['description']], [b'\x00\x01']
+        )
+        # The stored comments are shared rather than copied
+        assert corpus.comments[0] is stored[1].comments
+        assert to_fetch == [latest_issues[1]]
+        mock_issue_schema.assert_not_called()
+
+class TestGetIssuesProgress:
+    @pytest.mark.asyncio
+    @patch('app.services.issue_service.IssueRepository.bulk_insert')
+    @patch('app.services.issue_service.generate_issue_schema')
+    @patch('app.services.issue_service.fetch_comments_for_issue', return_value=[])
+    @patch('app.services.issue_service.fetch_issues')
+    @patch('app.services.issue_service.IssueRepository.select_by_name', return_value=[])
+    async def test_cancelled(
+        self, _mock_select_by_name, mock_fetch_issues, _mock_fetch_comments_for_issue,
+        mock_generate_issue_schema, mock_bulk_insert
+    ):
+        mock_fetch_issues.return_value = [{
+            'number': 1,
+            'title': 'Issue 1',
+            'html_url': 'https://github.com/test_owner/test_repo/issues/1',
+            'state': 'open',
+            'body': 'Description of issue 1',
+            'updated_at': '2024-01-01T00:00:00Z'
+        }]
+        progress = SyncProgress('test_owner/test_repo')
+        progress.cancel()
+
+        with pytest.raises(SyncCancelledError):
+            await get_issues('test_owner', 'test_repo', progress=progress)
+
+        assert (progress.fetched, progress.total) == (1, 1)
+        mock_generate_issue_schema.assert_not_called()
+        mock_bulk_insert.assert_not_called()
+
+class TestGetIssuesCoalescing:
+    @pytest.mark.asyncio
+    @patch('app.services.issue_service.sync_issues')
+    async def test_concurrent_calls_share_one_sync(self, mock_sync_issues):
+        async def sync_issues_side_effect(_owner, _repository, _progress, _semaphore):
+            await asyncio.sleep(0.05)
+            return []
+
+        mock_sync_issues.side_effect = sync_issues_side_effect
+
+        results = await asyncio.gather(*(get_issues('test_owner', 'test_repo') for _ in range(10)))
+
+        assert results == [[]] * 10
+        mock_sync_issues.assert_awaited_once_with('test_owner', 'test_repo', None, None)
+
+class TestGetCachedIssues:
+    def insert_issue(self, number, title='Issue', url='https://github.com/test_owner/test_repo/issues/1'):
+        IssueRepository.bulk_insert([Issue(
+            name='test_owner/test_repo', number=number, title=title, url=url, state='open',
+            comments=['comment'], embedding=b'\x00\x01', shape='768', updated='2024-01-01T00:00:00Z'
+        )])
+
+    @pytest.mark.asyncio
+    @patch('app.services.issue_service.schedule_refresh')
+    @patch('app.services.issue_service.get_issues')
+    async def test_fresh_data(self, mock_get_issues, mock_schedule_refresh):
+        self.insert_issue(1)
+        SyncStateRepository.upsert('test_owner/test_repo', time.time())
+
+        issues, freshness = await get_cached_issues('test_owner', 'test_repo')
+
+        assert issues.numbers.tolist() == [1]
+        assert not freshness.stale
+        assert not freshness.refreshing
+        mock_get_issues.assert_not_called()
+        mock_schedule_refresh.assert_not_called()
+
+    @pytest.mark.asyncio
+    @patch('app.services.issue_service.get_issues')
+    async def test_stale_data_schedules_refresh(self, mock_get_issues, test_app):
+        self.insert_issue(1)
+        SyncStateRepository.upsert('test_owner/test_repo', time.time() - test_app.config['SEARCH_STALE_TTL'] - 1)
+
+        issues, freshness = await get_cached_issues('test_owner', 'test_repo')
+
+        assert issues.numbers.tolist() == [1]
+        assert freshness.stale
+        assert freshness.refreshing
+        assert sync_queue.get(freshness.job_id).name == 'test_owner/test_repo'
+        mock_get_issues.assert_not_called()
+
+    @pytest.mark.asyncio
+    @patch('app.services.issue_service.schedule_refresh')
+    @patch('app.services.issue_service.get_issues')
+    async def test_never_synced(self, mock_get_issues, mock_schedule_refresh):
+        mock_get_issues.return_value = []
+
+        issues, freshness = await get_cached_issues('test_owner', 'test_repo')
+
+        assert issues == []
+        assert freshness.synced_at is None
+        mock_get_issues.assert_awaited_once_with('test_owner', 'test_repo')
+        mock_schedule_refresh.assert_not_called()
+
+    @pytest.mark.asyncio
+    @patch('app.services.sync_queue.SyncJobQueue.has_workers', new_callable=PropertyMock, return_value=True)
+    @patch('app.services.issue_service.get_issues')
+    async def test_never_synced_with_workers(self, mock_get_issues, _mock_has_workers):
+        issues, freshness = await get_cached_issues('test_owner', 'test_repo')
+
+        assert issues == []
+        assert freshness.refreshing
+        assert freshness.job_id is not None
+        mock_get_issues.assert_not_called()
+
+    def test_load_stored_corpus_without_display_columns(self):
+        self.insert_issue(7, title=None, url=None)
+
+        corpus = load_stored_corpus('test_owner/test_repo')
+
+        assert corpus.titles == ['']
+        assert corpus.urls == ['https://github.com/test_owner/test_repo/issues/7']
+
+    def test_load_stored_corpus_per_index_version(self):
+        self.insert_issue(1)
+
+        corpus = load_stored_corpus('test_owner/test_repo')
+        assert load_stored_corpus('test_owner/test_repo') is corpus
+
+        self.insert_issue(2)
+        IndexVersionRepository.increment('test_owner/test_repo')
+        assert load_stored_corpus('test_owner/test_repo').numbers.tolist() == [1, 2]
+
+    def test_get_freshness(self):
+        SyncStateRepository.upsert('test_owner/test_repo', 1234567890.0)
+
+        freshness = get_freshness('test_owner/test_repo')
+
+        assert freshness.synced_at == '2009-02-13 23:31:30'
+        assert freshness.stale
+
+class TestSyncForSearch:
+    @pytest.fixture(autouse=True)
+    def stored_issue(self):
+        IssueRepository.bulk_insert([Issue(
+            name='test_owner/test_repo', number=1, title='Issue', url='url', state='open',
+            comments=['comment'], embedding=b'\x00\x01', shape='768', updated='2024-01-01T00:00:00Z'
+        )])
+
+    def start_worker(self, test_app) -> threading.Thread:
+        def work():
+            with test_app.app_context():
+                sync_queue.run_next(timeout=5)
+
+        worker = threading.Thread(target=work)
+        worker.start()
+        return worker
+
+    @pytest.mark.asyncio
+    @patch('app.services.issue_service.get_issues')
+    async def test_syncs_in_the_request_without_workers(self, mock_get_issues):
+        mock_get_issues.return_value = []
+
+        issues, _ = await get_searchable_issues('test_owner', 'test_repo', 'sync')
+
+        assert issues == []
+        mock_get_issues.assert_awaited_once_with('test_owner', 'test_repo')
+        assert sync_queue.get_active('test_owner/test_repo') is None
+
+    @pytest.mark.asyncio
+    @patch('app.services.sync_queue.SyncJobQueue.has_workers', new_callable=PropertyMock, return_value=True)
+    @patch('app.services.issue_service.get_issues')
+    async def test_waits_for_the_sync_job(self, mock_get_issues, _mock_has_workers, test_app):
+        worker = self.start_worker(test_app)
+
+        issues, freshness = await get_searchable_issues('test_owner', 'test_repo', 'sync')
+        worker.join()
+
+        # The job ran the sync, and the search scored the stored issues once it had finished
+        mock_get_issues.assert_awaited_once_with('test_owner', 'test_repo', progress=ANY)
+        assert issues.numbers.tolist() == [1]
+        assert not freshness.refreshing
+
+    @pytest.mark.asyncio
+    @patch('app.services.sync_queue.SyncJobQueue.has_workers', new_callable=PropertyMock, return_value=True)
+    @patch('app.services.issue_service.get_issues')
+    async def test_searches_stored_issues_once_the_wait_is_over(self, mock_get_issues, _mock_has_workers, test_app):
+        test_app.config['SEARCH_SYNC_WAIT'] = 0.05
+
+        issues, freshness = await get_searchable_issues('test_owner', 'test_repo', 'sync')
+
+        assert issues.numbers.tolist() == [1]
+        assert freshness.refreshing
+        assert sync_queue.get(freshness.job_id).status == 'queued'
+        mock_get_issues.assert_not_called()
+
+    @pytest.mark.asyncio
+    @patch('app.services.sync_queue.SyncJobQueue.has_workers', new_callable=PropertyMock, return_value=True)
+    @patch('app.services.issue_service.get_issues', side_effect=RateLimitExceededError(reset_time=1234567890))
+    async def test_failed_sync_job(self, _mock_get_issues, _mock_has_workers, test_app):
+        worker = self.start_worker(test_app)
+
+        with pytest.raises(SyncJobFailedError, match='Rate limit exceeded'):
+            await get_searchable_issues('test_owner', 'test_repo', 'sync')
+        worker.join()
+
+class TestGetIssueComments:
+    def test_success(self):
+        IssueRepository.bulk_insert([Issue(
+            name='test_owner/test_repo', number=1, comments=['description', 'comment'],
+            embedding=b'', shape='768', updated='2024-01-01'
+        )])
+
+        assert get_issue_comments('test_owner', 'test_repo', 1) == ['description', 'comment']
+
+    def test_not_found(self):
+        with pytest.raises(IssueNotFoundError):
+            get_issue_comments('test_owner', 'test_repo', 1)
+
+class TestScheduleRefresh:
+    @patch('app.services.issue_service.get_issues')
+    def test_refresh_runs_as_sync_job(self, mock_get_issues):
+        mock_get_issues.return_value = []
+
+        job = schedule_refresh('test_owner', 'test_repo')
+
+        assert schedule_refresh('test_owner', 'test_repo').id == job.id
+        assert get_freshness('test_owner/test_repo').job_id == job.id
+
+        finished_job = sync_queue.run_next()
+
+        assert finished_job.id == job.id
+        assert finished_job.status == 'succeeded'
+        assert not get_freshness('test_owner/test_repo').refreshing
+        mock_get_issues.assert_awaited_once_with('test_owner', 'test_repo', progress=ANY)
+
+class TestStreamRelatedIssues:
+    def create_issue_schema(self, number):
+        return IssueSchema(
+            name='test_owner/test_repo',
+            number=number,
+            title=f'Issue {number}',
+            url=f'https://github.com/test_owner/test_repo/issues/{number}',
+            state='open',
+            comments=[],
+            embedding=b'',
+            shape='768',
+            updated='2024-01-01T00:00:00Z'
+        )
+
+    def test_missing_fields(self):
+        with pytest.raises(MissingFieldsError):
+            stream_related_issues(ImmutableMultiDict({'owner': 'test_owner'}))
+
+    def stream_events(self, **kwargs):
+        return list(stream_related_issues(ImmutableMultiDict({
+            'owner': 'test_owner', 'repository': 'test_repo', 'title': 'test_title', **kwargs
+        })))
+
+    @patch('app.services.issue_service.issue_searcher.rank_issues')
+    @patch('app.services.issue_service.load_stored_corpus')
+    @patch('app.services.issue_service.get_issues')
+    def test_events(self, mock_get_issues, mock_load_stored_corpus, mock_rank_issues):
+        class WorkerConfig(TestingConfig):
+            SYNC_WORKERS = 1
+            STREAM_POLL_INTERVAL = 0.01
+
+        stored_issue = self.create_issue_schema(1)
+        new_issue = self.create_issue_schema(2)
+        mock_load_stored_corpus.side_effect = [
+            IssueCorpusSchema.from_issues([stored_issue]), IssueCorpusSchema.from_issues([stored_issue, new_issue])
+        ]
+        hits_sent = threading.Event()
+
+        def rank_issues_side_effect(issues, _title, _description, embeddings=None):
+            corpus = IssueCorpusSchema.of(issues)
+            if embeddings is None and new_issue.number in corpus.numbers:
+                hits_sent.set()
+            return [corpus.to_display_issue(i, threshold=0.9) for i in range(len(corpus))]
+
+        async def get_issues_side_effect(_owner, _repository, progress):
+            progress.set_fetched(2, 1)
+            progress.add_embedded(new_issue)
+            # Keep the job running until the stream has scored the new issue
+            for _ in range(500):
+                if hits_sent.is_set():
+                    break
+                await asyncio.sleep(0.01)
+            progress.add_persisted(1)
+            return [stored_issue, new_issue]
+
+        mock_rank_issues.side_effect = rank_issues_side_effect
+        mock_get_issues.side_effect = get_issues_side_effect
+
+        worker_app = create_app(WorkerConfig)
+        try:
+            with worker_app.app_context():
+                events = self.stream_events(description='test_description')
+        finally:
+            sync_queue.shutdown(worker_app)
+
+        assert events[0]['type'] == 'results'
+        assert [issue.number for issue in events[0]['issues']] == [1]
+
+        hits = [event for event in events if event['type'] == 'hits']
+        assert [issue.number for issue in hits[0]['issues']] == [2]
+
+        progress_events = [event for event in events if event['type'] == 'progress']
+        assert progress_events[-1]['job'].status == 'succeeded'
+
+        assert events[-1]['type'] == 'done'
+        assert [issue.number for issue in events[-1]['issues']] == [1, 2]
+        assert events[-1]['detail'].total == 2
+
+    @patch('app.services.issue_service.issue_searcher.rank_issues', return_value=[])
+    @patch('app.services.issue_service.load_stored_corpus', return_value=[])
+    @patch('app.services.issue_service.get_issues', side_effect=Exception('Fetch issues error'))
+    def test_sync_failure(self, _mock_get_issues, _mock_load_stored_corpus, _mock_rank_issues, test_app):
+        test_app.config['STREAM_POLL_INTERVAL'] = 0.01
+
+        events = list(stream_related_issues(ImmutableMultiDict({
+            'owner': 'test_owner',
+            'repository': 'test_repo',
+            'title': 'test_title'
+        })))
+
+        assert events[0]['type'] == 'results'
+        assert events[-1] == {'type': 'error', 'errorMessage': 'Fetch issues error'}
+
+    @patch('app.services.issue_service.issue_searcher.rank_issues', return_value=[])
+    @patch('app.services.issue_service.load_stored_corpus', return_value=[])
+    @patch('app.services.issue_service.get_issues')
+    def test_syncs_in_foreground_without_workers(self, mock_get_issues, _mock_load_stored_corpus, _mock_rank_issues):
+        async def get_issues_side_effect(_owner, _repository, progress):
+            progress.set_fetched(1, 1)
+            return []
+
+        mock_get_issues.side_effect = get_issues_side_effect
+
+        events = self.stream_events()
+
+        assert [event['type'] for event in events] == ['results', 'progress', 'done']
+        assert events[1]['job'].status == 'succeeded'
+        mock_get_issues.assert_awaited_once()
+
+    @patch('app.services.issue_service.is_webhook_managed', return_value=True)
+    @patch('app.services.issue_service.issue_searcher.rank_issues', return_value=[])
+    @patch('app.services.issue_service.load_stored_corpus', return_value=[])
+    @patch('app.services.issue_service.get_issues')
+    def test_webhook_managed_repository_is_not_synced(self, mock_get_issues, *_mocks):
+        events = self.stream_events()
+
+        assert [event['type'] for event in events] == ['results', 'done']
+        assert sync_queue.get_active('test_owner/test_repo') is None
+        mock_get_issues.assert_not_called()
+
+    @patch('app.services.issue_service.issue_searcher.rank_issues', return_value=[])
+    @patch('app.services.issue_service.load_stored_corpus', return_value=[])
+    @patch('app.services.issue_service.get_issues')
+    def test_stale_mode_searches_fresh_data(self, mock_get_issues, _mock_load_stored_corpus, _mock_rank_issues):
+        SyncStateRepository.upsert('test_owner/test_repo', time.time())
+
+        events = self.stream_events(mode='stale')
+
+        assert [event['type'] for event in events] == ['results', 'done']
+        assert not events[-1]['detail'].freshness.stale
+        mock_get_issues.assert_not_called()
+
+class TestEmbeddingStoreSync:
+    def create_issue_schema(self, number, vector):
+        return IssueSchema(
+            name='test_owner/test_repo',
+            number=number,
+            title=f'Issue {number}',
+            url=f'https://github.com/test_owner/test_repo/issues/{number}',
+            state='open',
+            comments=[],
+            embedding=np.asarray(vector, dtype=np.float32).tobytes(),
+            shape=str(len(vector)),
+            updated='2024-01-01T00:00:00Z'
+        )
+
+    def test_disabled_store(self):
+        issues = [self.create_issue_schema(1, [1.0, 0.0])]
+        assert get_embedding_view('test_owner/test_repo', issues) is None
+
+    def test_builds_view_from_issues(self, test_app, tmp_path):
+        test_app.config['EMBEDDING_STORE_DIR'] = str(tmp_path)
+        issues = [self.create_issue_schema(1, [1.0, 0.0]), self.create_issue_schema(2, [0.0, 1.0])]
+
+        view = get_embedding_view('test_owner/test_repo', issues)
+
+        assert view.has_all([1, 2])
+        assert np.array_equal(view.matrix[view.rows[2]], [0.0, 1.0])
+
+    def test_appends_new_issues(self, test_app, tmp_path):
+        test_app.config['EMBEDDING_STORE_DIR'] = str(tmp_path)
+        issues = [self.create_issue_schema(1, [1.0, 0.0])]
+        get_embedding_view('test_owner/test_repo', issues)
+
+        updated_issue = self.create_issue_schema(1, [0.5, 0.5])
+        update_embedding_store('test_owner/test_repo', [updated_issue])
+
+        view = get_embedding_view('test_owner/test_repo', [updated_issue])
+        assert np.array_equal(view.matrix[view.rows[1]], [0.5, 0.5])
+
+    def test_loads_issues_without_embeddings_when_store_covers_them(self, test_app, tmp_path):
+        test_app.config['EMBEDDING_STORE_DIR'] = str(tmp_path)
+        issues = [self.create_issue_schema(1, [1.0, 0.0]), self.create_issue_schema(2, [0.0, 1.0])]
+        persist_new_issues('test_owner/test_repo', issues, [])
+        get_embedding_view('test_owner/test_repo', issues)
+
+        stored_issues = load_stored_corpus('test_owner/test_repo')
+
+        assert stored_issues.embeddings == [b'', b'']
+        view = get_embedding_view('test_owner/test_repo', stored_issues)
+        assert np.array_equal(view.matrix[view.rows[2]], [0.0, 1.0])
+
+    def test_rebuilds_store_for_issues_without_embeddings(self, test_app, tmp_path):
+        test_app.config['EMBEDDING_STORE_DIR'] = str(tmp_path)
+        issues = [self.create_issue_schema(1, [1.0, 0.0]), self.create_issue_schema(2, [0.0, 1.0])]
+        persist_new_issues('test_owner/test_repo', issues, [])
+        get_embedding_view('test_owner/test_repo', issues)
+        stored_issues = load_stored_corpus('test_owner/test_repo')
+        get_embedding_store().delete('test_owner/test_repo')
+
+        view = get_embedding_view('test_owner/test_repo', stored_issues)
+
+        assert np.array_equal(view.matrix[view.rows[1]], [1.0, 0.0])
+
+    def test_does_not_create_store_on_update(self, test_app, tmp_path):
+        test_app.config['EMBEDDING_STORE_DIR'] = str(tmp_path)
+        update_embedding_store('test_owner/test_repo', [self.create_issue_schema(1, [1.0, 0.0])])
+
+        assert not list(tmp_path.iterdir())
+
 class TestGenerateIssueName:
     def test_success(self):
         result = generate_issue_name('test_owner', 'test_repo')
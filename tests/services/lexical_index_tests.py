@@ -0,0 +1,111 @@
+# pylint: disable=W0621
+
+import numpy as np
+import pytest
+
+from app import create_app, db
+from app.models.issue_model import Issue
+from app.repositories.index_version_repository import IndexVersionRepository
+from app.repositories.issue_repository import IssueRepository
+from app.services.lexical_index import (
+    tokenize, count_issue_terms, LexicalIndex, get_lexical_index, update_lexical_index
+)
+
+from tests.testing_config import TestingConfig
+
+@pytest.fixture
+def test_app():
+    app = create_app(TestingConfig)
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+class TestTokenize:
+    def test_empty(self):
+        assert not tokenize(None)
+
+    def test_keeps_identifiers_and_versions(self):
+        assert tokenize('NullPointerException in v1.2.3 (see java.lang.Foo)') == [
+            'nullpointerexception', 'in', 'v1.2.3', 'v1', '2', '3', 'see', 'java.lang.foo', 'java', 'lang', 'foo'
+        ]
+
+    def test_count_issue_terms(self):
+        assert count_issue_terms('Crash on start', ['crash log', None]) == {'crash': 2, 'on': 1, 'start': 1, 'log': 1}
+
+class TestLexicalIndex:
+    def create_index(self):
+        index = LexicalIndex()
+        index.add(1, count_issue_terms('Crash with ERR_CONNECTION_RESET', ['Happens on every start']))
+        index.add(2, count_issue_terms('Slow start', ['The app starts slowly']))
+        index.add(3, count_issue_terms('Add dark mode', ['Please add a dark theme']))
+        return index
+
+    def test_score(self):
+        index = self.create_index()
+
+        scores = index.score(tokenize('err_connection_reset on start'), [3, 2, 1])
+
+        assert scores[0] == 0
+        assert scores[2] > scores[1] > 0
+
+    def test_top_k(self):
+        index = self.create_index()
+
+        assert [number for number, _ in index.top_k(tokenize('dark start'), 2)] in ([3, 1], [3, 2])
+        assert not index.top_k(tokenize('unrelated'), 2)
+
+    def test_add_replaces_terms(self):
+        index = self.create_index()
+        index.add(3, count_issue_terms('Crash', []))
+
+        assert len(index) == 3
+        assert index.score(['dark'], [3])[0] == 0
+        assert index.score(['crash'], [3])[0] > 0
+
+    def test_remove(self):
+        index = self.create_index()
+        index.remove(1)
+        index.remove(4)
+
+        assert len(index) == 2
+        assert not index.score_all(['err_connection_reset'])
+
+class TestGetLexicalIndex:
+    def create_issue(self, number, title, terms=None):
+        return Issue(
+            name='test_owner/test_repo', number=number, title=title, comments=['comment'], terms=terms,
+            embedding=np.zeros(2, dtype=np.float32).tobytes(), shape='2', updated='2024-01-01'
+        )
+
+    @pytest.mark.usefixtures('test_app')
+    def test_load_and_update(self):
+        IssueRepository.bulk_insert([
+            self.create_issue(1, 'Crash on start', terms=count_issue_terms('Crash on start', ['comment'])),
+            # Stored before terms were recorded
+            self.create_issue(2, 'Dark mode')
+        ])
+
+        index = get_lexical_index('test_owner/test_repo')
+
+        assert len(index) == 2
+        assert index.score(['dark'], [2])[0] > 0
+        assert get_lexical_index('test_owner/test_repo') is index
+
+        issue = self.create_issue(3, 'Dark theme', terms=count_issue_terms('Dark theme', []))
+        IssueRepository.bulk_insert([issue])
+        update_lexical_index('test_owner/test_repo', [issue], IndexVersionRepository.increment('test_owner/test_repo'))
+
+        assert get_lexical_index('test_owner/test_repo') is index
+        assert len(index) == 3
+
+    @pytest.mark.usefixtures('test_app')
+    def test_reload_on_version_change(self):
+        index = get_lexical_index('test_owner/test_repo')
+        IssueRepository.bulk_insert([self.create_issue(1, 'Crash on start')])
+        # Another process stored issues
+        IndexVersionRepository.increment('test_owner/test_repo')
+
+        reloaded = get_lexical_index('test_owner/test_repo')
+
+        assert reloaded is not index
+        assert len(reloaded) == 1
@@ -0,0 +1,178 @@
+# pylint: disable=W0621,W0613
+
+import time
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from app import create_app, db
+from app.models.issue_model import Issue
+from app.repositories.issue_repository import IssueRepository
+from app.repositories.sync_state_repository import SyncStateRepository
+from app.services.multi_repo_service import (
+    get_related_issues_across_repositories, score_repository, merge_hits, load_repository_embeddings
+)
+from app.utils.exceptions import RepositoryNotFoundError, InvalidFieldError
+
+from tests.testing_config import TestingConfig
+
+@pytest.fixture
+def test_app():
+    app = create_app(TestingConfig)
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+def create_issue(name, number, embedding):
+    return Issue(
+        name=name, number=number, title=f'Issue {number}', url=f'https://github.com/{name}/issues/{number}',
+        state='open', comments=['comment'], embedding=np.asarray(embedding, dtype=np.float32).tobytes(),
+        shape='2', updated='2024-01-01'
+    )
+
+@pytest.fixture
+def stored_issues(test_app):
+    IssueRepository.bulk_insert([
+        create_issue('test_owner/repo1', 1, [1.0, 0.0]),
+        create_issue('test_owner/repo1', 2, [0.0, 1.0]),
+        create_issue('test_owner/repo1', 3, [0.8, 0.6]),
+        create_issue('test_owner/repo2', 1, [0.9, 0.1]),
+        create_issue('test_owner/repo2', 2, [0.6, 0.8])
+    ])
+
+@pytest.fixture
+def mock_encode_query():
+    with patch('app.services.multi_repo_service.issue_searcher.encode_query_async') as mock:
+        mock.return_value = np.array([1.0, 0.0], dtype=np.float32)
+        yield mock
+
+@pytest.mark.usefixtures('stored_issues', 'mock_encode_query')
+class TestGetRelatedIssuesAcrossRepositories:
+    @patch('app.services.multi_repo_service.get_issues')
+    @pytest.mark.asyncio
+    async def test_merges_repositories(self, mock_get_issues):
+        issues, detail, repositories = await get_related_issues_across_repositories({
+            'repositories': ['test_owner/repo1', 'test_owner/repo2'], 'title': 'crash'
+        })
+
+        assert [(issue.name, issue.number) for issue in issues] == [
+            ('test_owner/repo1', 1), ('test_owner/repo2', 1), ('test_owner/repo1', 3), ('test_owner/repo2', 2)
+        ]
+        assert issues[0].comments == ['comment']
+        assert issues[0].threshold == pytest.approx(1.0)
+        assert detail.total == 4
+        assert [(result.name, result.total, result.error) for result in repositories] == [
+            ('test_owner/repo1', 2, None), ('test_owner/repo2', 2, None)
+        ]
+        assert mock_get_issues.await_count == 2
+
+    @patch('app.services.multi_repo_service.get_issues')
+    @pytest.mark.asyncio
+    async def test_limit(self, _mock_get_issues):
+        issues, detail, _ = await get_related_issues_across_repositories({
+            'repositories': ['test_owner/repo1', 'test_owner/repo2'], 'title': 'crash', 'limit': 1, 'offset': 1
+        })
+
+        assert [(issue.name, issue.number) for issue in issues] == [('test_owner/repo2', 1)]
+        assert detail.total == 4
+
+    @patch('app.services.multi_repo_service.get_issues')
+    @pytest.mark.asyncio
+    async def test_failed_sync_searches_stored_issues(self, mock_get_issues):
+        async def get_issues_side_effect(owner, repository, semaphore=None):
+            if repository == 'repo2':
+                raise RepositoryNotFoundError(owner, repository)
+            return []
+
+        mock_get_issues.side_effect = get_issues_side_effect
+
+        issues, _, repositories = await get_related_issues_across_repositories({
+            'repositories': ['test_owner/repo1', 'test_owner/repo2'], 'title': 'crash'
+        })
+
+        assert len(issues) == 4
+        assert repositories[0].error is None
+        assert repositories[1].error == 'Repository not found: https://github.com/test_owner/repo2'
+
+    @patch('app.services.multi_repo_service.refresh_if_stale')
+    @patch('app.services.multi_repo_service.get_issues')
+    @pytest.mark.asyncio
+    async def test_stale_mode(self, mock_get_issues, mock_refresh_if_stale):
+        SyncStateRepository.upsert('test_owner/repo1', time.time())
+
+        await get_related_issues_across_repositories({
+            'repositories': ['test_owner/repo1', 'test_owner/repo2'], 'title': 'crash', 'mode': 'stale'
+        })
+
+        mock_refresh_if_stale.assert_called_once_with('test_owner', 'repo1')
+        mock_get_issues.assert_awaited_once()
+        assert mock_get_issues.await_args.args == ('test_owner', 'repo2')
+
+    @patch('app.services.multi_repo_service.fetch_organization_repositories')
+    @patch('app.services.multi_repo_service.get_issues')
+    @pytest.mark.asyncio
+    async def test_organization(self, _mock_get_issues, mock_fetch_organization_repositories):
+        mock_fetch_organization_repositories.return_value = ['test_owner/repo2']
+
+        issues, _, repositories = await get_related_issues_across_repositories({
+            'organization': 'test_owner', 'title': 'crash'
+        })
+
+        mock_fetch_organization_repositories.assert_awaited_once_with('test_owner')
+        assert {issue.name for issue in issues} == {'test_owner/repo2'}
+        assert [result.name for result in repositories] == ['test_owner/repo2']
+
+    @patch('app.services.multi_repo_service.fetch_organization_repositories')
+    @pytest.mark.asyncio
+    async def test_organization_exceeds_limit(self, mock_fetch_organization_repositories, test_app):
+        test_app.config['MULTI_SEARCH_MAX_REPOSITORIES'] = 1
+        mock_fetch_organization_repositories.return_value = ['test_owner/repo1', 'test_owner/repo2']
+
+        with pytest.raises(InvalidFieldError):
+            await get_related_issues_across_repositories({'organization': 'test_owner', 'title': 'crash'})
+
+    @patch('app.services.issue_service.fetch_issues')
+    @pytest.mark.asyncio
+    async def test_sync_reads_stored_issues_without_embeddings(self, mock_fetch_issues, test_app, tmp_path):
+        test_app.config['EMBEDDING_STORE_DIR'] = str(tmp_path)
+        load_repository_embeddings('test_owner/repo1')
+        mock_fetch_issues.return_value = [
+            {'number': number, 'updated_at': '2024-01-01', 'title': f'Issue {number}', 'html_url': 'url',
+             'state': 'open'} for number in (1, 2, 3)
+        ]
+
+        with patch.object(IssueRepository, 'select_by_name') as mock_select_by_name:
+            issues, _, _ = await get_related_issues_across_repositories({
+                'repositories': ['test_owner/repo1'], 'title': 'crash'
+            })
+
+        mock_fetch_issues.assert_awaited_once()
+        mock_select_by_name.assert_not_called()
+        assert [issue.number for issue in issues] == [1, 3]
+
+@pytest.mark.usefixtures('stored_issues')
+class TestScoreRepository:
+    def test_top_k(self):
+        hits, total = score_repository('test_owner/repo1', np.array([1.0, 0.0], dtype=np.float32), None, 1)
+
+        assert hits == [(pytest.approx(1.0), 'test_owner/repo1', 1)]
+        assert total == 2
+
+    def test_empty_repository(self):
+        assert score_repository('test_owner/empty', np.array([1.0, 0.0], dtype=np.float32), None, 10) == ([], 0)
+
+    def test_builds_embedding_store(self, test_app, tmp_path):
+        test_app.config['EMBEDDING_STORE_DIR'] = str(tmp_path)
+
+        numbers, matrix = load_repository_embeddings('test_owner/repo2')
+
+        assert numbers.tolist() == [1, 2]
+        assert np.allclose(matrix, [[0.9, 0.1], [0.6, 0.8]])
+        assert (tmp_path / 'test_owner__repo2.json').exists()
+
+class TestMergeHits:
+    def test_success(self):
+        hits = merge_hits([[(0.9, 'a', 1), (0.5, 'a', 2)], [(0.7, 'b', 1)], []], 2)
+
+        assert hits == [(0.9, 'a', 1), (0.7, 'b', 1)]
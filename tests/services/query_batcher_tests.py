@@ -0,0 +1,63 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from app.services.query_batcher import QueryBatcher
+
+def encode_lengths(queries):
+    return np.array([[len(query)] for query in queries], dtype=np.float32)
+
+class TestQueryBatcher:
+    def test_disabled_encodes_on_the_caller_thread(self):
+        threads = []
+
+        def encode(queries):
+            threads.append(threading.current_thread())
+            return encode_lengths(queries)
+
+        batcher = QueryBatcher(encode)
+
+        assert batcher.encode('crash')[0] == 5
+        assert threads == [threading.current_thread()]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_queries_share_a_batch(self):
+        batches = []
+
+        def encode(queries):
+            batches.append(queries)
+            return encode_lengths(queries)
+
+        batcher = QueryBatcher(encode, max_batch=8, max_wait=0.2)
+
+        embeddings = await asyncio.gather(*(batcher.encode_async('x' * i) for i in range(1, 4)))
+
+        assert [embedding[0] for embedding in embeddings] == [1, 2, 3]
+        assert batches == [['x', 'xx', 'xxx']]
+
+    @pytest.mark.asyncio
+    async def test_max_batch(self):
+        batches = []
+
+        def encode(queries):
+            batches.append(queries)
+            return encode_lengths(queries)
+
+        batcher = QueryBatcher(encode, max_batch=2, max_wait=0.2)
+
+        await asyncio.gather(*(batcher.encode_async(str(i)) for i in range(3)))
+
+        assert sorted(len(batch) for batch in batches) == [1, 2]
+
+    def test_error_is_raised_to_every_caller(self):
+        def encode(_):
+            raise RuntimeError('model failed')
+
+        batcher = QueryBatcher(encode, max_wait=0.01)
+        futures = [batcher.submit('first'), batcher.submit('second')]
+
+        for future in futures:
+            with pytest.raises(RuntimeError):
+                future.result(timeout=5)
@@ -0,0 +1,203 @@
+# pylint: disable=W0621,W0613
+
+import json
+import time
+import zipfile
+from contextlib import contextmanager
+from unittest.mock import patch, PropertyMock
+
+import numpy as np
+import pytest
+
+from app import create_app, db
+from app.models.issue_model import Issue
+from app.repositories.embedding_store import EmbeddingStore
+from app.repositories.index_version_repository import IndexVersionRepository
+from app.repositories.issue_repository import IssueRepository
+from app.repositories.sync_state_repository import SyncStateRepository
+from app.services.issue_searcher import IssueSearcher
+from app.services.snapshot_service import export_snapshot, import_snapshot
+from app.utils.exceptions import SnapshotError
+
+from tests.testing_config import TestingConfig
+
+@pytest.fixture
+def test_app():
+    app = create_app(TestingConfig)
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+@pytest.fixture
+def embedding_dimension():
+    with patch.object(IssueSearcher, 'embedding_dimension', new_callable=PropertyMock) as mock:
+        mock.return_value = 2
+        yield mock
+
+@pytest.fixture
+def stored_issues(test_app):
+    IssueRepository.bulk_insert([
+        Issue(
+            name='test_owner/test_repo',
+            number=number,
+            title=f'Issue {number}',
+            url=f'https://github.com/test_owner/test_repo/issues/{number}',
+            state='open',
+            comments=[f'Description of issue {number}', 'Crash on startup'],
+            terms={'issue': 1, 'crash': 1},
+            embedding=np.array([number, 1.0], dtype=np.float32).tobytes(),
+            shape='2',
+            updated='2024-01-01T00:00:00Z'
+        ) for number in (3, 1, 2)
+    ])
+    SyncStateRepository.upsert('test_owner/test_repo', 1700000000.0)
+
+@pytest.fixture
+def snapshot(tmp_path, stored_issues, embedding_dimension):
+    path = tmp_path / 'snapshot.zip'
+    export_snapshot('test_owner/test_repo', str(path))
+    return path
+
+class TestExportSnapshot:
+    def test_layout(self, snapshot):
+        with zipfile.ZipFile(snapshot) as archive:
+            manifest = json.loads(archive.read('manifest.json'))
+            lines = archive.read('issues.jsonl').decode().splitlines()
+            numbers = np.frombuffer(archive.read('numbers.i64'), dtype='<i8')
+            embeddings = np.frombuffer(archive.read('embeddings.f32'), dtype='<f4').reshape(-1, 2)
+            assert archive.getinfo('issues.jsonl').compress_type == zipfile.ZIP_DEFLATED
+
+        assert manifest['name'] == 'test_owner/test_repo'
+        assert (manifest['dimension'], manifest['issues'], manifest['synced_at']) == (2, 3, 1700000000.0)
+        assert [json.loads(line)['number'] for line in lines] == [1, 2, 3]
+        assert json.loads(lines[0])['comments'] == ['Description of issue 1', 'Crash on startup']
+        assert numbers.tolist() == [1, 2, 3]
+        assert embeddings[:, 0].tolist() == [1.0, 2.0, 3.0]
+
+@pytest.mark.usefixtures('embedding_dimension')
+class TestImportSnapshot:
+    def test_round_trip(self, snapshot):
+        with patch('app.services.issue_service.issue_searcher.generate_serialized_embedding') as mock_embed:
+            manifest = import_snapshot(str(snapshot), 'test_owner/copy_repo')
+
+        mock_embed.assert_not_called()
+        assert manifest.issues == 3
+        issue = IssueRepository.select_by_primary_key('test_owner/copy_repo', 2)
+        assert issue.title == 'Issue 2'
+        assert issue.comments == ['Description of issue 2', 'Crash on startup']
+        assert issue.terms == {'issue': 1, 'crash': 1}
+        assert np.allclose(np.frombuffer(issue.embedding, dtype=np.float32), np.array([2.0, 1.0]) / np.sqrt(5))
+        assert issue.shape == '2'
+        assert SyncStateRepository.select_by_name('test_owner/copy_repo').synced_at == 1700000000.0
+        assert IndexVersionRepository.select_version('test_owner/copy_repo') == 1
+
+    def test_replaces_stored_issues(self, snapshot):
+        IssueRepository.delete_all_by_primary_key(IssueRepository.select_by_numbers('test_owner/test_repo', [3]))
+        IssueRepository.bulk_insert([
+            Issue(name='test_owner/test_repo', number=9, embedding=b'\x00' * 8, shape='2', updated='2024-01-01')
+        ])
+
+        import_snapshot(str(snapshot))
+
+        assert sorted(IssueRepository.select_updated_by_name('test_owner/test_repo')) == [1, 2, 3]
+
+    def test_writes_embedding_store(self, test_app, tmp_path, snapshot):
+        test_app.config['EMBEDDING_STORE_DIR'] = str(tmp_path / 'store')
+
+        import_snapshot(str(snapshot))
+
+        view = EmbeddingStore(str(tmp_path / 'store')).load('test_owner/test_repo')
+        assert view.numbers.tolist() == [1, 2, 3]
+        assert np.allclose(view.matrix[2], np.array([3.0, 1.0]) / np.sqrt(10))
+        assert view.normalized
+
+    def test_holds_sync_lock(self, test_app, tmp_path, snapshot):
+        test_app.config['SYNC_LOCK_DIR'] = str(tmp_path / 'locks')
+        stored_counts = []
+
+        @contextmanager
+        def record_lock(lock_dir, name):
+            stored_counts.append(IssueRepository.count_by_name(name))
+            yield
+            stored_counts.append(IssueRepository.count_by_name(name))
+
+        with patch('app.services.snapshot_service.blocking_inter_process_lock', side_effect=record_lock) as mock_lock:
+            import_snapshot(str(snapshot), 'test_owner/copy_repo')
+
+        mock_lock.assert_called_once_with(str(tmp_path / 'locks'), 'test_owner/copy_repo')
+        assert stored_counts == [0, 3]
+
+    def test_model_mismatch(self, snapshot):
+        with patch('app.services.snapshot_service.issue_searcher.model_name', 'other-model'):
+            with pytest.raises(SnapshotError) as excinfo:
+                import_snapshot(str(snapshot), 'test_owner/copy_repo')
+
+        assert 'other-model' in str(excinfo.value)
+        assert IssueRepository.count_by_name('test_owner/copy_repo') == 0
+
+    def test_dimension_mismatch(self, snapshot, embedding_dimension):
+        embedding_dimension.return_value = 768
+
+        with pytest.raises(SnapshotError):
+            import_snapshot(str(snapshot), 'test_owner/copy_repo')
+
+        assert IssueRepository.count_by_name('test_owner/copy_repo') == 0
+
+    def test_truncated_embeddings(self, tmp_path, snapshot):
+        truncated = tmp_path / 'truncated.zip'
+        with zipfile.ZipFile(snapshot) as source, zipfile.ZipFile(truncated, 'w') as target:
+            for info in source.infolist():
+                data = source.read(info)
+                target.writestr(info, data[:-4] if info.filename == 'embeddings.f32' else data)
+
+        with pytest.raises(SnapshotError):
+            import_snapshot(str(truncated), 'test_owner/copy_repo')
+
+    @pytest.mark.parametrize('truncate', [
+        lambda data: data.split(b'\n', 1)[0] + b'\n',
+        lambda data: data[:-20]
+    ])
+    def test_truncated_issues(self, tmp_path, snapshot, truncate):
+        truncated = tmp_path / 'truncated.zip'
+        with zipfile.ZipFile(snapshot) as source, zipfile.ZipFile(truncated, 'w') as target:
+            for info in source.infolist():
+                data = source.read(info)
+                target.writestr(info, truncate(data) if info.filename == 'issues.jsonl' else data)
+
+        with pytest.raises(SnapshotError):
+            import_snapshot(str(truncated), batch_size=1)
+
+        # The stored issues are left as they were
+        assert sorted(IssueRepository.select_updated_by_name('test_owner/test_repo')) == [1, 2, 3]
+        assert IndexVersionRepository.select_version('test_owner/test_repo') == 0
+
+    @pytest.mark.parametrize('missing', ['issues.jsonl', 'numbers.i64', 'embeddings.f32'])
+    def test_missing_entry(self, tmp_path, snapshot, missing):
+        incomplete = tmp_path / 'incomplete.zip'
+        with zipfile.ZipFile(snapshot) as source, zipfile.ZipFile(incomplete, 'w') as target:
+            for info in source.infolist():
+                if info.filename != missing:
+                    target.writestr(info, source.read(info))
+
+        with pytest.raises(SnapshotError, match=f'missing {missing}'):
+            import_snapshot(str(incomplete))
+
+        assert sorted(IssueRepository.select_updated_by_name('test_owner/test_repo')) == [1, 2, 3]
+        assert IndexVersionRepository.select_version('test_owner/test_repo') == 0
+
+    def test_not_a_snapshot(self, tmp_path):
+        path = tmp_path / 'snapshot.zip'
+        path.write_bytes(b'not a zip file')
+
+        with pytest.raises(SnapshotError):
+            import_snapshot(str(path))
+
+    def test_empty_repository(self, test_app, tmp_path):
+        SyncStateRepository.upsert('test_owner/empty_repo', time.time())
+        path = tmp_path / 'snapshot.zip'
+        export_snapshot('test_owner/empty_repo', str(path))
+
+        manifest = import_snapshot(str(path), 'test_owner/copy_repo')
+
+        assert manifest.issues == 0
+        assert SyncStateRepository.select_by_name('test_owner/copy_repo') is not None
@@ -0,0 +1,159 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.sync_coordinator import SingleFlight, SyncBudget, inter_process_lock, blocking_inter_process_lock
+from app.utils.exceptions import RateLimitExceededError
+
+class TestSingleFlight:
+    @pytest.mark.asyncio
+    async def test_coalesces_concurrent_calls(self):
+        single_flight = SingleFlight()
+        calls = []
+
+        async def sync():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return ['issue']
+
+        results = await asyncio.gather(*(single_flight.run('test_owner/test_repo', sync) for _ in range(10)))
+
+        assert len(calls) == 1
+        assert all(result == ['issue'] for result in results)
+        assert not single_flight.in_flight('test_owner/test_repo')
+
+    @pytest.mark.asyncio
+    async def test_does_not_coalesce_different_keys(self):
+        single_flight = SingleFlight()
+
+        async def sync(value):
+            await asyncio.sleep(0.01)
+            return value
+
+        results = await asyncio.gather(
+            single_flight.run('test_owner/repo1', lambda: sync(1)),
+            single_flight.run('test_owner/repo2', lambda: sync(2))
+        )
+
+        assert results == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_shares_exceptions(self):
+        single_flight = SingleFlight()
+
+        async def sync():
+            await asyncio.sleep(0.01)
+            raise ValueError('sync failed')
+
+        results = await asyncio.gather(
+            single_flight.run('test_owner/test_repo', sync),
+            single_flight.run('test_owner/test_repo', sync),
+            return_exceptions=True
+        )
+
+        assert all(isinstance(result, ValueError) for result in results)
+        assert not single_flight.in_flight('test_owner/test_repo')
+
+    def test_coalesces_across_event_loops(self):
+        single_flight = SingleFlight()
+        started = threading.Event()
+        calls = []
+        results = []
+
+        async def sync():
+            calls.append(1)
+            started.set()
+            await asyncio.sleep(0.1)
+            return 'synced'
+
+        def leader():
+            results.append(asyncio.run(single_flight.run('test_owner/test_repo', sync)))
+
+        def follower():
+            started.wait()
+            results.append(asyncio.run(single_flight.run('test_owner/test_repo', sync)))
+
+        threads = [threading.Thread(target=leader), threading.Thread(target=follower)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert results == ['synced', 'synced']
+
+class TestInterProcessLock:
+    @pytest.mark.asyncio
+    async def test_without_lock_dir(self):
+        async with inter_process_lock('', 'test_owner/test_repo'):
+            pass
+
+    @pytest.mark.asyncio
+    async def test_serializes_holders(self, tmp_path):
+        events = []
+
+        async def hold(label):
+            async with inter_process_lock(str(tmp_path), 'test_owner/test_repo'):
+                events.append(f'{label}-start')
+                await asyncio.sleep(0.05)
+                events.append(f'{label}-end')
+
+        # Separate threads stand in for separate processes
+        threads = [threading.Thread(target=asyncio.run, args=(hold(label),)) for label in ('a', 'b')]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.01)
+        for thread in threads:
+            thread.join()
+
+        assert events in (['a-start', 'a-end', 'b-start', 'b-end'], ['b-start', 'b-end', 'a-start', 'a-end'])
+        assert (tmp_path / 'test_owner__test_repo.lock').exists()
+
+    def test_blocking_lock_excludes_async_holders(self, tmp_path):
+        events = []
+
+        async def hold():
+            async with inter_process_lock(str(tmp_path), 'test_owner/test_repo'):
+                events.append('async')
+
+        with blocking_inter_process_lock(str(tmp_path), 'test_owner/test_repo'):
+            thread = threading.Thread(target=asyncio.run, args=(hold(),))
+            thread.start()
+            time.sleep(0.05)
+            events.append('blocking')
+        thread.join()
+
+        assert events == ['blocking', 'async']
+
+class TestSyncBudget:
+    @pytest.mark.asyncio
+    async def test_bounds_concurrent_syncs(self):
+        budget = SyncBudget(max_syncs=2, max_requests=5)
+        running = []
+        peak = []
+
+        async def sync():
+            running.append(1)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.pop()
+
+        await asyncio.gather(*(budget.run(sync) for _ in range(6)))
+
+        assert max(peak) == 2
+
+    @pytest.mark.asyncio
+    async def test_stops_after_rate_limit(self):
+        budget = SyncBudget(max_syncs=1, max_requests=5)
+        calls = []
+
+        async def sync():
+            calls.append(1)
+            raise RateLimitExceededError(0)
+
+        results = await asyncio.gather(*(budget.run(sync) for _ in range(3)), return_exceptions=True)
+
+        assert len(calls) == 1
+        assert all(isinstance(result, RateLimitExceededError) for result in results)
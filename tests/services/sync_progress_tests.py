@@ -0,0 +1,29 @@
+import pytest
+
+from app.services.sync_progress import SyncProgress
+from app.utils.exceptions import SyncCancelledError
+
+class TestSyncProgress:
+    def test_counters(self):
+        changes = []
+        progress = SyncProgress('test_owner/test_repo', on_change=lambda p: changes.append(p.embedded))
+
+        progress.set_fetched(10, 4)
+        progress.add_embedded()
+        progress.add_embedded('issue')
+        progress.add_persisted(2)
+
+        assert (progress.fetched, progress.total, progress.embedded, progress.persisted) == (10, 4, 2, 2)
+        assert progress.embedded_issues == ['issue']
+        assert changes == [0, 1, 2, 2]
+
+    def test_cancel(self):
+        progress = SyncProgress('test_owner/test_repo')
+        progress.check_cancelled()
+
+        progress.cancel()
+
+        assert progress.cancelled
+        with pytest.raises(SyncCancelledError) as exc_info:
+            progress.check_cancelled()
+        assert str(exc_info.value) == 'The sync of test_owner/test_repo was cancelled'
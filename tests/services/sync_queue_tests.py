@@ -0,0 +1,240 @@
+# pylint: disable=W0621
+
+import asyncio
+import threading
+import time
+from dataclasses import astuple
+from unittest.mock import patch
+
+import pytest
+
+from app import create_app, db
+from app.services.sync_queue import sync_queue, InProcessJobBackend, SqliteJobBackend
+from app.schemas.sync_job_schema import SyncJobSchema
+from app.utils.exceptions import SyncJobNotFoundError
+
+from tests.testing_config import TestingConfig
+
+class SqliteQueueConfig(TestingConfig):
+    SYNC_QUEUE_BACKEND = 'sqlite'
+    SYNC_QUEUE_POLL_INTERVAL = 0.01
+
+@pytest.fixture(params=[TestingConfig, SqliteQueueConfig], ids=['memory', 'sqlite'])
+def test_app(request):
+    app = create_app(request.param)
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+async def fake_get_issues(_owner, _repository, progress):
+    progress.set_fetched(3, 2)
+    progress.add_embedded()
+    progress.add_embedded()
+    progress.add_persisted(2)
+    return []
+
+@pytest.mark.usefixtures('test_app')
+class TestSyncJobQueue:
+    def test_enqueue(self):
+        job = sync_queue.enqueue('test_owner', 'test_repo')
+
+        assert job.name == 'test_owner/test_repo'
+        assert job.status == 'queued'
+        assert sync_queue.get(job.id) == job
+        assert sync_queue.get_active('test_owner/test_repo').id == job.id
+
+    def test_enqueue_reuses_active_job(self):
+        job = sync_queue.enqueue('test_owner', 'test_repo')
+
+        assert sync_queue.enqueue('test_owner', 'test_repo').id == job.id
+        assert sync_queue.enqueue('test_owner', 'other_repo').id != job.id
+
+    def test_get_missing_job(self):
+        with pytest.raises(SyncJobNotFoundError):
+            sync_queue.get('missing')
+
+    def test_run_next_without_jobs(self):
+        assert sync_queue.run_next() is None
+
+    @patch('app.services.issue_service.get_issues', side_effect=fake_get_issues)
+    def test_run_job(self, _mock_get_issues):
+        other_job = sync_queue.enqueue('test_owner', 'other_repo')
+        job = sync_queue.enqueue('test_owner', 'test_repo')
+
+        finished = sync_queue.run_job(job.id)
+
+        assert finished.id == job.id
+        assert finished.status == 'succeeded'
+        assert sync_queue.get(other_job.id).status == 'queued'
+        assert sync_queue.run_job(job.id) is None
+        assert sync_queue.get_progress(job.id) is None
+
+    @patch('app.services.issue_service.get_issues', side_effect=fake_get_issues)
+    def test_run_next_reports_progress(self, mock_get_issues):
+        job = sync_queue.enqueue('test_owner', 'test_repo')
+
+        finished_job = sync_queue.run_next()
+
+        assert finished_job.id == job.id
+        stored_job = sync_queue.get(job.id)
+        assert stored_job.status == 'succeeded'
+        assert astuple(stored_job.counters) == (3, 2, 2, 2)
+        assert sync_queue.get_active('test_owner/test_repo') is None
+        mock_get_issues.assert_called_once()
+
+    @patch('app.services.issue_service.get_issues', side_effect=Exception('Fetch issues error'))
+    def test_run_next_failure(self, _mock_get_issues):
+        job = sync_queue.enqueue('test_owner', 'test_repo')
+
+        sync_queue.run_next()
+
+        stored_job = sync_queue.get(job.id)
+        assert stored_job.status == 'failed'
+        assert stored_job.error == 'Fetch issues error'
+
+    @patch('app.services.issue_service.get_issues')
+    def test_cancel_queued_job(self, mock_get_issues):
+        job = sync_queue.enqueue('test_owner', 'test_repo')
+
+        assert sync_queue.cancel(job.id).status == 'cancelled'
+        assert sync_queue.run_next() is None
+        mock_get_issues.assert_not_called()
+
+    def test_cancel_running_job(self, test_app):
+        started = threading.Event()
+        result = {}
+
+        async def slow_get_issues(_owner, _repository, progress):
+            progress.set_fetched(10, 10)
+            started.set()
+            while True:
+                await asyncio.sleep(0.01)
+                progress.add_embedded()
+                progress.check_cancelled()
+
+        def run():
+            with test_app.app_context():
+                result['job'] = sync_queue.run_next()
+
+        job = sync_queue.enqueue('test_owner', 'test_repo')
+        with patch('app.services.issue_service.get_issues', side_effect=slow_get_issues):
+            worker = threading.Thread(target=run)
+            worker.start()
+            started.wait(5)
+            sync_queue.cancel(job.id)
+            worker.join(5)
+
+        assert result['job'].status == 'cancelled'
+        assert sync_queue.get(job.id).status == 'cancelled'
+
+class TestSyncWorkers:
+    @patch('app.services.issue_service.get_issues', side_effect=fake_get_issues)
+    def test_workers_run_queued_jobs(self, _mock_get_issues):
+        class WorkerConfig(TestingConfig):
+            SYNC_WORKERS = 1
+
+        app = create_app(WorkerConfig)
+        try:
+            with app.app_context():
+                assert sync_queue.has_workers
+                job = sync_queue.enqueue('test_owner', 'test_repo')
+                for _ in range(500):
+                    if not sync_queue.get(job.id).is_active:
+                        break
+                    threading.Event().wait(0.01)
+
+                assert sync_queue.get(job.id).status == 'succeeded'
+        finally:
+            sync_queue.shutdown(app)
+
+    def test_workers_are_not_started_for_command_line_tools(self):
+        class WorkerConfig(TestingConfig):
+            SYNC_WORKERS = 2
+
+        with create_app(WorkerConfig, start_sync_workers=False).app_context():
+            assert not sync_queue.has_workers
+
+class TestSqliteJobBackend:
+    @pytest.fixture(autouse=True)
+    def sqlite_app(self):
+        app = create_app(SqliteQueueConfig)
+        with app.app_context():
+            yield app
+            db.session.remove()
+
+    def test_requeues_job_with_expired_lease(self):
+        backend = SqliteJobBackend(poll_interval=0.01, lease=0.05)
+        backend.insert(SyncJobSchema(id='job1', name='a/b', owner='a', repository='b', created_at=time.time()))
+        assert backend.claim('job1').status == 'running'
+
+        time.sleep(0.1)
+
+        assert backend.select_active_by_name('a/b').status == 'queued'
+        assert backend.claim_next(0).id == 'job1'
+
+    def test_renewed_lease_keeps_job_running(self):
+        backend = SqliteJobBackend(poll_interval=0.01, lease=0.2)
+        backend.insert(SyncJobSchema(id='job1', name='a/b', owner='a', repository='b', created_at=time.time()))
+        backend.claim('job1')
+
+        for _ in range(3):
+            time.sleep(0.1)
+            backend.renew_lease('job1')
+
+        assert backend.select_active_by_name('a/b').status == 'running'
+        assert backend.claim_next(0) is None
+
+    @patch('app.services.issue_service.get_issues')
+    def test_running_job_renews_its_lease(self, mock_get_issues, tmp_path):
+        class ShortLeaseConfig(SqliteQueueConfig):
+            # The lease is renewed from another thread, which needs a connection of its own
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "jobs.db"}'
+            SYNC_JOB_LEASE = 0.15
+
+        statuses = []
+
+        async def slow_get_issues(_owner, _repository, progress):
+            for _ in range(3):
+                await asyncio.sleep(0.1)
+                statuses.append(sync_queue.get_active('a/b').status)
+            progress.set_fetched(0, 0)
+            return []
+
+        mock_get_issues.side_effect = slow_get_issues
+        with create_app(ShortLeaseConfig).app_context():
+            job = sync_queue.enqueue('a', 'b')
+
+            assert sync_queue.run_job(job.id).status == 'succeeded'
+            assert statuses == ['running'] * 3
+
+    @patch('app.services.issue_service.get_issues')
+    def test_lease_is_renewed_while_the_event_loop_is_blocked(self, mock_get_issues, tmp_path):
+        class ShortLeaseConfig(SqliteQueueConfig):
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "jobs.db"}'
+            SYNC_JOB_LEASE = 0.15
+
+        statuses = []
+
+        async def embedding_get_issues(_owner, _repository, progress):
+            # Embedding runs the model synchronously and never yields to the event loop
+            time.sleep(0.4)
+            statuses.append(sync_queue.get_active('a/b').status)
+            progress.set_fetched(0, 0)
+            return []
+
+        mock_get_issues.side_effect = embedding_get_issues
+        with create_app(ShortLeaseConfig).app_context():
+            job = sync_queue.enqueue('a', 'b')
+
+            assert sync_queue.run_job(job.id).status == 'succeeded'
+            assert statuses == ['running']
+            assert sync_queue.get(job.id).status == 'succeeded'
+
+class TestInProcessJobBackend:
+    def test_prunes_finished_jobs(self):
+        backend = InProcessJobBackend()
+        backend.insert(SyncJobSchema(id='old', name='a/b', owner='a', repository='b', status='succeeded'))
+        backend.insert(SyncJobSchema(id='new', name='a/c', owner='a', repository='c'))
+
+        assert backend.select_by_id('old') is None
+        assert backend.select_by_id('new') is not None
@@ -0,0 +1,189 @@
+# pylint: disable=W0621,W0613
+
+import hashlib
+import hmac
+import json
+import os
+import time
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from app import create_app, db
+from app.repositories.index_version_repository import IndexVersionRepository
+from app.repositories.issue_repository import IssueRepository
+from app.repositories.sync_state_repository import SyncStateRepository
+from app.services.issue_service import is_webhook_managed
+from app.services.lexical_index import get_lexical_index
+from app.services.webhook_service import verify_signature, handle_webhook_event
+from app.utils.exceptions import InvalidFieldError
+
+from tests.testing_config import TestingConfig
+
+PAYLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'payloads')
+
+def load_payload(file_name):
+    with open(os.path.join(PAYLOAD_DIR, file_name), encoding='utf-8') as f:
+        return json.load(f)
+
+@pytest.fixture
+def test_app():
+    app = create_app(TestingConfig)
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+@pytest.fixture
+def synced_repository(test_app):
+    SyncStateRepository.upsert('test_owner/test_repo', time.time())
+
+@pytest.fixture
+def mock_generate_serialized_embedding():
+    with patch('app.services.issue_service.issue_searcher.generate_serialized_embedding') as mock:
+        mock.return_value = (np.array([1.0, 0.0], dtype=np.float32).tobytes(), '2')
+        yield mock
+
+@pytest.fixture
+def mock_fetch_comments_for_issue():
+    with patch('app.services.webhook_service.fetch_comments_for_issue') as mock:
+        mock.return_value = [{'body': 'Happens on Linux too.'}]
+        yield mock
+
+class TestVerifySignature:
+    def test_success(self):
+        body = b'{"action": "opened"}'
+        signature = 'sha256=' + hmac.new(b'secret', body, hashlib.sha256).hexdigest()
+
+        assert verify_signature('secret', body, signature)
+
+    @pytest.mark.parametrize('secret, signature', [
+        ('secret', None),
+        ('secret', 'sha1=abc'),
+        ('secret', 'sha256=' + '0' * 64),
+        ('', 'sha256=' + '0' * 64)
+    ])
+    def test_invalid(self, secret, signature):
+        assert not verify_signature(secret, b'{"action": "opened"}', signature)
+
+@pytest.mark.usefixtures('synced_repository', 'mock_generate_serialized_embedding')
+class TestHandleWebhookEvent:
+    @pytest.mark.asyncio
+    async def test_issue_opened(self, mock_fetch_comments_for_issue):
+        result = await handle_webhook_event('issues', load_payload('issues_opened.json'))
+
+        assert (result.status, result.name, result.number) == ('upserted', 'test_owner/test_repo', 42)
+        issue = IssueRepository.select_by_primary_key('test_owner/test_repo', 42)
+        assert issue.title == 'Crash on startup with ERR_CONNECTION_RESET'
+        assert issue.comments == ['The app crashes right after launch.', 'Happens on Linux too.']
+        assert issue.updated == '2024-05-01T09:00:00Z'
+        assert IndexVersionRepository.select_version('test_owner/test_repo') == 1
+        assert is_webhook_managed(SyncStateRepository.select_by_name('test_owner/test_repo'))
+        mock_fetch_comments_for_issue.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_issue_edited_reuses_stored_comments(self, mock_fetch_comments_for_issue):
+        await handle_webhook_event('issues', load_payload('issues_opened.json'))
+        lexical_index = get_lexical_index('test_owner/test_repo')
+
+        result = await handle_webhook_event('issues', load_payload('issues_edited.json'))
+
+        assert result.status == 'upserted'
+        issue = IssueRepository.select_by_primary_key('test_owner/test_repo', 42)
+        assert issue.comments == ['The app crashes right after launch behind a proxy.', 'Happens on Linux too.']
+        assert mock_fetch_comments_for_issue.await_count == 1
+        # The loaded lexical index is updated in place
+        assert lexical_index.version == 2
+        assert get_lexical_index('test_owner/test_repo') is lexical_index
+        assert lexical_index.score(['proxy'], [42])[0] > 0
+
+    @pytest.mark.asyncio
+    async def test_comment_created_appends_comment(self, mock_fetch_comments_for_issue):
+        await handle_webhook_event('issues', load_payload('issues_opened.json'))
+
+        await handle_webhook_event('issue_comment', load_payload('issue_comment_created.json'))
+
+        issue = IssueRepository.select_by_primary_key('test_owner/test_repo', 42)
+        assert issue.comments[1:] == ['Happens on Linux too.', 'Same here on version 2.1.']
+        assert mock_fetch_comments_for_issue.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_comment_deleted_fetches_comments(self, mock_fetch_comments_for_issue):
+        await handle_webhook_event('issues', load_payload('issues_opened.json'))
+        mock_fetch_comments_for_issue.return_value = []
+
+        await handle_webhook_event('issue_comment', load_payload('issue_comment_deleted.json'))
+
+        issue = IssueRepository.select_by_primary_key('test_owner/test_repo', 42)
+        assert issue.comments == ['The app crashes right after launch.']
+        assert mock_fetch_comments_for_issue.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_redelivery(self, mock_fetch_comments_for_issue):
+        await handle_webhook_event('issues', load_payload('issues_opened.json'))
+
+        result = await handle_webhook_event('issues', load_payload('issues_opened.json'))
+
+        assert result.status == 'ignored'
+        assert IndexVersionRepository.select_version('test_owner/test_repo') == 1
+
+    @pytest.mark.asyncio
+    async def test_out_of_order_delivery(self, mock_fetch_comments_for_issue):
+        newer = load_payload('issues_opened.json')
+        older = load_payload('issues_opened.json')
+        older['issue']['updated_at'] = '2024-05-01T08:59:59Z'
+        older['issue']['title'] = 'An outdated title'
+        await handle_webhook_event('issues', newer)
+
+        result = await handle_webhook_event('issues', older)
+
+        assert result.status == 'ignored'
+        assert IssueRepository.select_by_primary_key('test_owner/test_repo', newer['issue']['number']).title != (
+            'An outdated title'
+        )
+
+    @pytest.mark.asyncio
+    async def test_issue_deleted(self, mock_fetch_comments_for_issue, test_app, tmp_path):
+        test_app.config['EMBEDDING_STORE_DIR'] = str(tmp_path)
+        await handle_webhook_event('issues', load_payload('issues_opened.json'))
+        lexical_index = get_lexical_index('test_owner/test_repo')
+
+        result = await handle_webhook_event('issues', load_payload('issues_deleted.json'))
+
+        assert result.status == 'removed'
+        assert IssueRepository.select_by_primary_key('test_owner/test_repo', 42) is None
+        assert not lexical_index.score(['crash'], [42]).any()
+        assert IndexVersionRepository.select_version('test_owner/test_repo') == 2
+
+    @pytest.mark.asyncio
+    async def test_unsynced_repository(self, mock_fetch_comments_for_issue):
+        payload = load_payload('issues_opened.json')
+        payload['repository']['full_name'] = 'test_owner/other_repo'
+
+        result = await handle_webhook_event('issues', payload)
+
+        assert result.status == 'ignored'
+        assert IssueRepository.select_by_primary_key('test_owner/other_repo', 42) is None
+
+    @pytest.mark.asyncio
+    async def test_other_event(self):
+        result = await handle_webhook_event('ping', {'zen': 'Keep it logically awesome.'})
+
+        assert (result.event, result.status) == ('ping', 'ignored')
+
+    @pytest.mark.asyncio
+    async def test_invalid_payload(self):
+        with pytest.raises(InvalidFieldError) as excinfo:
+            await handle_webhook_event('issues', {'action': 'opened', 'issue': {'number': 1}})
+
+        assert excinfo.value.field == 'repository'
+
+class TestIsWebhookManaged:
+    def test_expired(self, test_app):
+        SyncStateRepository.upsert('test_owner/test_repo', time.time())
+        SyncStateRepository.record_webhook('test_owner/test_repo', time.time() - 10)
+        sync_state = SyncStateRepository.select_by_name('test_owner/test_repo')
+
+        assert is_webhook_managed(sync_state)
+        test_app.config['WEBHOOK_SYNC_TTL'] = 5
+        assert not is_webhook_managed(sync_state)
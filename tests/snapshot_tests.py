@@ -0,0 +1,57 @@
+from unittest.mock import patch
+
+import pytest
+
+from app import create_app
+from app.schemas.snapshot_manifest_schema import SnapshotManifestSchema
+from app.snapshot import parse_args, main
+from app.utils.exceptions import SnapshotError
+
+from tests.testing_config import TestingConfig
+
+MANIFEST = SnapshotManifestSchema(
+    name='test_owner/test_repo', model='test-model', dimension=2, issues=3, created_at=1700000000.0
+)
+
+class TestParseArgs:
+    def test_export(self):
+        args = parse_args(['export', 'test_owner/test_repo', 'snapshot.zip'])
+
+        assert (args.command, args.repository, args.path) == ('export', 'test_owner/test_repo', 'snapshot.zip')
+
+    def test_import(self):
+        args = parse_args(['import', 'snapshot.zip', '--name', 'test_owner/copy_repo'])
+
+        assert (args.command, args.path, args.name) == ('import', 'snapshot.zip', 'test_owner/copy_repo')
+
+    @pytest.mark.parametrize('argv', [
+        ['export', 'test_repo', 'snapshot.zip'],
+        ['import', 'snapshot.zip', '--name', 'test_repo'],
+        ['import'],
+        []
+    ])
+    def test_invalid(self, argv):
+        with pytest.raises(SystemExit):
+            parse_args(argv)
+
+@patch('app.create_app')
+class TestMain:
+    @patch('app.services.snapshot_service.export_snapshot')
+    def test_export(self, mock_export_snapshot, mock_create_app, capsys):
+        mock_create_app.side_effect = lambda **kwargs: create_app(TestingConfig, **kwargs)
+        mock_export_snapshot.return_value = MANIFEST
+
+        assert main(['export', 'test_owner/test_repo', 'snapshot.zip']) == 0
+
+        mock_export_snapshot.assert_called_once_with('test_owner/test_repo', 'snapshot.zip')
+        mock_create_app.assert_called_once_with(start_sync_workers=False)
+        assert 'test_owner/test_repo: exported 3 issues to snapshot.zip' in capsys.readouterr().out
+
+    @patch('app.services.snapshot_service.import_snapshot')
+    def test_import_failure(self, mock_import_snapshot, mock_create_app, capsys):
+        mock_create_app.side_effect = lambda **kwargs: create_app(TestingConfig, **kwargs)
+        mock_import_snapshot.side_effect = SnapshotError('built with the model other-model, not test-model')
+
+        assert main(['import', 'snapshot.zip']) == 1
+
+        assert 'snapshot.zip: Invalid index snapshot: built with the model other-model' in capsys.readouterr().err
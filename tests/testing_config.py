@@ -5,3 +5,7 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     LOG_LEVEL = logging.DEBUG
+    EMBEDDING_STORE_DIR = ''
+    SYNC_LOCK_DIR = ''
+    SYNC_WORKERS = 0
+    QUERY_BATCH_WAIT = 0
@@ -0,0 +1,75 @@
+# pylint: disable=W0621
+
+import gzip
+import json
+from unittest.mock import patch
+
+import pytest
+from flask import Response, jsonify
+
+from app import create_app
+from app.utils import compression
+
+from tests.testing_config import TestingConfig
+
+@pytest.fixture
+def test_app():
+    app = create_app(TestingConfig)
+    app.config['COMPRESSION_MIN_SIZE'] = 100
+
+    @app.route('/test/large')
+    def large():
+        return jsonify({'comments': ['comment'] * 100})
+
+    @app.route('/test/small')
+    def small():
+        return jsonify({'comments': []})
+
+    @app.route('/test/stream')
+    def stream():
+        return Response((line for line in ['{"type": "results"}\n'] * 100), mimetype='application/x-ndjson')
+
+    return app
+
+@pytest.fixture
+def client(test_app):
+    return test_app.test_client()
+
+class TestCompressResponse:
+    def test_gzip(self, client):
+        response = client.get('/test/large', headers={'Accept-Encoding': 'gzip'})
+
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert json.loads(gzip.decompress(response.data)) == {'comments': ['comment'] * 100}
+
+    def test_brotli(self, client):
+        fake_brotli = type('FakeBrotli', (), {'compress': staticmethod(lambda data: b'br:' + data)})
+        with patch.object(compression, 'brotli', fake_brotli):
+            response = client.get('/test/large', headers={'Accept-Encoding': 'gzip, br'})
+
+        assert response.headers['Content-Encoding'] == 'br'
+        assert response.data.startswith(b'br:')
+
+    def test_not_accepted(self, client):
+        response = client.get('/test/large')
+
+        assert 'Content-Encoding' not in response.headers
+        assert response.json == {'comments': ['comment'] * 100}
+
+    def test_small_response(self, client):
+        response = client.get('/test/small', headers={'Accept-Encoding': 'gzip'})
+
+        assert 'Content-Encoding' not in response.headers
+
+    def test_streamed_response(self, client):
+        response = client.get('/test/stream', headers={'Accept-Encoding': 'gzip'})
+
+        assert 'Content-Encoding' not in response.headers
+
+    def test_disabled(self, test_app, client):
+        test_app.config['COMPRESSION_ENABLED'] = False
+
+        response = client.get('/test/large', headers={'Accept-Encoding': 'gzip'})
+
+        assert 'Content-Encoding' not in response.headers
@@ -0,0 +1,98 @@
+import pytest
+
+from app.utils.metrics import (
+    Counter, Gauge, Histogram, MetricsRegistry, cache_hit_ratio, metrics, record_cache, record_embedding,
+    issues_embedded, embedding_batch_size, to_repository_size
+)
+
+class TestCounter:
+    def test_labels(self):
+        counter = Counter('requests_total', 'Requests.', ('status',))
+
+        counter.inc(status='200')
+        counter.inc(2, status='200')
+        counter.inc(status='404')
+
+        assert counter.value(status='200') == 3
+        assert counter.render() == ['requests_total{status="200"} 3.0', 'requests_total{status="404"} 1.0']
+
+    def test_unlabeled_counter_starts_at_zero(self):
+        assert Counter('requests_total', 'Requests.').render() == ['requests_total 0.0']
+
+    def test_wrong_labels(self):
+        with pytest.raises(ValueError):
+            Counter('requests_total', 'Requests.', ('status',)).inc(code='200')
+
+    def test_escapes_label_values(self):
+        counter = Counter('requests_total', 'Requests.', ('path',))
+
+        counter.inc(path='a"b\\c')
+
+        assert counter.render() == ['requests_total{path="a\\"b\\\\c"} 1.0']
+
+class TestGauge:
+    def test_set(self):
+        gauge = Gauge('remaining', 'Remaining.')
+
+        gauge.set(10)
+        gauge.set(4)
+
+        assert gauge.render() == ['remaining 4.0']
+
+class TestHistogram:
+    def test_buckets_are_cumulative(self):
+        histogram = Histogram('seconds', 'Seconds.', (0.1, 1.0), ('size',))
+
+        histogram.observe(0.05, size='<1k')
+        histogram.observe(0.5, size='<1k')
+        histogram.observe(5, size='<1k')
+
+        assert histogram.count(size='<1k') == 3
+        assert histogram.render() == [
+            'seconds_bucket{size="<1k",le="0.1"} 1.0',
+            'seconds_bucket{size="<1k",le="1.0"} 2.0',
+            'seconds_bucket{size="<1k",le="+Inf"} 3.0',
+            'seconds_sum{size="<1k"} 5.55',
+            'seconds_count{size="<1k"} 3.0'
+        ]
+
+class TestMetricsRegistry:
+    def test_render(self):
+        registry = MetricsRegistry()
+        registry.counter('requests_total', 'Requests.').inc()
+        registry.gauge('remaining', 'Remaining.').set(1)
+
+        assert registry.render() == (
+            '# HELP requests_total Requests.\n'
+            '# TYPE requests_total counter\n'
+            'requests_total 1.0\n'
+            '# HELP remaining Remaining.\n'
+            '# TYPE remaining gauge\n'
+            'remaining 1.0\n'
+        )
+
+class TestRecordCache:
+    def test_hit_ratio(self):
+        metrics.reset()
+
+        record_cache('results', hits=1)
+        record_cache('results', hits=2, misses=1)
+
+        assert cache_hit_ratio.value(cache='results') == pytest.approx(0.75)
+
+class TestRecordEmbedding:
+    def test_success(self):
+        metrics.reset()
+
+        record_embedding(32, 0.5)
+
+        assert issues_embedded.value() == 32
+        assert embedding_batch_size.count() == 1
+        assert 'issues_embedded_per_second 64.0' in metrics.render()
+
+class TestToRepositorySize:
+    @pytest.mark.parametrize('size, expected', [
+        (0, '<1k'), (999, '<1k'), (1000, '1k-10k'), (10000, '10k-100k'), (100000, '>=100k')
+    ])
+    def test_success(self, size, expected):
+        assert to_repository_size(size) == expected
@@ -0,0 +1,53 @@
+# pylint: disable=W0621
+
+import threading
+
+import pytest
+from flask import current_app, g
+
+from app import create_app, db
+from app.utils.offload import run_off_loop
+from app.utils.profiling import profile_request
+from app.utils.stage_timing import time_stage
+
+from tests.testing_config import TestingConfig
+
+@pytest.fixture
+def test_app():
+    return create_app(TestingConfig, start_sync_workers=False)
+
+class TestRunOffLoop:
+    @pytest.mark.asyncio
+    async def test_runs_in_another_thread(self):
+        assert await run_off_loop(threading.get_ident) != threading.get_ident()
+
+    @pytest.mark.asyncio
+    async def test_passes_arguments(self):
+        assert await run_off_loop(lambda a, b=0: a + b, 1, b=2) == 3
+
+    @pytest.mark.asyncio
+    async def test_uses_app_context_of_its_own(self, test_app):
+        with test_app.app_context():
+            session = db.session()
+            app, thread_session = await run_off_loop(lambda: (current_app.name, db.session()))
+
+        assert app == test_app.name
+        assert thread_session is not session
+
+    @pytest.mark.asyncio
+    async def test_carries_stage_timings_over(self, test_app):
+        def read():
+            with time_stage('db_read'):
+                pass
+
+        with test_app.app_context():
+            g.stage_timings = {}
+            await run_off_loop(read)
+
+            assert list(g.stage_timings) == ['db_read']
+
+    @pytest.mark.asyncio
+    async def test_runs_inline_while_profiling(self, test_app, tmp_path):
+        test_app.config.update(PROFILING_ENABLED=True, PROFILE_DIR=str(tmp_path))
+        with test_app.test_request_context(headers={'X-Profile': 'true'}), profile_request('test'):
+            assert await run_off_loop(threading.get_ident) == threading.get_ident()
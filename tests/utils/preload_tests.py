@@ -0,0 +1,31 @@
+from unittest.mock import patch
+
+from app.services import issue_service
+from app.utils.preload import preload_model, configure_worker_threads
+
+class TestPreloadModel:
+    @patch('app.utils.preload.gc.freeze')
+    def test_success(self, mock_freeze):
+        issue_searcher = preload_model()
+
+        assert issue_searcher is issue_service.issue_searcher
+        assert issue_searcher._model is not None  # pylint: disable=protected-access
+        mock_freeze.assert_called_once()
+
+class TestConfigureWorkerThreads:
+    @patch('app.utils.preload.torch.set_num_threads')
+    @patch('app.utils.preload.os.cpu_count', return_value=8)
+    def test_divides_cores(self, _, mock_set_num_threads):
+        assert configure_worker_threads(4) == 2
+        mock_set_num_threads.assert_called_once_with(2)
+
+    @patch('app.utils.preload.torch.set_num_threads')
+    @patch('app.utils.preload.os.cpu_count', return_value=2)
+    def test_at_least_one_thread(self, _, mock_set_num_threads):
+        assert configure_worker_threads(4) == 1
+        mock_set_num_threads.assert_called_once_with(1)
+
+    @patch('app.utils.preload.torch.set_num_threads')
+    def test_explicit_threads(self, mock_set_num_threads):
+        assert configure_worker_threads(4, 3) == 3
+        mock_set_num_threads.assert_called_once_with(3)
@@ -0,0 +1,94 @@
+# pylint: disable=W0621
+
+import pstats
+
+import numpy as np
+import pytest
+from flask import jsonify
+
+from app import create_app
+from app.services.query_batcher import QueryBatcher
+from app.utils.profiling import profile_request
+
+from tests.testing_config import TestingConfig
+
+def busy_function():
+    return sum(range(1000))
+
+def encode_queries(queries):
+    return np.array([[len(query)] for query in queries], dtype=np.float32)
+
+@pytest.fixture
+def test_app(tmp_path):
+    app = create_app(TestingConfig)
+    app.config['PROFILING_ENABLED'] = True
+    app.config['PROFILE_DIR'] = str(tmp_path)
+
+    @app.route('/test/profiled')
+    async def profiled():
+        with profile_request('test'):
+            busy_function()
+        return jsonify({})
+
+    query_batcher = QueryBatcher(encode_queries, max_wait=0.01)
+
+    @app.route('/test/profiled/encode')
+    async def profiled_encode():
+        with profile_request('test'):
+            await query_batcher.encode_async('crash')
+        return jsonify({})
+
+    return app
+
+@pytest.fixture
+def client(test_app):
+    return test_app.test_client()
+
+class TestProfileRequest:
+    def test_header(self, client, tmp_path):
+        response = client.get('/test/profiled', headers={'X-Profile': 'true'})
+
+        file_name = response.headers['X-Profile']
+        assert file_name.startswith('test-') and file_name.endswith('.prof')
+        stats = pstats.Stats(str(tmp_path / file_name))
+        assert any(function_name == 'busy_function' for _, _, function_name in stats.stats)
+
+    def test_includes_batched_query_encoding(self, client, tmp_path):
+        response = client.get('/test/profiled/encode?profile=true')
+
+        stats = pstats.Stats(str(tmp_path / response.headers['X-Profile']))
+        assert any(function_name == 'encode_queries' for _, _, function_name in stats.stats)
+
+    def test_query(self, client, tmp_path):
+        response = client.get('/test/profiled?profile=true')
+
+        assert (tmp_path / response.headers['X-Profile']).exists()
+
+    def test_not_requested(self, client, tmp_path):
+        response = client.get('/test/profiled')
+
+        assert 'X-Profile' not in response.headers
+        assert not list(tmp_path.iterdir())
+
+    def test_disabled(self, test_app, client, tmp_path):
+        test_app.config['PROFILING_ENABLED'] = False
+
+        response = client.get('/test/profiled?profile=true')
+
+        assert 'X-Profile' not in response.headers
+        assert not list(tmp_path.iterdir())
+
+    def test_download(self, client):
+        file_name = client.get('/test/profiled?profile=true').headers['X-Profile']
+
+        response = client.get(f'/profiles/{file_name}')
+
+        assert response.status_code == 200
+        assert response.content_type == 'application/octet-stream'
+        assert client.get('/profiles/missing.prof').status_code == 404
+
+    def test_download_disabled(self, test_app, client):
+        file_name = client.get('/test/profiled?profile=true').headers['X-Profile']
+        test_app.config['PROFILING_ENABLED'] = False
+
+        assert client.get(f'/profiles/{file_name}').status_code == 404
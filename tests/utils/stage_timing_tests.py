@@ -0,0 +1,104 @@
+# pylint: disable=W0621
+
+import time
+
+import pytest
+from flask import Response, jsonify
+
+from app import create_app
+from app.utils.stage_timing import get_stage_timings, time_stage
+
+from tests.testing_config import TestingConfig
+
+@pytest.fixture
+def test_app():
+    app = create_app(TestingConfig)
+
+    @app.route('/test/stages', methods=['GET', 'POST'])
+    async def stages():
+        with time_stage('list'):
+            time.sleep(0.01)
+        for _ in range(2):
+            with time_stage('embed'):
+                time.sleep(0.005)
+        return jsonify({'issues': []})
+
+    @app.route('/test/list')
+    def list_response():
+        return jsonify([])
+
+    @app.route('/test/stream')
+    def stream():
+        with time_stage('list'):
+            pass
+        return Response((line for line in ['{"type": "results"}\n']), mimetype='application/x-ndjson')
+
+    return app
+
+@pytest.fixture
+def client(test_app):
+    return test_app.test_client()
+
+def parse_server_timing(header):
+    return {
+        metric.split(';dur=')[0]: float(metric.split(';dur=')[1]) for metric in header.split(', ')
+    }
+
+class TestStageTiming:
+    def test_server_timing_header(self, client):
+        response = client.get('/test/stages')
+
+        durations = parse_server_timing(response.headers['Server-Timing'])
+        assert list(durations) == ['list', 'embed', 'total']
+        assert durations['list'] >= 10
+        assert durations['embed'] >= 10
+        assert durations['total'] >= durations['list'] + durations['embed']
+        assert response.json == {'issues': []}
+
+    def test_timings_block_from_query(self, client):
+        response = client.get('/test/stages?timings=true')
+
+        assert set(response.json['timings']) == {'list', 'embed', 'total'}
+        assert response.json['issues'] == []
+
+    def test_timings_block_from_body(self, client):
+        response = client.post('/test/stages', json={'timings': True})
+
+        assert response.json['timings']['list'] >= 10
+
+    def test_timings_block_needs_json_object(self, client):
+        response = client.get('/test/list?timings=true')
+
+        assert response.json == []
+        assert parse_server_timing(response.headers['Server-Timing']).keys() == {'total'}
+
+    def test_stream_keeps_body(self, client):
+        response = client.get('/test/stream?timings=true')
+
+        assert response.data == b'{"type": "results"}\n'
+        assert 'list' in parse_server_timing(response.headers['Server-Timing'])
+
+    def test_log_line(self, client, caplog):
+        with caplog.at_level('INFO', logger='app.utils.stage_timing'):
+            client.get('/test/stages')
+            client.get('/test/list')
+
+        assert len(caplog.records) == 1
+        message = caplog.records[0].getMessage()
+        assert message.startswith('timings method=GET path=/test/stages status=200 list_ms=')
+        assert 'embed_ms=' in message and 'total_ms=' in message
+
+    def test_disabled(self, test_app, client):
+        test_app.config['SERVER_TIMING_ENABLED'] = False
+
+        response = client.get('/test/stages?timings=true')
+
+        assert 'Server-Timing' not in response.headers
+        assert 'timings' not in response.json
+
+    def test_outside_of_request(self, test_app):
+        with test_app.app_context():
+            with time_stage('list'):
+                pass
+
+            assert get_stage_timings() is None
@@ -0,0 +1,49 @@
+from unittest.mock import patch
+
+from app.utils.ttl_cache import TtlLruCache
+
+class TestTtlLruCache:
+    def test_get_and_set(self):
+        cache = TtlLruCache(2)
+        cache.set('a', 1)
+
+        assert cache.get('a') == 1
+        assert cache.get('b') is None
+
+    def test_evicts_least_recently_used(self):
+        cache = TtlLruCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        assert cache.get('a') == 1
+        assert cache.get('b') is None
+        assert cache.get('c') == 3
+        assert len(cache) == 2
+
+    @patch('app.utils.ttl_cache.time.monotonic')
+    def test_expires_entries(self, mock_monotonic):
+        cache = TtlLruCache(2, ttl=10)
+        mock_monotonic.return_value = 100.0
+        cache.set('a', 1)
+
+        mock_monotonic.return_value = 109.0
+        assert cache.get('a') == 1
+
+        mock_monotonic.return_value = 111.0
+        assert cache.get('a') is None
+        assert len(cache) == 0
+
+    def test_disabled(self):
+        cache = TtlLruCache(0)
+        cache.set('a', 1)
+
+        assert cache.get('a') is None
+
+    def test_clear(self):
+        cache = TtlLruCache(2)
+        cache.set('a', 1)
+        cache.clear()
+
+        assert len(cache) == 0
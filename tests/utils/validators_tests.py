@@ -2,8 +2,11 @@ import pytest
 
 from werkzeug.datastructures import ImmutableMultiDict
 
-from app.utils.validators import validate_form_data
-from app.utils.exceptions import MissingFieldsError
+from app.schemas.search_options_schema import SearchOptionsSchema
+from app.utils.validators import (
+    validate_form_data, validate_batch_data, validate_multi_repository_data, parse_search_options
+)
+from app.utils.exceptions import MissingFieldsError, InvalidFieldError
 
 class TestValidateFormData:
     def test_success(self):
@@ -26,3 +29,109 @@ class TestValidateFormData:
             validate_form_data(form_data)
 
         assert excinfo.value.missing_fields == ['repository', 'title']
+
+    def test_invalid_mode(self):
+        form_data = ImmutableMultiDict({
+            'owner': 'test_owner',
+            'repository': 'test_repo',
+            'title': 'test_title',
+            'mode': 'unknown'
+        })
+        with pytest.raises(InvalidFieldError) as excinfo:
+            validate_form_data(form_data)
+
+        assert excinfo.value.field == 'mode'
+
+    def test_invalid_ranking(self):
+        form_data = ImmutableMultiDict({
+            'owner': 'test_owner',
+            'repository': 'test_repo',
+            'title': 'test_title',
+            'ranking': 'unknown'
+        })
+        with pytest.raises(InvalidFieldError) as excinfo:
+            validate_form_data(form_data)
+
+        assert excinfo.value.field == 'ranking'
+
+class TestParseSearchOptions:
+    def test_defaults(self):
+        assert parse_search_options(ImmutableMultiDict({}), snippet_length=100) == SearchOptionsSchema(
+            limit=None, offset=0, fields=None, snippet_length=100
+        )
+
+    def test_success(self):
+        form_data = ImmutableMultiDict({
+            'limit': '10',
+            'offset': '20',
+            'fields': 'number, title,threshold',
+            'snippet_length': '0'
+        })
+
+        assert parse_search_options(form_data, snippet_length=100) == SearchOptionsSchema(
+            limit=10, offset=20, fields=['number', 'title', 'threshold'], snippet_length=0
+        )
+
+    def test_fields_as_list(self):
+        assert parse_search_options({'fields': ['number', 'url']}).fields == ['number', 'url']
+
+    @pytest.mark.parametrize('form_data, field', [
+        ({'limit': '-1'}, 'limit'),
+        ({'offset': 'abc'}, 'offset'),
+        ({'snippet_length': True}, 'snippet_length'),
+        ({'fields': 'number,embedding'}, 'fields'),
+        ({'fields': []}, 'fields')
+    ])
+    def test_invalid(self, form_data, field):
+        with pytest.raises(InvalidFieldError) as excinfo:
+            parse_search_options(form_data)
+
+        assert excinfo.value.field == field
+
+class TestValidateBatchData:
+    def test_success(self):
+        validate_batch_data({
+            'owner': 'test_owner',
+            'repository': 'test_repo',
+            'queries': [{'title': 'title1'}, {'title': 'title2', 'description': 'description2'}]
+        }, max_queries=2)
+
+    def test_missing_query_title(self):
+        with pytest.raises(MissingFieldsError) as excinfo:
+            validate_batch_data({
+                'owner': 'test_owner',
+                'repository': 'test_repo',
+                'queries': [{'title': 'title1'}, {'description': 'description2'}, 'title3']
+            }, max_queries=10)
+
+        assert excinfo.value.missing_fields == ['queries[1].title', 'queries[2].title']
+
+    @pytest.mark.parametrize('queries', ['title', [{'title': 'title'}] * 3])
+    def test_invalid_queries(self, queries):
+        with pytest.raises(InvalidFieldError) as excinfo:
+            validate_batch_data({'owner': 'test_owner', 'repository': 'test_repo', 'queries': queries}, max_queries=2)
+
+        assert excinfo.value.field == 'queries'
+
+class TestValidateMultiRepositoryData:
+    @pytest.mark.parametrize('form_data', [
+        {'repositories': ['test_owner/repo1', 'test_owner/repo.2'], 'title': 'test_title'},
+        {'organization': 'test_owner', 'title': 'test_title'}
+    ])
+    def test_success(self, form_data):
+        validate_multi_repository_data(form_data, max_repositories=2)
+
+    def test_missing_repositories(self):
+        with pytest.raises(MissingFieldsError) as excinfo:
+            validate_multi_repository_data({'title': 'test_title'}, max_repositories=2)
+
+        assert excinfo.value.missing_fields == ['repositories or organization']
+
+    @pytest.mark.parametrize('repositories', [
+        'test_owner/repo1', ['test_owner'], ['test_owner/repo1/extra'], ['test_owner/repo1', 'test_owner/repo2', 'a/b']
+    ])
+    def test_invalid_repositories(self, repositories):
+        with pytest.raises(InvalidFieldError) as excinfo:
+            validate_multi_repository_data({'repositories': repositories, 'title': 'test_title'}, max_repositories=2)
+
+        assert excinfo.value.field == 'repositories'
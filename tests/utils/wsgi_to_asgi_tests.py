@@ -0,0 +1,74 @@
+# pylint: disable=W0621
+
+import asyncio
+import json
+import time
+
+import pytest
+from flask import jsonify, request
+
+from app import create_app
+from app.utils.wsgi_to_asgi import ThreadPoolWsgiToAsgi
+
+from tests.testing_config import TestingConfig
+
+@pytest.fixture
+def application():
+    app = create_app(TestingConfig)
+
+    @app.route('/test/loop', methods=['POST'])
+    async def loop():
+        await asyncio.sleep(0.2)
+        return jsonify({'loop': id(asyncio.get_running_loop()), 'title': request.get_json()['title']})
+
+    return ThreadPoolWsgiToAsgi(app)
+
+async def call(application, path, body):
+    data = json.dumps(body).encode()
+    messages = [{'type': 'http.request', 'body': data, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    await application({
+        'type': 'http', 'method': 'POST', 'path': path, 'root_path': '', 'query_string': b'',
+        'http_version': '1.1',
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(data)).encode())]
+    }, receive, send)
+    return sent[0]['status'], json.loads(b''.join(message.get('body', b'') for message in sent[1:]))
+
+class TestThreadPoolWsgiToAsgi:
+    @pytest.mark.asyncio
+    async def test_async_views_share_the_server_loop(self, application):
+        status, body = await call(application, '/test/loop', {'title': 'crash'})
+
+        assert status == 200
+        assert body == {'loop': id(asyncio.get_running_loop()), 'title': 'crash'}
+
+    @pytest.mark.asyncio
+    async def test_requests_run_concurrently(self, application):
+        started_at = time.perf_counter()
+
+        results = await asyncio.gather(*(call(application, '/test/loop', {'title': str(i)}) for i in range(4)))
+
+        assert [body['title'] for _, body in results] == ['0', '1', '2', '3']
+        assert time.perf_counter() - started_at < 0.6
+
+    @pytest.mark.asyncio
+    async def test_lifespan(self, application):
+        messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        await application({'type': 'lifespan'}, receive, send)
+
+        assert sent == [{'type': 'lifespan.startup.complete'}, {'type': 'lifespan.shutdown.complete'}]